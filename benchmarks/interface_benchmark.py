@@ -0,0 +1,96 @@
+# Benchmark of the interface loading cost of the ASAP compiler for a synthetic design
+# -- json:     asap_interface.json is loaded, the control maps are reordered (ControlSignalMappingModel) and
+#              signals are resolved by dict descent
+# -- compiled: asap_interface.idx is mmapped (after the staleness check against asap_interface.json),
+#              ControlSignalMappingModel takes the precomputed reordering and signals are resolved by binary search
+# The load time is the startup cost of a compile. A compile then looks up the signals of its patch programs, so the
+# lookup cost grows with the patch programs, not with the design
+#
+# Usage: python3 benchmarks/interface_benchmark.py [<HOOKED SIGNALS> [<LOOKUPS>]]
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+import logging
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ASAPInterface import CompiledInterface, CompiledInterfaceWriter
+from ASAPCompiler import ControlSignalMappingModel
+
+SIGNAL_WIDTH    = 4
+SIGNALS_PER_MOD = 16
+
+
+# Writes the asap_interface.json of a design with <numSignals> observed and <numSignals> controlled signals
+# and returns the hierarchical names of the signals
+def writeInterface(interfaceFile, numSignals):
+    observabilityMap, controllabilityMap, controlTypeMap = {"TOP": {}}, {"TOP": {}}, {"TOP": {}}
+    signals = []
+    for index in range(numSignals):
+        moduleName, signalName = "u%d"%(index // SIGNALS_PER_MOD), "s%d"%(index % SIGNALS_PER_MOD)
+        for interfaceMap in [observabilityMap, controllabilityMap, controlTypeMap]:
+            interfaceMap["TOP"].setdefault(moduleName, {})
+        observabilityMap["TOP"][moduleName][signalName]   = [(index + 1) * SIGNAL_WIDTH - 1, index * SIGNAL_WIDTH]
+        controllabilityMap["TOP"][moduleName][signalName] = [(index + 1) * SIGNAL_WIDTH - 1, index * SIGNAL_WIDTH]
+        controlTypeMap["TOP"][moduleName][signalName]     = "clock" if index % SIGNALS_PER_MOD == 0 else "signal"
+        signals.append("TOP.%s.%s"%(moduleName, signalName))
+    with open(interfaceFile, "w") as ioFile:
+        json.dump({'OBSERVABILITY_MAP'   : observabilityMap,   \
+                   'CONTROLLABILITY_MAP' : controllabilityMap, \
+                   'CONTROL_TYPE_MAP'    : controlTypeMap}, ioFile, indent = 4)
+    return signals
+
+def lookupJson(signalMap, signal):
+    index = signalMap
+    for key in signal.split("."):
+        index = index[key]
+    return index
+
+# Returns (<LOAD SECONDS>, <SECONDS PER LOOKUP>) of the JSON interface
+def benchmarkJson(interfaceFile, lookups):
+    start = time.perf_counter()
+    with open(interfaceFile, "r") as ioFile:
+        ioMap = json.load(ioFile)
+    ControlSignalMappingModel(ioMap['CONTROLLABILITY_MAP'], ioMap['CONTROL_TYPE_MAP'])
+    loadTime = time.perf_counter() - start
+    start = time.perf_counter()
+    for signal in lookups:
+        lookupJson(ioMap['OBSERVABILITY_MAP'], signal)
+    return loadTime, (time.perf_counter() - start) / len(lookups)
+
+# Returns (<LOAD SECONDS>, <SECONDS PER LOOKUP>, <LEAF TABLE SECONDS>) of the compiled interface
+# The full control leaf table (every control record decoded) is not built by a compile
+def benchmarkCompiled(interfaceFile, lookups):
+    start = time.perf_counter()
+    interface = CompiledInterface.load(interfaceFile).getInterface()
+    ControlSignalMappingModel(None, None, compiledInterface = interface)
+    loadTime = time.perf_counter() - start
+    start = time.perf_counter()
+    for signal in lookups:
+        interface.getObserveIndex(signal)
+    lookupTime = (time.perf_counter() - start) / len(lookups)
+    start = time.perf_counter()
+    interface.getControlLeafTable()
+    return loadTime, lookupTime, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    numSignals = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    numLookups = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    with tempfile.TemporaryDirectory() as outputFolder:
+        interfaceFile = os.path.join(outputFolder, "asap_interface.json")
+        signals = writeInterface(interfaceFile, numSignals)
+        start = time.perf_counter()
+        CompiledInterfaceWriter(interfaceFile)
+        indexTime = time.perf_counter() - start
+        lookups = random.Random(0).choices(signals, k=numLookups)
+        jsonLoad, jsonLookup                       = benchmarkJson(interfaceFile, lookups)
+        compiledLoad, compiledLookup, leafTableTime = benchmarkCompiled(interfaceFile, lookups)
+        print("%d hooked signal(s), asap_interface.json %.1f MB, asap_interface.idx %.1f MB (written in %.2f s)"%(numSignals,                                                \
+                                                                                                              os.path.getsize(interfaceFile) / 1e6,                      \
+                                                                                                              os.path.getsize(interfaceFile[:-len(".json")] + ".idx") / 1e6, \
+                                                                                                              indexTime))
+        print("json     : load %8.1f ms, lookup %6.2f us"%(jsonLoad * 1e3, jsonLookup * 1e6))
+        print("compiled : load %8.1f ms, lookup %6.2f us, full control leaf table %.1f ms"%(compiledLoad * 1e3, compiledLookup * 1e6, leafTableTime * 1e3))
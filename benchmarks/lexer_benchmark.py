@@ -0,0 +1,100 @@
+# Micro-benchmark of the per-file tokenization cost of the SMU/SRU patch programs
+# -- uncached: A PLY lexer is built for every file (master regex compiled per file)
+# -- cached:   Every file gets a clone of the master lexer of its lexer class
+# -- parse:    Every file is parsed to its AST by the (cached) yacc grammar of its lexer class, on a cached lexer
+# The programs are the sample programs and generated programs of <SEQUENCES> sequences (of MAX_SEQ_DEPTH patterns)
+# and as many control blocks, so that the token stream of a file is the size of a realistic patch program
+#
+# Usage: python3 benchmarks/lexer_benchmark.py [<ITERATIONS>] [<SEQUENCES>]
+import os
+import sys
+import time
+import glob
+import logging
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import ply.lex as lex
+from ASAPCompiler import ASAPSmuLexer, ASAPSruLexer, ASAPSmuGrammar, ASAPSruGrammar
+
+SAMPLE_DIR    = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'asap_sample', 'remediation_programs')
+MAX_SEQ_DEPTH = 5
+GRAMMARS      = {ASAPSmuLexer: ASAPSmuGrammar, ASAPSruLexer: ASAPSruGrammar}
+
+
+# SMU program of <numSequences> sequences of MAX_SEQ_DEPTH patterns each (one of them empty)
+def getSmuProgram(numSequences):
+    sequences = []
+    for sequence in range(numSequences):
+        patterns = ["  (TOP.core%d.unit%d.state[%d:0] %s %d'b%s)"%(sequence % 4, pattern, pattern, ["==", ">", "<"][pattern % 3], \
+                                                                 pattern + 1, format(sequence % (2 ** (pattern + 1)), '0%db'%(pattern + 1))) \
+                    for pattern in range(MAX_SEQ_DEPTH - 1)]
+        sequences.append("t%d {\n%s\n  ()\n}"%(sequence, "\n".join(patterns)))
+    return "\n".join(sequences) + "\n"
+
+# SRU program of <numControls> signal/clock control blocks with trigger expressions of up to four triggers
+def getSruProgram(numControls):
+    controls = []
+    for control in range(numControls):
+        trigger = "(t%d.t%d' + ~(t%d ^ t%d))"%(control, (control + 1) % numControls, (control + 2) % numControls, (control + 3) % numControls)
+        if control % 2:
+            controls.append("clock {\n  name = TOP.core%d.clk_en[0:0]\n  trigger = %s\n}"%(control % 4, trigger))
+        else:
+            controls.append("signal {\n  name = TOP.core%d.ctrl%d[3:0]\n  trigger = %s\n  constant = 4'b%s\n}"%( \
+                            control % 4, control, trigger, format(control % 16, '04b')))
+    return "\n".join(controls) + "\n"
+
+
+def tokenize(lexer, code):
+    lexer.input(code)
+    return sum(1 for token in iter(lexer.token, None))
+
+def uncachedLexer(lexerClass):
+    return lex.lex(module=lexerClass())
+
+def cachedLexer(lexerClass):
+    return lexerClass().lexer
+
+# Returns (<SECONDS PER FILE>, <DIAGNOSTICS PER FILE>) of parsing every program <iterations> times
+def benchmarkParse(programs, iterations):
+    diagnostics = 0
+    start       = time.perf_counter()
+    for iteration in range(iterations):
+        for lexerClass, code in programs:
+            diagnostics += len(GRAMMARS[lexerClass].getGrammar().parseText(code)[1])
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(programs)), diagnostics / (iterations * len(programs))
+
+# Returns (<SECONDS PER FILE>, <TOKENS PER FILE>) of tokenizing every program <iterations> times
+def benchmark(getLexer, programs, iterations):
+    tokens = 0
+    start  = time.perf_counter()
+    for iteration in range(iterations):
+        for lexerClass, code in programs:
+            tokens += tokenize(getLexer(lexerClass), code)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(programs)), tokens / (iterations * len(programs))
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    iterations   = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    numSequences = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    programs = []
+    for smuFile in sorted(glob.glob(os.path.join(SAMPLE_DIR, '*', '*.smu'))):
+        with open(smuFile) as f:
+            programs.append((ASAPSmuLexer, f.read()))
+    for sruFile in sorted(glob.glob(os.path.join(SAMPLE_DIR, '*', '*.sru'))):
+        with open(sruFile) as f:
+            programs.append((ASAPSruLexer, f.read()))
+    programs.append((ASAPSmuLexer, getSmuProgram(numSequences)))
+    programs.append((ASAPSruLexer, getSruProgram(numSequences)))
+    # Warm-up: Builds (or loads) the master lexers, the grammars and their lex/parser tables
+    benchmark(cachedLexer, programs, 1)
+    assert benchmarkParse(programs, 1)[1] == 0, "Benchmark programs have syntax errors"
+    uncachedTime, tokens = benchmark(uncachedLexer, programs, iterations)
+    cachedTime, tokens   = benchmark(cachedLexer, programs, iterations)
+    parseTime, _         = benchmarkParse(programs, iterations)
+    print("%d program(s), %d iteration(s), %.1f token(s) per file"%(len(programs), iterations, tokens))
+    print("uncached : %8.1f us/file"%(uncachedTime * 1e6))
+    print("cached   : %8.1f us/file"%(cachedTime * 1e6))
+    print("speedup  : %8.1fx"%(uncachedTime / cachedTime))
+    print("parse    : %8.1f us/file (lexing included)"%(parseTime * 1e6))
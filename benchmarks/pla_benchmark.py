@@ -0,0 +1,65 @@
+# Benchmark of the SRU PLA minterm cfg (truth table of a trigger expression over the PLA inputs) by SRU segment size
+# -- minterm loop: The expression AST is evaluated once per minterm (2^<SEGMENT SIZE> evaluations)
+# -- truth table:  The whole truth table is evaluated at once on bit-parallel integer masks (PosExpr.getTruthTable)
+# -- Every trigger expression is a random expression of <SEGMENT SIZE> triggers with all the operators (+ ^ . ~ ')
+#
+# Usage: python3 benchmarks/pla_benchmark.py [<SRU SEGMENT SIZE> ...]
+import os
+import sys
+import time
+import random
+import logging
+from functools import reduce
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ASAPCompiler import PosExpr, TriggerVar, TriggerNot, TriggerOp
+
+REPEATS = 20
+
+
+# Returns a random trigger expression of the triggers <triggers>
+def getRandomExpr(rand, triggers):
+    if len(triggers) == 1:
+        return triggers[0] + ("'" if rand.random() < 0.3 else "")
+    split = rand.randint(1, len(triggers) - 1)
+    expr  = "(%s %s %s)"%(getRandomExpr(rand, triggers[:split]), rand.choice("+^."), getRandomExpr(rand, triggers[split:]))
+    return "~" + expr if rand.random() < 0.2 else expr
+
+# Value of the AST <node> for the trigger values <values>
+def evaluate(node, values):
+    if isinstance(node, TriggerVar):
+        return values[node.name]
+    if isinstance(node, TriggerNot):
+        return 1 - evaluate(node.operand, values)
+    return reduce(TriggerOp.operations[node.operator], [evaluate(operand, values) for operand in node.operands])
+
+# Minterm cfg by evaluating the expression per minterm
+def getMintermCfgByLoop(posExpr, segmentSize):
+    mintermCfg = 0
+    for minterm in range(2 ** segmentSize):
+        values = {var : (minterm >> index) & 1 for index, var in enumerate(posExpr.InputList)}
+        mintermCfg |= evaluate(posExpr.exprTree, values) << minterm
+    return mintermCfg
+
+# Returns (<SECONDS>, <MINTERM CFG>) per minterm cfg of <posExpr>
+def benchmark(posExpr, segmentSize, byLoop):
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        if byLoop:
+            mintermCfg = getMintermCfgByLoop(posExpr, segmentSize)
+        else:
+            posExpr.exprKey = None
+            mintermCfg = posExpr.getTruthTable(segmentSize)
+    return (time.perf_counter() - start) / REPEATS, mintermCfg
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes = [int(size) for size in sys.argv[1:]] or [4, 8, 10, 12, 16]
+    rand  = random.Random(0)
+    print("%12s %18s %18s"%("segment size", "minterm loop (us)", "truth table (us)"))
+    for size in sizes:
+        posExpr = PosExpr(getRandomExpr(rand, ["t%d"%(trigger) for trigger in range(size)]))
+        loopTime,  loopCfg  = benchmark(posExpr, size, True)
+        tableTime, tableCfg = benchmark(posExpr, size, False)
+        assert loopCfg == tableCfg, "Minterm cfg mismatch for %s"%(posExpr.expr)
+        print("%12d %18.1f %18.1f"%(size, loopTime * 1e6, tableTime * 1e6))
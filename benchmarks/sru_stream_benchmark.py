@@ -0,0 +1,74 @@
+# Scaling benchmark of the SRU cfg generation (control map reordering, cfg of every control node and
+# serialization of the cfg stream) from 100 to 100k controlled bits
+# -- The control map is a synthetic hierarchy of <MODULES> modules with 8 bit signals and one clock each
+# -- Every controlled signal/clock gets a control node, all triggered by the same POS expression
+#
+# Usage: python3 benchmarks/sru_stream_benchmark.py [<CONTROLLED BITS> ...]
+import os
+import sys
+import time
+import tempfile
+import logging
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+from ASAPCompiler import ASAPSruCompiler, ControlSignalMappingModel, ControlNodeList, Signal, Clock, Variable, PosExpr, Const
+
+SIGNAL_WIDTH    = 8
+SIGNALS_PER_MOD = 7
+MAX_TRIGGERS    = 16
+SRU_SEGMENT     = 3
+SRU_NUM_PLA     = 4
+
+
+# Returns the controllability map, control type map and control nodes of a design with ~<controlledBits> controlled bits
+def getControlledDesign(controlledBits):
+    controllabilityMap, controlTypeMap, controlNodes = {"TOP": {}}, {"TOP": {}}, []
+    trigger    = PosExpr("t0.t1")
+    index      = 0
+    module     = 0
+    while index < controlledBits:
+        moduleName = "m%d"%(module)
+        controllabilityMap["TOP"][moduleName], controlTypeMap["TOP"][moduleName] = {}, {}
+        controllabilityMap["TOP"][moduleName]["clk"] = [index, index]
+        controlTypeMap["TOP"][moduleName]["clk"]     = "clock"
+        controlNodes.append(Clock(Variable("TOP.%s.clk"%(moduleName), 0, 0), trigger))
+        index += 1
+        for signal in range(SIGNALS_PER_MOD):
+            signalName = "s%d"%(signal)
+            controllabilityMap["TOP"][moduleName][signalName] = [index + SIGNAL_WIDTH - 1, index]
+            controlTypeMap["TOP"][moduleName][signalName]     = "signal"
+            controlNodes.append(Signal(Variable("TOP.%s.%s"%(moduleName, signalName), SIGNAL_WIDTH - 1, 0), \
+                                       trigger,                                                            \
+                                       Const(SIGNAL_WIDTH, "1" * SIGNAL_WIDTH)))
+            index += SIGNAL_WIDTH
+        module += 1
+    return controllabilityMap, controlTypeMap, ControlNodeList(controlNodes), index
+
+# Returns (<SECONDS>, <STREAM BITS>) of compiling the SRU cfg of the design
+def benchmark(controllabilityMap, controlTypeMap, controlNodeList, outputFolder):
+    start = time.perf_counter()
+    reorderMap = ControlSignalMappingModel(controllabilityMap, controlTypeMap)
+    sruCompiler = ASAPSruCompiler(None,
+                                  outputFolder,
+                                  SRU_SEGMENT,
+                                  MAX_TRIGGERS,
+                                  reorderMap.numClkControls,
+                                  reorderMap.numSignalControls,
+                                  {"t0": 0, "t1": 1},
+                                  SRU_NUM_PLA,
+                                  reorderMap.controlledSignalMap,
+                                  reorderMap.controlledClkMap,
+                                  controlNodeList  = controlNodeList,
+                                  controlLeafTable = reorderMap.controlLeafTable)
+    sruCompiler.generateProgram()
+    return time.perf_counter() - start, len(sruCompiler.orderedCfg)
+
+
+if __name__ == "__main__":
+    logging.getLogger().setLevel(logging.WARNING)
+    sizes = [int(size) for size in sys.argv[1:]] or [100, 1000, 10000, 100000]
+    print("%16s %12s %12s %18s"%("controlled bits", "stream bits", "time (s)", "us/controlled bit"))
+    with tempfile.TemporaryDirectory() as outputFolder:
+        for size in sizes:
+            controllabilityMap, controlTypeMap, controlNodeList, controlledBits = getControlledDesign(size)
+            elapsed, streamBits = benchmark(controllabilityMap, controlTypeMap, controlNodeList, outputFolder)
+            print("%16d %12d %12.3f %18.2f"%(controlledBits, streamBits, elapsed, elapsed * 1e6 / controlledBits))
@@ -1,25 +1,31 @@
 from typing import List
 import ply.lex as lex
+import ply.yacc as yacc
 import logging                                                       # logger
 import pyfiglet                                                      # ASCII formatter (Just for tooling fun :) :))
-import re                                                            # Regex
 import sys
 from typing import Union
 import math
 from   functools import reduce
-import copy
 import json
 from enum import Enum
+import multiprocessing                                               # Process pool for parallel partition compilation
+import os
+import hashlib                                                       # Lex table module names keyed on the token rules
+from ASAPInterface import CompiledInterface, CompiledInterfaceSection  # Compiled interface (asap_interface.idx)
+from concurrent.futures import ProcessPoolExecutor
 
 #--------------------------------------------- LOGGER SETUP----------------------------------------#
 # Configure logging - Done at file top so that all classes have it accessible
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-# Setting up log file
-fileHandler = logging.FileHandler('ASAPCompiler.log', mode='w') 
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-fileHandler.setFormatter(formatter)
-logging.getLogger().addHandler(fileHandler)
-logging.info("Started Automatic, Scalable And Programmable (ASAP) tool for Hardware Patching...\n\n " + pyfiglet.figlet_format("ASAP COMPILER"))
+# Worker processes (partition compilation) re-import this file - They log to a file per partition instead
+if multiprocessing.parent_process() is None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    # Setting up log file
+    fileHandler = logging.FileHandler('ASAPCompiler.log', mode='w') 
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    fileHandler.setFormatter(formatter)
+    logging.getLogger().addHandler(fileHandler)
+    logging.info("Started Automatic, Scalable And Programmable (ASAP) tool for Hardware Patching...\n\n " + pyfiglet.figlet_format("ASAP COMPILER"))
 #--------------------------------------------------------------------------------------------------#
 
 
@@ -50,20 +56,26 @@ class LogStructuring:
                 initialString +=  ("\n" +"  " * (indent + 1) + str(value))
         return initialString
     
-    def logSRUOrderedMap(self,orderedMap):
+    # Only the programmed controls are logged - All other control bits have an all zero cfg
+    def logSRUOrderedMap(self, orderedCfg, cfgSectionMap, cfgSizeMap, controlBaseMap, programmedControls):
         data = ""
-        for cfgType in SRUCfgType:
-            if cfgType in [SRUCfgType.PLA_SEL, SRUCfgType.CNTL_ENB, SRUCfgType.CONSTANT]:
-                for controlType in ControlType:
-                    data += "\n For configType - %s, controlType %s, ordered config is %s"%(str(cfgType),
-                                                                                            str(controlType),
-                                                                                            self.logDictInfo(orderedMap[cfgType.value][controlType.value]))
+        for (cfgType, controlType), (offset, size) in cfgSectionMap.items():
+            if controlType is not None:
+                # Cfg of each programmed signal, in connection order
+                controlBase = controlBaseMap[controlType]
+                signalCfg   = {name : orderedCfg.getBinaryString(offset + (lsb - controlBase) * cfgSizeMap[cfgType], \
+                                                                 (msb - lsb + 1) * cfgSizeMap[cfgType])              \
+                               for name, [msb, lsb] in sorted(programmedControls[controlType].items(), key=lambda item: item[1][1])}
+                data += "\n For configType - %s, controlType %s, ordered config is %s"%(str(cfgType),
+                                                                                        str(controlType),
+                                                                                        self.logDictInfo(signalCfg))
             else:
                 data += "\n For configType - %s, ordered config is %s"%(str(cfgType),
-                                                                        self.logDictInfo(orderedMap[cfgType.value]))
+                                                                        orderedCfg.getBinaryString(offset, size))
         return data
     
-    def logSMUOrderedMap(self, orderedMap, numTriggers, seqDepth):
+    # Only the units of programmed triggers are logged - All other SMU units have an all zero cfg
+    def logSMUOrderedMap(self, orderedCfg, getCfgOffset, cfgSizeMap, numTriggers, seqDepth):
         data = ""
         for trigger in range(0,numTriggers):
             for cycle in range(0, seqDepth):
@@ -71,12 +83,60 @@ class LogStructuring:
                     data += "\n For trigger %d, in cycle %d, CfgType %s is %s"%(trigger,
                                                                                 cycle,
                                                                                 str(cfgtype),
-                                                                                orderedMap[cycle][trigger][cfgtype.value])
+                                                                                orderedCfg.getBinaryString(getCfgOffset(cycle, trigger, cfgtype),
+                                                                                                           cfgSizeMap[cfgtype]))
                 data += "\n"
         return data
 
 
-        
+# Class to hold the cfg state of the SMU/SRU compilers as a packed bit buffer. Bit 0 of the buffer is the
+# LSB of the cfg stream, i.e. the last bit streamed in. Every cfg field lives at a fixed bit offset and is
+# set/read in place, so the cfg state takes one bit per cfg bit and the cfg stream is assembled in one pass
+# over the buffer, however many triggers, PLAs and controls the patch architecture has
+class BitBuffer:
+    def __init__(self, size:int) -> None:
+        self.size = size
+        self.data = bytearray((size + 7) // 8)
+
+    def __len__(self):
+        return self.size
+
+    # Method returns the first byte, the last byte and the bit shift of a field within the buffer
+    def getFieldBytes(self, offset:int, width:int):
+        assert offset >= 0 and width >= 0 and offset + width <= self.size, \
+               "Cfg field [%d +: %d] outside of the cfg buffer of %d bits"%(offset, width, self.size)
+        return (offset >> 3), ((offset + width - 1) >> 3), (offset & 7)
+
+    # Method sets the field of <width> bits at bit <offset> to <value>. Only the bytes of the field are touched
+    def setField(self, offset:int, width:int, value:int):
+        firstByte, lastByte, shift = self.getFieldBytes(offset, width)
+        assert 0 <= value < (1 << width), "Cfg value %d does not fit into a cfg field of %d bits"%(value, width)
+        if width == 0:
+            return
+        fieldMask  = ((1 << width) - 1) << shift
+        fieldBytes = int.from_bytes(self.data[firstByte:lastByte + 1], 'little')
+        fieldBytes = (fieldBytes & ~fieldMask) | (value << shift)
+        self.data[firstByte:lastByte + 1] = fieldBytes.to_bytes(lastByte - firstByte + 1, 'little')
+
+    # Method returns the value of the field of <width> bits at bit <offset>
+    def getField(self, offset:int, width:int):
+        firstByte, lastByte, shift = self.getFieldBytes(offset, width)
+        if width == 0:
+            return 0
+        return (int.from_bytes(self.data[firstByte:lastByte + 1], 'little') >> shift) & ((1 << width) - 1)
+
+    # Method returns a field as a binary string (MSB first)
+    def getBinaryString(self, offset:int, width:int):
+        if width == 0:
+            return ""
+        return format(self.getField(offset, width), '0{}b'.format(width))
+
+    # Method returns the complete buffer as a binary string (MSB first), i.e. in cfg stream order
+    def toBinaryString(self):
+        if self.size == 0:
+            return ""
+        return format(int.from_bytes(self.data, 'little'), '0{}b'.format(self.size))
+
 
 # **************************** <SMU PATCH FILE (<name>.asap.smu) GRAMMER> *************************************
 # Every observable sequence is enclosed within - {}
@@ -198,6 +258,8 @@ class SequenceList:
 # clock c0 {
 #  control = <SOP expression of pattern sequence triggers>
 # }
+# A trigger expression is a Boolean expression of sequence names - ( ) groups, ~<expr>/<expr>' complement,
+# . AND, ^ XOR and + OR (in the order of precedence). e.g. (t0.t1' + ~(t2 ^ t3))
 # ControlNodeList(List(Union(Signal, Clock)))
 #   |
 #   +-- Signal (Variable, PosExpr, Const)    
@@ -213,29 +275,116 @@ class SequenceList:
 
 
 
-# AST node for holding POS expressions
-# The node does additional functions like finding all the associated variables and the expanded minterms
+# AST nodes of a trigger expression - Trigger (SMU sequence name), complement (~<expr>/<expr>') and the binary
+# operations OR (+), XOR (^) and AND (.). Chains of one operation are held by a single TriggerOp node
+# getTruthTable evaluates a node over all minterms at once - <varMasks> holds the truth table of every trigger
+# and bit i of a truth table is the value for minterm i
+class TriggerVar:
+    def __init__(self, name:str) -> None:
+        self.name = name
+
+    def getVars(self, vars:set):
+        vars.add(self.name)
+        return vars
+
+    def getTruthTable(self, varMasks:dict, fullMask:int):
+        return varMasks[self.name]
+
+    def __repr__(self):
+        return self.name
+
+
+class TriggerNot:
+    def __init__(self, operand) -> None:
+        self.operand = operand
+
+    def getVars(self, vars:set):
+        return self.operand.getVars(vars)
+
+    def getTruthTable(self, varMasks:dict, fullMask:int):
+        return ~self.operand.getTruthTable(varMasks, fullMask) & fullMask
+
+    def __repr__(self):
+        return f'~({self.operand})'
+
+
+class TriggerOp:
+    operations = {'+' : lambda lhs, rhs: lhs | rhs, \
+                  '^' : lambda lhs, rhs: lhs ^ rhs, \
+                  '.' : lambda lhs, rhs: lhs & rhs}
+
+    def __init__(self, operator:str, operands:list) -> None:
+        self.operator = operator
+        self.operands = operands
+
+    def getVars(self, vars:set):
+        for operand in self.operands:
+            operand.getVars(vars)
+        return vars
+
+    def getTruthTable(self, varMasks:dict, fullMask:int):
+        return reduce(self.operations[self.operator], [operand.getTruthTable(varMasks, fullMask) for operand in self.operands])
+
+    def __repr__(self):
+        return '(' + f' {self.operator} '.join(str(operand) for operand in self.operands) + ')'
+
+
+# AST node for holding trigger expressions (Boolean expressions of SMU triggers)
+# The expression is parsed once (ASAPTriggerGrammar) to an AST of TriggerVar/TriggerNot/TriggerOp nodes. The node
+# finds the associated triggers (sorted by name) and the truth table of the expression over them. The PLA inputs
+# are the triggers in reverse name order - PLA input k is bit k of the minterm index, so the first trigger by
+# name is the MSB of the minterm index
 class PosExpr(LogStructuring):
-    def __init__(self, expr:str) -> None:
+    def __init__(self, expr:str, exprTree = None) -> None:
         self.expr = expr
-        self.exprTokens  = self.getExprTokens(expr)
-        self.VarList     = self.getVarList()
+        # The SRU grammar passes the AST of the trigger expressions it parsed
+        if exprTree is None:
+            exprTree, diagnostics = ASAPTriggerGrammar.getGrammar().parseText(expr)
+            assert not diagnostics, "Illegal trigger expression %s - %s"%(expr, "; ".join(diagnostics))
+        self.exprTree = exprTree
+        self.VarList   = self.getVarList()
+        self.InputList = self.getInputList()
+        self.exprKey   = None
 
-    def getExprTokens(self, expr):
-        return  [token.strip() for token in expr.split('+')]
-    
     def getVarList(self):
-        varList = set()
-        for token in self.exprTokens:
-            # Use regular expression to find variables and complements
-            matches = re.findall(r'([a-zA-Z0-9]+)(?:\')?', token)
-            for match in matches:
-                varList.add(match)
-        return list(varList)
-    
-    # Returns the set of exprtokens
-    def getExprSet(self):
-        return frozenset(self.exprTokens)
+        return sorted(self.exprTree.getVars(set()))
+
+    # Returns the triggers in PLA input order (PLA input 0 first)
+    def getInputList(self):
+        return list(reversed(self.VarList))
+
+    # Repeats the <width> bit <mask> up to <numBits> bits (both powers of 2) - Doubled per step
+    @staticmethod
+    def getRepeatedMask(mask:int, width:int, numBits:int):
+        while width < numBits:
+            mask  |= mask << width
+            width <<= 1
+        return mask
+
+    # Truth table mask of the trigger <index> over the 2^<numVars> minterms - Bit i is bit <index> of minterm i
+    # (runs of 2^<index> 0s and 1s, repeated over all minterms)
+    @staticmethod
+    def getVarMask(index:int, numVars:int):
+        runMask = ((1 << (1 << index)) - 1) << (1 << index)
+        return PosExpr.getRepeatedMask(runMask, 1 << (index + 1), 1 << numVars)
+
+    # Truth table of the expression over 2^<numVars> minterms - Trigger k of InputList is bit k of the minterm
+    # index, the other bits (numVars >= # of triggers) are don't cares
+    def getTruthTable(self, numVars:int):
+        assert numVars >= len(self.VarList), "More triggers in %s than %d"%(self.expr, numVars)
+        numTriggers = len(self.VarList)
+        truthTable  = self.getExprKey()[1]
+        # The table over the triggers repeats for every value of the don't care bits
+        return self.getRepeatedMask(truthTable, 1 << numTriggers, 1 << numVars)
+
+    # Returns the key of the expression - (<triggers>, <truth table over the triggers>)
+    # Two trigger expressions with the same key are equivalent (e.g. t0.t1 and t1.t0 or ~(t0 + t1) and t0'.t1')
+    def getExprKey(self):
+        if self.exprKey is None:
+            numTriggers = len(self.VarList)
+            varMasks    = {var : self.getVarMask(index, numTriggers) for index, var in enumerate(self.InputList)}
+            self.exprKey = (tuple(self.VarList), self.exprTree.getTruthTable(varMasks, (1 << (1 << numTriggers)) - 1))
+        return self.exprKey
 
     def __repr__(self):
         return f'PosExpr({self.expr})'
@@ -274,25 +423,115 @@ class ControlNodeList:
         return f'ControlNodeList({self.controlNodes})'    
     
 
-# Base lexer class for definiting ignore/error rules - To be used by both SMU and SRU lexers
+# Base lexer class for definiting ignore/error rules - To be used by all lexers
+# PLY compiles the master regex of a lexer when it is built. The master lexer of every lexer class is built
+# once per process (from its lex table in the table directory when available), every lexer instance gets a
+# clone of it with its own input and position
+# An illegal character is skipped and reported to the error handler of the PLY lexer (errorHandler(<POSITION>, <MESSAGE>))
+# The grammars record it as a diagnostic of the program, a standalone lexer logs it
 class BaseLexer:
     # Ignored characters shared by all lexer classes
     t_ignore = ' \t\n'
+    masterLexers = {}  # <LEXER CLASS NAME> --> Master PLY lexer built in this process
+    # Regex templates of typed tokens - The groups of all rules share the master regex of a lexer,
+    # so the group names of every rule get their own prefix
+    VARIABLE_TEMPLATE = r'(?P<{0}Name>[a-zA-Z_][a-zA-Z_0-9]*(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*)\[(?P<{0}Msb>[0-9]+):(?P<{0}Lsb>[0-9]+)\]'
+    CONST_TEMPLATE    = r'(?P<{0}Width>\d*[1-9]\d*)\'[bB](?P<{0}Value>[01]+)'
 
     def t_error(self, t):
-        logging.info("Lexer error: Illegal character '%s'" % t.value[0])
+        t.lexer.errorHandler(t.lexpos, "Lexer Error: Illegal character '%s'"%(t.value[0]))
         t.lexer.skip(1)
 
+    @staticmethod
+    def logError(lexpos, message):
+        logging.error("Position %d: %s"%(lexpos, message))
 
-# Lexer Class for tokenizing SMU patch code
-class ASAPSmuLexer(BaseLexer):
-    # Build the lexer
+    # Variable/Const of the groups of a template match
+    @staticmethod
+    def getVariable(match, prefix):
+        return Variable(name = match.group(prefix + 'Name'),      \
+                        msb  = int(match.group(prefix + 'Msb')),  \
+                        lsb  = int(match.group(prefix + 'Lsb')))
+
+    @staticmethod
+    def getConst(match, prefix):
+        return Const(width       = int(match.group(prefix + 'Width')), \
+                     binaryValue = match.group(prefix + 'Value'))
+
+    # Build the lexer - Lexers built with PLY options (kwargs) are not cached
     def build(self, **kwargs):
-        self.lexer = lex.lex(module=self, **kwargs)
+        if kwargs:
+            self.lexer = lex.lex(module=self, **kwargs)
+        else:
+            lexerName = type(self).__name__
+            if lexerName not in BaseLexer.masterLexers:
+                BaseLexer.masterLexers[lexerName] = self.buildMasterLexer()
+            self.lexer = BaseLexer.masterLexers[lexerName].clone()
+        self.lexer.errorHandler = self.logError
+
+    # Default lex table directory - <XDG_CACHE_HOME or ~/.cache>/asap/lex_tables
+    @staticmethod
+    def getDefaultTableDir():
+        cacheHome = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        return os.path.join(cacheHome, 'asap', 'lex_tables')
+
+    # Lex table module of this lexer - Keyed on the token rules, so that a stale table is never loaded
+    def getTableModule(self):
+        rules = [repr(self.tokens), lex.__tabversion__]
+        for ruleName in sorted(name for name in dir(self) if name.startswith("t_")):
+            rule = getattr(self, ruleName)
+            # Function rules: The regex is the docstring (or set by lex.TOKEN)
+            rules.append("%s=%s"%(ruleName, rule if isinstance(rule, str) else getattr(rule, "regex", rule.__doc__)))
+        return "asap_%s_lextab_%s"%(type(self).__name__.lower(), hashlib.sha1("\n".join(rules).encode()).hexdigest()[:12])
+
+    # Builds the master lexer from the lex table (the table is written on the first build)
+    # Falls back to a plain build if the table directory is not writable
+    def buildMasterLexer(self):
+        tableDir = self.getDefaultTableDir()
+        try:
+            os.makedirs(tableDir, exist_ok=True)
+        except OSError:
+            logging.warning("Lex table directory %s is not writable - Building %s without a lex table"%(tableDir, type(self).__name__))
+            return lex.lex(module=self)
+        # PLY imports the table module by name - make the table directory importable while loading
+        sys.path.insert(0, tableDir)
+        try:
+            return lex.lex(module    = self,                 \
+                           optimize  = 1,                    \
+                           lextab    = self.getTableModule(), \
+                           outputdir = tableDir)
+        finally:
+            sys.path.remove(tableDir)
+
+
+# Base lexer class of the SMU/SRU lexers - VARIABLE/CONST tokens carry their parsed value (Variable, Const)
+# PLY matches function rules in the order of definition (ahead of string rules), so VARIABLE/CONST are matched
+# ahead of the names and triggers at their start. PLY rejects a rule defined twice in a file - The rules of both
+# lexers are defined here once
+class TypedTokenLexer(BaseLexer):
+    VARIABLE_REGEX = BaseLexer.VARIABLE_TEMPLATE.format('var')
+    CONST_REGEX    = BaseLexer.CONST_TEMPLATE.format('const')
+
+    @lex.TOKEN(VARIABLE_REGEX)
+    def t_VARIABLE(self, t):
+        t.value = self.getVariable(t.lexer.lexmatch, 'var')
+        return t
+
+    @lex.TOKEN(CONST_REGEX)
+    def t_CONST(self, t):
+        t.value = self.getConst(t.lexer.lexmatch, 'const')
+        return t
+
+
+# Lexer Class for tokenizing SMU patch code
+# SEQUENCE_NAME tokens carry the sequence name
+class ASAPSmuLexer(TypedTokenLexer):
+    SEQUENCE_NAME_REGEX = r'[a-zA-Z_][a-zA-Z_0-9]*'
 
     def __init__(self, **kwargs):
     # Token definitions for SMU Programming language
         self.tokens = (
+            'SEQUENCE_NAME',   # Name of a sequence - The trigger of the sequence in SRU patch code
             'SEQUENCE_START',  # '{' Marks the beginning of a sequence
             'SEQUENCE_END',    # '}' Marks the end of a sequence
             'PATTERN_START',   # '(' Marks the start of a pattern
@@ -303,21 +542,55 @@ class ASAPSmuLexer(BaseLexer):
         )
 
         # Regular expression patterns for SMU Programming language tokens
-        self.t_SEQUENCE_START = r'[a-zA-Z_][a-zA-Z_0-9]*\s*{'
-        self.t_SEQUENCE_END   = r'}'
+        self.t_SEQUENCE_START = r'\{'
+        self.t_SEQUENCE_END   = r'\}'
         self.t_PATTERN_START  = r'\('
         self.t_PATTERN_END    = r'\)'
-        self.t_VARIABLE       = r'[a-zA-Z_][a-zA-Z_0-9]*(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*\[[0-9]+:[0-9]+\]'
         self.t_COMPARISON     = r'[><=]=?'
-        self.t_CONST          = r'[0-9]+\'[bB][01]+'
         self.build(**kwargs)
 
+    @lex.TOKEN(SEQUENCE_NAME_REGEX)
+    def t_SEQUENCE_NAME(self, t):
+        return t
+
+
+# Lexer Class for tokenizing trigger expressions of SRU control blocks
+class ASAPTriggerLexer(BaseLexer):
+    VAR_REGEX = r'[a-zA-Z0-9_]+'
+    # Operator tokens of trigger expressions - Shared with the SRU lexer, which lexes the trigger expressions of control blocks
+    OPERATOR_RULES = (('OR',         r'\+'),  # '+'
+                      ('XOR',        r'\^'),  # '^'
+                      ('AND',        r'\.'),  # '.'
+                      ('NOT',        r'~'),   # '~' Prefix complement
+                      ('COMPLEMENT', r"'"),   # "'" Postfix complement
+                      ('LPAREN',     r'\('),  # '('
+                      ('RPAREN',     r'\)'))  # ')'
+
+    def __init__(self, **kwargs):
+        # Token definitions for trigger expressions
+        self.tokens = ('VAR',) + self.addOperatorRules(self)  # Trigger - Name of a SMU sequence
+
+        # Regular expression patterns for trigger expression tokens
+        self.t_VAR = self.VAR_REGEX
+        self.build(**kwargs)
+
+    # Adds the operator rules to a lexer - Returns the operator tokens
+    @staticmethod
+    def addOperatorRules(lexer):
+        for token, regex in ASAPTriggerLexer.OPERATOR_RULES:
+            setattr(lexer, 't_' + token, regex)
+        return tuple(token for token, regex in ASAPTriggerLexer.OPERATOR_RULES)
+
 
 # Lexer Class for tokenizing SRU patch code
-class ASAPSruLexer(BaseLexer):
-    # Build the lexer
-    def build(self, **kwargs):
-        self.lexer = lex.lex(module=self, **kwargs)
+# The trigger expressions are lexed with the tokens of ASAPTriggerLexer - Every identifier but the keywords of
+# control blocks is a trigger (VAR)
+class ASAPSruLexer(TypedTokenLexer):
+    KEYWORDS       = {'clock'    : 'CLOCK',   \
+                      'signal'   : 'SIGNAL',  \
+                      'name'     : 'NAME',    \
+                      'trigger'  : 'TRIGGER', \
+                      'constant' : 'CONSTANT'}
 
     def __init__(self, **kwargs):
         # Token definitions for SRU Programming language
@@ -326,296 +599,327 @@ class ASAPSruLexer(BaseLexer):
             'SIGNAL',           # 'signal' string indicates the start of signal control block defintion
             'BLOCK_START',      # '{' Marks the beginning of a control block
             'BLOCK_END',        # '}' Marks the end of a control block
-            'NAME',             # String indicating NAME of signal - 
-            'TRIGGER',          # trigger = (<POS string>)
-            'CONSTANT'          # binary bit-vector constant
-        )
+            'NAME',             # 'name' argument - name = <VARIABLE>
+            'TRIGGER',          # 'trigger' argument - trigger = (<trigger expression>)
+            'CONSTANT',         # 'constant' argument - constant = <CONST>
+            'ASSIGN',           # '='
+            'VARIABLE',         # Controlled signal with its part select - e.g. TOP.inst1.sig[1:0]
+            'CONST',            # Binary bit-vector constant with size - e.g. 2'b00
+            'VAR'               # Trigger - Name of a SMU sequence
+        ) + ASAPTriggerLexer.addOperatorRules(self)
 
         # Regular expression patterns for SRU Programming language tokens
-        self.t_CLOCK = r'clock'
-        self.t_SIGNAL = r'signal'
-        self.t_BLOCK_START= r'\{'
-        self.t_NAME = r'name\s*=\s*[a-zA-Z_][a-zA-Z_0-9]*(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*\[[0-9]+:[0-9]+\]'
-        self.t_TRIGGER = r'trigger\s*=\s*\(([^()]+)\)'
-        self.t_CONSTANT = r'constant\s*=\s*\d*[1-9]\d*\'[bB][01]+'
-        self.t_BLOCK_END = r'\}'
+        self.t_BLOCK_START = r'\{'
+        self.t_BLOCK_END   = r'\}'
+        self.t_ASSIGN      = r'='
         self.build(**kwargs)
 
+    @lex.TOKEN(ASAPTriggerLexer.VAR_REGEX)
+    def t_VAR(self, t):
+        t.type = self.KEYWORDS.get(t.value, 'VAR')
+        return t
+
+
+# Exception raised for a patch program with syntax errors - Holds every diagnostic of the program
+class ASAPPatchSyntaxError(Exception):
+    def __init__(self, patchFile, diagnostics) -> None:
+        self.patchFile   = patchFile
+        self.diagnostics = diagnostics
+        super().__init__("%d syntax error(s) in %s\n%s"%(len(diagnostics), patchFile, "\n".join(diagnostics)))
+
+
+# Base grammar class for the SMU/SRU patch programs (PLY yacc)
+# The LALR parser of every grammar class is built once per process, with its tables cached in the table
+# directory. A syntax error is recorded as a diagnostic - The parser recovers at the end of the enclosing
+# block ('}') and continues, so that one pass returns every diagnostic of a program
+class BaseGrammar:
+    TABLE_MODULE   = None
+    grammars       = {}  # <GRAMMAR CLASS NAME> --> Grammar (with its PLY parser) built in this process
+    # Diagnostics of p_error
+    END_MESSAGE    = "Syntax Error: Unexpected end of program"
+    TOKEN_MESSAGE  = "Syntax Error: Unexpected token %s"
+
+    def __init__(self, lexerClass) -> None:
+        self.lexerClass  = lexerClass
+        self.tokens      = lexerClass().tokens
+        self.diagnostics = []
+        tableDir = self.getDefaultTableDir()
+        try:
+            os.makedirs(tableDir, exist_ok=True)
+        except OSError:
+            logging.warning("Parser table directory %s is not writable - Building %s without tables"%(tableDir, type(self).__name__))
+            self.parser = yacc.yacc(module=self, debug=False, write_tables=False)
+            return
+        # PLY imports the table module by name - make the table directory importable while loading
+        sys.path.insert(0, tableDir)
+        try:
+            self.parser = yacc.yacc(module    = self,              \
+                                    method    = "LALR",            \
+                                    outputdir = tableDir,          \
+                                    tabmodule = self.TABLE_MODULE, \
+                                    debug     = False)
+        finally:
+            sys.path.remove(tableDir)
+
+    # Default table directory - <XDG_CACHE_HOME or ~/.cache>/asap/parser_tables
+    @staticmethod
+    def getDefaultTableDir():
+        cacheHome = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        return os.path.join(cacheHome, 'asap', 'parser_tables')
+
+    # Returns the grammar of this class built in this process
+    @classmethod
+    def getGrammar(cls):
+        if cls.__name__ not in BaseGrammar.grammars:
+            BaseGrammar.grammars[cls.__name__] = cls()
+        return BaseGrammar.grammars[cls.__name__]
+
+    # Parses a patch program - Returns its AST and the list of diagnostics (illegal characters included)
+    def parseText(self, text):
+        self.text        = text
+        self.diagnostics = []
+        lexer = self.lexerClass().lexer
+        lexer.errorHandler = self.addDiagnostic
+        result = self.parser.parse(text, lexer=lexer)
+        return result, self.diagnostics
+
+    # Newlines are not tokens - The line and column of a diagnostic are found from the position of its token
+    def addDiagnostic(self, lexpos, message):
+        self.diagnostics.append("Line %d, Column %d: %s"%(self.text.count('\n', 0, lexpos) + 1, \
+                                                          lexpos - self.text.rfind('\n', 0, lexpos), message))
+
+    # Recovery at '}' - Error reporting is re-enabled right away, so that an error in the next block is reported too
+    def recover(self, p, message):
+        self.addDiagnostic(p.lexpos(len(p) - 1), message)
+        p.parser.errok()
+
+    def p_error(self, p):
+        if p is None:
+            self.addDiagnostic(len(self.text), self.END_MESSAGE)
+        else:
+            self.addDiagnostic(p.lexpos, self.TOKEN_MESSAGE%(p.type))
 
-# SRU Parser class - Performs lexical analysis on SRU code and generates AST
-class ASAPSruParser:
-    def __init__(self, asapSruFile) -> None:
-        self.asapSruFile = asapSruFile
-        self.sruLexer = ASAPSruLexer()
-        self.controlNodeList = ControlNodeList([])
-        with open(asapSruFile, "r") as file:
-            sruCode = file.read() 
-            try:
-                logging.info("Running lexical analysis on ASAP-SRU patch file - '%s'"%(self.asapSruFile))
-                self.sruLexer.lexer.input(sruCode)
-            except Exception as e:
-                logging.info(str(e))
-                logging.info("Lexical analysis failed.")
-                exit(1)
-            logging.info("Lexical analysis successyfully completed.")
-        self.parse()
-        logging.info("Generated AST for SRU patch script - \n %s"%(self.controlNodeList))
 
-    def extractVariableInfo(self, variable):
-        # Define a regular expression pattern to match VAR_NAME, MSB, and LSB
-        if len(variable.split('=')) != 2:
-            raise Exception("Syntax Error: name assignment %s incorrect"%(variable))
-        else:
-            varName = variable.split('=')[1].strip()
-        pattern = r'(?P<name>[a-zA-Z_][a-zA-Z_0-9]*(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*)\[(?P<msb>\d+):(?P<lsb>\d+)\]'
-        
-        # Match the pattern in the input string
-        match = re.match(pattern, varName)
-        
-        if match:
-            # Extract matched groups
-            name = match.group('name')
-            msb  = int(match.group('msb'))
-            lsb  = int(match.group('lsb'))
-            
-            return name, msb, lsb
-        else:
-            raise Exception("Syntax Error: Invalid variable string format - %s" %(varName))
+# SMU grammar - Builds the SequenceList of a SMU patch program
+# program  : <sequence>*
+# sequence : SEQUENCE_NAME SEQUENCE_START <pattern>* SEQUENCE_END
+# pattern  : PATTERN_START VARIABLE COMPARISON CONST PATTERN_END
+#          | PATTERN_START PATTERN_END (empty pattern)
+# A malformed pattern is a diagnostic - The parser recovers at its PATTERN_END
+class ASAPSmuGrammar(BaseGrammar):
+    TABLE_MODULE   = "asap_smu_parsetab"
 
-    def extractConstInfo(self, const):
-        if len(const.split('=')) != 2:
-            raise Exception("Syntax Error: constant assignment '%s' is incorrect"%(const))
-        else:
-            constVal = const.split('=')[1].strip()
-        # Define a regular expression pattern to match WIDTH and BINARY_VALUE
-        pattern = r'(?P<width>\d+)\'b(?P<binary_value>[01]+)'
+    def __init__(self) -> None:
+        super().__init__(ASAPSmuLexer)
+
+    def p_smuProgram(self, p):
+        '''program : sequences'''
+        p[0] = SequenceList([sequence for sequence in p[1] if sequence is not None])
+
+    def p_sequences(self, p):
+        '''sequences : sequences sequence
+                     | '''
+        p[0] = p[1] if len(p) == 3 else []
+        if len(p) == 3:
+            p[0].append(p[2])
+
+    def p_sequence(self, p):
+        '''sequence : SEQUENCE_NAME SEQUENCE_START patterns SEQUENCE_END'''
+        p[0] = Sequence(patterns = p[3], \
+                        name     = p[1])
+
+    def p_sequence_error(self, p):
+        '''sequence : SEQUENCE_NAME SEQUENCE_START error SEQUENCE_END
+                    | error SEQUENCE_END'''
+        self.recover(p, "Sequence skipped")
+        p[0] = None
+
+    def p_patterns(self, p):
+        '''patterns : patterns pattern
+                    | '''
+        p[0] = p[1] if len(p) == 3 else []
+        if len(p) == 3 and p[2] is not None:
+            p[0].append(p[2])
+
+    def p_pattern(self, p):
+        '''pattern : PATTERN_START VARIABLE COMPARISON CONST PATTERN_END'''
+        p[0] = Pattern(lhs    = p[2],                          \
+                       opType = Comparison(operator = p[3]),   \
+                       rhs    = p[4])
+
+    def p_pattern_empty(self, p):
+        '''pattern : PATTERN_START PATTERN_END'''
+        p[0] = Pattern(lhs    = None,  \
+                       opType = None,  \
+                       rhs    = None)
+
+    def p_pattern_error(self, p):
+        '''pattern : PATTERN_START error PATTERN_END'''
+        self.addDiagnostic(p.lexpos(1), "Syntax Error: Pattern should be (<VARIABLE> <COMPARISON> <CONST>)")
+        p.parser.errok()
+        p[0] = None
+
+
+# Trigger expression rules - Build the AST (TriggerVar/TriggerNot/TriggerOp) of a trigger expression
+# Shared by the SRU grammar (trigger arguments) and the trigger expression grammar (PosExpr)
+# expr : expr OR expr | expr XOR expr | expr AND expr   (precedence OR < XOR < AND)
+#      | NOT expr | expr COMPLEMENT | LPAREN expr RPAREN | VAR
+class TriggerExprRules:
+    precedence = (('left',  'OR'),  \
+                  ('left',  'XOR'), \
+                  ('left',  'AND'), \
+                  ('right', 'NOT'), \
+                  ('left',  'COMPLEMENT'))
+
+    def p_triggerExpr(self, p):
+        '''expr : expr OR expr
+                | expr XOR expr
+                | expr AND expr'''
+        # Chains of one operation are flattened - Long expressions do not nest the AST
+        operands = []
+        for operand in [p[1], p[3]]:
+            operands += operand.operands if isinstance(operand, TriggerOp) and operand.operator == p[2] else [operand]
+        p[0] = TriggerOp(operator = p[2], operands = operands)
+
+    def p_triggerExpr_not(self, p):
+        '''expr : NOT expr
+                | expr COMPLEMENT'''
+        p[0] = TriggerNot(operand = p[2] if p.slice[1].type == "NOT" else p[1])
+
+    def p_triggerExpr_group(self, p):
+        '''expr : LPAREN expr RPAREN'''
+        p[0] = p[2]
+
+    def p_triggerExpr_var(self, p):
+        '''expr : VAR'''
+        p[0] = TriggerVar(name = p[1])
+
+
+# SRU grammar - Builds the ControlNodeList of a SRU patch program
+# program  : <control>*
+# control  : SIGNAL BLOCK_START <argument>+ BLOCK_END (exactly one NAME/TRIGGER/CONSTANT argument each, in any order)
+#          | CLOCK BLOCK_START <argument>+ BLOCK_END  (exactly one NAME/TRIGGER argument each, in any order)
+# argument : NAME ASSIGN VARIABLE | TRIGGER ASSIGN LPAREN expr RPAREN | CONSTANT ASSIGN CONST
+class ASAPSruGrammar(TriggerExprRules, BaseGrammar):
+    TABLE_MODULE   = "asap_sru_parsetab"
+    start          = "program"
 
-        # Match the pattern in the input string
-        match = re.match(pattern, constVal)
-        
-        if match:
-            # Extract matched groups
-            width = int(match.group('width'))
-            binaryValue = match.group('binary_value')
-            
-            return width, binaryValue
-        else:
-            raise Exception("Invalid constant string format - %s" %(constVal))
-    
-    def extractPosExpr(self, expr):
-        if len(expr.split('=')) != 2:
-            raise Exception("Syntax Error: Trigger assignment '%s' is incorrect"%(expr))
-        else:
-            trigExpr = expr.split('=')[1]
-        match = re.search(r'\((.*?)\)', trigExpr)
+    def __init__(self) -> None:
+        super().__init__(ASAPSruLexer)
+
+    def p_sruProgram(self, p):
+        '''program : controls'''
+        p[0] = ControlNodeList([control for control in p[1] if control is not None])
+
+    def p_controls(self, p):
+        '''controls : controls control
+                    | '''
+        p[0] = p[1] if len(p) == 3 else []
+        if len(p) == 3:
+            p[0].append(p[2])
+
+    def p_control(self, p):
+        '''control : SIGNAL BLOCK_START arguments BLOCK_END
+                   | CLOCK BLOCK_START arguments BLOCK_END'''
+        arguments = {}
+        for argType, value in p[3]:
+            # A repeated argument is illegal
+            arguments[argType] = value if argType not in arguments else None
+        p[0] = self.getControlNode(p.slice[1].type, arguments, p.lexpos(1))
+
+    def p_control_error(self, p):
+        '''control : SIGNAL BLOCK_START error BLOCK_END
+                   | CLOCK BLOCK_START error BLOCK_END
+                   | error BLOCK_END'''
+        self.recover(p, "Control block skipped")
+        p[0] = None
+
+    # Returns [(<ARGUMENT TYPE>, <VALUE>)]
+    def p_arguments(self, p):
+        '''arguments : arguments argument
+                     | argument'''
+        p[0] = p[1] + [p[2]] if len(p) == 3 else [p[1]]
+
+    def p_argument(self, p):
+        '''argument : NAME ASSIGN VARIABLE
+                    | CONSTANT ASSIGN CONST'''
+        p[0] = (p.slice[1].type, p[3])
+
+    # The expression string of the trigger keeps its outer parentheses
+    def p_argument_trigger(self, p):
+        '''argument : TRIGGER ASSIGN LPAREN expr RPAREN'''
+        p[0] = ("TRIGGER", PosExpr(expr     = self.text[p.lexpos(3):p.lexpos(5) + 1], \
+                                   exprTree = p[4]))
+
+    # Builds the Signal/Clock node of a control block from its arguments ({<ARGUMENT TYPE>: <VALUE>})
+    # Returns None (and records a diagnostic) if an argument is missing, repeated (None) or not allowed
+    def getControlNode(self, controlType, arguments, lexpos):
+        expected = ("NAME", "TRIGGER", "CONSTANT") if controlType == "SIGNAL" else ("NAME", "TRIGGER")
+        if sorted(arguments) != sorted(expected) or None in arguments.values():
+            self.addDiagnostic(lexpos, "Syntax Error: Illegal arguments for %s block definition - Expected one %s each"%(controlType, "/".join(expected)))
+            return None
+        if controlType == "SIGNAL":
+            logging.info("- Creating signal control for signal - %s" %(arguments["NAME"].name))
+            logging.info("- Bypass constant for signal is %s"%(arguments["CONSTANT"].binaryValue))
+            return Signal(signal   = arguments["NAME"],    \
+                          trigger  = arguments["TRIGGER"], \
+                          constant = arguments["CONSTANT"])
+        logging.info("- Creating clock control for signal - %s" %(arguments["NAME"].name))
+        return Clock(signal  = arguments["NAME"], \
+                     trigger = arguments["TRIGGER"])
+
+
+# Trigger expression grammar - Builds the AST of a standalone trigger expression (see TriggerExprRules)
+# A syntax error is a diagnostic with the column of its token
+class ASAPTriggerGrammar(TriggerExprRules, BaseGrammar):
+    TABLE_MODULE   = "asap_trigger_parsetab"
+    start          = "expr"
+    END_MESSAGE    = "Unexpected end of expression"
+    TOKEN_MESSAGE  = "Unexpected token %s"
 
-        if match:
-            posExpr = match.group(1)
-        else:
-            raise Exception("Incorrect POS expression - %s"%(expr))
-        return posExpr
+    def __init__(self) -> None:
+        super().__init__(ASAPTriggerLexer)
 
-    def parse(self):
+    def addDiagnostic(self, lexpos, message):
+        self.diagnostics.append("Column %d: %s"%(lexpos + 1, message))
+
+
+# SRU Parser class - Parses the SRU code to generate AST
+# exitOnError = False: A program with syntax errors raises ASAPPatchSyntaxError (with all of its diagnostics)
+class ASAPSruParser:
+    def __init__(self, asapSruFile, exitOnError=True) -> None:
+        self.asapSruFile = asapSruFile
+        with open(asapSruFile, "r") as file:
+            sruCode = file.read() 
         logging.info("Parsing %s"%(self.asapSruFile))
-        currentToken = self.sruLexer.lexer.token()
-        while currentToken:
-            try:
-                if currentToken.type == "SIGNAL":
-                    blockStart = self.sruLexer.lexer.token()
-                    if blockStart.type == "BLOCK_START":
-                        varToken, trigToken, constToken = None, None, None
-                        argToken1 = self.sruLexer.lexer.token()
-                        argToken2 = self.sruLexer.lexer.token()
-                        argToken3 = self.sruLexer.lexer.token()
-                        for token in [argToken1, argToken2, argToken3]:
-                            if token.type == "NAME" and varToken is None:
-                                varToken = token
-                            elif token.type == "TRIGGER" and trigToken is None:
-                                trigToken = token
-                            elif token.type == "CONSTANT" and constToken is None:
-                                constToken = token
-                            else:
-                                raise Exception("Syntax Error: Illegal arguments for SIGNAL block defintion in lineno %s"%(str(currentToken.lineno)))
-                        varName, msb, lsb  = self.extractVariableInfo(varToken.value)
-                        logging.info("- Creating signal control for signal - %s" %(varName))
-                        newVar = Variable(name = varName,
-                                          msb  = msb,
-                                          lsb  = lsb)
-                        width, binVal  = self.extractConstInfo(constToken.value)
-                        logging.info("- Bypass constant for signal is %s"%(binVal))
-                        newConst = Const(width       = width,
-                                         binaryValue = binVal)
-                        posExpr = self.extractPosExpr(trigToken.value)
-                        newPosExpr = PosExpr(expr = posExpr)
-                        newSignalNode = Signal(signal   = newVar,  \
-                                               trigger  = newPosExpr, \
-                                               constant = newConst)
-                        self.controlNodeList.addControlNode(newSignalNode)
-                        blockEnd = self.sruLexer.lexer.token()
-                        if blockEnd.type != "BLOCK_END":
-                            raise Exception("Syntax Error: Expected end of signal definition - received token %s"%(blockEnd.type))
-                        currentToken = self.sruLexer.lexer.token()
-                    else:
-                        raise Exception("Syntax Error: Signal block should start with '{' received token - %s"%(blockStart.type))
-                elif currentToken.type == "CLOCK":
-                    blockStart = self.sruLexer.lexer.token()
-                    if blockStart.type == "BLOCK_START":
-                        varToken, trigToken = None, None
-                        argToken1 = self.sruLexer.lexer.token()
-                        argToken2 = self.sruLexer.lexer.token()
-                        for token in [argToken1, argToken2]:
-                            if token.type == "NAME" and varToken is None:
-                                varToken = token
-                            elif token.type == "TRIGGER" and trigToken is None:
-                                trigToken = token
-                            else:
-                                raise Exception("Syntax Error: Illegal arguments for SIGNAL block defintion in lineno %s"%(str(currentToken.lineno)))
-                        varName, msb, lsb  = self.extractVariableInfo(varToken.value)
-                        logging.info("- Creating clock control for signal - %s" %(varName))
-                        newVar = Variable(name = varName,
-                                          msb  = msb,
-                                          lsb  = lsb)
-                        posExpr = self.extractPosExpr(trigToken.value)
-                        newPosExpr = PosExpr(expr = posExpr)
-                        newClockNode = Clock(signal    = newVar,  \
-                                             trigger   = newPosExpr)
-                        self.controlNodeList.addControlNode(newClockNode)
-                        blockEnd = self.sruLexer.lexer.token()
-                        if blockEnd.type != "BLOCK_END":
-                            raise Exception("Syntax Error: Expected end of signal definition - received token %s"%(blockEnd.type))
-                        currentToken = self.sruLexer.lexer.token()
-                    else:
-                        raise Exception("Syntax Error: Signal block should start with '{' received token - %s"%(blockStart.type))
-                else:
-                    raise Exception("Control nodes can either be SIGNAL/CLOCK - Received token %s"%(currentToken.type))
-            except Exception as e:
-                logging.error(str(e))
+        self.controlNodeList, self.diagnostics = ASAPSruGrammar.getGrammar().parseText(sruCode)
+        if self.diagnostics:
+            for diagnostic in self.diagnostics:
+                logging.error("%s: %s"%(self.asapSruFile, diagnostic))
+            if exitOnError:
                 logging.error("SRU Patch code parsing failed")
                 exit(1)
+            raise ASAPPatchSyntaxError(self.asapSruFile, self.diagnostics)
+        logging.info("Generated AST for SRU patch script - \n %s"%(self.controlNodeList))
 
 
-# SMU Parser class - Performs lexical analysis and parses the SMU code to generate AST                    
+# SMU Parser class - Parses the SMU code to generate AST                    
+# exitOnError = False: A program with syntax errors raises ASAPPatchSyntaxError (with all of its diagnostics)
 class ASAPSmuParser:
-    def __init__(self, asapSmuFile) -> None:
+    def __init__(self, asapSmuFile, exitOnError=True) -> None:
         self.asapSmuFile = asapSmuFile
-        self.smuLexer = ASAPSmuLexer()
         with open(asapSmuFile, "r") as file:
             smuCode = file.read() 
-            try:
-                logging.info("Running lexical analysis on ASAP-SMU patch file - '%s'"%(self.asapSmuFile))
-                self.smuLexer.lexer.input(smuCode)
-            except Exception as e:
-                logging.info(str(e))
-                logging.error("Lexical analysis failed.")
-                exit(1)
-            logging.info("Lexical analysis successyfully completed.")
-        self.sequenceList = SequenceList([])
-        self.parse()
-        logging.info("Generated AST for SMU patch script - \n %s"%(self.sequenceList))
-
-    def extractVariableInfo(self, variable):
-        # Define a regular expression pattern to match VAR_NAME, MSB, and LSB
-        pattern = r'(?P<name>[a-zA-Z_][a-zA-Z_0-9]*(?:\.[a-zA-Z_][a-zA-Z_0-9]*)*)\[(?P<msb>\d+):(?P<lsb>\d+)\]'
-        
-        # Match the pattern in the input string
-        match = re.match(pattern, variable)
-        
-        if match:
-            # Extract matched groups
-            name = match.group('name')
-            msb  = int(match.group('msb'))
-            lsb  = int(match.group('lsb'))
-            
-            return name, msb, lsb
-        else:
-            raise Exception("Invalid variable string format - %s" %(variable))
-
-    def extractConstInfo(self, const):
-        # Define a regular expression pattern to match WIDTH and BINARY_VALUE
-        pattern = r'(?P<width>\d+)\'b(?P<binary_value>[01]+)'
-        
-        # Match the pattern in the input string
-        match = re.match(pattern, const)
-        if match:
-            # Extract matched groups
-            width = int(match.group('width'))
-            binaryValue = match.group('binary_value')
-            
-            return width, binaryValue
-        else:
-            raise Exception("Syntax Error - Invalid constant string format - %s" %(const))
-
-    def parse(self):
-        currentToken = self.smuLexer.lexer.token()
         logging.info("Parsing %s"%(self.asapSmuFile))
-        while currentToken:
-            try:
-                if currentToken.type == "SEQUENCE_START":
-                    seqName = currentToken.value.rstrip('{').strip()
-                    newSequence = Sequence(patterns = [],     \
-                                           name     = seqName)
-                    currentToken = self.smuLexer.lexer.token()
-                    while currentToken.type != "SEQUENCE_END":
-                        if currentToken.type == "PATTERN_START":
-                            nextToken =  self.smuLexer.lexer.token()
-                            # Checking if the pattern is non-empty
-                            if nextToken.type == "VARIABLE":
-                                varToken   = nextToken
-                                compToken  = self.smuLexer.lexer.token()
-                                constToken = self.smuLexer.lexer.token()
-                                # Parsing the variable
-                                if varToken.type == "VARIABLE":
-                                    varName, msb, lsb  = self.extractVariableInfo(varToken.value)
-                                    newVar = Variable(name = varName, \
-                                                      msb  = msb,     \
-                                                      lsb  = lsb)
-                                else:
-                                    raise Exception("Syntax Error - Expected a VARIABLE token. Received token %s" % varToken.type)
-                                # Parsing the comparison operation
-                                if compToken.type == "COMPARISON":
-                                    compType  = compToken.value
-                                    newComp = Comparison(operator = compType)
-                                else:
-                                    raise Exception("Syntax Error - Expected a COMPARISON token. Received token %s" % compToken.type)
-                                # Parsing the Const value
-                                if constToken.type == "CONST":
-                                    width, binVal  = self.extractConstInfo(constToken.value)
-                                    newConst = Const(width       = width, \
-                                                     binaryValue = binVal)
-                                else:
-                                    raise Exception("Syntax Error - Expected a CONST token. Received token %s" % constToken.type)
-                                patternEndToken = self.smuLexer.lexer.token()
-                                # Parsing end of pattern
-                                if  patternEndToken.type == "PATTERN_END":
-                                    newPattern = Pattern(lhs    = newVar,   \
-                                                         opType = newComp,  \
-                                                         rhs    = newConst)
-                                    newSequence.addPatterns(newPattern)
-                                else:
-                                    raise Exception("Syntax Error - Pattern should end with ')'. Received token %s" % patternEndToken.type)
-                                currentToken = self.smuLexer.lexer.token()
-                            # Checking if the pattern is empty
-                            elif nextToken.type == "PATTERN_END":
-                                newPattern = Pattern(lhs    = None,  \
-                                                     opType = None,  \
-                                                     rhs    = None)
-                                newSequence.addPatterns(newPattern)
-                                currentToken = self.smuLexer.lexer.token()
-                            # Illegal pattern
-                            else:
-                                raise Exception("Syntax Error - Pattern is neither empty nor valid -  Received token %s" % currentToken.type)
-                        else:
-                            raise Exception("Syntax Error - Pattern should begin with '(' Received token %s" % currentToken.type)
-
-                    self.sequenceList.addSequences(newSequence)
-                    currentToken = self.smuLexer.lexer.token()
-                else:
-                    raise Exception("Syntax Error - Sequence should start with '{{' Received token %s" % currentToken.type)
-            except Exception as e:
-                logging.error(str(e))
+        self.sequenceList, self.diagnostics = ASAPSmuGrammar.getGrammar().parseText(smuCode)
+        if self.diagnostics:
+            for diagnostic in self.diagnostics:
+                logging.error("%s: %s"%(self.asapSmuFile, diagnostic))
+            if exitOnError:
                 logging.error("Parsing failed")
                 exit(1)
-        logging.info("Parsed %s successfully - AST generated"%(self.asapSmuFile))
+            raise ASAPPatchSyntaxError(self.asapSmuFile, self.diagnostics)
+        logging.info("Generated AST for SMU patch script - \n %s"%(self.sequenceList))
 
 # Type of cfgs in SMU
 class SMUCfgType(Enum):
@@ -628,48 +932,63 @@ class SMUCfgType(Enum):
 
 
 class ASAPSmuCompiler(LogStructuring):
-    def __init__(self, asapSmuFile,      \
-                       outputFolder,     \
-                       maxSeqDepth,      \
-                       maxTriggers,      \
-                       segmentSize,      \
-                       observabilityMap) -> None:
+    def __init__(self, asapSmuFile,                   \
+                       outputFolder,                  \
+                       maxSeqDepth,                   \
+                       maxTriggers,                   \
+                       segmentSize,                   \
+                       observabilityMap,              \
+                       sequenceList      = None,      \
+                       streamFileName    = "smu.stream",\
+                       compiledInterface = None,      \
+                       observePipelineDepth = 0) -> None:
         self.asapSmuFile         = asapSmuFile
         self.outputFolder        = outputFolder
-        self.sequenceList        = ASAPSmuParser(self.asapSmuFile).sequenceList
+        # Sequences of the SMU patch file (a pre-routed subset of them for patch partitions)
+        self.sequenceList        = sequenceList if sequenceList is not None else ASAPSmuParser(self.asapSmuFile).sequenceList
+        self.streamFileName      = streamFileName
         self.maxSeqDepth         = maxSeqDepth
         self.maxTriggers         = maxTriggers
         self.segmentSize         = segmentSize
         self.observableSignalMap = observabilityMap
+        # Compiled interface section (CompiledInterfaceSection) - Observed signals are looked up in it instead of observabilityMap
+        self.compiledInterface   = compiledInterface
         self.maskWidth           = self.segmentSize
         self.cmpValWidth         = self.segmentSize
         # The following three lines of code internally determines the width of observable signal set
         self.maxObserveWidth     = 0
-        self.setMaxObserveIndex(self.observableSignalMap)
+        if self.compiledInterface is not None:
+            self.maxObserveWidth = self.compiledInterface.maxObserveIndex
+        else:
+            self.setMaxObserveIndex(self.observableSignalMap)
         self.maxObserveWidth+=1
         self.numSegments         = math.ceil(self.maxObserveWidth/segmentSize)
-        self.inpSelWidth         = math.ceil(math.log2(self.numSegments))
+        # INP_SEL is BITS_NUM_SEGMENTS wide in smu.v - 1 bit for a single segment. FSM_CMP is $clog2(N) wide,
+        # i.e. FSM_CMP has no cfg bits for a maximum sequence depth of 1
+        self.inpSelWidth         = max(1, math.ceil(math.log2(self.numSegments)))
         self.fsmCmpWidth         = math.ceil(math.log2(self.maxSeqDepth))
-        self.cmpSelMap        = {"=="   : "11",
-                                 ">"    : "10",
-                                 "<"    : "01",
-                                 "PASS" : "00"}
+        self.cmpSelMap        = {"=="   : 0b11,
+                                 ">"    : 0b10,
+                                 "<"    : 0b01,
+                                 "PASS" : 0b00}
         self.cfgSizeMap = {
             SMUCfgType.SMU_ENB : 1,
-            SMUCfgType.INP_SEL : int(math.ceil(math.log2(self.numSegments))),
+            SMUCfgType.INP_SEL : self.inpSelWidth,
             SMUCfgType.CMP_VAL : self.segmentSize,
             SMUCfgType.MASK    : self.segmentSize,
-            SMUCfgType.FSM_CMP : int(math.ceil(math.log2(self.maxSeqDepth))),
+            SMUCfgType.FSM_CMP : self.fsmCmpWidth,
             SMUCfgType.CMP_SEL : 2  # Determined based on cmpSelMap
         }
-        orderedCfgPerUnit = {triggerIndex:["0"*self.cfgSizeMap[SMUCfgType.SMU_ENB],
-                                           "0"*self.cfgSizeMap[SMUCfgType.INP_SEL],
-                                           "0"*self.cfgSizeMap[SMUCfgType.CMP_VAL],
-                                           "0"*self.cfgSizeMap[SMUCfgType.MASK],
-                                           "0"*self.cfgSizeMap[SMUCfgType.FSM_CMP],
-                                           "0"*self.cfgSizeMap[SMUCfgType.CMP_SEL]] for triggerIndex in range(0, self.maxTriggers)}
-        # Ordered cfg for SMU is indexed as orderedCfg[<CYCLE #>][<TRIGGER INDEX>][<CFG TYPE>]
-        self.orderedCfg = {cycleIndex:copy.deepcopy(orderedCfgPerUnit) for cycleIndex in range(0, self.maxSeqDepth)}
+        # Offset of each cfg type within the cfg of a SMU unit. Indexing in SMUCfgType is opposite to that of
+        # the actual register cfg, so CMP_SEL is at the LSB of the unit
+        self.cfgUnitOffsetMap = {}
+        self.cfgUnitSize      = 0
+        for cfgType in reversed(SMUCfgType):
+            self.cfgUnitOffsetMap[cfgType] = self.cfgUnitSize
+            self.cfgUnitSize              += self.cfgSizeMap[cfgType]
+        # Ordered cfg for SMU is a bit buffer of <CYCLE #> x <TRIGGER INDEX> units (cycle major, unit 0 at the LSB)
+        # Use getCfgOffset to locate a cfg type of a unit
+        self.orderedCfg = BitBuffer(self.maxSeqDepth * self.maxTriggers * self.cfgUnitSize)
         self.cmpSelWidth         = 2
         self.CfgSizePerSmuState  = self.cmpValWidth +  \
                                    self.maskWidth   +  \
@@ -678,8 +997,18 @@ class ASAPSmuCompiler(LogStructuring):
                                    self.cmpSelWidth   
         self.CfgSizePerSmu       = self.CfgSizePerSmuState * self.maxSeqDepth
         self.CfgSize             = self.maxTriggers * self.CfgSizePerSmu      
-        logging.info("Observable signal map - %s"%(self.logDictInfo(self.observableSignalMap))) 
+        if self.compiledInterface is not None:
+            logging.info("Observable signals of %s"%(self.compiledInterface))
+        else:
+            logging.info("Observable signal map - %s"%(self.logDictInfo(self.observableSignalMap))) 
         logging.info("Observable signal width = %d"%(self.maxObserveWidth))
+        # Register stages between every observed signal and the SMU (OBSERVE_PIPELINE_DEPTH of the interface). The stages
+        # are balanced, so sequences match as programmed, only later - Triggers (and the controls they enable) fire
+        # <DEPTH> cycles after the observed sequence. This latency is not compensated
+        self.observePipelineDepth = observePipelineDepth
+        if self.observePipelineDepth > 0:
+            logging.info("Observe pipeline depth = %d stage(s) - Triggers fire %d cycle(s) after the observed sequences"%(self.observePipelineDepth, \
+                                                                                                                     self.observePipelineDepth))
         logging.info("SMU Segment size - %d"%(self.segmentSize))
         logging.info("Number of segments - %d"%(self.numSegments))
 
@@ -700,6 +1029,11 @@ class ASAPSmuCompiler(LogStructuring):
         
     # Method to retrieve observable signal index of a given signal
     def getObserveIndex(self, signal:str):
+        if self.compiledInterface is not None:
+            index = self.compiledInterface.getObserveIndex(signal)
+            if index is None:
+                raise KeyError(signal)
+            return index
         signalKeys = signal.split(".")
         index = self.observableSignalMap
         for key in signalKeys:
@@ -708,6 +1042,10 @@ class ASAPSmuCompiler(LogStructuring):
                 return None
         return index
 
+    # Method to retrieve the bit offset of a cfg type of the SMU unit <triggerIndex> in cycle <cycleIndex>
+    def getCfgOffset(self, cycleIndex:int, triggerIndex:int, cfgType:SMUCfgType):
+        return (cycleIndex * self.maxTriggers + triggerIndex) * self.cfgUnitSize + self.cfgUnitOffsetMap[cfgType]
+
     # Method to retrieve relative signal mask and compVal constant
     def getMaskAndCompValForSegment(self, segmentBitPositionLsb, patternMsb, patternLsb, constant:Const):
         mask = 0
@@ -717,8 +1055,7 @@ class ASAPSmuCompiler(LogStructuring):
         intConst = int(constant.binaryValue, 2)
         const =  intConst << (patternLsb  + segmentBitPositionLsb)
 
-        return format(mask,  '0{}b'.format(self.cfgSizeMap[SMUCfgType.MASK] )), \
-               format(const, '0{}b'.format(self.cfgSizeMap[SMUCfgType.CMP_VAL]))
+        return mask, const
     
     # Method to generate cfg for a pattern
     def getCfgForPattern(self, pattern:Pattern):
@@ -759,18 +1096,18 @@ class ASAPSmuCompiler(LogStructuring):
                                                                  constant)
                 # This conditional checks if compVal is set for any bit outside masked zone.
                 # If so, it is a compile bug.
-                if (~int(mask, 2) & int(compVal, 2)):
+                if (~mask & compVal):
                     raise Exception("Compile Error: Non-zero Compval generated outside masked area for %s"%(pattern))
             except Exception as e:
                 logging.error(str(e))
                 exit(1)
             
-            inpSel = format(segmentIndex, '0{}b'.format(self.cfgSizeMap[SMUCfgType.INP_SEL]))
+            inpSel = segmentIndex
         else:
             logging.info("")
-            mask    = format(0, '0{}b'.format(self.cfgSizeMap[SMUCfgType.MASK]))
-            compVal = format(0, '0{}b'.format(self.cfgSizeMap[SMUCfgType.CMP_VAL]))
-            inpSel  = format(0, '0{}b'.format(self.cfgSizeMap[SMUCfgType.INP_SEL]))
+            mask    = 0
+            compVal = 0
+            inpSel  = 0
         try:
            if cmpOp is not None: 
                 cmpSel = self.cmpSelMap[cmpOp.operator]
@@ -780,16 +1117,20 @@ class ASAPSmuCompiler(LogStructuring):
             logging.error("Invalid comparison operation in pattern - %s"%str(pattern))
             exit(1)
         logging.info("---- Cfg for %s :\n  InpSel (Segment #) - %s\n  Mask - %s\n  cmpVal - %s\n  cmpSel ('00':PASS, 01:'<', 10:'>', 11: '==')  - %s"%(pattern, \
-                                                                                                                                                       inpSel,  \
-                                                                                                                                                       mask,    \
-                                                                                                                                                       compVal, \
-                                                                                                                                                       cmpSel))
+                                                                                                                                                       format(inpSel,  '0{}b'.format(self.cfgSizeMap[SMUCfgType.INP_SEL])), \
+                                                                                                                                                       format(mask,    '0{}b'.format(self.cfgSizeMap[SMUCfgType.MASK])),    \
+                                                                                                                                                       format(compVal, '0{}b'.format(self.cfgSizeMap[SMUCfgType.CMP_VAL])), \
+                                                                                                                                                       format(cmpSel,  '0{}b'.format(self.cfgSizeMap[SMUCfgType.CMP_SEL]))))
 
         return inpSel, mask, compVal, cmpSel 
     
     # Method to generate cfg for a sequence and set them in ordered cfg map
     def setCfgForSequence(self, sequence:Sequence, triggerIndex:int):
         try:
+            if triggerIndex >= self.maxTriggers:
+                raise Exception("Sequence - %s needs SMU unit %d, but there are only %d SMU units"%(sequence.name, \
+                                                                                                   triggerIndex,  \
+                                                                                                   self.maxTriggers))
             if len(sequence.patterns) > self.maxSeqDepth:
                 raise Exception("Sequence - %s has %d patterns that is more than the maximum # of patterns - %d"%(sequence.name,          \
                                                                                                                   len(sequence.patterns), \
@@ -799,14 +1140,22 @@ class ASAPSmuCompiler(LogStructuring):
             exit(1)
         for cycleIndex, pattern in enumerate(sequence.patterns):
             inpSel, mask, compVal, cmpSel = self.getCfgForPattern(pattern)
-            smuEnb = format(1, '0{}b'.format(1))
-            fsmCmp = format(len(sequence.patterns) - 1, '0{}b'.format(math.ceil(math.log2(self.maxSeqDepth))))
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.SMU_ENB.value] = smuEnb
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.INP_SEL.value] = inpSel
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.MASK.value]    = mask
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.CMP_VAL.value] = compVal
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.CMP_SEL.value] = cmpSel
-            self.orderedCfg[cycleIndex][triggerIndex][SMUCfgType.FSM_CMP.value] = fsmCmp
+            unitCfg = {
+                SMUCfgType.SMU_ENB : 1,
+                SMUCfgType.INP_SEL : inpSel,
+                SMUCfgType.MASK    : mask,
+                SMUCfgType.CMP_VAL : compVal,
+                SMUCfgType.CMP_SEL : cmpSel,
+                SMUCfgType.FSM_CMP : len(sequence.patterns) - 1
+            }
+            try:
+                for cfgType in SMUCfgType:
+                    self.orderedCfg.setField(self.getCfgOffset(cycleIndex, triggerIndex, cfgType), \
+                                             self.cfgSizeMap[cfgType],                             \
+                                             unitCfg[cfgType])
+            except AssertionError as e:
+                logging.error("%s (sequence %s, cycle %d)"%(str(e), sequence.name, cycleIndex))
+                exit(1)
         logging.info("-- Cfg generation for sequence %s complete."%(sequence.name))
     
     # Method to get cfg for SMU
@@ -820,16 +1169,10 @@ class ASAPSmuCompiler(LogStructuring):
             self.setCfgForSequence(sequence, triggerIndex) 
         return nameToTriggerIndex
     
-    # This is the sole method that determines the actual ordering of elements of SMU ordered cfg
-    # in the programmable cfg stream. 
+    # The ordering of elements of SMU ordered cfg in the programmable cfg stream is determined by
+    # getCfgOffset. The stream is the ordered cfg buffer, MSB first
     def getCfgStreamFromOrderedCfg(self):
-        cfgStream = ""
-        for cycle in range(0, self.maxSeqDepth):
-            for trigger in range(0, self.maxTriggers):
-                # Using reversed as indeing in SMUCfgType is opposite to that of actual register cfg
-                for cfgType in reversed(SMUCfgType):
-                    cfgStream = self.orderedCfg[cycle][trigger][cfgType.value] + cfgStream
-        return cfgStream
+        return self.orderedCfg.toBinaryString()
 
     # Method writes the SMU bitsream and returns mapping information of sequences
     def generateProgram(self):
@@ -839,14 +1182,18 @@ class ASAPSmuCompiler(LogStructuring):
         for seqName in nameToTriggerIndex:
             logging.info("Sequence %s mapped to SMU unit with trigger index - %d" %(seqName,                     \
                                                                                     nameToTriggerIndex[seqName]))
-        logging.info("SMU Ordered cfg is - %s"%(self.logSMUOrderedMap(self.orderedCfg, self.maxTriggers, self.maxSeqDepth)))
+        logging.info("SMU Ordered cfg is - %s"%(self.logSMUOrderedMap(self.orderedCfg,          \
+                                                                      self.getCfgOffset,        \
+                                                                      self.cfgSizeMap,          \
+                                                                      len(nameToTriggerIndex),  \
+                                                                      self.maxSeqDepth)))
         logging.info("SMU trigger index map - %s"%(self.logDictInfo(nameToTriggerIndex)))
         cfgStream = self.getCfgStreamFromOrderedCfg()
         logging.info("Size of SMU cfg - %d"%(len(cfgStream)))
         logging.info("SMU Cfg stream - \n  %s"%(cfgStream))
-        with open(self.outputFolder + "/smu.stream", "w") as outFile:
-            for bit in cfgStream:
-                outFile.write(" %s"%(bit))
+        with open(self.outputFolder + "/" + self.streamFileName, "w") as outFile:
+            if cfgStream:
+                outFile.write(" " + " ".join(cfgStream))
         return nameToTriggerIndex
     
 # Enum class for SRU control types
@@ -873,16 +1220,20 @@ class SRUCfgType(Enum):
 # so that post configuration of the convenient dictionary, the class 
 # auto-generates the ordered cfg.
 class ASAPSruCompiler(LogStructuring):
-    def __init__(self, sruPatchFile,         \
-                       outputFolder,         \
-                       sruSegmentSize,       \
-                       maxTriggers,          \
-                       numClkControls,       \
-                       numSignalControls,    \
-                       nameToTriggerIndex,   \
-                       numPLA,               \
-                       controlledSignalMap,  \
-                       controlledClkMap):
+    def __init__(self, sruPatchFile,                  \
+                       outputFolder,                  \
+                       sruSegmentSize,                \
+                       maxTriggers,                   \
+                       numClkControls,                \
+                       numSignalControls,             \
+                       nameToTriggerIndex,            \
+                       numPLA,                        \
+                       controlledSignalMap,           \
+                       controlledClkMap,              \
+                       controlNodeList   = None,      \
+                       streamFileName    = "sru.stream",\
+                       controlLeafTable  = None,      \
+                       compiledInterface = None):
         # Trigger name to trigger index mapping
         self.nameToTriggerIndex    = nameToTriggerIndex  
         # Size of SRU segments     
@@ -905,24 +1256,41 @@ class ASAPSruCompiler(LogStructuring):
         self.sruPatchFile          = sruPatchFile
         # Output folder
         self.outputFolder          = outputFolder
-        # Parse the SRU Patch file to generate AST
-        self.sruParser             = ASAPSruParser(self.sruPatchFile)
-
-        # Initialize the ordered signal cfg - CFG bits concerning each signal under control and PLAs
-        # The order of definition here should be with respect tot the order in CfgType, ControlType Enums
-        self.orderedCfg = [[{}, {}], # PLA_SEL  signal/clock
-                           [{}, {}], # CNTL_ENB for signal/clock
-                           [{}, {}], # CONSTANT for signal/clock (CONSTANT for clock is don't care. done for code symmetry)
-                           {},       # TRIG_SEL 
-                           {}        # MINTERM_SEL
-                          ]
-        # Initialize the ordered PLA cfg - CFG bits converning each PLAs
+        # Parse the SRU Patch file to generate AST (control nodes are pre-routed for patch partitions)
+        self.controlNodeList       = controlNodeList if controlNodeList is not None else ASAPSruParser(self.sruPatchFile).controlNodeList
+        self.streamFileName        = streamFileName
 
         # ControlSignalMap for Signal/Clock controls
         self.controlMap = {
             ControlType.SIGNAL : self.controlledSignalMap, \
             ControlType.CLOCK  : self.controlledClkMap
         }
+        # Compiled interface section (CompiledInterfaceSection) - The programmed controls are looked up in it, no
+        # control leaf table is built
+        self.compiledInterface = compiledInterface
+        # Control leaf table ([<NAME>, <MSB>, <LSB>] in connection order) for Signal/Clock controls, and the control
+        # index of each controlled signal. Both are derived once from the control maps
+        if controlLeafTable is None and self.compiledInterface is None:
+            controlLeafTable = {
+                ControlType.SIGNAL : ControlSignalMappingModel.getControlLeafTable(self.controlledSignalMap, 0,                      self.numSignalControls), \
+                ControlType.CLOCK  : ControlSignalMappingModel.getControlLeafTable(self.controlledClkMap,    self.numSignalControls, self.numClkControls)
+            }
+        self.controlLeafTable = controlLeafTable
+        self.controlIndexMap  = None
+        if self.controlLeafTable is not None:
+            self.controlIndexMap = {controlType : {name : [msb, lsb] for [name, msb, lsb] in self.controlLeafTable[controlType]} \
+                                    for controlType in ControlType}
+        # Reordered [<MSB>, <LSB>] of the programmed controls (for the ordered cfg log)
+        self.programmedControls = {controlType : {} for controlType in ControlType}
+        # Index of the first control bit and # of control bits for Signal/Clock controls (clock controls follow signal controls)
+        self.controlBaseMap = {
+            ControlType.SIGNAL : 0,                      \
+            ControlType.CLOCK  : self.numSignalControls
+        }
+        self.numControlsMap = {
+            ControlType.SIGNAL : self.numSignalControls, \
+            ControlType.CLOCK  : self.numClkControls
+        }
 
         # Cfg Sizes initialization 
         self.cfgSizeMap = {
@@ -938,128 +1306,88 @@ class ASAPSruCompiler(LogStructuring):
         }
         logging.info("Cfg Size Map - %s"%(self.logDictInfo(self.cfgSizeMap)))
 
-        # Initialize the ordered controlled signal / PLA cfgs with signal map
-        for  cfgType in SRUCfgType:
-            if cfgType in [SRUCfgType.PLA_SEL, SRUCfgType.CNTL_ENB, SRUCfgType.CONSTANT]:
-                for controlType in ControlType:
-                    # Initialize the Cfg map with signal to control bit map
-                    self.orderedCfg[cfgType.value][controlType.value] = copy.deepcopy(self.controlMap[controlType])
-                    # Initialize the control bit past of cfg map with initialize cfg
-                    self.initalizeCfg(self.orderedCfg[cfgType.value][controlType.value], \
-                                      self.cfgSizeMap[cfgType])
-            else:
-                # TRIG_SEL/MINTERM_SEL is per PLU. Initialize orderedCfg for these for each PLUs
-                self.orderedCfg[cfgType.value] = {index:("0"*self.cfgSizeMap[cfgType]) for index in range(0, self.numPLA)}
-
-
-    # Method to initialize trigger sel cfg for the signal/clock control
-    def initalizeCfg(self, currentNode, cfgSize):
-        for key in currentNode:
-            if isinstance(currentNode[key], dict):
-                self.initalizeCfg(currentNode[key], cfgSize)
-            # This comparison is to make sure we do not traverse the same node already traversed
-            elif isinstance(currentNode[key], list):
-                signalMsb = currentNode[key][0]
-                signalLsb = currentNode[key][1]
-                cfg       = format(0, '0{}b'.format(cfgSize*(signalMsb - signalLsb + 1)))
-                currentNode[key] = cfg
-
-    # This method is used to get distinct POS expressions used as triggers
-    # Two POS expressions are equivalent if two distinct POS expressions
-    # has the exact same # and type of expression tokens/minterms this is
-    # achieved in code using sets
-    # Each distinct POS expression is mapped to distinct PLA units
+        # Initialize the ordered cfg - A bit buffer holding the CFG bits concerning each signal under control and PLAs.
+        # cfgSectionMap holds the [offset, size] of each (CfgType, ControlType) section of the buffer. The sections are
+        # laid out from the LSB in the order of the SRU cfg stream - CONSTANT (signal), CNTL_ENB (clock, signal),
+        # PLA_SEL (clock, signal), MINTERM_SEL (PLA 0 first), TRIG_SEL (PLA 0 first). CONSTANT for clock is not
+        # part of the stream. Within a control section, control bits are in connection order (index in control signal q)
+        self.cfgSectionMap = {}
+        cfgOffset = 0
+        for cfgType, controlType in [(SRUCfgType.CONSTANT,    ControlType.SIGNAL), \
+                                     (SRUCfgType.CNTL_ENB,    ControlType.CLOCK),  \
+                                     (SRUCfgType.CNTL_ENB,    ControlType.SIGNAL), \
+                                     (SRUCfgType.PLA_SEL,     ControlType.CLOCK),  \
+                                     (SRUCfgType.PLA_SEL,     ControlType.SIGNAL), \
+                                     (SRUCfgType.MINTERM_SEL, None),               \
+                                     (SRUCfgType.TRIG_SEL,    None)]:
+            numUnits = self.numPLA if controlType is None else self.numControlsMap[controlType]
+            self.cfgSectionMap[(cfgType, controlType)] = [cfgOffset, numUnits * self.cfgSizeMap[cfgType]]
+            cfgOffset += numUnits * self.cfgSizeMap[cfgType]
+        self.orderedCfg = BitBuffer(cfgOffset)
+
+    # This method is used to get distinct trigger expressions, in the order of the SRU patch program
+    # Two trigger expressions are equivalent if they have the same triggers and the same truth
+    # table over them (PosExpr.getExprKey) - e.g. t0.t1 and t1.t0
+    # Each distinct trigger expression is mapped to distinct PLA units
     def getDistinctPOSExpr(self, controlList: ControlNodeList):
-        distinctPOSExpr = set()
+        distinctPOSExpr = {}
         for node in controlList.controlNodes:
-            exprTokenSet = frozenset(node.trigger.exprTokens)
-            distinctPOSExpr.add(exprTokenSet)
+            # The truth table of an expression has 2^<# of triggers> bits - Checked before it is derived
+            if len(node.trigger.getVarList()) > self.sruSegmentSize:
+                raise Exception("More variables in POS expression %s than the SRU segment size %s"%(node.trigger.expr, self.sruSegmentSize))
+            distinctPOSExpr.setdefault(node.trigger.getExprKey(), node.trigger)
         return distinctPOSExpr
     
-    
-    # Helper method used to find all variables in a POS expression
-    def getVarsInExprSet(self, exprSet):
-        varList = set()
-        for token in exprSet:
-            # Use regular expression to find variables and complements
-            matches = re.findall(r'([a-zA-Z0-9]+)(?:\')?', token)
-            for match in matches:
-                varList.add(match)
-        return list(varList)
-    
     # Method used to get trigger select cfg for a PLA unit
-    # Each POS expression gets mapped to a PLA unit
-    def getTrigSelectCfgForExpr(self, exprSet:set):
-        try:
-            vars = self.getVarsInExprSet(exprSet)
-            if len(vars) > self.sruSegmentSize:
-                raise Exception("More variables in POS expression %s than the SRU segment size %s"%(exprSet, self.sruSegmentSize))
-        except Exception as e:
-            logging.error(str(e))
-            exit(1)
-        trigSelCfg = ""
+    # Each POS expression gets mapped to a PLA unit - Trigger k of the PLA input list of the expression is PLA input k
+    def getTrigSelectCfgForExpr(self, posExpr:PosExpr):
+        trigSelCfg = 0
+        trigSelWidth = self.cfgSizeMap[SRUCfgType.TRIG_SEL] // self.sruSegmentSize
         varToPlaIndexMap = {}
         try:
-            for index, var in enumerate(vars):
+            for index, var in enumerate(posExpr.InputList):
                 if var in self.nameToTriggerIndex:
                     triggerIndex = self.nameToTriggerIndex[var]
                     # Latest configuration should be appended towards the MSB side
-                    trigSelCfg = format(triggerIndex, '0{}b'.format(int(self.cfgSizeMap[SRUCfgType.TRIG_SEL]/self.sruSegmentSize))) + trigSelCfg
+                    trigSelCfg |= triggerIndex << (index * trigSelWidth)
                     varToPlaIndexMap[var] = index
                 else:
-                    raise Exception("Trigger %s in POS expression %s not programmed in SMU patch"%(var, exprSet))
-            trigSelCfg = format(int(trigSelCfg, 2), '0{}b'.format(self.cfgSizeMap[SRUCfgType.TRIG_SEL]))
+                    raise Exception("Trigger %s in POS expression %s not programmed in SMU patch"%(var, posExpr.expr))
         except Exception as e:
             logging.error(str(e))
             exit(1)
         return trigSelCfg, varToPlaIndexMap
 
-    # Method used to get complimented and non-complimented terms in an expression token
-    def getComplimentAndNonComplimentVars(self, exprToken):
-        vars = [var.strip() for var in str(exprToken).split('.')]
-        return [var.rstrip("'") for var in vars if var.endswith("'")], [var for var in vars if not var.endswith("'")]
-            
     # Method used to select relevant minterms representing the POS expr to be programmed
-    # to a PLA unit. It needs a mapping of trigger to PLA index and an token set of the
-    # POS expression
-    def getMintermCfgForExpr(self, exprSet: set, varToPlaIndexMap: dict):
-        numMinterms = 2 ** self.sruSegmentSize
-        mintermCfg = [False] * numMinterms  # Initialize mintermCfg as a list of False
-        for i in range(numMinterms):
-            binary = bin(i)[2:].zfill(self.sruSegmentSize)  # Convert i to binary string
-            for exprToken in exprSet:
-                cmpVars, nonCmpVars = self.getComplimentAndNonComplimentVars(exprToken)
-                if all(binary[::-1][varToPlaIndexMap[var]] == '1' for var in nonCmpVars) and \
-                   all(binary[::-1][varToPlaIndexMap[var]] == '0' for var in cmpVars):
-                    mintermCfg[i] = True
-        # Reversing the cfg list as Cfg follows bit ordering which goes MSB --> LSB
-        mintermCfg.reverse()
-        CfgStr = ''.join('1' if bit else '0' for bit in mintermCfg)
-        return CfgStr
+    # to a PLA unit - The truth table of the expression over the PLA inputs, with minterm i as bit i of the cfg
+    def getMintermCfgForExpr(self, posExpr:PosExpr):
+        return posExpr.getTruthTable(self.sruSegmentSize)
 
     # This method is used to derive PLA config for all POS expressions
     # It returns 3 maps - 1. Expression to mapped PLA index,
     # 2. Expression to PLA config
     def getPLAConfig(self, distinctPOSExpr):
         exprToPlaMap, exprToTrigSelCfg, exprToMintermCfg,  = {}, {}, {}
-        for plaIndex, exprSet in enumerate(distinctPOSExpr):
-            exprToPlaMap[exprSet] = plaIndex
-            exprToTrigSelCfg[exprSet], \
-            varToPlaIndexMap          = self.getTrigSelectCfgForExpr(exprSet)
-            exprToMintermCfg[exprSet] = self.getMintermCfgForExpr(exprSet, varToPlaIndexMap)
-            logging.info("Mapping POS expression - %s to PLA - %d"%(str(exprSet), plaIndex))
+        for plaIndex, (exprKey, posExpr) in enumerate(distinctPOSExpr.items()):
+            exprToPlaMap[exprKey] = plaIndex
+            exprToTrigSelCfg[exprKey], \
+            varToPlaIndexMap          = self.getTrigSelectCfgForExpr(posExpr)
+            exprToMintermCfg[exprKey] = self.getMintermCfgForExpr(posExpr)
+            logging.info("Mapping POS expression - %s to PLA - %d"%(posExpr.expr, plaIndex))
             logging.info("--Trigger signal mapping - %s"%(self.logDictInfo(varToPlaIndexMap)))
-            logging.info("--Minterm select cfg - %s"%(exprToMintermCfg[exprSet]))
+            logging.info("--Minterm select cfg - %s"%(format(exprToMintermCfg[exprKey], '0{}b'.format(self.cfgSizeMap[SRUCfgType.MINTERM_SEL]))))
         return exprToPlaMap, exprToTrigSelCfg, exprToMintermCfg
             
     # Method to derive cfgs (PLA_SEL, CNTL_ENB) for a clock control
     def getCfgForClkControl(self, clkControl: Clock, exprToPlaMap: dict):
         try:
             logging.info("Configuring clock control for control node - %s"%(clkControl))
-            plaIndexForTrigger = exprToPlaMap[clkControl.trigger.getExprSet()]
-            plaSelCfg = format(plaIndexForTrigger, '0{}b'.format(self.cfgSizeMap[SRUCfgType.PLA_SEL]))
-            cntlEnbCfg = "1"
-            logging.info("Cfg For %s\n  CNTL_ENB (Control Enable) - %s\n  PLA_SEL - %s" %(str(clkControl),cntlEnbCfg, plaSelCfg))
+            plaIndexForTrigger = exprToPlaMap[clkControl.trigger.getExprKey()]
+            plaSelCfg = plaIndexForTrigger
+            cntlEnbCfg = 1
+            logging.info("Cfg For %s\n  CNTL_ENB (Control Enable) - %d\n  PLA_SEL - %s" %(str(clkControl),                                                      \
+                                                                                          cntlEnbCfg,                                                           \
+                                                                                          format(plaSelCfg, '0{}b'.format(self.cfgSizeMap[SRUCfgType.PLA_SEL]))))
             if clkControl.signal.msb != clkControl.signal.lsb:
                 raise Exception("Multi-bit CLK signals are not supported - found violation for clock signal %s" %(clkControl.signal.name))
         except Exception as e:
@@ -1071,35 +1399,50 @@ class ASAPSruCompiler(LogStructuring):
     def getCfgForSignalControl(self, sigControl: Signal, exprToPlaMap: dict):
         logging.info("Configuring signal control for control node - %s"%(sigControl))
         try:
-            plaIndexForTrigger = exprToPlaMap[sigControl.trigger.getExprSet()]
+            plaIndexForTrigger = exprToPlaMap[sigControl.trigger.getExprKey()]
         except KeyError:
-            logging.error("POS expression %s not found to be mapped to any PLAs"%(str(sigControl.trigger.getExprSet())))
+            logging.error("POS expression %s not found to be mapped to any PLAs"%(sigControl.trigger.expr))
             exit(1)
-        plaSelCfg = format(plaIndexForTrigger, '0{}b'.format(self.cfgSizeMap[SRUCfgType.PLA_SEL]))*(sigControl.signal.msb - sigControl.signal.lsb + 1)
-        cntlEnbCfg = "1"*(sigControl.signal.msb - sigControl.signal.lsb + 1)
-        constCfg = format(int(sigControl.constant.binaryValue, 2), '0{}b'.format(sigControl.constant.width))
-        logging.info("Cfg for %s\n  CNTL_ENB (Control Enable) - %s\n  PLA_SEL - %s\n  CONSTANT - %s" %(str(sigControl),cntlEnbCfg, plaSelCfg, constCfg))
+        # PLA_SEL/CNTL_ENB are repeated for every controlled signal bit
+        numBits    = sigControl.signal.msb - sigControl.signal.lsb + 1
+        plaSelCfg  = reduce(lambda cfg, bit: (cfg << self.cfgSizeMap[SRUCfgType.PLA_SEL]) | plaIndexForTrigger, range(numBits), 0)
+        cntlEnbCfg = (1 << numBits) - 1
+        constCfg   = int(sigControl.constant.binaryValue, 2)
+        logging.info("Cfg for %s\n  CNTL_ENB (Control Enable) - %s\n  PLA_SEL - %s\n  CONSTANT - %s" %(str(sigControl),                                                                          \
+                                                                                                    format(cntlEnbCfg, '0{}b'.format(numBits)),                                                \
+                                                                                                    format(plaSelCfg,  '0{}b'.format(numBits * self.cfgSizeMap[SRUCfgType.PLA_SEL])),          \
+                                                                                                    format(constCfg,   '0{}b'.format(sigControl.constant.width))))
         return plaSelCfg, cntlEnbCfg, constCfg
 
-    # Since orderedMap is in the form of a tree, you have to traverse the tree to set 
-    # cfg for the right signal node
-    # This method traverses the Cfg tree and sets the cfg for the provided hierarchical signal
-    def setCfgForOrderedMap(self, signalName:str, cfgMap, cfg):
-        signalKeys = signalName.split(".")
-        index = cfgMap
-        for key in signalKeys:
-            try:
-                # If index[key] is str, it is definititely a cfg
-                if isinstance(index[key], str):
-                    index[key] = cfg
-                # else keep going inside until the leaf node
-                else:
-                    index = index[key]
-            except KeyError as e:
-                logging.error("Illegal signal name - %s"%(signalName))
-                exit(1)
-            if index is None:
-                raise Exception("Empty/Un-initilized cfg map")
+    # Method returns the reordered [<MSB>, <LSB>] of a controlled signal/clock (None if it is not a control of <controlType>)
+    def getControlIndex(self, name:str, controlType:ControlType):
+        if self.controlIndexMap is not None:
+            return self.controlIndexMap[controlType].get(name)
+        controlIndex = self.compiledInterface.getControlIndex(name)
+        if controlIndex is None or controlIndex[0] != controlType.name.lower():
+            return None
+        return controlIndex[2]
+
+    # This method sets the cfg of the controlled bits of <signal> in the <cfgType> section of the ordered cfg.
+    # cfg holds the cfg of all controlled bits, the LSB first
+    def setCfgForOrderedMap(self, signal:Variable, controlType:ControlType, cfgType:SRUCfgType, cfg:int):
+        index = self.getControlIndex(signal.name, controlType)
+        if index is None:
+            logging.error("Illegal signal name - %s"%(signal.name))
+            exit(1)
+        [signalMsb, signalLsb] = index
+        if signal.lsb < 0 or signal.msb > signalMsb - signalLsb:
+            raise Exception("Controlled signal index %d:%d of signal %s not within actual controlled range of %d:%d"%(signal.msb,            \
+                                                                                                                      signal.lsb,            \
+                                                                                                                      signal.name,           \
+                                                                                                                      signalMsb - signalLsb, \
+                                                                                                                      0))
+        self.programmedControls[controlType][signal.name] = index
+        controlIndex = signalLsb - self.controlBaseMap[controlType] + signal.lsb
+        sectionOffset, _ = self.cfgSectionMap[(cfgType, controlType)]
+        self.orderedCfg.setField(sectionOffset + controlIndex * self.cfgSizeMap[cfgType],       \
+                                 (signal.msb - signal.lsb + 1) * self.cfgSizeMap[cfgType],     \
+                                 cfg)
 
     # Manager method that derives each type of configuration and set them to the ordered
     # cfg object. 
@@ -1114,8 +1457,11 @@ class ASAPSruCompiler(LogStructuring):
                 exprToPlaMap, exprToTrigSelCfg, exprToMintermCfg = self.getPLAConfig(distinctPOSExpr)
                 for expr in exprToPlaMap:
                     # Setting ordered cfg for PLA (TRIG_SEL and MINTERM_SEL)
-                    self.orderedCfg[SRUCfgType.TRIG_SEL.value][exprToPlaMap[expr]]    = exprToTrigSelCfg[expr]
-                    self.orderedCfg[SRUCfgType.MINTERM_SEL.value][exprToPlaMap[expr]] = exprToMintermCfg[expr]
+                    for cfgType, exprToCfg in [(SRUCfgType.TRIG_SEL, exprToTrigSelCfg), (SRUCfgType.MINTERM_SEL, exprToMintermCfg)]:
+                        sectionOffset, _ = self.cfgSectionMap[(cfgType, None)]
+                        self.orderedCfg.setField(sectionOffset + exprToPlaMap[expr] * self.cfgSizeMap[cfgType], \
+                                                 self.cfgSizeMap[cfgType],                                      \
+                                                 exprToCfg[expr])
         except Exception as e:
             logging.error(str(e))
             exit(1)
@@ -1127,125 +1473,62 @@ class ASAPSruCompiler(LogStructuring):
                 if isinstance(controlNode, Signal):
                     plaSelCfg, cntlEnbCfg, constCfg = self.getCfgForSignalControl(controlNode, exprToPlaMap)
                     # Setting PLA_SEL for a signal control unit
-                    self.setCfgForOrderedMap(controlNode.signal.name,                                   \
-                                             self.orderedCfg[SRUCfgType.PLA_SEL.value][ControlType.SIGNAL.value],   \
-                                             plaSelCfg)
+                    self.setCfgForOrderedMap(controlNode.signal, ControlType.SIGNAL, SRUCfgType.PLA_SEL,  plaSelCfg)
                     # Setting CNTL_ENB for a signal control unit
-                    self.setCfgForOrderedMap(controlNode.signal.name,                                   \
-                                             self.orderedCfg[SRUCfgType.CNTL_ENB.value][ControlType.SIGNAL.value],  \
-                                             cntlEnbCfg)
+                    self.setCfgForOrderedMap(controlNode.signal, ControlType.SIGNAL, SRUCfgType.CNTL_ENB, cntlEnbCfg)
                     # Setting CONSTANT for a signal control unit 
-                    self.setCfgForOrderedMap(controlNode.signal.name,                                   \
-                                             self.orderedCfg[SRUCfgType.CONSTANT.value][ControlType.SIGNAL.value],  \
-                                             constCfg)
+                    self.setCfgForOrderedMap(controlNode.signal, ControlType.SIGNAL, SRUCfgType.CONSTANT, constCfg)
                 # Generating Cfg for clock control nodes
                 elif isinstance(controlNode, Clock):
                     plaSelCfg, cntlEnbCfg = self.getCfgForClkControl(controlNode, exprToPlaMap)
                     # Setting PLA_SEL for a clock control unit
-                    self.setCfgForOrderedMap(controlNode.signal.name,
-                                             self.orderedCfg[SRUCfgType.PLA_SEL.value][ControlType.CLOCK.value],    \
-                                             plaSelCfg)
-                    # Setting CONSTANT for a clock control unit 
-                    self.setCfgForOrderedMap(controlNode.signal.name,
-                                             self.orderedCfg[SRUCfgType.CNTL_ENB.value][ControlType.CLOCK.value],   \
-                                             cntlEnbCfg)
+                    self.setCfgForOrderedMap(controlNode.signal, ControlType.CLOCK,  SRUCfgType.PLA_SEL,  plaSelCfg)
+                    # Setting CNTL_ENB for a clock control unit 
+                    self.setCfgForOrderedMap(controlNode.signal, ControlType.CLOCK,  SRUCfgType.CNTL_ENB, cntlEnbCfg)
                 else:
                     raise Exception("Illegal controlNode type - %s"%(type(controlNode)))     
         except Exception as e:
             logging.error(str(e))
             exit(1)   
-        logging.info("Ordered config map - %s"%(self.logSRUOrderedMap(self.orderedCfg)))
-    
-    # Method to find signal with the given LSB
-    def getSignalForConnectionIndexLsb(self, signalMap, index, signalKeys, sizeRange, nameList=None):
-        if nameList is None:
-            nameList = []
-
-        for key in signalMap:
-            if isinstance(signalMap[key], dict):
-                nameList.append(key)
-                signalKeys, sizeRange = self.getSignalForConnectionIndexLsb(signalMap[key], index, signalKeys, sizeRange, nameList)
-                nameList.pop()  # Remove the last element after recursion
-            else:
-                if signalMap[key][1] == index:
-                    nameList.append(key)
-                    signalKeys, sizeRange = nameList[:], signalMap[key]
-                    nameList.pop()  # Remove the last element after finding the signal
-        return signalKeys, sizeRange
-    
-    # This method retrieves the minimum and maximum LSB indices of signals in a given signal tree
-    def getMinimalAndMaximalIndexLsbInMap(self, signalMap, minIndex, maxIndex):
-        for key in signalMap:
-            if isinstance(signalMap[key], dict):
-                minIndex, maxIndex = self.getMinimalAndMaximalIndexLsbInMap(signalMap[key], minIndex, maxIndex)
-            else:
-                # Find if LSB < minimal index
-                if minIndex > signalMap[key][1]:
-                    minIndex = signalMap[key][1]
-                # Find if LSB > maximal index
-                if maxIndex < signalMap[key][1]:
-                    maxIndex = signalMap[key][1]
-        return minIndex, maxIndex
-
-    # Given a cfg, it returns the serialized cfg in connection order
-    def getCfgInConnectionOrder(self, cfgMap, controlMap):
-        startIndex, maxIndex = self.getMinimalAndMaximalIndexLsbInMap(controlMap, sys.maxsize, 0)
-        cfg = ""
-        while startIndex <= maxIndex:
-            signalKeys, sizeRange = self.getSignalForConnectionIndexLsb(controlMap, startIndex, None, None)
-            if signalKeys is None or sizeRange is None:
-                # Reached if getSignalForConnectionIndexLsb doesn't successfully get a signal with LSB = startIndex
-                raise Exception("Invalid signal start index - %d"%(startIndex))
-            index = copy.deepcopy(cfgMap)
-            for key in signalKeys:
-                index = index[key]
-                if index is None:
-                    raise Exception("Invalid configuration found while generating cfg stream")
-            cfg = index + cfg
-            [signalMsb, signalLsb] = sizeRange
-            startIndex += (signalMsb - signalLsb + 1)
-        return cfg
+        logging.info("Ordered config map - %s"%(self.logSRUOrderedMap(self.orderedCfg,         \
+                                                                      self.cfgSectionMap,      \
+                                                                      self.cfgSizeMap,         \
+                                                                      self.controlBaseMap,     \
+                                                                      self.programmedControls)))
     
-    # Get the SMU cfg stream - This method accumulates the cfg in the order required by SRU
+    # Get the SRU cfg stream - The ordered cfg buffer (MSB first) is laid out in the order required by SRU
     def getCfgStreamFromOrderedCfg(self):
-        cfgStream = ""
-        # Constant
-        cfgStream = self.getCfgInConnectionOrder(self.orderedCfg[SRUCfgType.CONSTANT.value][ControlType.SIGNAL.value], \
-                                                 self.controlMap[ControlType.SIGNAL]) + cfgStream
-        # Control Enable Select ([signal, clock])
-        for controlType in reversed(ControlType):
-            cfgStream = self.getCfgInConnectionOrder(self.orderedCfg[SRUCfgType.CNTL_ENB.value][controlType.value], \
-                                                     self.controlMap[controlType]) + cfgStream
-        # PLA sel ([signal, clock])
-        for controlType in reversed(ControlType):
-            cfgStream = self.getCfgInConnectionOrder(self.orderedCfg[SRUCfgType.PLA_SEL.value][controlType.value], \
-                                                     self.controlMap[controlType]) + cfgStream
-        # Minterm select
-        for plaIndex in self.orderedCfg[SRUCfgType.MINTERM_SEL.value]:
-            cfgStream = self.orderedCfg[SRUCfgType.MINTERM_SEL.value][plaIndex] + cfgStream
-        # Trigger select
-        for plaIndex in self.orderedCfg[SRUCfgType.TRIG_SEL.value]:
-            cfgStream = self.orderedCfg[SRUCfgType.TRIG_SEL.value][plaIndex] + cfgStream
-        return cfgStream
+        return self.orderedCfg.toBinaryString()
 
     # Method writes the SMU bitsream and returns mapping information of sequences
     def generateProgram(self):
         logging.info("Compiling file %s"%(self.sruPatchFile))
-        controlNodeList = self.sruParser.controlNodeList
+        controlNodeList = self.controlNodeList
         self.setSruCfg(controlNodeList)
         logging.info("Compilation complete.")
         cfgStream = self.getCfgStreamFromOrderedCfg()
         logging.info("Size of SRU cfg - %d"%(len(cfgStream)))
         logging.info("SRU Cfg stream - \n  %s"%(cfgStream))
-        with open(self.outputFolder + "/sru.stream", "w") as outFile:
-            for bit in cfgStream:
-                outFile.write(" %s"%(bit))
+        with open(self.outputFolder + "/" + self.streamFileName, "w") as outFile:
+            if cfgStream:
+                outFile.write(" " + " ".join(cfgStream))
    
 
 class ControlSignalMappingModel:
-    def __init__(self, controllabilityMap, controlTypeMap) -> None:
+    def __init__(self, controllabilityMap, controlTypeMap, compiledInterface=None) -> None:
         self.controllabilityMap = controllabilityMap
         self.controlTypeMap     = controlTypeMap
+        # The reordering of a compiled interface (CompiledInterfaceSection) is precomputed - Nothing is loaded, the SRU
+        # compiler looks up the reordered index of the programmed controls in the compiled interface
+        if compiledInterface is not None:
+            self.controlledSignalMap, self.controlledClkMap = None, None
+            self.numSignalControls  = compiledInterface.numSignalControls
+            self.numClkControls     = compiledInterface.numClkControls
+            self.controlLeafTable   = None
+            logging.info("Signal control size = %d"%(self.numSignalControls))
+            logging.info("Clock control size = %d"%(self.numClkControls))
+            logging.info("Reordered controls of %s"%(compiledInterface))
+            return
         self.controlledSignalMap, self.numSignalControls  = self.controlReorder(0,                       \
                                                                                 self.controllabilityMap, \
                                                                                 self.controlTypeMap,     \
@@ -1260,6 +1543,12 @@ class ControlSignalMappingModel:
         logging.info("Clock control size = %d"%(self.numClkControls))
         logging.info("Reordered clock control map - %s"%(self.controlledClkMap))
         # Merge signal and clock control maps in the order {signal control, clock control}
+        # Control leaf table - [<NAME>, <MSB>, <LSB>] of every controlled signal/clock, sorted by LSB (connection order).
+        # Built once from the reordered maps and shared by every serialization of the SRU cfg
+        self.controlLeafTable = {
+            ControlType.SIGNAL : self.getControlLeafTable(self.controlledSignalMap, 0,                      self.numSignalControls), \
+            ControlType.CLOCK  : self.getControlLeafTable(self.controlledClkMap,    self.numSignalControls, self.numClkControls)
+        }
 
 
     
@@ -1280,9 +1569,164 @@ class ControlSignalMappingModel:
                     reorderedControlMap.update({element:[reorderedMsb, reorderedLsb]})
                     currentIndex += ((currentControlMap[element][0] - currentControlMap[element][1]) + 1)
         return reorderedControlMap, currentIndex
+
+    # Method returns the leaves [<NAME>, <MSB>, <LSB>] of a (reordered) control map in tree order
+    @staticmethod
+    def getControlLeaves(controlMap, leaves, prefix=""):
+        for key in controlMap:
+            if isinstance(controlMap[key], dict):
+                ControlSignalMappingModel.getControlLeaves(controlMap[key], leaves, prefix + key + ".")
+            else:
+                leaves.append([prefix + key, controlMap[key][0], controlMap[key][1]])
+        return leaves
+
+    # Method returns the leaf table of a reordered control map. The leaves have to cover the control bits
+    # <baseIndex> to <baseIndex + numControls - 1> without gaps/overlaps
+    @staticmethod
+    def getControlLeafTable(controlMap, baseIndex, numControls):
+        leafTable = sorted(ControlSignalMappingModel.getControlLeaves(controlMap, []), key=lambda leaf: leaf[2])
+        nextIndex = baseIndex
+        for [name, msb, lsb] in leafTable:
+            assert lsb == nextIndex, "Invalid signal start index - %d for signal %s (expected %d)"%(lsb, name, nextIndex)
+            nextIndex = msb + 1
+        assert nextIndex == baseIndex + numControls, "Control map covers %d of %d controls"%(nextIndex - baseIndex, numControls)
+        return leafTable
                   
                                     
 
+# Class to route the sequences (SMU) and controls (SRU) of a patch program to the patch partitions of the interface
+# (PATCH_PARTITIONS of asap_interface.json). Every partition has its own patch block, so -
+# -- All signals of a sequence have to be observed in the same partition
+# -- A control goes to the partition of its controlled signal, and the sequences triggering it have to be in that partition
+class PatchPartitionRouter:
+    def __init__(self, partitionToInterface) -> None:
+        self.partitionToInterface = partitionToInterface
+
+    # Returns True if the hierarchical signal name is in the (nested) signal map
+    @staticmethod
+    def hasSignal(signalMap, signal:str):
+        index = signalMap
+        for key in signal.split("."):
+            if not isinstance(index, dict) or key not in index:
+                return False
+            index = index[key]
+        return isinstance(index, list)
+
+    # Returns the partition whose interface map has the signal
+    def getPartitionOfSignal(self, signal:str, mapName:str):
+        for partition in self.partitionToInterface:
+            interface = self.partitionToInterface[partition]
+            if isinstance(interface, CompiledInterfaceSection):
+                if interface.hasSignal(mapName, signal):
+                    return partition
+            elif self.hasSignal(interface[mapName], signal):
+                return partition
+        raise Exception("Signal %s not found in the %s of any patch partition"%(signal, mapName))
+
+    # Returns {<PARTITION>: SequenceList} and {<SEQUENCE NAME>: <PARTITION>}
+    def routeSequences(self, sequenceList:SequenceList):
+        partitionToSequences = {partition: SequenceList([]) for partition in self.partitionToInterface}
+        sequenceToPartition  = {}
+        try:
+            for sequence in sequenceList.sequences:
+                partitions = {self.getPartitionOfSignal(pattern.lhs.name, 'OBSERVABILITY_MAP') \
+                              for pattern in sequence.patterns if pattern.lhs is not None}
+                if len(partitions) != 1:
+                    raise Exception("Sequence %s observes signals of %d patch partitions %s - A sequence has to be within one partition"%(sequence.name,    \
+                                                                                                                                         len(partitions), \
+                                                                                                                                         sorted(partitions)))
+                partition = partitions.pop()
+                partitionToSequences[partition].addSequences(sequence)
+                sequenceToPartition[sequence.name] = partition
+                logging.info("Sequence %s routed to patch partition %s"%(sequence.name, partition))
+        except Exception as e:
+            logging.error(str(e))
+            exit(1)
+        return partitionToSequences, sequenceToPartition
+
+    # Returns {<PARTITION>: ControlNodeList}
+    def routeControls(self, controlNodeList:ControlNodeList, sequenceToPartition:dict):
+        partitionToControls = {partition: ControlNodeList([]) for partition in self.partitionToInterface}
+        try:
+            for controlNode in controlNodeList.controlNodes:
+                partition = self.getPartitionOfSignal(controlNode.signal.name, 'CONTROLLABILITY_MAP')
+                for trigger in controlNode.trigger.getVarList():
+                    if trigger not in sequenceToPartition:
+                        raise Exception("Trigger %s of the control of %s not programmed in SMU patch"%(trigger, controlNode.signal.name))
+                    if sequenceToPartition[trigger] != partition:
+                        raise Exception("Control of %s (patch partition %s) is triggered by sequence %s of patch partition %s"%(controlNode.signal.name, \
+                                                                                                                             partition,                  \
+                                                                                                                             trigger,                    \
+                                                                                                                             sequenceToPartition[trigger]))
+                partitionToControls[partition].addControlNode(controlNode)
+                logging.info("Control of %s routed to patch partition %s"%(controlNode.signal.name, partition))
+        except Exception as e:
+            logging.error(str(e))
+            exit(1)
+        return partitionToControls
+
+
+#------------------------------------------ PROCESS POOL ------------------------------------------#
+# Workers are module-level functions so that they can be pickled by the (spawn based) process pool.
+# The spawn start method is used as the pool may be created from the GUI (threads + Tk in the parent)
+def createProcessPool(jobs):
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'))
+
+# Compiles the SMU/SRU programs of a patch partition to smu_<PARTITION>.stream/sru_<PARTITION>.stream
+# Returns the partition and its sequence to trigger index map
+def compilePartitionWorker(task):
+    partition, interface, sequenceList, controlNodeList, outputFolder, smuProgramFile, sruProgramFile, observePipelineDepth = task
+    # Worker processes log to a file per partition (see LOGGER SETUP)
+    if multiprocessing.parent_process() is not None:
+        rootLogger = logging.getLogger()
+        for handler in list(rootLogger.handlers):
+            rootLogger.removeHandler(handler)
+        fileHandler = logging.FileHandler('ASAPCompiler_%s.log'%(partition), mode='w')
+        fileHandler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        rootLogger.addHandler(fileHandler)
+        rootLogger.setLevel(logging.INFO)
+    logging.info("Compiling patch partition %s"%(partition))
+    # The interface of the partition is either its JSON interface or its compiled interface section
+    compiledInterface = interface if isinstance(interface, CompiledInterfaceSection) else None
+    if compiledInterface is not None:
+        params, observabilityMap, controllabilityMap, controlTypeMap = compiledInterface.params, None, None, None
+    else:
+        params, observabilityMap, controllabilityMap, controlTypeMap = interface['PARAMS'],              \
+                                                                       interface['OBSERVABILITY_MAP'],   \
+                                                                       interface['CONTROLLABILITY_MAP'], \
+                                                                       interface['CONTROL_TYPE_MAP']
+    smuCompiler = ASAPSmuCompiler(smuProgramFile,
+                                  outputFolder,
+                                  params['MAX_SEQ_DEPTH'],
+                                  params['MAX_TRIGGERS'],
+                                  params['SMU_SEGMENT_SIZE'],
+                                  observabilityMap,
+                                  sequenceList      = sequenceList,
+                                  streamFileName    = "smu_%s.stream"%(partition),
+                                  compiledInterface = compiledInterface,
+                                  observePipelineDepth = observePipelineDepth)
+    nameToTriggerIndex = smuCompiler.generateProgram()
+    reorderMap = ControlSignalMappingModel(controllabilityMap,
+                                           controlTypeMap,
+                                           compiledInterface = compiledInterface)
+    sruCompiler = ASAPSruCompiler(sruProgramFile,
+                                  outputFolder,
+                                  params['SRU_SEGMENT_SIZE'],
+                                  params['MAX_TRIGGERS'],
+                                  reorderMap.numClkControls,
+                                  reorderMap.numSignalControls,
+                                  nameToTriggerIndex,
+                                  params['SRU_NUM_PLA'],
+                                  reorderMap.controlledSignalMap,
+                                  reorderMap.controlledClkMap,
+                                  controlNodeList   = controlNodeList,
+                                  streamFileName    = "sru_%s.stream"%(partition),
+                                  controlLeafTable  = reorderMap.controlLeafTable,
+                                  compiledInterface = compiledInterface)
+    sruCompiler.generateProgram()
+    return partition, nameToTriggerIndex
+
+
 class ASAPCompiler:
     def __init__(self, asapSpecFile, asapInterfaceFile, outputFolder, smuProgramFile, sruProgramFile):
         paramMap = {}
@@ -1293,8 +1737,11 @@ class ASAPCompiler:
                 paramMap.update({line.split('=')[0].strip(): line.split('=')[1].strip()})
 
         # asap_interface.txt generated by ASAP Insertion tool has the relevant observe/control signal mapping information
-        with open(asapInterfaceFile, "r") as ioFile:
-            ioMap = json.load(ioFile)
+        # Its compiled interface (asap_interface.idx, see ASAPInterface) is used instead when it is up to date
+        compiledInterface = CompiledInterface.load(asapInterfaceFile)
+        if compiledInterface is None:
+            with open(asapInterfaceFile, "r") as ioFile:
+                ioMap = json.load(ioFile)
 
         # SRU PARAMS
         SRU_SEGMENT_SIZE    = int(paramMap['SRU_SEGMENT_SIZE'])
@@ -1305,12 +1752,29 @@ class ASAPCompiler:
         MAX_SEQ_DEPTH       = int(paramMap['MAX_SEQ_DEPTH'])
         MAX_TRIGGERS        = int(paramMap['MAX_TRIGGERS'])
 
-        # IO Interface Maps for SMU/SRU
-        OBSERVABILITY_MAP   = ioMap['OBSERVABILITY_MAP']
-        CONTROLLABILITY_MAP = ioMap['CONTROLLABILITY_MAP']
-        CONTROL_TYPE_MAP    = ioMap['CONTROL_TYPE_MAP']
-
-
+        # IO Interface Maps for SMU/SRU (looked up in the top level section of the compiled interface if there is one)
+        COMPILED_INTERFACE  = compiledInterface.getInterface() if compiledInterface is not None else None
+        OBSERVABILITY_MAP   = ioMap['OBSERVABILITY_MAP']   if compiledInterface is None else None
+        CONTROLLABILITY_MAP = ioMap['CONTROLLABILITY_MAP'] if compiledInterface is None else None
+        CONTROL_TYPE_MAP    = ioMap['CONTROL_TYPE_MAP']    if compiledInterface is None else None
+        PATCH_PARTITIONS    = ioMap.get('PATCH_PARTITIONS') if compiledInterface is None else compiledInterface.getPartitions()
+        # Register stages of the observe path (PIPELINE_INTERVAL of ASAP Insertion) - The same for all patch partitions
+        OBSERVE_PIPELINE_DEPTH = ioMap.get('OBSERVE_PIPELINE_DEPTH', 0) if compiledInterface is None else \
+                                 COMPILED_INTERFACE.params.get('OBSERVE_PIPELINE_DEPTH', 0)
+
+        # Optional params
+        # JOBS                - Number of worker processes compiling patch partitions (1: serial)
+        JOBS                = int(paramMap.get('JOBS', 1))
+        assert JOBS >= 1, "JOBS should be a positive integer"
+
+        # Both patch programs are parsed ahead of compilation, so that the syntax errors of both are reported
+        sequenceList, controlNodeList = self.parsePrograms(smuProgramFile, sruProgramFile)
+
+        # Patch partitions - Every partition is compiled to its own bitstreams (smu_<PARTITION>.stream, sru_<PARTITION>.stream)
+        if PATCH_PARTITIONS:
+            self.compilePartitions(PATCH_PARTITIONS, outputFolder, smuProgramFile, sruProgramFile, sequenceList, controlNodeList, \
+                                   JOBS, OBSERVE_PIPELINE_DEPTH)
+            return
 
         # Defining SMU compiler object
         smuCompiler = ASAPSmuCompiler(smuProgramFile,
@@ -1318,12 +1782,16 @@ class ASAPCompiler:
                                       MAX_SEQ_DEPTH,
                                       MAX_TRIGGERS,
                                       SMU_SEGMENT_SIZE,
-                                      OBSERVABILITY_MAP)
+                                      OBSERVABILITY_MAP,
+                                      sequenceList      = sequenceList,
+                                      compiledInterface = COMPILED_INTERFACE,
+                                      observePipelineDepth = OBSERVE_PIPELINE_DEPTH)
         nameToTriggerIndex = smuCompiler.generateProgram()
 
         # Emulating control map re-ordering for SRU arch requirement
         reorderMap = ControlSignalMappingModel(CONTROLLABILITY_MAP,
-                                            CONTROL_TYPE_MAP)
+                                            CONTROL_TYPE_MAP,
+                                            compiledInterface = COMPILED_INTERFACE)
         
         # Defining SRU compiler object
         sruCompiler = ASAPSruCompiler(sruProgramFile,
@@ -1335,9 +1803,55 @@ class ASAPCompiler:
                                       nameToTriggerIndex,
                                       SRU_NUM_PLA,
                                       reorderMap.controlledSignalMap,
-                                      reorderMap.controlledClkMap)
+                                      reorderMap.controlledClkMap,
+                                      controlNodeList   = controlNodeList,
+                                      controlLeafTable  = reorderMap.controlLeafTable,
+                                      compiledInterface = COMPILED_INTERFACE)
         sruCompiler.generateProgram()
 
+    # Parses the SMU/SRU patch programs - Returns the SequenceList and the ControlNodeList of the programs
+    # The diagnostics of both programs are reported before exiting on a syntax error
+    @staticmethod
+    def parsePrograms(smuProgramFile, sruProgramFile):
+        syntaxErrors = []
+        try:
+            sequenceList = ASAPSmuParser(smuProgramFile, exitOnError=False).sequenceList
+        except ASAPPatchSyntaxError as error:
+            syntaxErrors.append(error)
+        try:
+            controlNodeList = ASAPSruParser(sruProgramFile, exitOnError=False).controlNodeList
+        except ASAPPatchSyntaxError as error:
+            syntaxErrors.append(error)
+        if syntaxErrors:
+            logging.error("Patch program parsing failed - %s"%(", ".join("%d syntax error(s) in %s"%(len(error.diagnostics), error.patchFile) \
+                                                                         for error in syntaxErrors)))
+            exit(1)
+        return sequenceList, controlNodeList
+
+    # Routes the sequences/controls of the patch programs to the patch partitions and compiles every partition
+    # (in the process pool if JOBS > 1)
+    def compilePartitions(self, partitionToInterface, outputFolder, smuProgramFile, sruProgramFile, sequenceList, controlNodeList, \
+                          jobs, observePipelineDepth=0):
+        router = PatchPartitionRouter(partitionToInterface)
+        partitionToSequences, sequenceToPartition = router.routeSequences(sequenceList)
+        partitionToControls = router.routeControls(controlNodeList, sequenceToPartition)
+        tasks = [(partition,                            \
+                  partitionToInterface[partition],      \
+                  partitionToSequences[partition],      \
+                  partitionToControls[partition],       \
+                  outputFolder,                         \
+                  smuProgramFile,                       \
+                  sruProgramFile,                       \
+                  observePipelineDepth) for partition in partitionToInterface]
+        if jobs > 1 and len(tasks) > 1:
+            logging.info("Compiling %d patch partitions in the process pool"%(len(tasks)))
+            with createProcessPool(min(jobs, len(tasks))) as executor:
+                results = list(executor.map(compilePartitionWorker, tasks))
+        else:
+            results = [compilePartitionWorker(task) for task in tasks]
+        for partition, nameToTriggerIndex in results:
+            logging.info("Patch partition %s compiled - SMU trigger index map - %s"%(partition, nameToTriggerIndex))
+
 
 
 
@@ -1,12 +1,35 @@
 from __future__ import absolute_import
 from __future__ import print_function
 import os
+import re
+import sys
+import tempfile
+import shutil
+import subprocess
+import uuid
+import mmap                                                          # Memory mapped source files
+import gc                                                            # Freezing of long-lived ASTs (LOW_MEMORY)
+import multiprocessing                                               # Process pool for parallel (JOBS > 1) execution
+from concurrent.futures import ProcessPoolExecutor
 import logging                                                       # logger
 #import pyfiglet                                                      # ASCII formatter (Just for tooling fun :) :))
 import json
-from pyverilog.vparser.parser import VerilogCodeParser               # PyVerilog Parser
+import math
+import heapq                                                        # First fit segment lookup (OBSERVE_PACKING)
+import sqlite3                                                       # Design symbol database (SYMBOL_DB)
+import hashlib                                                       # Content hashing for AST cache keys
+import pickle                                                        # AST cache serialization
+try:
+    import resource                                                  # Peak RSS reporting (not available on Windows)
+except ImportError:
+    resource = None
+import pyverilog
+from ply.yacc import yacc                                            # PLY parser generator (used by PyVerilog)
+from pyverilog.vparser.parser import VerilogParser as PyVerilogParser  # PyVerilog Parser
+from pyverilog.vparser.lexer import VerilogLexer                     # PyVerilog Lexer
 from pyverilog.vparser.ast import *                                  # PyVerilog AST
 from pyverilog.ast_code_generator.codegen import ASTCodeGenerator    # Pyverilog AST to verilog code generator
+from ASAPInterface import CompiledInterfaceWriter                    # Compiled interface (INTERFACE_INDEX)
 
 #--------------------------------------------- LOGGER SETUP----------------------------------------#
 # Configure logging - Done at file top so that all classes have it accessible
@@ -24,6 +47,21 @@ class PragmaParsingError(Exception):
     pass
 
 
+# Exception class for preprocessing failures
+class PreprocessingError(Exception):
+    pass
+
+
+# Exception class for modules defined more than once in the filelist
+class DuplicateModuleError(Exception):
+    pass
+
+
+# Exception class for insertion edits that cannot be spliced into the source text
+class SpliceError(Exception):
+    pass
+
+
 # Class to create structured log prints of complex objects
 class LogStructuring:
     def __init__(self) -> None:
@@ -53,11 +91,71 @@ class LogStructuring:
         
 
 
-# Class to process filelist and extract pragmas and associated properties
+# Class holding the source files of the filelist. Every file is memory mapped once and the buffer is
+# shared by the pragma scan, the declaration scan, the AST cache and the preprocessing stage
+class SourceStore:
+    def __init__(self) -> None:
+        self.fileToBuffer = {}  # <FILE> --> mmap (b'' for empty files, which cannot be mapped)
+
+    # Returns the files of a filelist (blank lines are skipped)
+    @staticmethod
+    def readFilelist(filelist):
+        with open(filelist, 'r') as f:
+            return [filename.strip() for filename in f if filename.strip()]
+
+    def getBuffer(self, file):
+        if file not in self.fileToBuffer:
+            with open(file, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    self.fileToBuffer[file] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                else:
+                    self.fileToBuffer[file] = b''
+        return self.fileToBuffer[file]
+
+    # Decoded text of a file with newlines normalized (as read in text mode)
+    def getText(self, file):
+        text = self.getBuffer(file)[:].decode('utf-8', errors='replace')
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+        return text
+
+    # Text of a file as is (newlines are not normalized, undecodable bytes are kept as surrogates) - Written
+    # back with the same encoding, text outside of the edits is byte for byte the source
+    def getSourceText(self, file):
+        return self.getBuffer(file)[:].decode('utf-8', errors='surrogateescape')
+
+    # Number of line breaks in buffer[start:end] - \r\n, \r and \n each end a line (as in getText)
+    @staticmethod
+    def countLines(buffer, start, end):
+        lines = buffer[start:end]
+        return lines.count(b'\n') + lines.count(b'\r') - lines.count(b'\r\n')
+
+    # Start offset of the line holding buffer[offset] (no line starts before <start>)
+    @staticmethod
+    def getLineStart(buffer, start, offset):
+        return max(buffer.rfind(b'\n', start, offset), buffer.rfind(b'\r', start, offset), start - 1) + 1
+
+    def close(self):
+        for buffer in self.fileToBuffer.values():
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+        self.fileToBuffer = {}
+
+
+# Class to extract pragmas from the files of a filelist
+# -- Every file is scanned once (memory mapped) with a single regex for '#pragma' lines
+# -- Byte offsets are mapped to line numbers lazily, only for the lines holding a pragma
+# -- Files larger than PARALLEL_SCAN_SIZE are scanned in line aligned chunks on the process pool (if any)
 class PragmaExtractor(LogStructuring):
-    def __init__(self, filelist) -> None:
+    PRAGMA             = re.compile(rb'#pragma[^\r\n]*')
+    PARALLEL_SCAN_SIZE = 64 * 1024 * 1024
+    SCAN_CHUNK_SIZE    = 16 * 1024 * 1024
+
+    def __init__(self, filelist, sourceStore=None, executor=None) -> None:
         super().__init__()  # LogStructuring constructor
-        self.filelist = filelist
+        self.filelist    = filelist
+        self.sourceStore = sourceStore if sourceStore is not None else SourceStore()
+        self.executor    = executor
         logging.info("Pragma extractor initialized with %s"%(filelist))
 
     # This method parses the pragma in a line to returns two tuples
@@ -100,16 +198,49 @@ class PragmaExtractor(LogStructuring):
         else:
             return None, None
 
+    # Returns [(<LINE NUMBER>, <LINE>)] for all lines with a pragma in buffer[start:end]
+    # start should be the start of a line. Line numbers are relative to start (first line is 1)
+    @staticmethod
+    def findPragmaLines(buffer, start, end):
+        pragmaLines = []
+        lineNumber, lineOffset = 1, start
+        for match in PragmaExtractor.PRAGMA.finditer(buffer, start, end):
+            lineStart   = SourceStore.getLineStart(buffer, start, match.start())
+            lineNumber += SourceStore.countLines(buffer, lineOffset, lineStart)
+            lineOffset  = lineStart
+            pragmaLines.append((lineNumber, buffer[lineStart:match.end()].decode('utf-8', errors='replace')))
+        return pragmaLines
+
+    # Scans a large file in line aligned chunks on the process pool
+    # Line numbers of a chunk are offset by the newlines of all preceding chunks
+    def findPragmaLinesParallel(self, file, buffer):
+        boundaries = [0]
+        while boundaries[-1] < len(buffer):
+            boundary = buffer.find(b'\n', boundaries[-1] + self.SCAN_CHUNK_SIZE)
+            boundaries.append(len(buffer) if boundary == -1 else boundary + 1)
+        tasks = [(file, start, end) for start, end in zip(boundaries[:-1], boundaries[1:])]
+        logging.info("Scanning %s for pragmas in %d chunk(s) on the process pool"%(file, len(tasks)))
+        pragmaLines = []
+        linesBefore = 0
+        for chunkPragmaLines, chunkNewlines in self.executor.map(pragmaScanWorker, tasks):
+            pragmaLines.extend((linesBefore + lineNumber, line) for lineNumber, line in chunkPragmaLines)
+            linesBefore += chunkNewlines
+        return pragmaLines
+
     # Parses a file and populates a hash map with line # and observe, control args
     def fileParser(self, file):
         # Ensure that the file exists
         assert os.path.exists(file), "Verilog file %s in filelist doesn't exist"%(file)
         pragmaDict = {}
-        with open(file, 'r') as f:
-            for line_number, line in enumerate(f, start=1):
-                observe, control = self.pragmaParser(line)
-                if observe or control:
-                    pragmaDict[line_number] = (observe, control)
+        buffer = self.sourceStore.getBuffer(file)
+        if self.executor is not None and len(buffer) >= self.PARALLEL_SCAN_SIZE:
+            pragmaLines = self.findPragmaLinesParallel(file, buffer)
+        else:
+            pragmaLines = self.findPragmaLines(buffer, 0, len(buffer))
+        for line_number, line in pragmaLines:
+            observe, control = self.pragmaParser(line)
+            if observe or control:
+                pragmaDict[line_number] = (observe, control)
         logging.info("Pragma distribution in file - %s is %s"%(file, self.logDictInfo(pragmaDict)))
         return pragmaDict
     
@@ -117,89 +248,741 @@ class PragmaExtractor(LogStructuring):
     def filelistParse(self):
         # Ensure that the filelist exists
         assert os.path.exists(self.filelist), "Filelist %s doesn't exist"%(self.filelist)
-        files = [filename.strip() for filename in open(self.filelist, 'r')]
+        files = SourceStore.readFilelist(self.filelist)
         logging.info("List of files in filelist %s - %s"%(self.filelist, self.logListInfo(files)))
         return {file: self.fileParser(file) for file in files}
 
 
+# Class for a fast declaration level scan of the filelist (no full parse)
+# For every module definition it records the file, line span, input port names and the instantiated modules
+# -- Comments and strings are blanked out (line numbers are preserved) before scanning
+# -- Instantiations are over-approximated: Any identifier in a module body naming a module defined in the
+#    filelist is treated as an instance of that module. At worst a module is fully parsed needlessly
+class DeclarationScanner:
+    COMMENT_OR_STRING = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"', re.DOTALL)
+    MODULE            = re.compile(r'\b(?:macro)?module\s+([A-Za-z_][\w$]*)(.*?)\bendmodule\b', re.DOTALL)
+    SUBROUTINE        = re.compile(r'\b(function|task)\b.*?\bend\1\b', re.DOTALL)
+    INPUT             = re.compile(r'\binput\b(.*?)(?=;|\binput\b|\boutput\b|\binout\b)', re.DOTALL)
+    RANGE             = re.compile(r'\[[^\]]*\]')
+    IDENTIFIER        = re.compile(r'[A-Za-z_][\w$]*')
+    NET_KEYWORDS      = {'wire', 'reg', 'logic', 'signed', 'unsigned', 'integer', 'real', 'time', 'tri', 'var', 'supply0', \
+                         'supply1', 'wand', 'wor', 'triand', 'trior', 'tri0', 'tri1', 'uwire'}
+
+    def __init__(self, files, sourceStore=None) -> None:
+        sourceStore               = sourceStore if sourceStore is not None else SourceStore()
+        self.moduleToFile         = {}  # <MODULE> --> <FILE>
+        self.moduleToInputPorts   = {}  # <MODULE> --> {<INPUT PORT NAME>}
+        self.moduleToInstances    = {}  # <MODULE> --> {<INSTANTIATED MODULE>}
+        self.fileToModuleSpans    = {}  # <FILE>   --> [(<START LINE>, <END LINE>, <MODULE>)]
+        moduleToIdentifiers       = {}
+        for file in files:
+            text = self.COMMENT_OR_STRING.sub(self.blankOut, sourceStore.getText(file))
+            self.fileToModuleSpans[file] = []
+            line, position = 1, 0
+            for match in self.MODULE.finditer(text):
+                line += text.count('\n', position, match.start())
+                position = match.start()
+                module, body = match.group(1), match.group(2)
+                self.fileToModuleSpans[file].append((line, line + match.group(0).count('\n'), module))
+                self.moduleToFile[module]       = file
+                self.moduleToInputPorts[module] = self.getInputPorts(body)
+                moduleToIdentifiers[module]     = set(self.IDENTIFIER.findall(body))
+        # Only identifiers naming modules of the filelist are instances
+        for module in moduleToIdentifiers:
+            self.moduleToInstances[module] = {identifier for identifier in moduleToIdentifiers[module] \
+                                              if identifier in self.moduleToFile and identifier != module}
+
+    # Comments are replaced by their newlines and strings by an empty string
+    @staticmethod
+    def blankOut(match):
+        return '""' if match.group(0).startswith('"') else '\n' * match.group(0).count('\n')
+
+    # Input port names declared in a module body (ANSI or non-ANSI). Function/task inputs are skipped
+    def getInputPorts(self, body):
+        body = self.SUBROUTINE.sub('', body)
+        inputPorts = set()
+        for match in self.INPUT.finditer(body):
+            declaration = self.RANGE.sub(' ', match.group(1))
+            inputPorts.update(identifier for identifier in self.IDENTIFIER.findall(declaration) \
+                              if identifier not in self.NET_KEYWORDS)
+        return frozenset(inputPorts)
+
+    # Returns the module enclosing the given line of a file (None if the line is outside all modules)
+    def getModuleAtLine(self, file, line):
+        for startLine, endLine, module in self.fileToModuleSpans[file]:
+            if startLine <= line <= endLine:
+                return module
+        return None
+
+    # Returns the modules to be rewritten - modules with pragmas and all their ancestors up to the top module
+    # Only modules reachable from the top module are considered
+    def getRequiredModules(self, topModule, fileToPragma):
+        reachable = {topModule}
+        stack     = [topModule]
+        parents   = {}
+        while stack:
+            module = stack.pop()
+            for child in self.moduleToInstances[module]:
+                parents.setdefault(child, set()).add(module)
+                if child not in reachable:
+                    reachable.add(child)
+                    stack.append(child)
+        pragmaModules = {self.getModuleAtLine(file, line) for file in fileToPragma for line in fileToPragma[file]}
+        required = {topModule} | (pragmaModules & reachable)
+        stack    = list(pragmaModules & reachable)
+        while stack:
+            for parent in parents.get(stack.pop(), ()):
+                if parent not in required:
+                    required.add(parent)
+                    stack.append(parent)
+        return required
+
+
+# Class indexing module definitions by name (<MODULE> --> ModuleDef). It is built once from the file ASTs
+# and is the single module map shared by the parser, the instantiation tree and the generator
+# The file defining each module is recorded as well
+class ModuleIndex(dict):
+    def __init__(self, fileToAst=None) -> None:
+        super().__init__()
+        self.moduleToFile = {}  # <MODULE> --> <FILE>
+        if fileToAst:
+            for file in fileToAst:
+                self.addFile(file, fileToAst[file])
+
+    @staticmethod
+    def getModuleDefs(ast):
+        return [definition for definition in ast.description.definitions if isinstance(definition, ModuleDef)]
+
+    def addFile(self, file, ast):
+        for moduleDef in self.getModuleDefs(ast):
+            if moduleDef.name in self.moduleToFile:
+                logging.error("Module '%s' is defined in %s and again in %s"%(moduleDef.name,                    \
+                                                                            self.moduleToFile[moduleDef.name], \
+                                                                            file))
+                raise DuplicateModuleError("Duplicate definition of module '%s'"%(moduleDef.name))
+            self[moduleDef.name] = moduleDef
+            self.moduleToFile[moduleDef.name] = file
+
+    # Rebinds the modules of a file to the definitions of a new AST of that file (e.g. returned by a pool worker)
+    def updateFile(self, file, ast):
+        for moduleDef in self.getModuleDefs(ast):
+            assert self.moduleToFile.get(moduleDef.name) == file, "Module '%s' is not indexed for %s"%(moduleDef.name, file)
+            self[moduleDef.name] = moduleDef
+
+    def getFile(self, module):
+        return self.moduleToFile.get(module)
+
+    # Drops the definitions of the modules of a file (the modules stay mapped to the file)
+    def releaseFile(self, file, ast):
+        for moduleDef in self.getModuleDefs(ast):
+            self.pop(moduleDef.name, None)
+
+
 # Class to identify module instantiation hierarchy to perform various insertion operations
-# The class expects top-module and a hash map of module to AST for tree population
+# The class expects top-module and a hash map of module to AST for hierarchy population
+# The hierarchy is a DAG with one node per unique module and the instances of a module (in order of appearance)
+# as edges. A module instantiated many times is expanded once. It is built and traversed iteratively
+# Instances of pruned modules (see DeclarationScanner) are leaves of the hierarchy
 class InstantiationTree:
-    def __init__(self, topModule, moduleToAst):
+    def __init__(self, topModule, moduleToAst, prunedModules=()):
         self.topModule = topModule
         self.moduleToAst = moduleToAst
-        self.instanceTree = self.populateTree(moduleToAst[topModule], \
-                          isTopModule=True)
-
-    # Method used to recursively populate the instantiation tree
-    def populateTree(self, ast, isTopModule = False):
-        treeNode = {}
-        if isTopModule:
-            treeNode.update({("TOP", self.topModule):  \
-                              self.populateTree(ast)})
-        else:
-            for item in ast.items:
-                if isinstance(item, InstanceList):
-                    for instance in item.instances:
-                        treeNode.update({(instance.name, instance.module): \
-                                        self.populateTree(self.moduleToAst[instance.module])})
-        return treeNode if treeNode else None
-    
-    def populateSignalList(self, treeNode, moduleToObserveSignal, moduleToControlSignal, observeIndex = 0, controlIndex = 0):
-        if treeNode is not None:
-            observeSignalList = {}
-            controlSignalList = {}
-            for key, value in treeNode.items:
-                observeSignals = moduleToObserveSignal[key[1]]
-                controlSignals = moduleToControlSignal[key[1]]
-                for signal in observeSignals:
-                    observeSignalList.update({signal:[observeSignals[1] - observeSignals[0] + observeIndex, observeIndex]})
-                    observeIndex +=  observeSignals[1] - observeSignals[0] + 1
-                for signal in controlSignals:
-                    controlSignalList.update({signal:[controlSignals[1] - controlSignals[0] + controlIndex, controlIndex]})
-                    controlIndex +=  controlSignals[1] - controlSignals[0] + 1
-                
-                observeChild, controlChild = self.populateSignalList(value,                  \
-                                                                     moduleToObserveSignal,  \
-                                                                     moduleToControlSignal,  \
-                                                                     observeIndex,           \
-                                                                     controlIndex)
-                observeSignalList.update(observeChild)
-                controlSignalList.update(controlChild)
-
-        return {key[0]:observeSignalList}, {key[0]:controlSignalList}
-          
+        self.prunedModules = prunedModules
+        self.moduleToInstances = self.populateDag()  # <MODULE> --> [(<INSTANCE NAME>, <MODULE>)]
+
+    # Collects the instances of every module reachable from the top module
+    def populateDag(self):
+        moduleToInstances = {}
+        stack = [self.topModule]
+        while stack:
+            module = stack.pop()
+            if module in moduleToInstances:
+                continue
+            instances = []
+            if module not in self.prunedModules:
+                for item in self.moduleToAst[module].items:
+                    if isinstance(item, InstanceList):
+                        for instance in item.instances:
+                            instances.append((instance.name, instance.module))
+                            if instance.module not in moduleToInstances:
+                                stack.append(instance.module)
+            moduleToInstances[module] = instances
+        return moduleToInstances
+
+    def getInstances(self, module):
+        return self.moduleToInstances[module]
+
+    # Returns the modules of the hierarchy, every module placed after all modules instantiated in it
+    def getModulesInPostOrder(self):
+        postOrder = []
+        visited   = {self.topModule}
+        onPath    = {self.topModule}
+        stack     = [(self.topModule, iter(self.moduleToInstances[self.topModule]))]
+        while stack:
+            module, instances = stack[-1]
+            for _, child in instances:
+                assert child not in onPath, "Recursive instantiation of module '%s'"%(child)
+                if child not in visited:
+                    visited.add(child)
+                    onPath.add(child)
+                    stack.append((child, iter(self.moduleToInstances[child])))
+                    break
+            else:
+                stack.pop()
+                onPath.discard(module)
+                postOrder.append(module)
+        return postOrder
+
+
+# Class reporting the peak RSS of the process in every phase of a run (LOW_MEMORY)
+# -- Linux: The peak is reset at the start of every phase (/proc/self/clear_refs), so every phase reports its own peak
+# -- Elsewhere: The peak since the start of the process is reported (resource module, if available)
+# Worker processes of the process pool are not accounted for
+class PeakMemoryMonitor:
+    def __init__(self, enabled=True) -> None:
+        self.enabled        = enabled
+        self.phase          = None
+        self.phaseToPeakRss = {}  # <PHASE> --> Peak RSS in bytes
+        self.resettable     = enabled and self.resetPeak()
+
+    @staticmethod
+    def resetPeak():
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')
+            return True
+        except OSError:
+            return False
+
+    # Returns the peak RSS in bytes (None if not available)
+    def getPeakRss(self):
+        if self.resettable:
+            with open('/proc/self/status') as f:
+                for line in f:
+                    if line.startswith('VmHWM:'):
+                        return int(line.split()[1]) * 1024
+        if resource is not None:
+            maxRss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return maxRss if sys.platform == 'darwin' else maxRss * 1024   # Bytes on macOS, KiB elsewhere
+        return None
+
+    def startPhase(self, phase):
+        if not self.enabled:
+            return
+        self.endPhase()
+        if self.resettable:
+            self.resetPeak()
+        self.phase = phase
+
+    def endPhase(self):
+        if not self.enabled or self.phase is None:
+            return
+        peakRss = self.getPeakRss()
+        if peakRss is not None:
+            self.phaseToPeakRss[self.phase] = peakRss
+            logging.info("Peak RSS in phase '%s' - %.1f MiB%s"%(self.phase, peakRss / (1 << 20), \
+                                                                 "" if self.resettable else " (since process start)"))
+        self.phase = None
+
+
+# Class hashing source files for the on-disk caches (see AstCache and InterfaceSummaryStore)
+# The key of a file is a hash of -
+# -- A context string of the cache (e.g. versions of the cached data)
+# -- Preprocessor defines and include directories
+# -- Contents of the file and of every file it `includes
+# The key is complete as every file is preprocessed as its own compilation unit (see VerilogPreprocessStage)
+class SourceHasher:
+    INCLUDE_PATTERN = re.compile(rb'`include\s+"([^"]+)"')
+
+    def __init__(self, defines=(), includes=(), sourceStore=None) -> None:
+        self.defines     = tuple(defines)
+        self.includes    = tuple(includes)
+        self.sourceStore = sourceStore if sourceStore is not None else SourceStore()
+
+    # Resolves an `include path the same way the preprocessor would - relative to the
+    # including file first and then through the include directories
+    def resolveInclude(self, includeName, includingFile):
+        for directory in (os.path.dirname(includingFile),) + self.includes:
+            candidate = os.path.join(directory, includeName)
+            if os.path.isfile(candidate):
+                return candidate
+        return None
+
+    # Feeds the contents of a file and all its (transitively) included files into the hash
+    # Returns False if an include cannot be resolved, in which case the file cannot be hashed
+    def hashSource(self, file, digest, visited):
+        if file in visited:
+            return True
+        visited.add(file)
+        content = self.sourceStore.getBuffer(file)
+        digest.update(file.encode() + b'\0')
+        digest.update(content)
+        digest.update(b'\0')
+        for includeName in self.INCLUDE_PATTERN.findall(content):
+            includedFile = self.resolveInclude(includeName.decode('utf-8', errors='replace'), file)
+            if includedFile is None or not self.hashSource(includedFile, digest, visited):
+                return False
+        return True
+
+    # Returns the key of a file (None if an include cannot be resolved)
+    def getKey(self, file, context):
+        digest = hashlib.sha256()
+        digest.update(("%sdefines-%s;includes-%s;"%(context, ",".join(self.defines), ",".join(self.includes))).encode())
+        if not self.hashSource(file, digest, set()):
+            return None
+        return digest.hexdigest()
+
+
+# Class to persist per-file ASTs on disk so that unchanged files are not re-parsed across runs
+# Each entry is a pickled AST keyed by the pyverilog version (AST node layout may change across versions)
+# and the source hash of the file (see SourceHasher)
+class AstCache:
+    def __init__(self, cacheDir, defines=(), includes=(), sourceStore=None) -> None:
+        self.cacheDir    = cacheDir
+        self.hasher      = SourceHasher(defines, includes, sourceStore)
+        self.hits        = 0
+        self.misses      = 0
+        os.makedirs(self.cacheDir, exist_ok=True)
+        logging.info("AST cache initialized in %s"%(self.cacheDir))
+
+    # Returns the cache key of a file (None if the file cannot be cached)
+    def getKey(self, file):
+        key = self.hasher.getKey(file, "pyverilog-%s;pickle-%d;"%(pyverilog.__version__, pickle.HIGHEST_PROTOCOL))
+        if key is None:
+            logging.info("-- Unresolved `include in %s - file will not be cached"%(file))
+        return key
+
+    def getEntryPath(self, key):
+        return os.path.join(self.cacheDir, key + ".ast")
+
+    # Returns the cached AST for a key or None on a cache miss
+    def load(self, key):
+        if key is not None and os.path.exists(self.getEntryPath(key)):
+            try:
+                with open(self.getEntryPath(key), 'rb') as f:
+                    ast = pickle.load(f)
+                self.hits += 1
+                return ast
+            except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+                logging.warning("Discarding corrupt AST cache entry %s - %s"%(self.getEntryPath(key), str(e)))
+        self.misses += 1
+        return None
+
+    # Stores an AST against a key. The entry is written to a temporary file first and then
+    # moved in place so that concurrent runs never see a partially written entry
+    def store(self, key, ast):
+        if key is None or ast is None:
+            return
+        tempPath = self.getEntryPath(key) + ".%d.tmp"%(os.getpid())
+        try:
+            with open(tempPath, 'wb') as f:
+                pickle.dump(ast, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tempPath, self.getEntryPath(key))
+        except (OSError, RecursionError, pickle.PicklingError) as e:
+            logging.warning("Unable to cache AST in %s - %s"%(self.getEntryPath(key), str(e)))
+            if os.path.exists(tempPath):
+                os.remove(tempPath)
+
+
+# Class persisting per-partition interface summaries for incremental insertion (SUMMARY_DIR)
+# A partition is the sub-hierarchy of a module (e.g. a third-party IP). Its summary holds -
+# -- The observe/control widths of the partition root
+# -- The observability/controllability/control type maps of an instance of the root (offsets relative to the instance)
+# -- The observe pipeline stages of every observed signal up to the root's observe port, the height of the root and
+#    whether the root has a pipeline clock port (see PIPELINE_INTERVAL)
+# -- The modified files of the partition
+# A summary is keyed by the contents (and includes) of the files of the partition and by the settings changing the
+# generated RTL. Partitions with an up-to-date summary are neither parsed nor instrumented: Their root is a leaf of the
+# hierarchy (like a pruned module) whose widths and maps come from the summary, and the stored files are copied to the output
+# Partitions are formed from the declaration scan. A partition is only eligible if its files define no module outside
+# of it, no module below its root is instantiated from outside of it and it is not nested in another partition
+# Files are hashed as for the AST cache (see SourceHasher)
+class InterfaceSummaryStore:
+    SUMMARY_VERSION = 3
+
+    def __init__(self, summaryDir, scanner, topModule, partitions=(), settings=(), defines=(), includes=(), sourceStore=None) -> None:
+        self.cacheDir           = summaryDir
+        self.hasher             = SourceHasher(defines, includes, sourceStore)
+        self.settings           = tuple(str(setting) for setting in settings)
+        self.partitionToModules = {}  # <ROOT MODULE> --> {<MODULE>} (eligible partitions only)
+        self.partitionToFiles   = {}  # <ROOT MODULE> --> [<FILE>]
+        self.partitionToKey     = {}  # <ROOT MODULE> --> Summary key (None if a file cannot be hashed)
+        self.partitionToSummary = {}  # <ROOT MODULE> --> Up-to-date summary
+        os.makedirs(self.cacheDir, exist_ok=True)
+        # By default every module instantiated in the top module is a partition
+        if not partitions:
+            partitions = sorted(scanner.moduleToInstances.get(topModule, ()))
+        fileToModules = {}
+        for module in scanner.moduleToFile:
+            fileToModules.setdefault(scanner.moduleToFile[module], set()).add(module)
+        for partition in partitions:
+            modules = self.getPartitionModules(scanner, topModule, partition, fileToModules)
+            if modules is not None:
+                self.partitionToModules[partition] = modules
+        # Nested partitions are dropped - The enclosing partition is summarized as a whole
+        for partition in list(self.partitionToModules):
+            if any(partition in self.partitionToModules[other] for other in self.partitionToModules if other != partition):
+                logging.warning("Partition '%s' is nested in another partition - Dropped"%(partition))
+                del self.partitionToModules[partition]
+        fileOrder = {file: index for index, file in enumerate(scanner.fileToModuleSpans)}
+        for partition in self.partitionToModules:
+            self.partitionToFiles[partition] = sorted({scanner.moduleToFile[module] for module in self.partitionToModules[partition]}, \
+                                                      key=lambda file: fileOrder[file])
+            self.partitionToKey[partition]   = self.getPartitionKey(partition)
+            summary = self.loadSummary(partition)
+            if summary is not None:
+                self.partitionToSummary[partition] = summary
+        logging.info("Interface summaries: %d of %d partition(s) up-to-date in %s"%(len(self.partitionToSummary),   \
+                                                                                 len(self.partitionToModules),   \
+                                                                                 self.cacheDir))
+
+    # Returns the modules of the sub-hierarchy of a partition root (None if the partition is not eligible)
+    @staticmethod
+    def getPartitionModules(scanner, topModule, root, fileToModules):
+        if root == topModule or root not in scanner.moduleToFile:
+            logging.warning("Partition '%s' is the top module or not defined in the filelist - Ignored"%(root))
+            return None
+        # Modules reachable from the root, and from the top module without passing through the root
+        reachable = []
+        for start, skip in ((root, None), (topModule, root)):
+            modules = {start}
+            stack   = [start]
+            while stack:
+                for child in scanner.moduleToInstances.get(stack.pop(), ()):
+                    if child != skip and child not in modules:
+                        modules.add(child)
+                        stack.append(child)
+            reachable.append(modules)
+        subtree, outside = reachable
+        if not any(root in scanner.moduleToInstances.get(module, ()) for module in outside):
+            logging.warning("Partition '%s' is not instantiated in the hierarchy of '%s' - Ignored"%(root, topModule))
+            return None
+        if subtree & outside:
+            logging.warning("Modules of partition '%s' are instantiated outside of it - Ignored"%(root))
+            return None
+        if any(fileToModules[scanner.moduleToFile[module]] - subtree for module in subtree):
+            logging.warning("Files of partition '%s' define modules outside of it - Ignored"%(root))
+            return None
+        return subtree
+
+    def getPartitionKey(self, partition):
+        digest = hashlib.sha256()
+        digest.update(("asap-summary-%d;settings-%s;root-%s;"%(self.SUMMARY_VERSION, ",".join(self.settings), partition)).encode())
+        for file in self.partitionToFiles[partition]:
+            key = self.hasher.getKey(file, "pyverilog-%s;"%(pyverilog.__version__))
+            if key is None:
+                logging.info("-- Unresolved `include in %s - Partition '%s' will not be summarized"%(file, partition))
+                return None
+            digest.update(key.encode())
+        return digest.hexdigest()
+
+    def getSummaryPath(self, partition):
+        return os.path.join(self.cacheDir, partition + ".json")
+
+    def getFilesDir(self, partition):
+        return os.path.join(self.cacheDir, partition)
+
+    # Returns the summary of a partition if it is up-to-date (else None)
+    def loadSummary(self, partition):
+        key = self.partitionToKey[partition]
+        if key is None or not os.path.exists(self.getSummaryPath(partition)):
+            return None
+        try:
+            with open(self.getSummaryPath(partition), 'r') as f:
+                summary = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Discarding corrupt summary %s - %s"%(self.getSummaryPath(partition), str(e)))
+            return None
+        if summary.get('KEY') != key or \
+           not all(os.path.exists(os.path.join(self.getFilesDir(partition), filename)) for filename in summary['FILES']):
+            return None
+        return summary
+
+    # Returns the files of the partitions with an up-to-date summary (not to be parsed)
+    def getSummarizedFiles(self):
+        return [file for partition in self.partitionToSummary for file in self.partitionToFiles[partition]]
+
+    # Returns the modules of the partitions with an up-to-date summary
+    def getSummarizedModules(self):
+        return {module for partition in self.partitionToSummary for module in self.partitionToModules[partition]}
+
+    # Returns the partitions to be (re-)summarized after insertion
+    def getStalePartitions(self):
+        return [partition for partition in self.partitionToModules \
+                if partition not in self.partitionToSummary and self.partitionToKey[partition] is not None]
+
+    # Copies the stored files of the up-to-date partitions to the output folder
+    def restoreFiles(self, outputFolder):
+        for partition in self.partitionToSummary:
+            logging.info("Restoring the files of partition '%s' from its summary"%(partition))
+            for filename in self.partitionToSummary[partition]['FILES']:
+                shutil.copyfile(os.path.join(self.getFilesDir(partition), filename), os.path.join(outputFolder, filename))
+
+    # Stores the summary of a partition along with its modified files (taken from the output folder)
+    # The summary is written last (via a temporary file), so that an interrupted store leaves no valid summary
+    def storeSummary(self, partition, summary, outputFolder):
+        filesDir = self.getFilesDir(partition)
+        os.makedirs(filesDir, exist_ok=True)
+        filenames = [os.path.basename(file) for file in self.partitionToFiles[partition]]
+        for filename in filenames:
+            shutil.copyfile(os.path.join(outputFolder, filename), os.path.join(filesDir, filename))
+        summary = dict(summary, KEY=self.partitionToKey[partition], FILES=filenames)
+        tempPath = self.getSummaryPath(partition) + ".%d.tmp"%(os.getpid())
+        with open(tempPath, 'w') as f:
+            json.dump(summary, f, indent = 4)
+        os.replace(tempPath, self.getSummaryPath(partition))
+        logging.info("Summary of partition '%s' stored"%(partition))
+
+
+# PyVerilog parser whose LALR tables are written to (and loaded from) a fixed table directory
+# The stock parser writes its tables to the working directory and, as the table module is not
+# importable from there, regenerates them every time it is constructed
+class TableCachedVerilogParser(PyVerilogParser):
+    TABLE_MODULE = "asap_verilog_parsetab"
+
+    def __init__(self, tableDir) -> None:
+        self.lexer = VerilogLexer(error_func=self._lexer_error_func)
+        self.lexer.build()
+        self.tokens = self.lexer.tokens
+        os.makedirs(tableDir, exist_ok=True)
+        # PLY imports the table module by name - make the table directory importable while loading
+        sys.path.insert(0, tableDir)
+        try:
+            self.parser = yacc(module    = self,              \
+                               method    = "LALR",            \
+                               outputdir = tableDir,          \
+                               tabmodule = self.TABLE_MODULE, \
+                               debug     = False)
+        finally:
+            sys.path.remove(tableDir)
+
+    # Parses the preprocessed text of one source file
+    # Lexer state is reset so that a single parser can be reused across files
+    def parseText(self, text, filename):
+        self.lexer.filename        = filename
+        self.lexer.directives      = []
+        self.lexer.default_nettype = 'wire'
+        self.lexer.reset_lineno()
+        return self.parse(text)
+
+
+# Class providing one PyVerilog parser per process (per table directory)
+# Every file is fed through the same parser instead of building a new parser per file
+class VerilogParserPool:
+    parsers = {}  # <TABLE_DIR> --> TableCachedVerilogParser built in this process
+
+    def __init__(self, tableDir=None) -> None:
+        self.tableDir = os.path.abspath(tableDir if tableDir else self.getDefaultTableDir())
+
+    # Default table directory - <XDG_CACHE_HOME or ~/.cache>/asap/parser_tables
+    @staticmethod
+    def getDefaultTableDir():
+        cacheHome = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+        return os.path.join(cacheHome, 'asap', 'parser_tables')
+
+    def getParser(self):
+        if self.tableDir not in VerilogParserPool.parsers:
+            logging.info("Building Verilog parser with tables in %s"%(self.tableDir))
+            VerilogParserPool.parsers[self.tableDir] = TableCachedVerilogParser(self.tableDir)
+        return VerilogParserPool.parsers[self.tableDir]
+
+    def parse(self, text, filename):
+        return self.getParser().parseText(text, filename)
+
+
+# Class to preprocess all files of the filelist in one batch. The preprocessed text is kept in memory
+# -- Fast path: Files without any compiler directive (no '`') are passed through as-is
+# -- All remaining files are preprocessed with a single iverilog -E run. Each file is preceded by
+#    a boundary marker file; the marker line survives preprocessing and is used to split the
+#    output back per file. Line numbers within each file are preserved (pragmas are mapped by line)
+# Every file is preprocessed as its own compilation unit: The boundary marker file resets the macros
+# (`undefineall) and the other compiler directives (`resetall) and re-defines the command line defines,
+# so macros defined in a file are not visible to the files following it in the batch. The output of a
+# file thus only depends on its own contents, its includes and the defines (see AstCache)
+class VerilogPreprocessStage:
+    def __init__(self, defines=(), includes=(), fastPath=True, sourceStore=None) -> None:
+        self.defines     = tuple(defines)
+        self.includes    = tuple(includes)
+        self.fastPath    = fastPath
+        self.sourceStore = sourceStore if sourceStore is not None else SourceStore()
+
+    def getPreprocessorCommand(self, outputFile):
+        command = [os.environ.get('PYVERILOG_IVERILOG', 'iverilog')]
+        for include in self.includes:
+            command.extend(['-I', include])
+        for define in self.defines:
+            command.extend(['-D', define])
+        command.extend(['-E', '-o', outputFile])
+        return command
+
+    # Returns {<FILE>: <PREPROCESSED TEXT>} for the given files
+    def preprocess(self, files):
+        fileToText = {}
+        batch = []
+        for file in files:
+            text = self.sourceStore.getText(file)
+            if self.fastPath and '`' not in text:
+                fileToText[file] = text
+            else:
+                batch.append(file)
+        logging.info("Preprocessing: %d file(s) without directives passed through, %d file(s) batched"%(len(fileToText), \
+                                                                                                        len(batch)))
+        if batch:
+            fileToText.update(self.preprocessBatch(batch))
+        return fileToText
+
+    # Returns the `define directives of the command line defines (-D <NAME> defines <NAME> to 1)
+    def getDefineDirectives(self):
+        directives = []
+        for define in self.defines:
+            name, _, value = define.partition('=')
+            directives.append("`define %s %s\n"%(name, value if value else "1"))
+        return "".join(directives)
+
+    # Runs the external preprocessor once over all files in the batch
+    def preprocessBatch(self, files):
+        workDir = tempfile.mkdtemp(prefix="asap_pp_")
+        try:
+            nonce = uuid.uuid4().hex
+            markers = []
+            sources = []
+            resetMarker = "__ASAP_PP_RESET_%s__"%(nonce)
+            for index, file in enumerate(files):
+                marker = "__ASAP_PP_BOUNDARY_%s_%d__"%(nonce, index)
+                markerFile = os.path.join(workDir, "boundary_%d.v"%(index))
+                # Leading newline keeps the reset marker on its own line even if the previous file has no trailing newline
+                # The output between the reset marker and the boundary marker belongs to no file
+                with open(markerFile, 'w') as f:
+                    f.write("\n%s\n`resetall\n`undefineall\n%s%s\n"%(resetMarker, self.getDefineDirectives(), marker))
+                markers.append(marker)
+                sources.extend([markerFile, file])
+            outputFile = os.path.join(workDir, "preprocess.output")
+            command = self.getPreprocessorCommand(outputFile) + sources
+            try:
+                result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+            except OSError as e:
+                raise PreprocessingError("Unable to run preprocessor '%s' - %s"%(command[0], str(e)))
+            if result.returncode != 0 or not os.path.exists(outputFile):
+                logging.error("Preprocessor failed with\n%s"%(result.stderr))
+                raise PreprocessingError("Preprocessing failed for batch of %d file(s)"%(len(files)))
+            with open(outputFile, 'r') as f:
+                output = f.read()
+        finally:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+        # Split the preprocessed output on the boundary markers
+        markerToIndex = {marker: index for index, marker in enumerate(markers)}
+        fileToLines = {file: [] for file in files}
+        currentFile = None
+        for line in output.splitlines(keepends=True):
+            if line.strip() in markerToIndex:
+                currentFile = files[markerToIndex[line.strip()]]
+            elif line.strip() == resetMarker:
+                # The leading newline of the marker file ends the last line of a file without a trailing newline,
+                # otherwise it is an extra empty line
+                if currentFile is not None and fileToLines[currentFile] and fileToLines[currentFile][-1] == "\n":
+                    fileToLines[currentFile].pop()
+                currentFile = None
+            elif currentFile is not None:
+                fileToLines[currentFile].append(line)
+        return {file: "".join(fileToLines[file]) for file in files}
+
 
 # Class to parse the filelist
 class VerilogParser(LogStructuring):
-    def __init__(self, filelist, topModule) -> None:
+    def __init__(self, filelist, topModule, astCacheDir=None, defines=None, includes=None, parserTableDir=None, \
+                       preprocessFastPath=True, executor=None, pruneHierarchy=False, summaryDir=None, partitions=None, \
+                       summarySettings=(), jobs=1) -> None:
         super().__init__()  # LogStructuring constructor
         self.filelist        = filelist
+        self.parserTableDir  = parserTableDir
+        self.executor        = executor
+        self.jobs            = jobs  # Workers of the executor
+        self.defines         = tuple(defines)  if defines  else ()
+        self.includes        = tuple(includes) if includes else ()
+        # Every source file is read (memory mapped) once and shared by all scans and the preprocessing stage
+        self.sourceStore     = SourceStore()
+        self.preprocessStage = VerilogPreprocessStage(self.defines, self.includes, preprocessFastPath, self.sourceStore)
+        self.astCache        = AstCache(astCacheDir, self.defines, self.includes, self.sourceStore) if astCacheDir else None
         logging.info("Parser initialized with %s"%(self.filelist))
-        self.pragmaExtractor = PragmaExtractor(self.filelist)
+        self.pragmaExtractor = PragmaExtractor(self.filelist, self.sourceStore, executor)
         self.fileToPragma    = self.pragmaExtractor.filelistParse()
+        self.files           = list(self.fileToPragma)
+        self.scanner         = None
+        # Partitions with an up-to-date interface summary are not parsed. Their roots are leaves of the hierarchy
+        self.summaryStore    = InterfaceSummaryStore(summaryDir, self.getDeclarationScanner(), topModule, partitions, summarySettings, \
+                                                     self.defines, self.includes, self.sourceStore) if summaryDir else None
+        summarizedFiles      = set(self.summaryStore.getSummarizedFiles()) if self.summaryStore else set()
+        # Pruned modules are not rewritten. Files with only pruned modules are passed through unparsed
+        self.prunedModuleToInputPorts = {}
+        self.filesToParse    = self.getFilesToParse(topModule) if pruneHierarchy else self.files
+        if summarizedFiles:
+            self.filesToParse = [file for file in self.filesToParse if file not in summarizedFiles]
+            for module in self.summaryStore.getSummarizedModules():
+                self.prunedModuleToInputPorts.setdefault(module, self.scanner.moduleToInputPorts[module])
+        self.passThroughFiles = [file for file in self.files if file not in self.filesToParse and file not in summarizedFiles]
         self.fileToAst       = self.fileWiseAst()
         logging.info("File to AST hash map generated")
         self.moduleToAst     = self.moduleWiseAst()
         logging.info("Module to AST hash map generated")
-        self.tree            = InstantiationTree(topModule, self.moduleToAst).instanceTree
-        logging.info("Instantiation tree generated \n %s"%(self.logTreeInfo(self.tree)))
+        self.tree            = InstantiationTree(topModule, self.moduleToAst, self.prunedModuleToInputPorts)
+        logging.info("Instantiation tree generated \n %s"%(self.logDictInfo(self.tree.moduleToInstances)))
 
+    # Module to AST index (raises DuplicateModuleError for modules defined more than once)
     def moduleWiseAst(self):
-        moduleToAst = {}
-        for file in self.fileToAst:
-            ast = self.fileToAst[file]
-            definitions = ast.description.definitions
-            for definition in definitions:
-                if isinstance(definition, ModuleDef):
-                    moduleToAst.update({definition.name:definition})
-        return moduleToAst
+        return ModuleIndex(self.fileToAst)
+
+    # The declaration scan is run once and shared by hierarchy pruning and the interface summaries
+    def getDeclarationScanner(self):
+        if self.scanner is None:
+            self.scanner = DeclarationScanner(self.files, self.sourceStore)
+        return self.scanner
+
+    # Hierarchy pruning: Only files defining modules on a path from the top module to a pragma are parsed
+    def getFilesToParse(self, topModule):
+        scanner = self.getDeclarationScanner()
+        if topModule not in scanner.moduleToFile:
+            logging.warning("Top module '%s' not found by declaration scan - Hierarchy pruning disabled"%(topModule))
+            return self.files
+        requiredModules = scanner.getRequiredModules(topModule, self.fileToPragma)
+        requiredFiles   = {scanner.moduleToFile[module] for module in requiredModules}
+        self.prunedModuleToInputPorts = {module: scanner.moduleToInputPorts[module] for module in scanner.moduleToFile \
+                                         if module not in requiredModules}
+        logging.info("Hierarchy pruning: %d of %d module(s) to be rewritten, %d of %d file(s) to be parsed"%(len(requiredModules),      \
+                                                                                                          len(scanner.moduleToFile), \
+                                                                                                          len(requiredFiles),        \
+                                                                                                          len(self.files)))
+        return [file for file in self.files if file in requiredFiles]
 
     # Source file to AST hash map
     def fileWiseAst(self):
-        files = [filename.strip() for filename in open(self.filelist, 'r') if filename.strip()]
+        files = self.filesToParse
         assert all(os.path.exists(file) for file in files), "Not all files in the filelist are valid"
-        fileToAst = {file: VerilogCodeParser([file]).parse() for file in files}
+        fileToAst = {}
+        self.parserPool = VerilogParserPool(self.parserTableDir)
+        # Only files missing from (or changed since) the AST cache are preprocessed and parsed
+        fileToCacheKey = {}
+        for file in files:
+            fileToCacheKey[file] = self.astCache.getKey(file) if self.astCache else None
+            fileToAst[file] = self.astCache.load(fileToCacheKey[file]) if self.astCache else None
+        dirtyFiles = [file for file in files if fileToAst[file] is None]
+        fileToText = self.preprocessStage.preprocess(dirtyFiles)
+        if self.executor is not None and len(dirtyFiles) > 1:
+            # Preprocessed text is parsed in the process pool. Each worker keeps its own parser (same table directory)
+            logging.info("Parsing %d file(s) in the process pool"%(len(dirtyFiles)))
+            tasks = [(fileToText[file], file, self.parserPool.tableDir) for file in dirtyFiles]
+            asts  = self.executor.map(parseWorker, tasks, chunksize=getChunkSize(len(tasks), self.jobs))
+            fileToAst.update(zip(dirtyFiles, asts))
+        else:
+            for file in dirtyFiles:
+                fileToAst[file] = self.parserPool.parse(fileToText[file], file)
+        for file in dirtyFiles:
+            if self.astCache:
+                self.astCache.store(fileToCacheKey[file], fileToAst[file])
+        if self.astCache:
+            logging.info("AST cache: %d hit(s), %d miss(es) for %d file(s)"%(self.astCache.hits,   \
+                                                                           self.astCache.misses, \
+                                                                           len(files)))
         if all(value is not None for value in fileToAst.values()):
             logging.info("Filewise AST generated")
         else:
@@ -281,6 +1064,500 @@ class VerilogParser(LogStructuring):
             fileToModuleToSignalToControl.update({file:moduleToSignalToControl})
         return fileToModuleToSignalToObserve, fileToModuleToSignalToControl
 
+    # Writes the design symbol database (see SymbolDatabase). To be called before the ASTs are modified
+    def writeSymbolDatabase(self, path, fileToModuleToSignalToObserve, fileToModuleToSignalToControl):
+        moduleToSignalToObserve = {}
+        moduleToSignalToControl = {}
+        for file in fileToModuleToSignalToObserve:
+            moduleToSignalToObserve.update(fileToModuleToSignalToObserve[file])
+            moduleToSignalToControl.update(fileToModuleToSignalToControl[file])
+        SymbolDatabase.write(path, self.moduleToAst, self.tree, moduleToSignalToObserve, moduleToSignalToControl)
+        logging.info("Symbol database written to %s"%(path))
+
+
+
+# Class evaluating constant expressions (parameters, declaration ranges) of a module
+# Parameters are evaluated in order of declaration with their default values (instance overrides are not applied)
+# Expressions that are not constant (or use unsupported operators/system functions) evaluate to None
+# Integer division truncates toward zero and the remainder takes the sign of the dividend (as in Verilog)
+class ConstantEvaluator:
+    BINARY_OPERATORS = {Plus: lambda a, b: a + b,           Minus: lambda a, b: a - b,      Times: lambda a, b: a * b,
+                        Divide: lambda a, b: (abs(a) // abs(b)) * (1 if (a < 0) == (b < 0) else -1),
+                        Mod: lambda a, b: (abs(a) % abs(b)) * (1 if a >= 0 else -1),
+                        Power: lambda a, b: ConstantEvaluator.power(a, b),
+                        Sll: lambda a, b: a << b,           Srl: lambda a, b: a >> b,       Sla: lambda a, b: a << b,
+                        Sra: lambda a, b: a >> b,           And: lambda a, b: a & b,        Or: lambda a, b: a | b,
+                        Xor: lambda a, b: a ^ b,            Eq: lambda a, b: int(a == b),   NotEq: lambda a, b: int(a != b),
+                        LessThan: lambda a, b: int(a < b),  LessEq: lambda a, b: int(a <= b),
+                        GreaterThan: lambda a, b: int(a > b), GreaterEq: lambda a, b: int(a >= b),
+                        Land: lambda a, b: int(bool(a and b)), Lor: lambda a, b: int(bool(a or b))}
+    UNARY_OPERATORS  = {Uminus: lambda a: -a, Uplus: lambda a: a, Unot: lambda a: ~a, Ulnot: lambda a: int(not a)}
+    INT_CONST        = re.compile(r"^(?:\d*)'[sS]?([bBoOdDhH])([0-9a-fA-F_]+)$")
+    BASES            = {'b': 2, 'o': 8, 'd': 10, 'h': 16}
+
+    # Integer power with Verilog semantics for negative exponents - 1 for base 1, -1/1 for base -1 (odd/even exponent),
+    # 0 for any other base. 0 to a negative power is x (not constant)
+    @staticmethod
+    def power(base, exponent):
+        if exponent >= 0:
+            return base ** exponent
+        if base == 0:
+            raise ArithmeticError("0 to the power of %d"%(exponent))
+        if base == -1:
+            return -1 if exponent % 2 else 1
+        return 1 if base == 1 else 0
+
+    def __init__(self, moduleDef) -> None:
+        self.parameterToValue = {}  # <PARAMETER> --> Value (None if not constant)
+        declarations = list(moduleDef.paramlist.params) if moduleDef.paramlist else []
+        declarations += [item for item in moduleDef.items if isinstance(item, Decl)]
+        for declaration in declarations:
+            for parameter in getattr(declaration, 'list', ()):
+                if isinstance(parameter, (Parameter, Localparam)):
+                    self.parameterToValue[parameter.name] = self.evaluate(parameter.value)
+
+    # Returns the integer value of an expression (None if not constant)
+    def evaluate(self, node):
+        try:
+            return self.evaluateNode(node)
+        except (ArithmeticError, ValueError, TypeError, RecursionError):
+            return None
+
+    def evaluateNode(self, node):
+        if isinstance(node, Rvalue):
+            return self.evaluateNode(node.var)
+        if isinstance(node, IntConst):
+            value = node.value.replace('_', '')
+            match = self.INT_CONST.match(value)
+            return int(match.group(2), self.BASES[match.group(1).lower()]) if match else int(value)
+        if isinstance(node, Identifier):
+            return self.parameterToValue.get(node.name)
+        if type(node) in self.BINARY_OPERATORS:
+            left, right = self.evaluateNode(node.left), self.evaluateNode(node.right)
+            return None if left is None or right is None else self.BINARY_OPERATORS[type(node)](left, right)
+        if type(node) in self.UNARY_OPERATORS:
+            right = self.evaluateNode(node.right)
+            return None if right is None else self.UNARY_OPERATORS[type(node)](right)
+        if isinstance(node, Cond):
+            condition = self.evaluateNode(node.cond)
+            return None if condition is None else self.evaluateNode(node.true_value if condition else node.false_value)
+        if isinstance(node, SystemCall) and node.syscall == 'clog2' and len(node.args) == 1:
+            value = self.evaluateNode(node.args[0])
+            return None if value is None else max(0, (value - 1).bit_length())
+        return None
+
+    # Returns (msb, lsb, width) of a declaration range (a single bit if there is no range)
+    def getRange(self, width):
+        if width is None:
+            return 0, 0, 1
+        msb, lsb = self.evaluate(width.msb), self.evaluate(width.lsb)
+        return msb, lsb, (abs(msb - lsb) + 1 if msb is not None and lsb is not None else None)
+
+
+# Class holding the design symbol database (SYMBOL_DB) - An SQLite database of the parsed design with the tables -
+# -- modules:   name, file, line
+# -- instances: path, name, module, parent, depth (the hierarchy expanded from the top module, whose path is its name)
+# -- signals:   module, name, direction (input/output/inout), type (reg/wire), msb, lsb, width, line and the
+#               pragma annotations (observe_msb, observe_lsb, control_type, control_msb, control_lsb)
+# The view hierarchical_signals joins every instance with the signals of its module (path: <INSTANCE PATH>.<SIGNAL>)
+# Only module level ports and reg/wire declarations of parsed modules are recorded. Widths are evaluated with the
+# parameter defaults of the module (NULL if not constant). Paths are indexed for prefix queries, and a REGEXP
+# function is registered on connections opened by this class
+class SymbolDatabase:
+    SCHEMA = """
+        CREATE TABLE modules   (name TEXT PRIMARY KEY, file TEXT, line INTEGER);
+        CREATE TABLE instances (path TEXT PRIMARY KEY, name TEXT, module TEXT, parent TEXT, depth INTEGER);
+        CREATE TABLE signals   (module TEXT, name TEXT, direction TEXT, type TEXT, msb INTEGER, lsb INTEGER, width INTEGER,
+                                line INTEGER, observe_msb INTEGER, observe_lsb INTEGER, control_type TEXT, control_msb INTEGER,
+                                control_lsb INTEGER, PRIMARY KEY (module, name));
+        CREATE VIEW hierarchical_signals AS
+            SELECT instances.path || '.' || signals.name AS path, instances.path AS instance_path, signals.*
+            FROM instances JOIN signals ON signals.module = instances.module;
+        """
+    INDEXES = """
+        CREATE INDEX instances_module ON instances (module);
+        CREATE INDEX signals_width    ON signals (width);
+        """
+    DIRECTIONS = {Input: 'input', Output: 'output', Inout: 'inout'}
+    TYPES      = {Reg: 'reg', Wire: 'wire'}
+
+    def __init__(self, path) -> None:
+        self.connection = sqlite3.connect(path)
+        self.connection.create_function('REGEXP', 2, self.regexp, deterministic=True)
+
+    @staticmethod
+    def regexp(pattern, value):
+        return value is not None and re.search(pattern, value) is not None
+
+    # Writes the database of a parsed design. The database is built in a temporary file and moved in place
+    # moduleToSignalToObserve/moduleToSignalToControl - Pragma annotations (see VerilogParser.fileToModuleToSignalToPragma)
+    @staticmethod
+    def write(path, moduleToAst, instanceTree, moduleToSignalToObserve, moduleToSignalToControl):
+        tempPath = path + ".%d.tmp"%(os.getpid())
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        connection = sqlite3.connect(tempPath)
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        connection.executescript(SymbolDatabase.SCHEMA)
+        with connection:
+            connection.executemany("INSERT INTO modules VALUES (?, ?, ?)",                                           \
+                                   ((name, moduleToAst.getFile(name), moduleToAst[name].lineno) for name in moduleToAst))
+            connection.executemany("INSERT INTO instances VALUES (?, ?, ?, ?, ?)", SymbolDatabase.getInstanceRows(instanceTree))
+            for name in moduleToAst:
+                connection.executemany("INSERT INTO signals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",           \
+                                       SymbolDatabase.getSignalRows(moduleToAst[name],                              \
+                                                                    moduleToSignalToObserve.get(name, {}),          \
+                                                                    moduleToSignalToControl.get(name, {})))
+        connection.executescript(SymbolDatabase.INDEXES)
+        connection.close()
+        os.replace(tempPath, path)
+
+    # Instances of the hierarchy, expanded iteratively from the top module - (path, name, module, parent, depth)
+    @staticmethod
+    def getInstanceRows(instanceTree):
+        stack = [(instanceTree.topModule, instanceTree.topModule, instanceTree.topModule, None, 0)]
+        while stack:
+            path, name, module, parent, depth = stack.pop()
+            yield path, name, module, parent, depth
+            for instanceName, childModule in reversed(instanceTree.getInstances(module)):
+                stack.append((path + "." + instanceName, instanceName, childModule, path, depth + 1))
+
+    # Ports and module level reg/wire declarations of a module. A signal declared more than once (e.g. a
+    # non-ANSI port and its net declaration) is recorded once, with the direction and type merged
+    @staticmethod
+    def getSignalRows(moduleDef, signalToObserve, signalToControl):
+        evaluator = ConstantEvaluator(moduleDef)
+        nameToRow = {}
+        declarations = []
+        for port in moduleDef.portlist.ports:
+            if isinstance(port, Ioport):
+                declarations.extend(declaration for declaration in (port.first, port.second) if declaration is not None)
+        for item in moduleDef.items:
+            if isinstance(item, Decl):
+                declarations.extend(item.list)
+        for declaration in declarations:
+            direction = SymbolDatabase.DIRECTIONS.get(type(declaration))
+            netType   = SymbolDatabase.TYPES.get(type(declaration))
+            if direction is None and netType is None:
+                continue
+            row = nameToRow.get(declaration.name)
+            if row is None:
+                msb, lsb, width = evaluator.getRange(declaration.width)
+                observe = signalToObserve.get(declaration.name, (None, None))
+                control = signalToControl.get(declaration.name, (None, None, None))
+                row = nameToRow[declaration.name] = [moduleDef.name, declaration.name, None, None, msb, lsb, width, \
+                                                     declaration.lineno, observe[0], observe[1], control[0], control[1], control[2]]
+            row[2] = row[2] or direction
+            row[3] = row[3] or netType
+        return [tuple(row) for row in nameToRow.values()]
+
+    # Returns the rows of hierarchical_signals under an instance path (the instance itself included),
+    # optionally filtered by a regex on the signal path and by width. Prefix lookups use the path index
+    def findSignals(self, pathPrefix=None, pathRegex=None, minWidth=None, maxWidth=None):
+        conditions, parameters = [], []
+        if pathPrefix is not None:
+            conditions.append("(instance_path = ? OR (instance_path >= ? AND instance_path < ?))")
+            parameters += [pathPrefix, pathPrefix + ".", pathPrefix + "/"]   # '/' follows '.'
+        if pathRegex is not None:
+            conditions.append("path REGEXP ?")
+            parameters.append(pathRegex)
+        if minWidth is not None:
+            conditions.append("width >= ?")
+            parameters.append(minWidth)
+        if maxWidth is not None:
+            conditions.append("width <= ?")
+            parameters.append(maxWidth)
+        query = "SELECT * FROM hierarchical_signals" + (" WHERE " + " AND ".join(conditions) if conditions else "")
+        return self.connection.execute(query, parameters).fetchall()
+
+    def execute(self, query, parameters=()):
+        return self.connection.execute(query, parameters).fetchall()
+
+    def close(self):
+        self.connection.close()
+
+
+# Class indexing the Identifier nodes of a module by name (built with one iterative walk of the module AST)
+# Every occurrence is recorded with its context -
+# -- underLvalue/underRvalue: The identifier has an Lvalue/Rvalue ancestor
+# -- instance: The enclosing module instance (None outside of instance port connections)
+# A node shared at several places of the AST has one occurrence per place
+class IdentifierIndex:
+    def __init__(self, moduleDef) -> None:
+        self.nameToOccurrences = {}  # <NAME> --> [(<IDENTIFIER NODE>, underLvalue, underRvalue, <INSTANCE>)]
+        stack = [(moduleDef, False, False, None)]
+        while stack:
+            node, underLvalue, underRvalue, instance = stack.pop()
+            if node is None:
+                continue
+            if isinstance(node, Identifier):
+                self.nameToOccurrences.setdefault(node.name, []).append((node, underLvalue, underRvalue, instance))
+            underLvalue = underLvalue or isinstance(node, Lvalue)
+            underRvalue = underRvalue or isinstance(node, Rvalue)
+            instance    = node if isinstance(node, Instance) else instance
+            for child in node.children():
+                stack.append((child, underLvalue, underRvalue, instance))
+
+    def getOccurrences(self, name):
+        return self.nameToOccurrences.get(name, [])
+
+
+# Class recording the state of the modules of a file AST before hook insertion (see VerilogSpliceEmitter)
+# Nodes are referenced, not copied - A snapshot taken in a pool worker must be returned (pickled) along with its AST
+class SpliceSnapshot:
+    def __init__(self, ast) -> None:
+        # [(<MODULEDEF>, <ITEMS>, <PORTS>, [(<INSTANCELIST>, <INSTANCE>, <NUM PORTARGS>)], [(<IDENTIFIER>, <NAME>)])]
+        # Identifiers are listed in pre-order (i.e. in order of appearance in the source)
+        self.modules = []
+        for moduleDef in ModuleIndex.getModuleDefs(ast):
+            instances = [(item, instance, len(instance.portlist)) for item in moduleDef.items \
+                         if isinstance(item, InstanceList) for instance in item.instances]
+            identifiers = []
+            visited = set()
+            stack = [moduleDef]
+            while stack:
+                node = stack.pop()
+                if node is None or id(node) in visited:
+                    continue
+                visited.add(id(node))
+                if isinstance(node, Identifier):
+                    identifiers.append((node, node.name))
+                stack.extend(reversed(node.children()))
+            self.modules.append((moduleDef, tuple(moduleDef.items), tuple(moduleDef.portlist.ports), instances, identifiers))
+
+
+# Class to emit a modified file by splicing the insertion edits into the original source text. Text outside
+# of the edits (formatting, comments, pragmas) is preserved. The edits are recovered by comparing the modified
+# AST with its SpliceSnapshot (by node identity) -
+# -- Identifiers renamed to <NAME>_controlled: The suffix is inserted (occurrences are matched by line and order)
+# -- Declarations replaced in place:           The declaration statement is replaced by the new items
+# -- Items inserted before/after all others:   Inserted after the module header/before endmodule
+# -- Output reg ports converted to wire:       The 'reg' keyword is replaced
+# -- Ports and instance port args appended:    Inserted before the closing parenthesis
+# Any other change, or source text not matching the AST, raises SpliceError (callers fall back to code generation)
+class VerilogSpliceEmitter:
+    INDENT           = '  '
+    MODULE_KEYWORD   = re.compile(r'\b(?:macro)?module\b')
+    ENDMODULE        = re.compile(r'\bendmodule\b')
+    PARENTHESIS      = re.compile(r'[();]')
+    OUTPUT_REG       = re.compile(r'\boutput\s+(reg)\b')
+    DECL_STATEMENT   = re.compile(r'[ \t]*\b(reg|wire)\b[^;]*;')
+
+    def __init__(self, text, snapshot) -> None:
+        if '`' in text:
+            raise SpliceError("compiler directives in source")
+        if '\r' in text.replace('\r\n', ''):
+            raise SpliceError("unsupported line endings")
+        self.text       = text
+        # Comments and strings are blanked out with spaces - Offsets and line numbers are preserved
+        self.code       = DeclarationScanner.COMMENT_OR_STRING.sub(lambda match: re.sub(r'[^\n]', ' ', match.group(0)), text)
+        self.lineStarts = [0] + [match.end() for match in re.finditer('\n', text)]
+        self.snapshot   = snapshot
+        self.codegen    = ASTCodeGenerator()
+        self.edits      = []  # [(<START OFFSET>, <END OFFSET>, <TEXT>)]
+
+    # Returns the (start, end) offsets of a line (end excludes the newline)
+    def getLineSpan(self, lineno):
+        if not lineno or not 1 <= lineno <= len(self.lineStarts):
+            raise SpliceError("no source line %s"%(lineno))
+        start = self.lineStarts[lineno - 1]
+        end   = self.lineStarts[lineno] - 1 if lineno < len(self.lineStarts) else len(self.text)
+        return start, end
+
+    def getIndent(self, offset):
+        lineStart = self.text.rfind('\n', 0, offset) + 1
+        line = self.text[lineStart:offset]
+        return line[:len(line) - len(line.lstrip())]
+
+    def render(self, node, indent):
+        return self.codegen.visit(node).strip('\n').replace('\n', '\n' + indent)
+
+    # Returns the spliced text, or None if the AST has no edits
+    def getSplicedText(self):
+        for moduleDef, items, ports, instances, identifiers in self.snapshot.modules:
+            headerEnd, portGroup, endmodule = self.getModuleRegion(moduleDef)
+            self.addRenameEdits(identifiers)
+            self.addItemEdits(moduleDef, items, headerEnd, endmodule)
+            self.addPortEdits(moduleDef, ports, portGroup)
+            for instanceList, instance, numPortArgs in instances:
+                self.addPortArgEdits(instanceList, instance, numPortArgs)
+        if not self.edits:
+            return None
+        splicedText = []
+        position = 0
+        # Edits at the same offset are applied in order of recording
+        for start, end, text in sorted(self.edits, key=lambda edit: (edit[0], edit[1])):
+            if start < position:
+                raise SpliceError("overlapping edits")
+            splicedText.append(self.text[position:start])
+            splicedText.append(text)
+            position = end
+        splicedText.append(self.text[position:])
+        return ''.join(splicedText)
+
+    # Returns the offset of the ';' ending the module header, the (open, close) offsets of the port list
+    # parentheses (None if there is no port list) and the offset of endmodule
+    def getModuleRegion(self, moduleDef):
+        lineStart, lineEnd = self.getLineSpan(moduleDef.lineno)
+        match = self.MODULE_KEYWORD.search(self.code, lineStart)
+        if match is None or match.start() > lineEnd:
+            raise SpliceError("module '%s' not found at line %d"%(moduleDef.name, moduleDef.lineno))
+        depth, portGroup, headerEnd = 0, None, None
+        for match in self.PARENTHESIS.finditer(self.code, match.end()):
+            if match.group(0) == '(':
+                if depth == 0:
+                    groupStart = match.start()
+                depth += 1
+            elif match.group(0) == ')':
+                depth -= 1
+                # The parameter list is the group preceded by '#'
+                if depth == 0 and not self.code[:groupStart].rstrip().endswith('#'):
+                    portGroup = (groupStart, match.start())
+            elif depth == 0:
+                headerEnd = match.start()
+                break
+        endmodule = self.ENDMODULE.search(self.code, headerEnd) if headerEnd is not None else None
+        if endmodule is None:
+            raise SpliceError("header/endmodule of module '%s' not found"%(moduleDef.name))
+        return headerEnd, portGroup, endmodule.start()
+
+    # Identifiers renamed to <NAME>_controlled. The occurrences of a name on a line are matched to the AST
+    # identifiers of that line in order. Port names of named port connections (.<NAME>) are skipped
+    def addRenameEdits(self, identifiers):
+        lineAndNameToNodes = {}
+        for node, name in identifiers:
+            lineAndNameToNodes.setdefault((node.lineno, name), []).append(node)
+        for (lineno, name), nodes in lineAndNameToNodes.items():
+            if all(node.name == name for node in nodes):
+                continue
+            lineStart, lineEnd = self.getLineSpan(lineno)
+            occurrences = [match.end() for match in re.finditer(r'(?<![\w$.])%s(?![\w$])'%(re.escape(name)), \
+                                                                self.code[lineStart:lineEnd])]
+            if len(occurrences) != len(nodes):
+                raise SpliceError("occurrences of '%s' at line %d do not match the AST"%(name, lineno))
+            for node, offset in zip(nodes, occurrences):
+                if node.name == name + "_controlled":
+                    self.edits.append((lineStart + offset, lineStart + offset, "_controlled"))
+                elif node.name != name:
+                    raise SpliceError("unexpected rename of '%s' to '%s'"%(name, node.name))
+
+    # Returns the (start, end) offsets of a single declaration statement
+    def getDeclSpan(self, item):
+        if not isinstance(item, Decl) or len(item.list) != 1 or not isinstance(item.list[0], (Reg, Wire)):
+            raise SpliceError("unsupported replaced item at line %s"%(getattr(item, 'lineno', None)))
+        lineStart, lineEnd = self.getLineSpan(item.lineno)
+        match = self.DECL_STATEMENT.match(self.code, lineStart)
+        if match is None or match.group(1) != ('reg' if isinstance(item.list[0], Reg) else 'wire') or \
+           not re.search(r'(?<![\w$])%s(?![\w$])'%(re.escape(item.list[0].name)), self.code[match.start():match.end()]):
+            raise SpliceError("declaration of '%s' not found at line %d"%(item.list[0].name, item.lineno))
+        return match.start(1), match.end()
+
+    # Runs of new items are spliced in place of the original items they replace (if any). Otherwise
+    # runs ahead of all original items go after the module header and runs after them go before endmodule
+    def addItemEdits(self, moduleDef, items, headerEnd, endmodule):
+        itemToIndex = {id(item): index for index, item in enumerate(items)}
+        previousIndex = -1
+        run = []
+        for item in list(moduleDef.items) + [None]:
+            if item is not None and id(item) not in itemToIndex:
+                run.append(item)
+                continue
+            index = itemToIndex[id(item)] if item is not None else len(items)
+            if index <= previousIndex:
+                raise SpliceError("items of module '%s' reordered"%(moduleDef.name))
+            replaced = items[previousIndex + 1:index]
+            if replaced:
+                spans = [self.getDeclSpan(replacedItem) for replacedItem in replaced]
+                indent = self.getIndent(spans[0][0])
+                self.edits.append((spans[0][0], spans[0][1], ('\n' + indent).join(self.render(newItem, indent) for newItem in run)))
+                for start, end in spans[1:]:
+                    self.edits.append((start, end, ''))
+            elif run and previousIndex == -1:
+                self.edits.append((headerEnd + 1, headerEnd + 1, \
+                                   ''.join('\n' + self.INDENT + self.render(newItem, self.INDENT) for newItem in run)))
+            elif run and item is None:
+                self.addInsertionBefore(endmodule, [self.render(newItem, self.INDENT) for newItem in run], '', self.INDENT)
+            elif run:
+                raise SpliceError("items inserted within module '%s'"%(moduleDef.name))
+            previousIndex = index
+            run = []
+
+    # Inserts lines (each with the given separator appended but the last) ahead of the line holding offset,
+    # or right at offset if it is not the first non-blank character of its line
+    def addInsertionBefore(self, offset, lines, separator, indent):
+        lineStart = self.text.rfind('\n', 0, offset) + 1
+        if self.code[lineStart:offset].strip():
+            text = '\n' + (separator + '\n').join(indent + line for line in lines) + '\n'
+            self.edits.append((offset, offset, text))
+        else:
+            text = ''.join(indent + line + (separator if index < len(lines) - 1 else '') + '\n' for index, line in enumerate(lines))
+            self.edits.append((lineStart, lineStart, text))
+
+    # Appends comma separated nodes (ports/port args) to the list enclosed by the parentheses at the given offsets
+    # The new entries go on lines of their own (indented like the last entry) if the list is closed on a line of
+    # its own. Otherwise they are appended on the closing line
+    def addListEntries(self, openOffset, closeOffset, nodes):
+        if self.code[openOffset + 1:closeOffset].strip():
+            lastEnd = openOffset + 1 + len(self.code[openOffset + 1:closeOffset].rstrip())
+            self.edits.append((lastEnd, lastEnd, ','))
+            indent = self.getIndent(lastEnd)
+        else:
+            lastEnd = None
+            indent = self.getIndent(closeOffset) + self.INDENT
+        lineStart = self.text.rfind('\n', 0, closeOffset) + 1
+        if self.code[lineStart:closeOffset].strip():
+            self.edits.append((closeOffset, closeOffset, (' ' if lastEnd is not None else '') + \
+                               ', '.join(self.render(node, indent) for node in nodes)))
+        else:
+            self.addInsertionBefore(closeOffset, [self.render(node, indent) for node in nodes], ',', indent)
+
+    # Output reg ports converted to wire and ports appended to the (ANSI) port list
+    def addPortEdits(self, moduleDef, ports, portGroup):
+        currentPorts = moduleDef.portlist.ports
+        if len(currentPorts) < len(ports):
+            raise SpliceError("ports of module '%s' removed"%(moduleDef.name))
+        for port, currentPort in zip(ports, currentPorts):
+            if currentPort is port:
+                continue
+            if not (isinstance(port, Ioport) and isinstance(port.first, Output) and isinstance(port.second, Reg) and \
+                    isinstance(currentPort, Ioport) and isinstance(currentPort.second, Wire) and                       \
+                    currentPort.first.name == port.first.name):
+                raise SpliceError("unsupported change of port %d of module '%s'"%(ports.index(port), moduleDef.name))
+            lineStart, lineEnd = self.getLineSpan(port.lineno)
+            matches = list(self.OUTPUT_REG.finditer(self.code, lineStart, lineEnd))
+            if len(matches) != 1:
+                raise SpliceError("declaration of port '%s' not found at line %d"%(port.first.name, port.lineno))
+            self.edits.append((matches[0].start(1), matches[0].end(1), 'wire'))
+        newPorts = currentPorts[len(ports):]
+        if newPorts:
+            if portGroup is None or not all(isinstance(port, Ioport) for port in ports):
+                raise SpliceError("ports cannot be appended to module '%s'"%(moduleDef.name))
+            self.addListEntries(portGroup[0], portGroup[1], newPorts)
+
+    # Port args appended to an instance
+    def addPortArgEdits(self, instanceList, instance, numPortArgs):
+        portArgs = instance.portlist
+        if len(portArgs) == numPortArgs:
+            return
+        if len(portArgs) < numPortArgs or len(instanceList.instances) != 1 or \
+           any(portArg.portname is None for portArg in portArgs):
+            raise SpliceError("port args cannot be appended to instance '%s'"%(instance.name))
+        lineStart, _ = self.getLineSpan(instanceList.lineno)
+        match = re.compile(r'(?<![\w$.])%s\s*(?:\[[^\]]*\]\s*)?\('%(re.escape(instance.name))).search(self.code, lineStart)
+        if match is None:
+            raise SpliceError("instance '%s' not found"%(instance.name))
+        depth = 0
+        for parenthesis in self.PARENTHESIS.finditer(self.code, match.end() - 1):
+            if parenthesis.group(0) == '(':
+                depth += 1
+            elif parenthesis.group(0) == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+        if depth != 0:
+            raise SpliceError("port list of instance '%s' not closed"%(instance.name))
+        self.addListEntries(match.end() - 1, parenthesis.start(), portArgs[numPortArgs:])
 
 
 # Class to generate modified verilog code based on added pragmas
@@ -294,9 +1571,69 @@ class VerilogGenerator(LogStructuring):
                        fileToModuleToSignalToControl,  
                        observePort, 
                        controlPortIn, 
-                       controlPortOut) -> None:
+                       controlPortOut,
+                       executor                 = None,
+                       moduleToInputPorts       = None,
+                       prunedModuleToInputPorts = None,
+                       passThroughFiles         = (),
+                       coalesceRanges           = False,
+                       emitter                  = "codegen",
+                       hardlinkUnmodified       = False,
+                       lowMemory                = False,
+                       memoryMonitor            = None,
+                       moduleToSummary          = None,
+                       observePipelineInterval  = 0,
+                       pipelineClock            = "clk",
+                       insertionMode            = "hierarchy",
+                       jobs                     = 1,
+                       sourceStore              = None) -> None:
         self.filewiseAst           = filewiseAst
+        # "hierarchy": Hooks are threaded through the hierarchy to the top module ports
+        # "simulation": Only the modules with controlled signals get their (stage one) splice points. The hooks are
+        #               reached through hierarchical references instead (see SimulationTapGenerator)
+        assert insertionMode in ("hierarchy", "simulation"), "Unknown insertion mode '%s'"%(insertionMode)
+        self.insertionMode         = insertionMode
+        # Observe pipelining: The observe port of every module at a multiple of <INTERVAL> levels above the leaves is
+        # registered on <pipelineClock> (0: Combinational observe path, 1: Registered at every hierarchy boundary)
+        # <pipelineClock> is an input port of the top module. Below the top module it is threaded as <observePort>_clk
+        assert observePipelineInterval >= 0, "Observe pipeline interval should be a non-negative integer"
+        self.observePipelineInterval = observePipelineInterval
+        self.pipelineClock         = pipelineClock
+        self.pipelineClockPort     = observePort + "_clk"
+        self.moduleToHeight        = {}  # <MODULE> --> Longest instance path down to a leaf (leaves: 0)
+        self.moduleToObserveStages = {}  # <MODULE> --> Register stages at the observe port of the module (0/1)
+        self.moduleToObserveLatency = {} # <MODULE> --> Register stages between every observed signal and the observe port
+        self.moduleToPipelineClock = {}  # <MODULE> --> True if the module (or its sub-hierarchy) has observe pipeline stages
+        # Emit one concatenation assignment per internal port instead of one assignment per signal slice
+        self.coalesceRanges        = coalesceRanges
+        # "codegen": Files are generated from the AST, "splice": Edits are spliced into the source text (see VerilogSpliceEmitter)
+        assert emitter in ("codegen", "splice"), "Unknown emitter '%s'"%(emitter)
+        self.emitter               = emitter
+        # Files without edits are hard-linked (instead of copied) to the output folder
+        self.hardlinkUnmodified    = hardlinkUnmodified
+        self.fileToSpliceSnapshot  = {}  # <FILE> --> SpliceSnapshot (splice emitter only)
+        # Source files read by the parser - The splice emitter splices the edits into their text
+        self.sourceStore           = sourceStore if sourceStore is not None else SourceStore()
+        # Low memory mode: Every file is written (and its AST released) as soon as stage two is done with its modules
+        self.lowMemory             = lowMemory
+        self.memoryMonitor         = memoryMonitor if memoryMonitor is not None else PeakMemoryMonitor(enabled=False)
+        self.emittedFiles          = set()
+        self.pendingWrites         = []  # [(<FILE>, <FUTURE>)] of the files written in the process pool (codegen/splice workers)
+        # Interface summaries of (not parsed) partition roots - Their widths and signal maps are taken from the summary
+        self.moduleToSummary       = moduleToSummary if moduleToSummary else {}
         self.moduleWiseAst         = moduleWiseAst
+        # Pruned modules (see DeclarationScanner) are not parsed and get no hooks. Their input ports come from the scan
+        prunedModuleToInputPorts   = prunedModuleToInputPorts if prunedModuleToInputPorts else {}
+        self.prunedModules         = set(prunedModuleToInputPorts)
+        self.passThroughFiles      = passThroughFiles
+        # Input port names per module - Lets stage one run on a single file (in a pool worker) without the full module map
+        if moduleToInputPorts is None:
+            moduleToInputPorts = self.getModuleToInputPorts(moduleWiseAst)
+            for module in prunedModuleToInputPorts:
+                moduleToInputPorts.setdefault(module, prunedModuleToInputPorts[module])
+        self.moduleToInputPorts    = moduleToInputPorts
+        self.executor              = executor
+        self.jobs                  = jobs  # Workers of the executor
         self.outputFolder          = outputFolder
         self.fileToModuleToSignalToObserve = fileToModuleToSignalToObserve
         self.fileToModuleToSignalToControl = fileToModuleToSignalToControl
@@ -322,10 +1659,12 @@ class VerilogGenerator(LogStructuring):
     def createInternalObserveTaps(self, signalToObserve, sruDriverList):
         assignmentList = []
         observePortIndexLastInt = 0
+        # Signals in SRU driver list (hash set for membership checks)
+        sruDriverSignals = {controlSignal[0] for controlSignal in sruDriverList}
         for signal in signalToObserve:
             # If the observed signal is in SRU driver list:
             # -- assign <observePortInt[<range>]> = <signal[OBSERVE_START:OBSERVE_END]> 
-            if any(signal == controlSignal[0] for controlSignal in sruDriverList):
+            if signal in sruDriverSignals:
                 logging.info("Observed port '%s' also found to be a controlled input. Tapping in to '%s' for observation" %(signal, \
                                                                                                                             signal))
                 signalRangeLhs = signalToObserve[signal][0]
@@ -343,7 +1682,7 @@ class VerilogGenerator(LogStructuring):
             # If the counter part (+/- "_controlled") of observed signal is in SRU sriver list as well,
             # -- we should observe this as the original observed signal would be the patched version
             # -- assign <observePortInt[<range>]> = <couterPart(signal)[OBSERVE_START:OBSERVE_END]> 
-            elif any(self.signalCounterPart(signal) == controlSignal[0] for controlSignal in sruDriverList):
+            elif self.signalCounterPart(signal) in sruDriverSignals:
                 logging.info("Observed port '%s' also found to be a controlled reg/wire/output. Tapping in to '%s' for observation" %(signal,  \
                                                                                                                self.signalCounterPart(signal)))
                 signalRangeLhs = signalToObserve[signal][0]
@@ -376,6 +1715,8 @@ class VerilogGenerator(LogStructuring):
                                 IntConst(signalRangeRhs))
                 assignmentList.append(Assign(Lhs, Rhs))
                 observePortIndexLastInt += (signalRangeLhs - signalRangeRhs) + 1
+        if self.coalesceRanges:
+            assignmentList = self.coalesceTapAssignments(assignmentList, portIsDriven=True)
         return assignmentList, observePortIndexLastInt - 1
     
     def signalCounterPart(self, signal):
@@ -426,20 +1767,44 @@ class VerilogGenerator(LogStructuring):
             controlPortOutIndexLastInt += ((signalRangeLhs - signalRangeRhs)) + 1
         
         assert (controlPortOutIndexLastInt == controlPortInIndexLastInt), "Control port in/out cannot be of different size"
+        if self.coalesceRanges:
+            assignmentList = self.coalesceTapAssignments(assignmentList[:len(sruDriverList)], portIsDriven=True) + \
+                             self.coalesceTapAssignments(assignmentList[len(sruDriverList):], portIsDriven=False)
         return assignmentList, controlPortInIndexLastInt - 1, controlPortOutIndexLastInt - 1
+
+    # Coalescing pass - Merges the tap assignments of an internal port into one concatenation assignment
+    # The tap slices of a port are adjacent and cover it from bit 0 in order of the assignment list, so
+    # the slices of the other side concatenated MSB first make up the whole port
+    # -- portIsDriven (observe/control in):   assign <port>_int = {<signalN[..]>, ..., <signal1[..]>}
+    # -- otherwise    (control out):          assign {<signalN'[..]>, ..., <signal1'[..]>} = <port>_int
+    def coalesceTapAssignments(self, assignmentList, portIsDriven):
+        if len(assignmentList) < 2:
+            return assignmentList
+        if portIsDriven:
+            port   = assignmentList[0].left.var.name
+            slices = [assignment.right for assignment in reversed(assignmentList)]
+            return [Assign(Identifier(port), Concat(slices))]
+        else:
+            port   = assignmentList[0].right.var.name
+            slices = [assignment.left for assignment in reversed(assignmentList)]
+            return [Assign(Concat(slices), Identifier(port))]
     
+    # Returns {<MODULE>: {<INPUT PORT NAME>}} for all modules in the module map
+    @staticmethod
+    def getModuleToInputPorts(moduleWiseAst):
+        moduleToInputPorts = {}
+        for moduleName in moduleWiseAst:
+            moduleToInputPorts[moduleName] = frozenset(port.first.name for port in moduleWiseAst[moduleName].portlist.ports \
+                                                       if isinstance(getattr(port, 'first', None), Input))
+        return moduleToInputPorts
+
     # Method to check if a given signal name is an input to the module with given module name
     def isInputPortofModule(self, signalName, moduleName):
-        moduleAst = self.moduleWiseAst[moduleName]
-        for port in moduleAst.portlist.ports:
-            if isinstance(port.first, Input):
-                if port.first.name == signalName:
-                    return True
-        return False
-
-    # This method is particulary used by traverseAstToModifyLHS for checking port modification
+        return signalName in self.moduleToInputPorts[moduleName]
+
+    # This method is particulary used by renameControlledSignals for checking port modification
     # of module instance arguments. if an argument is an input of the instance, it shouldn't be
-    # modified by traverseAstToModifyLHS.  
+    # modified when renaming drivers.  
     def isInputTapToInstance(self, astNode, signal):
         if isinstance(astNode, Instance):
             portArgs    = astNode.portlist
@@ -451,32 +1816,26 @@ class VerilogGenerator(LogStructuring):
         else:
             return False
 
-    # This method recursively traverses the AST to modify all drivers of a signal
-    def traverseAstToModifyLHS(self, astNode, signal):
-        # traverse the node if the nod is valid and it is not branching to an RHS assignment
-        if astNode is not None and not isinstance(astNode, Rvalue) and not self.isInputTapToInstance(astNode, signal):
-            childNodes = astNode.children()
-            if isinstance(astNode, Identifier):
-                if astNode.name == signal:
-                    astNode.name = astNode.name  + "_controlled"
-            for child in childNodes:
-                self.traverseAstToModifyLHS(child, signal)
-        return
-
-    # This method recursively traverses the AST to modify all loads of a signal
-    def traverseAstToModifyRHS(self, astNode, signal):
-        # traverse the node if the nod is valid and it is not branching to an RHS assignment
-        if astNode is not None and not isinstance(astNode, Lvalue):
-            childNodes = astNode.children()
-            if isinstance(astNode, Identifier):
-                if astNode.name == signal:
-                    astNode.name = astNode.name  + "_controlled"
-            for child in childNodes:
-                self.traverseAstToModifyRHS(child, signal)
-        return
- 
+    # This method renames drivers (LHS) or loads (RHS) of controlled signals to <signal>_controlled
+    # All renames of a module are applied in one pass over an identifier index of the module
+    # -- Drivers: Identifiers outside of any Rvalue, skipping connections of instances for which the signal is an input port
+    # -- Loads:   Identifiers outside of any Lvalue
+    # renames - [(<SIGNAL>, "LHS"/"RHS")]
+    def renameControlledSignals(self, moduleDef, renames):
+        index = IdentifierIndex(moduleDef)
+        for signal, side in renames:
+            for node, underLvalue, underRvalue, instance in index.getOccurrences(signal):
+                # A node shared at several places of the AST is renamed only once
+                if node.name != signal:
+                    continue
+                if side == "LHS" and not underRvalue and not self.isInputTapToInstance(instance, signal):
+                    node.name = signal + "_controlled"
+                elif side == "RHS" and not underLvalue:
+                    node.name = signal + "_controlled"
+
     # Method to modify controlled IO ports
-    def ModifyControlledIOPorts(self, moduleDef, signalToControl):
+    # Drivers/loads to be renamed are recorded in renames (see renameControlledSignals)
+    def ModifyControlledIOPorts(self, moduleDef, signalToControl, renames):
         items = list(moduleDef.items) # Items include Decls, Assigns, Blocks etc
         ports = list(moduleDef.portlist.ports)
         newPorts = []
@@ -507,7 +1866,7 @@ class VerilogGenerator(LogStructuring):
                                           signed = port.second.signed,             \
                                           dimensions = port.second.dimensions),))
                     items.insert(0, newWire)
-                    self.traverseAstToModifyRHS(moduleDef, port.first.name)
+                    renames.append((port.first.name, "RHS"))
                     sruDriverList.append((port.second.name,                        \
                                           signalToControl[port.second.name][1],    \
                                           signalToControl[port.second.name][2]))
@@ -540,7 +1899,7 @@ class VerilogGenerator(LogStructuring):
                                           signed = port.second.signed,             \
                                           dimensions = port.second.dimensions),))
                     items.insert(0, newWire)
-                    self.traverseAstToModifyLHS(moduleDef, port.first.name)
+                    renames.append((port.first.name, "LHS"))
                     sruDriverList.append((port.second.name + "_controlled",        \
                                           signalToControl[port.second.name][1],    \
                                           signalToControl[port.second.name][2]))
@@ -580,7 +1939,7 @@ class VerilogGenerator(LogStructuring):
                                        width = port.first.width)
                     newPort   = Ioport(first=newOutput, second=portWire)
                     newPorts.append(newPort) 
-                    self.traverseAstToModifyLHS(moduleDef, port.first.name)
+                    renames.append((port.first.name, "LHS"))
                     sruDriverList.append((port.second.name + "_controlled",        \
                                           signalToControl[port.second.name][1],    \
                                           signalToControl[port.second.name][2]))
@@ -597,7 +1956,8 @@ class VerilogGenerator(LogStructuring):
         
 
     # Method to modify controlled Reg/Wire declarations
-    def ModifyControlledRegAndWires(self, moduleDef, signalToControl):
+    # Drivers to be renamed are recorded in renames (see renameControlledSignals)
+    def ModifyControlledRegAndWires(self, moduleDef, signalToControl, renames):
         items = list(moduleDef.items)
         newItems = []      # item list (to be converted to tuple) for new AST items
         sruDriverList = [] # Drivers of SRU input (each would be a tuple (signal, start_index, end_index))
@@ -621,7 +1981,7 @@ class VerilogGenerator(LogStructuring):
                                                                                            regDecl.name,                       \
                                                                                            signalToControl[regDecl.name][0]))
                         logging.info("--- Bypassing driver of '%s' via register '%s' for SRU control"%(regDecl.name,           \
-                                                                                                       regDecl.name,+ "_controlled"))
+                                                                                                       regDecl.name + "_controlled"))
                         # Making a Declaration node passed with list (tuple) of the new register - A_controlled
                         newReg =  Decl((Reg(name = regDecl.name + "_controlled",   \
                                             width = regDecl.width,                 \
@@ -634,7 +1994,7 @@ class VerilogGenerator(LogStructuring):
                                             dimensions = regDecl.dimensions),))
                         newItems.append(newWire)
                         newItems.append(newReg)
-                        self.traverseAstToModifyLHS(moduleDef, regDecl.name)
+                        renames.append((regDecl.name, "LHS"))
                         sruDriverList.append((regDecl.name + "_controlled",        \
                                               signalToControl[regDecl.name][1],
                                               signalToControl[regDecl.name][2]))
@@ -675,7 +2035,7 @@ class VerilogGenerator(LogStructuring):
                                             dimensions = wireDecl.dimensions),))
                         newItems.append(newWire)
                         newItems.append(oldWire)    
-                        self.traverseAstToModifyLHS(moduleDef, wireDecl.name)
+                        renames.append((wireDecl.name, "LHS"))
                         sruDriverList.append((wireDecl.name + "_controlled",        \
                                               signalToControl[wireDecl.name][1],
                                               signalToControl[wireDecl.name][2]))
@@ -693,8 +2053,11 @@ class VerilogGenerator(LogStructuring):
 
 
     def addModuleWiseLogicForControl(self, moduleNode, signalToControl):
-        sruDriverListIo, sruLoadListIo   = self.ModifyControlledIOPorts(moduleNode, signalToControl)
-        sruDriverListDec, sruLoadListDec = self.ModifyControlledRegAndWires(moduleNode, signalToControl)
+        renames = []
+        sruDriverListIo, sruLoadListIo   = self.ModifyControlledIOPorts(moduleNode, signalToControl, renames)
+        sruDriverListDec, sruLoadListDec = self.ModifyControlledRegAndWires(moduleNode, signalToControl, renames)
+        if renames:
+            self.renameControlledSignals(moduleNode, renames)
 
         assignmentList, controlPortInIndexLastInt, controlPortOutIndexLastInt = self.createInternalControlTaps((sruDriverListIo + sruDriverListDec),
                                                                                                       (sruLoadListIo + sruLoadListDec))
@@ -729,6 +2092,8 @@ class VerilogGenerator(LogStructuring):
     # This method does module-wise observe/control hooks for per-module signals
     def stageOneFileModifier(self, file, moduleToSignalToObserve, moduleToSignalToControl):
         ast = self.filewiseAst[file]
+        if self.emitter == "splice":
+            self.fileToSpliceSnapshot[file] = SpliceSnapshot(ast)
         moduleToControlWidth = {}
         moduleToObserveWidth = {}
         moduleDefs = ast.description.definitions
@@ -746,243 +2111,461 @@ class VerilogGenerator(LogStructuring):
     
     # Returns AST for a module (if it exists): Else returns None
     def getAstForModule(self, moduleName):
-        for file in self.fileToModuleToSignalToObserve:
-            ast = self.filewiseAst[file]
-            for definition in ast.description.definitions:
-                if isinstance(definition, ModuleDef):
-                    if definition.name == moduleName:
-                        return definition
-        return None
+        return self.moduleWiseAst.get(moduleName)
+
+    # Returns {<INSTANCE NAME>: [Instance]} for the instances in the items of a module
+    @staticmethod
+    def getInstancesByName(items):
+        nameToInstances = {}
+        for item in items:
+            if isinstance(item, InstanceList):
+                for instance in item.instances:
+                    if isinstance(instance, Instance):
+                        nameToInstances.setdefault(instance.name, []).append(instance)
+        return nameToInstances
     
-    # Recursive method to insert control/observe hooks in the instantiation hierarchy
-    # Sample Instance Tree - {(TOP, Sample):{(inst1, Or):None, (inst2, And):None}}
-    #            (TOP, Sample)     
-    #                 /\
-    #                /  \
-    #      (inst1, Or)  (inst2, And)
-    #               |    |
-    #               |    |
-    #            None    None
-    # In the above tree, top-module Sample has an instance each of Or and And modules, which are leaf instances
-    # Node with value - None indicates a leaf module
-    def insertInterModuleHooks(self, moduleNode, treeNode, 
-                                                 moduleToObserveWidth,  \
-                                                 moduleToControlWidth):   
-        if moduleNode is not None:
-            # The moduleNode is the current module being processed
-            # The value of treeNode[moduleNode] are the instances of other modules within that module
-            childModules = treeNode[moduleNode]
-            # Tracker for width of observe/control ports hooked up in each instance within the module
-            controlPortInstIndex = 0
-            observePortInstIndex = 0
-            # Get the AST for the current module being processed
-            items = list(self.getAstForModule(moduleNode[1]).items)
-            ports = list(self.getAstForModule(moduleNode[1]).portlist.ports)
-            if childModules is not None:  # Check if this is not a leaf module
-                # Non-leaf module operations
-                for childModule in childModules:
-                    logging.info("--- Adding instance hooks for child module instance '%s(%s)' of module '%s'" %(childModule[0], childModule[1], \
-                                                                                                                 moduleNode[1]))
-                    # Recurse through child instances before hooking up ports (only if it has not been traversed before
-                    # no prevent duplicate hooks)
-                    # This would update the controlPortWidth and observePortWidth 
-                    if childModule[1] not in self.moduleToControlPortWidth and \
-                       childModule[1] not in self.moduleToObservePortWidth:
-                        self.insertInterModuleHooks(childModule, {childModule: treeNode[moduleNode][childModule]},  \
-                                                                  moduleToObserveWidth,                             \
-                                                                  moduleToControlWidth)
-
-                    for item in items:
-                        if isinstance(item, InstanceList):
-                            instances = item.instances
-                            for instance in instances:
-                                if isinstance(instance, Instance):
-                                    # Ports in the instance portlist
-                                    instancePorts = list(instance.portlist)
-                                    if instance.name == childModule[0] and self.moduleToObservePortWidth[childModule[1]] > 0:
-                                        # Port-Mapping for observe port
-                                        lhs = self.observePort
-                                        Rhs = Partselect(Identifier(self.observePort + "_inst"),                                                      \
-                                                         msb = IntConst(observePortInstIndex + self.moduleToObservePortWidth[childModule[1]] - 1),    \
-                                                         lsb = IntConst(observePortInstIndex))
-                                        
-                                        instancePorts.append(PortArg(lhs,Rhs))
-                                        observePortInstIndex += self.moduleToObservePortWidth[childModule[1]]
-                                    if instance.name == childModule[0] and self.moduleToControlPortWidth[childModule[1]] > 0:
-                                        # Port-Mapping for ControlIn port
-                                        lhs = self.controlPortIn
-                                        Rhs = Partselect(Identifier(self.controlPortIn + "_inst"),                                                    \
-                                                         msb = IntConst(controlPortInstIndex + self.moduleToControlPortWidth[childModule[1]] - 1),    \
-                                                         lsb = IntConst(controlPortInstIndex))
-                                        instancePorts.append(PortArg(lhs,Rhs))
-                                        # Port-Mapping for ControlOut port
-                                        lhs = self.controlPortOut
-                                        Rhs = Partselect(Identifier(self.controlPortOut + "_inst"),                                                   \
-                                                         msb = IntConst(controlPortInstIndex + self.moduleToControlPortWidth[childModule[1]] - 1),    \
-                                                         lsb = IntConst(controlPortInstIndex))
-                                        instancePorts.append(PortArg(lhs,Rhs))
-                                        controlPortInstIndex += self.moduleToControlPortWidth[childModule[1]]
-                                    instance.portlist = tuple(instancePorts)
-            # The mmodule has both internal and instance-wise observe ports
-            if observePortInstIndex > 0 and moduleToObserveWidth[moduleNode[1]] > 0:
-                logging.info("-- Module '%s' has both internal and instance-wise observe hooks - Concatenating them to the module observe port" %(moduleNode[1]))
-                # Declare <observePort>_inst wire
-                observePortInstWidth = Width(msb = IntConst(observePortInstIndex - 1), lsb = IntConst(0))
-                items.insert(0, Decl((Wire(self.observePort + "_inst", width = observePortInstWidth),)))
-                # Add assignment: assign <observePort> = {<obervePort>_int, <observePort>_inst}
-                lhs = Identifier(self.observePort)
-                concatWireOne = Identifier(self.observePort + "_int")
-                concatWireTwo = Identifier(self.observePort + "_inst")
-                rhs = Concat([concatWireOne, concatWireTwo])
-                items.append(Assign(lhs, rhs))
-                self.getAstForModule(moduleNode[1]).items = tuple(items)
-            # The module has instance-wise but no internal observe ports
-            elif observePortInstIndex > 0 and moduleToObserveWidth[moduleNode[1]] == 0:
-                logging.info("-- Module '%s' has only observe hooks from instances - Assigning them to the module observe port" %(moduleNode[1]))
-                # Declare <observePort>_inst wire
-                observePortInstWidth = Width(msb = IntConst(observePortInstIndex - 1), lsb = IntConst(0))
-                items.insert(0, Decl((Wire(self.observePort + "_inst", width = observePortInstWidth),)))
-                # Add assignment: assign <observePort> = <observePort>_inst
-                lhs = Identifier(self.observePort)
-                rhs = Identifier(self.observePort + "_inst")
-                items.append(Assign(lhs, rhs))
-                self.getAstForModule(moduleNode[1]).items = tuple(items)
-
-            # The module has internal but no instance-wise observe ports
-            elif observePortInstIndex == 0 and moduleToObserveWidth[moduleNode[1]] > 0:
-                logging.info("-- Module '%s' has only internal observe hooks - Assigning them to the module observe port" %(moduleNode[1]))
-                # Add assignment: assign <observePort> = <observePort>_int
-                lhs = Identifier(self.observePort)
-                rhs = Identifier(self.observePort + "_int")
-                items.append(Assign(lhs, rhs))  
-                self.getAstForModule(moduleNode[1]).items = tuple(items)  
+    # Method to insert control/observe hooks of one module in the instantiation hierarchy
+    # Modules are processed in post-order (see stageTwoFileModifier), so the observe/control port
+    # widths of all modules instantiated in a module are known when the module is processed
+    # Sample hierarchy - Top-module Sample has an instance each of Or and And modules, which are leaf modules
+    #   Sample --> [(inst1, Or), (inst2, And)]
+    #   Or     --> []
+    #   And    --> []
+    def insertInterModuleHooks(self, moduleName, moduleToObserveWidth, moduleToControlWidth):
+        # Instances of other modules within the module being processed - [(<INSTANCE NAME>, <MODULE>)]
+        childModules = self.instanceTree.getInstances(moduleName)
+        # Tracker for width of observe/control ports hooked up in each instance within the module
+        controlPortInstIndex = 0
+        observePortInstIndex = 0
+        # Get the AST for the current module being processed
+        moduleDef = self.getAstForModule(moduleName)
+        items = list(moduleDef.items)
+        ports = list(moduleDef.portlist.ports)
+        nameToInstances = self.getInstancesByName(items)
+        # Observe port slices of the instances - [(<INSTANCE NAME>, <MODULE>, <MSB>, <LSB>)]
+        observeSlices = []
+        for childModule in childModules:
+            logging.info("--- Adding instance hooks for child module instance '%s(%s)' of module '%s'" %(childModule[0], childModule[1], \
+                                                                                                         moduleName))
+            for instance in nameToInstances.get(childModule[0], ()):
+                # Ports in the instance portlist
+                instancePorts = list(instance.portlist)
+                if self.moduleToObservePortWidth[childModule[1]] > 0:
+                    # Port-Mapping for observe port
+                    lhs = self.observePort
+                    Rhs = Partselect(Identifier(self.observePort + "_inst"),                                                      \
+                                     msb = IntConst(observePortInstIndex + self.moduleToObservePortWidth[childModule[1]] - 1),    \
+                                     lsb = IntConst(observePortInstIndex))
+                                
+                    instancePorts.append(PortArg(lhs,Rhs))
+                    observeSlices.append((childModule[0], childModule[1], \
+                                          observePortInstIndex + self.moduleToObservePortWidth[childModule[1]] - 1, observePortInstIndex))
+                    observePortInstIndex += self.moduleToObservePortWidth[childModule[1]]
+                if self.moduleToControlPortWidth[childModule[1]] > 0:
+                    # Port-Mapping for ControlIn port
+                    lhs = self.controlPortIn
+                    Rhs = Partselect(Identifier(self.controlPortIn + "_inst"),                                                    \
+                                     msb = IntConst(controlPortInstIndex + self.moduleToControlPortWidth[childModule[1]] - 1),    \
+                                     lsb = IntConst(controlPortInstIndex))
+                    instancePorts.append(PortArg(lhs,Rhs))
+                    # Port-Mapping for ControlOut port
+                    lhs = self.controlPortOut
+                    Rhs = Partselect(Identifier(self.controlPortOut + "_inst"),                                                   \
+                                     msb = IntConst(controlPortInstIndex + self.moduleToControlPortWidth[childModule[1]] - 1),    \
+                                     lsb = IntConst(controlPortInstIndex))
+                    instancePorts.append(PortArg(lhs,Rhs))
+                    controlPortInstIndex += self.moduleToControlPortWidth[childModule[1]]
+                if self.moduleToPipelineClock[childModule[1]]:
+                    # Port-Mapping for the observe pipeline clock
+                    instancePorts.append(PortArg(self.pipelineClockPort, Identifier(self.getPipelineClock(moduleName))))
+                instance.portlist = tuple(instancePorts)
+        # Final observe/control port width     
+        self.moduleToObservePortWidth[moduleName] = observePortInstIndex + moduleToObserveWidth[moduleName]
+        self.moduleToControlPortWidth[moduleName] = controlPortInstIndex + moduleToControlWidth[moduleName]
+        self.setObservePipelineStages(moduleName, childModules)
+        # Observe pipelining: Slices of the observe port with a lower latency are delayed to the latency of the module
+        observeInst, observeInt = self.getBalancedObserveSlices(moduleName, items, observeSlices, moduleToObserveWidth[moduleName])
+        # The mmodule has both internal and instance-wise observe ports
+        if observePortInstIndex > 0 and moduleToObserveWidth[moduleName] > 0:
+            logging.info("-- Module '%s' has both internal and instance-wise observe hooks - Concatenating them to the module observe port" %(moduleName))
+            # Declare <observePort>_inst wire
+            observePortInstWidth = Width(msb = IntConst(observePortInstIndex - 1), lsb = IntConst(0))
+            items.insert(0, Decl((Wire(self.observePort + "_inst", width = observePortInstWidth),)))
+            # Add assignment: assign <observePort> = {<obervePort>_int, <observePort>_inst}
+            lhs = Identifier(self.observePort)
+            rhs = Concat([observeInt, observeInst])
+            items.extend(self.getObservePortDrivers(moduleName, lhs, rhs))
+            moduleDef.items = tuple(items)
+        # The module has instance-wise but no internal observe ports
+        elif observePortInstIndex > 0 and moduleToObserveWidth[moduleName] == 0:
+            logging.info("-- Module '%s' has only observe hooks from instances - Assigning them to the module observe port" %(moduleName))
+            # Declare <observePort>_inst wire
+            observePortInstWidth = Width(msb = IntConst(observePortInstIndex - 1), lsb = IntConst(0))
+            items.insert(0, Decl((Wire(self.observePort + "_inst", width = observePortInstWidth),)))
+            # Add assignment: assign <observePort> = <observePort>_inst
+            lhs = Identifier(self.observePort)
+            items.extend(self.getObservePortDrivers(moduleName, lhs, observeInst))
+            moduleDef.items = tuple(items)
+
+        # The module has internal but no instance-wise observe ports
+        elif observePortInstIndex == 0 and moduleToObserveWidth[moduleName] > 0:
+            logging.info("-- Module '%s' has only internal observe hooks - Assigning them to the module observe port" %(moduleName))
+            # Add assignment: assign <observePort> = <observePort>_int
+            lhs = Identifier(self.observePort)
+            items.extend(self.getObservePortDrivers(moduleName, lhs, observeInt))
+            moduleDef.items = tuple(items)  
 
-            else:
-                logging.info("-- Module '%s' has neither internal not instance-wise observe hooks" %(moduleNode[1]))
-
-            # The module has both internal and instance-wise control ports
-            if controlPortInstIndex > 0 and moduleToControlWidth[moduleNode[1]] > 0:
-                logging.info("-- Module '%s' has both internal and instance-wise control hooks - Concatenating them to the module control port" %(moduleNode[1]))
-                # Declare wire <controlPortIn_inst>
-                controlPortInstWidth = Width(msb = IntConst(controlPortInstIndex - 1), lsb = IntConst(0))
-                items.insert(0, Decl((Wire(self.controlPortIn + "_inst", width = controlPortInstWidth),)))
-                # Add assignment assign <controlPortIn> = {<controlPortIn>_int, <controlPortIn>_inst}
-                lhs = Identifier(self.controlPortIn)
-                concatWireOne = Identifier(self.controlPortIn + "_int")
-                concatWireTwo = Identifier(self.controlPortIn + "_inst")
-                rhs = Concat([concatWireOne, concatWireTwo])
-                items.append(Assign(lhs, rhs))
-                # Declare wire <controlPortOut_inst>
-                items.insert(0, Decl((Wire(self.controlPortOut + "_inst", width = controlPortInstWidth),)))
-                # Add assignment assign {<controlPortOut>_int, <controlPortOut>_inst} = <controlPortOut>
-                concatWireOne = Identifier(self.controlPortOut + "_int")
-                concatWireTwo = Identifier(self.controlPortOut + "_inst")
-                lhs = Concat([concatWireOne, concatWireTwo])
-                rhs = Identifier(self.controlPortOut)
-                items.append(Assign(lhs, rhs))
-                self.getAstForModule(moduleNode[1]).items = tuple(items)
-
-            # The module has instance-wise but no internal control ports
-            elif controlPortInstIndex > 0 and moduleToControlWidth[moduleNode[1]] == 0:
-                logging.info("-- Module '%s' has only control hooks from instances - Assigning them to the module control port" %(moduleNode[1]))
-                # Declare wire <controlPortIn_inst>
-                controlPortInstWidth = Width(msb = IntConst(controlPortInstIndex - 1), lsb = IntConst(0))
-                items.insert(0, Decl((Wire(self.controlPortIn + "_inst", width = controlPortInstWidth),)))
-                # Add assignment assign <controlPortIn> = <controlPortIn>_inst
-                lhs = Identifier(self.controlPortIn)
-                rhs = Identifier(self.controlPortIn + "_inst")
-                items.append(Assign(lhs, rhs))
-                # Add assignment assign <controlPortOut> = <controlPortOut>_inst
-                lhs = Identifier(self.controlPortOut + "_inst")
-                rhs = Identifier(self.controlPortOut)
-                items.append(Assign(lhs, rhs))
-                self.getAstForModule(moduleNode[1]).items = tuple(items)  
-
-            # The module has internal but no instance-wise control ports
-            elif controlPortInstIndex == 0 and moduleToControlWidth[moduleNode[1]] > 0:
-                logging.info("-- Module '%s' has only internal control hooks - Assigning them to the module control port" %(moduleNode[1]))
-                # Add assignment assign <controlPortIn> = <controlPortIn>_int
-                lhs = Identifier(self.controlPortIn)
-                rhs = Identifier(self.controlPortIn + "_int")
-                items.append(Assign(lhs, rhs))
-                # Add assignment assign <controlPortOut> = <controlPortOut>_int
-                lhs = Identifier(self.controlPortOut + "_int")
-                rhs = Identifier(self.controlPortOut)
-                items.append(Assign(lhs, rhs))
-                self.getAstForModule(moduleNode[1]).items = tuple(items)  
-            else:
-                logging.info("-- Module '%s' has neither internal nor instance-wise control hooks" %(moduleNode[1]))
-
-            # Final observe/control port width     
-            self.moduleToObservePortWidth[moduleNode[1]] = observePortInstIndex + moduleToObserveWidth[moduleNode[1]]
-            self.moduleToControlPortWidth[moduleNode[1]] = controlPortInstIndex + moduleToControlWidth[moduleNode[1]]
-            
-            # IO Port declaration for the current module
-            if observePortInstIndex != 0 or moduleToObserveWidth[moduleNode[1]] != 0: 
-                logging.info("-- Inserting primary observe port in module '%s'" %(moduleNode[1]))
-                observePortTotalWidth = Width(msb = IntConst(self.moduleToObservePortWidth[moduleNode[1]]-1), lsb = IntConst(0))
-                observePortOutput = Ioport(Output(self.observePort, width = observePortTotalWidth))
-                ports.append(observePortOutput)
-                self.getAstForModule(moduleNode[1]).portlist.ports = tuple(ports)
-            if  controlPortInstIndex != 0 or moduleToControlWidth[moduleNode[1]] != 0:
-                logging.info("-- Inserting primary control port in module '%s'" %(moduleNode[1]))
-                controlPortTotalWidth = Width(msb = IntConst(self.moduleToControlPortWidth[moduleNode[1]]-1), lsb = IntConst(0))
-                controlPortOutput = Ioport(Output(self.controlPortIn, width =controlPortTotalWidth))
-                controlPortInput  = Ioport(Input(self.controlPortOut, width =controlPortTotalWidth))
-                ports.extend([controlPortOutput, controlPortInput])
-                self.getAstForModule(moduleNode[1]).portlist.ports = tuple(ports)
-            
         else:
-            return
-    
+            logging.info("-- Module '%s' has neither internal not instance-wise observe hooks" %(moduleName))
+
+        # The module has both internal and instance-wise control ports
+        if controlPortInstIndex > 0 and moduleToControlWidth[moduleName] > 0:
+            logging.info("-- Module '%s' has both internal and instance-wise control hooks - Concatenating them to the module control port" %(moduleName))
+            # Declare wire <controlPortIn_inst>
+            controlPortInstWidth = Width(msb = IntConst(controlPortInstIndex - 1), lsb = IntConst(0))
+            items.insert(0, Decl((Wire(self.controlPortIn + "_inst", width = controlPortInstWidth),)))
+            # Add assignment assign <controlPortIn> = {<controlPortIn>_int, <controlPortIn>_inst}
+            lhs = Identifier(self.controlPortIn)
+            concatWireOne = Identifier(self.controlPortIn + "_int")
+            concatWireTwo = Identifier(self.controlPortIn + "_inst")
+            rhs = Concat([concatWireOne, concatWireTwo])
+            items.append(Assign(lhs, rhs))
+            # Declare wire <controlPortOut_inst>
+            items.insert(0, Decl((Wire(self.controlPortOut + "_inst", width = controlPortInstWidth),)))
+            # Add assignment assign {<controlPortOut>_int, <controlPortOut>_inst} = <controlPortOut>
+            concatWireOne = Identifier(self.controlPortOut + "_int")
+            concatWireTwo = Identifier(self.controlPortOut + "_inst")
+            lhs = Concat([concatWireOne, concatWireTwo])
+            rhs = Identifier(self.controlPortOut)
+            items.append(Assign(lhs, rhs))
+            moduleDef.items = tuple(items)
+
+        # The module has instance-wise but no internal control ports
+        elif controlPortInstIndex > 0 and moduleToControlWidth[moduleName] == 0:
+            logging.info("-- Module '%s' has only control hooks from instances - Assigning them to the module control port" %(moduleName))
+            # Declare wire <controlPortIn_inst>
+            controlPortInstWidth = Width(msb = IntConst(controlPortInstIndex - 1), lsb = IntConst(0))
+            items.insert(0, Decl((Wire(self.controlPortIn + "_inst", width = controlPortInstWidth),)))
+            # Add assignment assign <controlPortIn> = <controlPortIn>_inst
+            lhs = Identifier(self.controlPortIn)
+            rhs = Identifier(self.controlPortIn + "_inst")
+            items.append(Assign(lhs, rhs))
+            # Add assignment assign <controlPortOut> = <controlPortOut>_inst
+            lhs = Identifier(self.controlPortOut + "_inst")
+            rhs = Identifier(self.controlPortOut)
+            items.append(Assign(lhs, rhs))
+            moduleDef.items = tuple(items)  
+
+        # The module has internal but no instance-wise control ports
+        elif controlPortInstIndex == 0 and moduleToControlWidth[moduleName] > 0:
+            logging.info("-- Module '%s' has only internal control hooks - Assigning them to the module control port" %(moduleName))
+            # Add assignment assign <controlPortIn> = <controlPortIn>_int
+            lhs = Identifier(self.controlPortIn)
+            rhs = Identifier(self.controlPortIn + "_int")
+            items.append(Assign(lhs, rhs))
+            # Add assignment assign <controlPortOut> = <controlPortOut>_int
+            lhs = Identifier(self.controlPortOut + "_int")
+            rhs = Identifier(self.controlPortOut)
+            items.append(Assign(lhs, rhs))
+            moduleDef.items = tuple(items)  
+        else:
+            logging.info("-- Module '%s' has neither internal nor instance-wise control hooks" %(moduleName))
+
+        # IO Port declaration for the current module
+        if observePortInstIndex != 0 or moduleToObserveWidth[moduleName] != 0: 
+            logging.info("-- Inserting primary observe port in module '%s'" %(moduleName))
+            observePortTotalWidth = Width(msb = IntConst(self.moduleToObservePortWidth[moduleName]-1), lsb = IntConst(0))
+            observePortOutput = Ioport(Output(self.observePort, width = observePortTotalWidth))
+            ports.append(observePortOutput)
+            moduleDef.portlist.ports = tuple(ports)
+        if  controlPortInstIndex != 0 or moduleToControlWidth[moduleName] != 0:
+            logging.info("-- Inserting primary control port in module '%s'" %(moduleName))
+            controlPortTotalWidth = Width(msb = IntConst(self.moduleToControlPortWidth[moduleName]-1), lsb = IntConst(0))
+            controlPortOutput = Ioport(Output(self.controlPortIn, width =controlPortTotalWidth))
+            controlPortInput  = Ioport(Input(self.controlPortOut, width =controlPortTotalWidth))
+            ports.extend([controlPortOutput, controlPortInput])
+            moduleDef.portlist.ports = tuple(ports)
+        if self.moduleToPipelineClock[moduleName] and moduleName != self.topModule:
+            logging.info("-- Inserting observe pipeline clock port in module '%s'" %(moduleName))
+            ports.append(Ioport(Input(self.pipelineClockPort)))
+            moduleDef.portlist.ports = tuple(ports)
+
+    # Observe pipelining - A module is a pipeline boundary if its height (above the leaves) is one less than a multiple
+    # of the pipeline interval, so that leaf modules are registered for an interval of 1
+    # NOTE: Only the observe path is pipelined. The control ports are never registered, as the SRU (control_port_in ->
+    #       Qin -> Qout -> control_port_out) is in the functional path of every controlled signal and a register stage
+    #       on it would delay the design itself
+    # The latency of a module is the deepest latency of its instances plus its own stage (see getBalancedObserveSlices)
+    def setObservePipelineStages(self, moduleName, childModules):
+        isBoundary = self.observePipelineInterval > 0 and \
+                     (self.moduleToHeight[moduleName] + 1) % self.observePipelineInterval == 0
+        self.moduleToObserveStages[moduleName] = 1 if isBoundary and self.moduleToObservePortWidth[moduleName] > 0 else 0
+        self.moduleToObserveLatency[moduleName] = self.moduleToObserveStages[moduleName] + \
+                                                  max([self.moduleToObserveLatency[child] for _, child in childModules], default=0)
+        self.moduleToPipelineClock[moduleName] = self.moduleToObserveStages[moduleName] > 0 or \
+                                                 any(self.moduleToPipelineClock[child] for _, child in childModules)
+
+    # Clock of the observe pipeline registers in a module - The pipeline clock in the top module, the threaded clock port below it
+    def getPipelineClock(self, moduleName):
+        return self.pipelineClock if moduleName == self.topModule else self.pipelineClockPort
+
+    # Delay balancing of the observe pipeline - Every observed signal of a module reaches its observe port with the same latency
+    # The observe port slice of every instance (and the internal observe signals, latency 0) is delayed by the difference of its
+    # latency to the deepest latency among the instances (reg <observePort>_<INSTANCE NAME>_dly<N> / <observePort>_int_dly<N>)
+    # Returns the (delayed) expressions of the instance-wise and internal observe signals. The delay registers are added to <items>
+    def getBalancedObserveSlices(self, moduleName, items, observeSlices, internalWidth):
+        depth = self.moduleToObserveLatency[moduleName] - self.moduleToObserveStages[moduleName]
+        observeInst = Identifier(self.observePort + "_inst")
+        if any(self.moduleToObserveLatency[childModule] < depth for _, childModule, _, _ in observeSlices):
+            slices = []
+            for instanceName, childModule, msb, lsb in observeSlices:
+                instSlice = Partselect(Identifier(self.observePort + "_inst"), msb = IntConst(msb), lsb = IntConst(lsb))
+                slices.insert(0, self.getDelayedObserveSlice(moduleName, items, self.observePort + "_" + instanceName, instSlice, \
+                                                             msb - lsb + 1, depth - self.moduleToObserveLatency[childModule]))
+            observeInst = Concat(slices)
+        observeInt = self.getDelayedObserveSlice(moduleName, items, self.observePort + "_int", Identifier(self.observePort + "_int"), \
+                                                 internalWidth, depth if internalWidth > 0 else 0)
+        return observeInst, observeInt
+
+    # Returns <expr> delayed by <delay> register stages (reg <name>_dly0 ... <name>_dly<delay-1>). The registers are added to <items>
+    def getDelayedObserveSlice(self, moduleName, items, name, expr, width, delay):
+        if delay > 0:
+            logging.info("-- Delaying observe slice '%s' of module '%s' by %d stage(s) (observe pipeline balancing)" %(name, moduleName, delay))
+        senseList = SensList([Sens(Identifier(self.getPipelineClock(moduleName)), type = 'posedge')])
+        for stage in range(delay):
+            delayReg = "%s_dly%d"%(name, stage)
+            items.append(Decl((Reg(delayReg, width = Width(msb = IntConst(width - 1), lsb = IntConst(0))),)))
+            items.append(Always(senseList, NonblockingSubstitution(Lvalue(Identifier(delayReg)), Rvalue(expr))))
+            expr = Identifier(delayReg)
+        return expr
+
+    # Returns the items driving the observe port of a module - A continuous assignment, or a register stage
+    # (reg <observePort>_pipe, clocked on the pipeline clock) at pipeline boundaries
+    def getObservePortDrivers(self, moduleName, lhs, rhs):
+        if self.moduleToObserveStages[moduleName] == 0:
+            return [Assign(lhs, rhs)]
+        logging.info("-- Registering the observe port of module '%s' (observe pipeline boundary)" %(moduleName))
+        pipeWidth = Width(msb = IntConst(self.moduleToObservePortWidth[moduleName] - 1), lsb = IntConst(0))
+        pipeReg   = Identifier(self.observePort + "_pipe")
+        senseList = SensList([Sens(Identifier(self.getPipelineClock(moduleName)), type = 'posedge')])
+        return [Decl((Reg(self.observePort + "_pipe", width = pipeWidth),)),                          \
+                Always(senseList, NonblockingSubstitution(Lvalue(pipeReg), Rvalue(rhs))),              \
+                Assign(lhs, Identifier(self.observePort + "_pipe"))]
+
+    # Returns the height of every module of the hierarchy (longest instance path down to a leaf)
+    # Summarized partition roots take the height of their sub-hierarchy from the summary
+    def getModuleHeights(self):
+        moduleToHeight = {}
+        for moduleName in self.instanceTree.getModulesInPostOrder():
+            if moduleName in self.moduleToSummary:
+                moduleToHeight[moduleName] = self.moduleToSummary[moduleName]['HEIGHT']
+                continue
+            childHeights = [moduleToHeight[child] for _, child in self.instanceTree.getInstances(moduleName)]
+            moduleToHeight[moduleName] = max(childHeights) + 1 if childHeights else 0
+        return moduleToHeight
+
     def stageTwoFileModifier(self, moduleToObserveWidth, moduleToControlWidth):
-        # Top module node in instance tree
-        topModuleNode = ("TOP", self.topModule)
-        self.insertInterModuleHooks(moduleNode           = topModuleNode,        \
-                                    treeNode             = self.instanceTree,    \
-                                    moduleToControlWidth = moduleToControlWidth, \
-                                    moduleToObserveWidth = moduleToObserveWidth)
+        # Pruned modules have no hooks (no pragmas in their sub-hierarchy) and are never traversed
+        # Summarized partition roots are not traversed either, their hooks are in the stored files
+        for module in self.prunedModules:
+            summary = self.moduleToSummary.get(module)
+            self.moduleToObservePortWidth[module] = summary['OBSERVE_WIDTH'] if summary else 0
+            self.moduleToControlPortWidth[module] = summary['CONTROL_WIDTH'] if summary else 0
+            self.moduleToPipelineClock[module]    = summary['PIPELINE_CLOCK'] if summary else False
+            self.moduleToObserveLatency[module]   = self.getPipelineDepth(summary['OBSERVE_PIPELINE_MAP']) if summary else 0
+        if self.observePipelineInterval > 0:
+            assert self.pipelineClock in self.moduleToInputPorts[self.topModule], \
+                   "Pipeline clock '%s' is not an input port of the top module '%s'"%(self.pipelineClock, self.topModule)
+        self.moduleToHeight = self.getModuleHeights()
+        modulesInPostOrder = [moduleName for moduleName in self.instanceTree.getModulesInPostOrder() \
+                              if moduleName not in self.prunedModules]
+        if self.lowMemory:
+            # Number of modules of each file still to be processed. Files outside of the hierarchy are final already
+            fileToPendingModules = {file: 0 for file in self.fileToModuleToSignalToObserve}
+            for moduleName in modulesInPostOrder:
+                fileToPendingModules[self.moduleWiseAst.getFile(moduleName)] += 1
+            for file in fileToPendingModules:
+                if fileToPendingModules[file] == 0:
+                    self.streamFile(file)
+        # Every unique module is processed once, after all modules it instantiates
+        for moduleName in modulesInPostOrder:
+            self.insertInterModuleHooks(moduleName           = moduleName,           \
+                                        moduleToControlWidth = moduleToControlWidth, \
+                                        moduleToObserveWidth = moduleToObserveWidth)
+            if self.lowMemory:
+                file = self.moduleWiseAst.getFile(moduleName)
+                fileToPendingModules[file] -= 1
+                if fileToPendingModules[file] == 0:
+                    self.streamFile(file)
+
+    # Low memory mode: Writes a file whose modules are final and releases its AST. Leaf modules come first in the
+    # post-order, so their ASTs are released as soon as their port widths are known
+    def streamFile(self, file):
+        if self.executor is not None:
+            # The AST is pickled to the worker in the background. The reference is dropped once it is sent
+            worker, task = (spliceWorker, self.getSpliceTask(file)) if self.emitter == "splice" else \
+                           (codegenWorker, (self.filewiseAst[file], self.getModifiedFilename(file)))
+            self.pendingWrites.append((file, self.executor.submit(worker, task)))
+        elif self.emitter == "splice":
+            self.genSplicedVerilogFile(file)
+        else:
+            self.genModifiedVerilogFile(file)
+        self.emittedFiles.add(file)
+        self.moduleWiseAst.releaseFile(file, self.filewiseAst.pop(file))
+        self.fileToSpliceSnapshot.pop(file, None)
         
     # Method to generate the observe/control signal map and signal to control type map
-    # This map is used by ASAP compiler to generate bitstream  
-    def getSignalList(self, treeNode, currentModule, moduleToObserveSignal, moduleToControlSignal, observeIndex = 0, controlIndex = 0):
-        if treeNode is not None:
-            observeSignalList = {}
-            controlSignalList = {}
-            # Records the type of controlled signal (signal/clock)
-            signalToControlType = {}
-            observeSignals = moduleToObserveSignal[currentModule[1]]
-            controlSignals = moduleToControlSignal[currentModule[1]]
-
-            # First: Update the list with signals of internal instances sequentially (use recursion)
-            if treeNode[currentModule] is not None:
-                for child in treeNode[currentModule]:
-                    observeChild, controlChild,    \
-                    controlTypeChild,              \
-                    observeIndex, controlIndex = self.getSignalList(treeNode[currentModule], \
-                                                                    child,                   \
-                                                                    moduleToObserveSignal,   \
-                                                                    moduleToControlSignal,   \
-                                                                    observeIndex,            \
-                                                                    controlIndex)
-                    observeSignalList.update(observeChild)
-                    controlSignalList.update(controlChild)
-                    signalToControlType.update(controlTypeChild)
-            # Second: Update the list with all the signals in the current module being processed
+    # This map is used by ASAP compiler to generate bitstream
+    # The layout of every unique module (own signals placed after the signals of its instances) is computed once,
+    # per-instance maps are then expanded iteratively with the absolute observe/control offsets of each instance
+    # Returns observeSignalList, controlSignalList, signalToControlType, observeWidth, controlWidth
+    # The observe pipeline stages of every observed signal (same layout as observeSignalList) are kept in observePipelineMap
+    def getSignalList(self, moduleToObserveSignal, moduleToControlSignal):
+        self.moduleToSignalToObserve = moduleToObserveSignal
+        self.moduleToSignalToControl = moduleToControlSignal
+        self.moduleToObserveSize, self.moduleToControlSize = self.getSignalSizes()
+        observeSignalList, controlSignalList, signalToControlType, self.observePipelineMap = self.expandSignalMaps("TOP", self.topModule, 0, 0)
+        return observeSignalList, controlSignalList, signalToControlType, \
+               self.moduleToObserveSize[self.topModule], self.moduleToControlSize[self.topModule]
+
+    # Returns the observe/control sizes of every module of the hierarchy (own signals plus the signals of its instances)
+    def getSignalSizes(self):
+        moduleToObserveSignal = self.moduleToSignalToObserve
+        moduleToControlSignal = self.moduleToSignalToControl
+        moduleToObserveSize = {}
+        moduleToControlSize = {}
+        for moduleName in self.instanceTree.getModulesInPostOrder():
+            if moduleName in self.moduleToSummary:
+                moduleToObserveSize[moduleName] = self.moduleToSummary[moduleName]['OBSERVE_WIDTH']
+                moduleToControlSize[moduleName] = self.moduleToSummary[moduleName]['CONTROL_WIDTH']
+                continue
+            # Pruned modules have no observe/control signals
+            observeSignals = moduleToObserveSignal.get(moduleName, {})
+            controlSignals = moduleToControlSignal.get(moduleName, {})
+            moduleToObserveSize[moduleName] = sum(moduleToObserveSize[child] for _, child in self.instanceTree.getInstances(moduleName)) + \
+                                              sum(observeSignals[signal][0] - observeSignals[signal][1] + 1 for signal in observeSignals)
+            moduleToControlSize[moduleName] = sum(moduleToControlSize[child] for _, child in self.instanceTree.getInstances(moduleName)) + \
+                                              sum(controlSignals[signal][1] - controlSignals[signal][2] + 1 for signal in controlSignals)
+        return moduleToObserveSize, moduleToControlSize
+
+    # Returns the observe/control/type/observe pipeline stage maps ({<INSTANCE NAME>: <MAP>}) of an instance of a module
+    # placed at the given offsets. The stages of a signal are counted up to the observe port of the instance
+    def expandSignalMaps(self, rootInstanceName, rootModule, rootObserveIndex, rootControlIndex):
+        moduleToObserveSignal = self.moduleToSignalToObserve
+        moduleToControlSignal = self.moduleToSignalToControl
+        moduleToObserveSize   = self.moduleToObserveSize
+        moduleToControlSize   = self.moduleToControlSize
+        observeSignalList   = {}
+        controlSignalList   = {}
+        signalToControlType = {}
+        observeStageList    = {}
+        # (<INSTANCE NAME>, <MODULE>, <PARENT OBSERVE MAP>, <PARENT CONTROL MAP>, <PARENT TYPE MAP>, <PARENT STAGE MAP>,
+        #  <OBSERVE OFFSET>, <CONTROL OFFSET>, <PIPELINE STAGES ABOVE THE INSTANCE>)
+        stack = [(rootInstanceName, rootModule, observeSignalList, controlSignalList, signalToControlType, observeStageList, \
+                  rootObserveIndex, rootControlIndex, 0)]
+        while stack:
+            instanceName, moduleName, parentObserve, parentControl, parentType, parentStage, observeIndex, controlIndex, stages = stack.pop()
+            observeMap, controlMap, typeMap, stageMap = {}, {}, {}, {}
+            parentObserve[instanceName] = observeMap
+            parentControl[instanceName] = controlMap
+            parentType[instanceName]    = typeMap
+            parentStage[instanceName]   = stageMap
+            # Summarized partition roots: Maps of the summary moved to the offsets of the instance
+            if moduleName in self.moduleToSummary:
+                observeMap.update(self.shiftSignalMap(self.moduleToSummary[moduleName]['OBSERVABILITY_MAP'], observeIndex))
+                controlMap.update(self.shiftSignalMap(self.moduleToSummary[moduleName]['CONTROLLABILITY_MAP'], controlIndex))
+                typeMap.update(self.moduleToSummary[moduleName]['CONTROL_TYPE_MAP'])
+                stageMap.update(self.shiftStageMap(self.moduleToSummary[moduleName]['OBSERVE_PIPELINE_MAP'], stages))
+                continue
+            # Every observed signal of the instance reaches its observe port after the latency of the module. The stages above an
+            # instance of a shallower module include its delay registers (see getBalancedObserveSlices)
+            stages += self.moduleToObserveLatency.get(moduleName, 0)
+            # First: Signals of internal instances in order of instantiation (their maps are filled when popped)
+            children = []
+            for childInstance, childModule in self.instanceTree.getInstances(moduleName):
+                children.append((childInstance, childModule, observeMap, controlMap, typeMap, stageMap, observeIndex, controlIndex, \
+                                 stages - self.moduleToObserveLatency.get(childModule, 0)))
+                observeMap[childInstance] = None  # Placeholder - keeps the order of instances ahead of signals
+                controlMap[childInstance] = None
+                typeMap[childInstance]    = None
+                stageMap[childInstance]   = None
+                observeIndex += moduleToObserveSize[childModule]
+                controlIndex += moduleToControlSize[childModule]
+            # Second: Signals in the current module being processed
+            observeSignals = moduleToObserveSignal.get(moduleName, {})
+            controlSignals = moduleToControlSignal.get(moduleName, {})
             for signal in observeSignals:
-                observeSignalList.update({signal:[observeSignals[signal][0] - observeSignals[signal][1] + observeIndex, observeIndex]})
+                observeMap.update({signal:[observeSignals[signal][0] - observeSignals[signal][1] + observeIndex, observeIndex]})
+                stageMap.update({signal:stages})
                 observeIndex +=  observeSignals[signal][0] - observeSignals[signal][1] + 1
             for signal in controlSignals:
-                controlSignalList.update({signal:[controlSignals[signal][1] - controlSignals[signal][2] + controlIndex, controlIndex]})
-                signalToControlType.update({signal:controlSignals[signal][0]})
+                controlMap.update({signal:[controlSignals[signal][1] - controlSignals[signal][2] + controlIndex, controlIndex]})
+                typeMap.update({signal:controlSignals[signal][0]})
                 controlIndex +=  controlSignals[signal][1] - controlSignals[signal][2] + 1
-            
-            return {currentModule[0]:observeSignalList}, {currentModule[0]:controlSignalList}, \
-                   {currentModule[0]:signalToControlType}, observeIndex, controlIndex
-        else:
-            return None, None
-
-
+            stack.extend(reversed(children))
+        return observeSignalList, controlSignalList, signalToControlType, observeStageList
+
+    # Returns a copy of a (nested) observe/control map with all [<MSB>, <LSB>] entries moved by an offset
+    @staticmethod
+    def shiftSignalMap(signalMap, offset):
+        return {key: VerilogGenerator.shiftSignalMap(value, offset) if isinstance(value, dict) else [value[0] + offset, value[1] + offset] \
+                for key, value in signalMap.items()}
+
+    # Returns a copy of a (nested) observe pipeline stage map with all stage counts increased by the stages above it
+    @staticmethod
+    def shiftStageMap(stageMap, stages):
+        return {key: VerilogGenerator.shiftStageMap(value, stages) if isinstance(value, dict) else value + stages \
+                for key, value in stageMap.items()}
+
+    # Returns the largest number of observe pipeline stages in a (nested) stage map
+    @staticmethod
+    def getPipelineDepth(stageMap):
+        return max([VerilogGenerator.getPipelineDepth(value) if isinstance(value, dict) else value \
+                    for value in stageMap.values()], default=0)
+
+    # Returns the interface summary of a module (see InterfaceSummaryStore) - Widths and the maps of an instance at offset 0
+    # None if the module is not part of the instrumented hierarchy
+    def getPartitionSummary(self, module):
+        if module not in self.moduleToObserveSize:
+            return None
+        observeSignalList, controlSignalList, signalToControlType, observeStageList = self.expandSignalMaps(module, module, 0, 0)
+        return {'OBSERVE_WIDTH'        : self.moduleToObserveSize[module],
+                'CONTROL_WIDTH'        : self.moduleToControlSize[module],
+                'OBSERVABILITY_MAP'    : observeSignalList[module],
+                'CONTROLLABILITY_MAP'  : controlSignalList[module],
+                'CONTROL_TYPE_MAP'     : signalToControlType[module],
+                'OBSERVE_PIPELINE_MAP' : observeStageList[module],
+                'HEIGHT'               : self.moduleToHeight[module],
+                'PIPELINE_CLOCK'       : self.moduleToPipelineClock[module]}
+
+
+
+    # Stage one on the process pool - Every file is modified independently in a worker. The modified
+    # ASTs replace the parent's copies (file and module maps) so that stage two works on them
+    # Returns {<FILE>: (moduleToObserveWidth, moduleToControlWidth)}
+    def stageOneParallel(self):
+        files = self.getStageOneFiles()
+        logging.info("Stage 1 AST modification: Inserting internal observe/control hooks in %d file(s) in the process pool"%(len(files)))
+        tasks = [(file,                                      \
+                  self.filewiseAst[file],                    \
+                  self.fileToModuleToSignalToObserve[file],  \
+                  self.fileToModuleToSignalToControl[file],  \
+                  self.moduleToInputPorts,                   \
+                  self.observePort,                          \
+                  self.controlPortIn,                        \
+                  self.controlPortOut,                       \
+                  self.coalesceRanges,                       \
+                  self.emitter) for file in files]
+        fileToStageOneResult = {}
+        for file, (ast, snapshot, moduleToObserveWidth, moduleToControlWidth) in zip(files, self.executor.map(stageOneWorker, tasks, \
+                                                                                             chunksize=getChunkSize(len(tasks), self.jobs))):
+            self.filewiseAst[file] = ast
+            self.moduleWiseAst.updateFile(file, ast)
+            if snapshot is not None:
+                self.fileToSpliceSnapshot[file] = snapshot
+            fileToStageOneResult[file] = (moduleToObserveWidth, moduleToControlWidth)
+        logging.info("Stage 1 AST modification complete")
+        return fileToStageOneResult
 
     # This method modifies the AST for inserting observation/control hooks
     #            __________________________                   __________________________
@@ -999,50 +2582,203 @@ class VerilogGenerator(LogStructuring):
         consolidatedModuletoSignalToObserve = {}
         consolidatedModuletoSignalToControl = {}
         # STAGE - 1 (Intra module hook insertion)
+        self.memoryMonitor.startPhase("Stage 1 insertion")
+        stageOneFiles = set(self.getStageOneFiles())
+        if self.executor is not None:
+            fileToStageOneResult = self.stageOneParallel()
         for file in self.fileToModuleToSignalToObserve :
-            logging.info("Stage 1 AST modification: Inserting internal observe/control hooks in file - %s" %(file))
-            moduleToObserveWidthPerFile, moduleToControlWidthPerFile =  self.stageOneFileModifier(file, self.fileToModuleToSignalToObserve[file], 
-                                                                                                        self.fileToModuleToSignalToControl[file])
-            logging.info("Stage 1 AST modification complete")
+            if file not in stageOneFiles:
+                # Simulation insertion mode: No splice points in the file
+                moduleToObserveWidthPerFile, moduleToControlWidthPerFile = {}, {}
+            elif self.executor is not None:
+                moduleToObserveWidthPerFile, moduleToControlWidthPerFile = fileToStageOneResult[file]
+            else:
+                logging.info("Stage 1 AST modification: Inserting internal observe/control hooks in file - %s" %(file))
+                moduleToObserveWidthPerFile, moduleToControlWidthPerFile =  self.stageOneFileModifier(file, self.fileToModuleToSignalToObserve[file], 
+                                                                                                            self.fileToModuleToSignalToControl[file])
+                logging.info("Stage 1 AST modification complete")
             moduleToObserveWidth.update(moduleToObserveWidthPerFile)
             moduleToControlWidth.update(moduleToControlWidthPerFile)
             consolidatedModuletoSignalToObserve.update(self.fileToModuleToSignalToObserve[file])
             consolidatedModuletoSignalToControl.update(self.fileToModuleToSignalToControl[file])
 
+        # The modified ASTs live until written - Keep them away from the cyclic GC
+        if self.lowMemory:
+            gc.freeze()
+
         # STAGE - 2 (Inter module hook insertion)   
-        logging.info("Stage 2 AST modification: Connecting cross-module observe/control hooks")
-        self.stageTwoFileModifier(moduleToObserveWidth, \
-                                  moduleToControlWidth)
-        logging.info("Stage 2 AST modification complete")
+        self.memoryMonitor.startPhase("Stage 2 insertion")
+        if self.insertionMode == "simulation":
+            logging.info("Stage 2 AST modification skipped (simulation insertion mode)")
+        else:
+            logging.info("Stage 2 AST modification: Connecting cross-module observe/control hooks")
+            self.stageTwoFileModifier(moduleToObserveWidth, \
+                                      moduleToControlWidth)
+            logging.info("Stage 2 AST modification complete")
 
         # Generate signalMap
-        observeSignalList, controlSignalList, signalToControlType, observeWidth, controlWidth = self.getSignalList(self.instanceTree,                    \
-                                                                                                                   ("TOP", self.topModule),              \
-                                                                                                                   consolidatedModuletoSignalToObserve,  \
+        observeSignalList, controlSignalList, signalToControlType, observeWidth, controlWidth = self.getSignalList(consolidatedModuletoSignalToObserve,  \
                                                                                                                    consolidatedModuletoSignalToControl)
         logging.info("Net width of control signal = %d"%(controlWidth))
         logging.info("Net width of observe signal = %d"%(observeWidth))
         return observeSignalList, controlSignalList, signalToControlType
 
+    # Returns the files to be modified in stage one - In the simulation insertion mode, only the files with controlled
+    # signals (their splice points) are modified. Observed signals are tapped by hierarchical references
+    def getStageOneFiles(self):
+        if self.insertionMode != "simulation":
+            return list(self.fileToModuleToSignalToObserve)
+        return [file for file in self.fileToModuleToSignalToControl \
+                if any(self.fileToModuleToSignalToControl[file].values())]
+
+    # Returns the modules with stage one hooks (internal observe/control ports)
+    def getModifiedModules(self):
+        return {module for file in self.getStageOneFiles() for module in self.fileToModuleToSignalToControl[file]}
+
+    def getModifiedFilename(self, file):
+        return self.outputFolder + "/" + os.path.basename(file)
+
     def genModifiedVerilogFile(self, file):
         logging.info("Generating modified verilog files...")
-        codegen = ASTCodeGenerator()
-        newFilename = self.outputFolder + "/" + os.path.basename(file)
-        verilogCode = codegen.visit(self.filewiseAst[file])
-        with open(newFilename, "w") as f:
-            f.write(str(verilogCode))
+        codegenWorker((self.filewiseAst[file], self.getModifiedFilename(file)))
         logging.info("File write completed.")
+
+    # Splices the edits of a file into its source text (see spliceWorker)
+    def genSplicedVerilogFile(self, file):
+        self.completeSplicedFile(file, spliceWorker(self.getSpliceTask(file)))
+
+    # Splice task of a file - The source text is taken from the source store (every file is read once)
+    def getSpliceTask(self, file):
+        return (self.sourceStore.getSourceText(file), self.filewiseAst[file], self.fileToSpliceSnapshot[file], self.getModifiedFilename(file))
+
+    # Logs the result of a splice task. Files without edits are copied (or hard-linked) unchanged
+    def completeSplicedFile(self, file, result):
+        newFilename, spliced, error = result
+        if error is not None:
+            logging.warning("Splice emitter: %s in file %s - Generated the file from the AST instead"%(error, file))
+        if spliced is None:
+            logging.info("No edits in file %s - Copying it unchanged"%(file))
+            self.copyUnmodifiedFile(file, newFilename)
+        else:
+            logging.info("File write completed - %s"%(newFilename))
+
+    # Copies a file byte for byte, or hard-links it if enabled (falls back to copying across file systems)
+    def copyUnmodifiedFile(self, file, newFilename):
+        if self.hardlinkUnmodified:
+            if os.path.exists(newFilename):
+                if os.path.samefile(file, newFilename):
+                    return
+                os.remove(newFilename)
+            try:
+                os.link(file, newFilename)
+                return
+            except OSError:
+                logging.info("Hard link of %s failed - Copying it instead"%(file))
+        shutil.copyfile(file, newFilename)
     
     # This method generates new verilog code for each file in the filelist
     def generateVerilog(self):
         logging.info("Starting cross-module patch hook insertion.....")
         observeSignalList, controlSignalList, signalToControlType = self.astModifier()
         logging.info("Cross module patch hook insertion complete")
-        for file in self.fileToModuleToSignalToObserve:
-            self.genModifiedVerilogFile(file)
+        self.memoryMonitor.startPhase("Code generation")
+        # Files already written in low memory mode (see streamFile) are skipped
+        files = [file for file in self.getStageOneFiles() if file not in self.emittedFiles]
+        if self.emitter == "splice" and self.executor is not None:
+            logging.info("Splicing the edits into the source files in the process pool...")
+            tasks = [self.getSpliceTask(file) for file in files]
+            for file, result in zip(files, self.executor.map(spliceWorker, tasks, chunksize=getChunkSize(len(tasks), self.jobs))):
+                self.completeSplicedFile(file, result)
+        elif self.emitter == "splice":
+            logging.info("Splicing the edits into the source files...")
+            for file in files:
+                self.genSplicedVerilogFile(file)
+        elif self.executor is not None:
+            logging.info("Generating modified verilog files in the process pool...")
+            tasks = [(self.filewiseAst[file], self.getModifiedFilename(file)) for file in files]
+            for newFilename in self.executor.map(codegenWorker, tasks, chunksize=getChunkSize(len(tasks), self.jobs)):
+                logging.info("File write completed - %s"%(newFilename))
+        else:
+            for file in files:
+                self.genModifiedVerilogFile(file)
+        for file, future in self.pendingWrites:
+            if self.emitter == "splice":
+                self.completeSplicedFile(file, future.result())
+            else:
+                logging.info("File write completed - %s"%(future.result()))
+        # Files with only pruned modules (and files without splice points in the simulation insertion mode) are copied unchanged
+        unmodifiedFiles = [file for file in self.fileToModuleToSignalToObserve if file not in set(self.getStageOneFiles())]
+        for file in list(self.passThroughFiles) + unmodifiedFiles:
+            logging.info("Copying unmodified file - %s"%(file))
+            self.copyUnmodifiedFile(file, self.getModifiedFilename(file))
         return observeSignalList, controlSignalList, signalToControlType
 
 
+#------------------------------------------ PROCESS POOL ------------------------------------------#
+# Workers are module-level functions so that they can be pickled by the (spawn based) process pool.
+# The spawn start method is used as the pool may be created from the GUI (threads + Tk in the parent)
+def createProcessPool(jobs):
+    return ProcessPoolExecutor(max_workers=jobs, mp_context=multiprocessing.get_context('spawn'))
+
+# Tasks are handed out in chunks (~4 chunks per worker) to amortize the IPC overhead per task
+def getChunkSize(numTasks, jobs):
+    return max(1, numTasks // (jobs * 4))
+
+# Worker: Finds the pragma lines in a (line aligned) chunk of a file
+# Returns the pragma lines (line numbers relative to the chunk) and the number of newlines in the chunk
+def pragmaScanWorker(task):
+    file, start, end = task
+    with open(file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        return PragmaExtractor.findPragmaLines(buffer, start, end), SourceStore.countLines(buffer, start, end)
+
+# Worker: Parses preprocessed text with the (per process) cached parser
+def parseWorker(task):
+    text, file, tableDir = task
+    return VerilogParserPool(tableDir).parse(text, file)
+
+# Worker: Stage one (intra module) hook insertion for one file
+# Returns the modified AST (and its splice snapshot) along with the per-module observe/control widths for stage two
+def stageOneWorker(task):
+    file, ast, moduleToSignalToObserve, moduleToSignalToControl, moduleToInputPorts, \
+    observePort, controlPortIn, controlPortOut, coalesceRanges, emitter = task
+    generator = VerilogGenerator({file: ast}, None, None, None, None,                \
+                                 {file: moduleToSignalToObserve},                    \
+                                 {file: moduleToSignalToControl},                    \
+                                 observePort, controlPortIn, controlPortOut,         \
+                                 moduleToInputPorts = moduleToInputPorts,            \
+                                 coalesceRanges     = coalesceRanges,                   \
+                                 emitter            = emitter)
+    moduleToObserveWidth, moduleToControlWidth = generator.stageOneFileModifier(file, moduleToSignalToObserve, \
+                                                                                      moduleToSignalToControl)
+    # The splice snapshot references nodes of the AST, so both are pickled in one result
+    return ast, generator.fileToSpliceSnapshot.get(file), moduleToObserveWidth, moduleToControlWidth
+
+# Worker: Generates verilog code from an AST and writes it to the given file
+def codegenWorker(task):
+    ast, newFilename = task
+    verilogCode = ASTCodeGenerator().visit(ast)
+    with open(newFilename, "w") as f:
+        f.write(str(verilogCode))
+    return newFilename
+
+# Worker: Splices the edits of a file into its source text (see VerilogSpliceEmitter) and writes it to the given file
+# Falls back to code generation if the edits cannot be spliced. The AST and its snapshot are pickled in one task
+# Returns (<NEW FILENAME>, <SPLICED>, <SPLICE ERROR>) - <SPLICED> is None (nothing written) if the file has no edits
+def spliceWorker(task):
+    text, ast, snapshot, newFilename = task
+    try:
+        splicedText = VerilogSpliceEmitter(text, snapshot).getSplicedText()
+    except SpliceError as error:
+        codegenWorker((ast, newFilename))
+        return newFilename, False, str(error)
+    if splicedText is None:
+        return newFilename, None, None
+    with open(newFilename, 'w', encoding='utf-8', errors='surrogateescape', newline='') as f:
+        f.write(splicedText)
+    return newFilename, True, None
+#--------------------------------------------------------------------------------------------------#
+
+
 # This class reorders the controlMap to generate controls in the order requried by SRU
 # If the arch requirements of SRU changes, this has to be changed.
 class ControlSignalMappingModel:
@@ -1086,6 +2822,308 @@ class ControlSignalMappingModel:
         return reorderedControlMap, currentIndex
 
 
+# This class packs the observed signals into SMU segments (OBSERVE_PACKING)
+# The observe port layout follows the hierarchy traversal, so signals may straddle SMU segment boundaries (the SMU
+# compiler rejects patterns on them) and segments may be partially used. The packed layout is the input vector of the
+# SMU - patchBlock permutes the observe port into it:
+# -- Signals wider than a segment cannot be within one segment. They start at a segment boundary
+# -- All other signals are packed first fit decreasing, so none of them straddles a segment boundary
+class ObservePacker:
+    def __init__(self, observeSignalList, segmentSize) -> None:
+        assert segmentSize > 0, "SMU_SEGMENT_SIZE should be a positive integer"
+        self.observeSignalList = observeSignalList
+        self.segmentSize       = segmentSize
+        leaves                 = self.getLeaves(observeSignalList)
+        self.observeWidth      = sum(msb - lsb + 1 for keys, (msb, lsb) in leaves)
+        self.keysToPosition    = {}  # (<"TOP">, <INSTANCE>, ..., <SIGNAL>) --> <PACKED LSB>
+        self.segmentToUsed     = []  # <SEGMENT> --> Number of packed bits (from the segment LSB)
+        # Segments by free bits (<FREE BITS> --> heap of segment indices) - The first fitting segment of a signal is
+        # the smallest index over the heaps with at least as many free bits
+        freeToSegments         = [[] for free in range(segmentSize + 1)]
+        wideLeaves             = [leaf for leaf in leaves if leaf[1][0] - leaf[1][1] + 1 >  segmentSize]
+        narrowLeaves           = [leaf for leaf in leaves if leaf[1][0] - leaf[1][1] + 1 <= segmentSize]
+        for keys, (msb, lsb) in wideLeaves:
+            width = msb - lsb + 1
+            self.keysToPosition[keys] = len(self.segmentToUsed) * segmentSize
+            self.segmentToUsed.extend([segmentSize] * (width // segmentSize))
+            if width % segmentSize:
+                self.addSegment(freeToSegments, width % segmentSize)
+        # Decreasing width (stable, so equal widths keep the port order)
+        for keys, (msb, lsb) in sorted(narrowLeaves, key=lambda leaf: leaf[1][1] - leaf[1][0]):
+            width     = msb - lsb + 1
+            fitting   = [heap[0] for heap in freeToSegments[width:] if heap]
+            if fitting:
+                segment = min(fitting)
+                heapq.heappop(freeToSegments[segmentSize - self.segmentToUsed[segment]])
+            else:
+                self.segmentToUsed.append(0)
+                segment = len(self.segmentToUsed) - 1
+            self.keysToPosition[keys]     = segment * segmentSize + self.segmentToUsed[segment]
+            self.segmentToUsed[segment]  += width
+            heapq.heappush(freeToSegments[segmentSize - self.segmentToUsed[segment]], segment)
+        self.packedSignalList  = self.getPackedMap(observeSignalList)
+        self.packedWidth       = max([self.keysToPosition[keys] + msb - lsb + 1 for keys, (msb, lsb) in leaves] + [0])
+        self.numSegments       = len(self.segmentToUsed)
+        self.unpackedSegments  = math.ceil((self.getMaximalIndex(leaves) + 1) / segmentSize)
+        self.straddling        = [keys for keys, (msb, lsb) in narrowLeaves if msb // segmentSize != lsb // segmentSize]
+        self.utilization       = self.observeWidth / (self.numSegments * segmentSize) if self.numSegments else 1.0
+        logging.info("Observe packing - %d segment(s) of %d bits (unpacked: %d segment(s), %d straddling signal(s)), utilization %.1f%%"%( \
+                     self.numSegments, segmentSize, self.unpackedSegments, len(self.straddling), 100 * self.utilization))
+        for keys, (msb, lsb) in wideLeaves:
+            logging.warning("Observed signal %s (%d bits) is wider than a SMU segment - Aligned to a segment boundary"%( \
+                            ".".join(keys), msb - lsb + 1))
+
+    # Appends a segment with <used> packed bits to the segments with free bits
+    def addSegment(self, freeToSegments, used):
+        self.segmentToUsed.append(used)
+        heapq.heappush(freeToSegments[self.segmentSize - used], len(self.segmentToUsed) - 1)
+
+    # Returns [(<KEY PATH>, [<MSB>, <LSB>])] of a (nested) signal map in map order
+    @staticmethod
+    def getLeaves(signalMap, keys=()):
+        leaves = []
+        for key, value in signalMap.items():
+            if isinstance(value, dict):
+                leaves.extend(ObservePacker.getLeaves(value, keys + (key,)))
+            else:
+                leaves.append((keys + (key,), value))
+        return leaves
+
+    @staticmethod
+    def getMaximalIndex(leaves):
+        return max([msb for keys, (msb, lsb) in leaves] + [-1])
+
+    # Returns a copy of a (nested) signal map with the packed indices
+    def getPackedMap(self, signalMap, keys=()):
+        packedMap = {}
+        for key, value in signalMap.items():
+            if isinstance(value, dict):
+                packedMap[key] = self.getPackedMap(value, keys + (key,))
+            else:
+                position       = self.keysToPosition[keys + (key,)]
+                packedMap[key] = [position + value[0] - value[1], position]
+        return packedMap
+
+    # Returns [(<PACKED MSB>, <PACKED LSB>, <PORT MSB>, <PORT LSB>)] ordered by the packed index
+    def getPackedRanges(self):
+        return sorted([(self.keysToPosition[keys] + msb - lsb, self.keysToPosition[keys], msb, lsb) \
+                       for keys, (msb, lsb) in self.getLeaves(self.observeSignalList)], key=lambda item: item[1])
+
+    # Returns the [<MSB>, <LSB>] ranges of the packed vector that hold no signal
+    def getPackedGaps(self):
+        gaps  = []
+        index = 0
+        for packedMsb, packedLsb, msb, lsb in self.getPackedRanges():
+            if packedLsb > index:
+                gaps.append([packedLsb - 1, index])
+            index = packedMsb + 1
+        return gaps
+
+    # Packing report of asap_interface.json
+    def getReport(self):
+        return {
+            'SEGMENT_SIZE'      : self.segmentSize,
+            'SEGMENTS'          : self.numSegments,
+            'UNPACKED_SEGMENTS' : self.unpackedSegments,
+            'PACKED_WIDTH'      : self.packedWidth,
+            'UTILIZATION'       : round(self.utilization, 4)
+        }
+
+
+# This class splits the observe/control interface into patch partitions (PATCH_PARTITIONS) - One patch block per partition
+# A partition is given by instance paths (relative to the top module). A signal belongs to the partition of the longest
+# instance path containing it (so a nested path carves a sub-partition out of an enclosing one). Signals outside of all
+# paths belong to the default partition
+# The observe/control bits of a partition are the concatenation (LSB first) of its ranges of the top module ports.
+# The interface maps of a partition keep the hierarchical signal names, with indices local to the partition
+class PatchPartitionMap:
+    DEFAULT_PARTITION = "default"
+
+    def __init__(self, partitionToPaths, observeSignalList, controlSignalList, signalToControlType) -> None:
+        self.pathToPartition = {}  # (<"TOP">, <INSTANCE>, ...) --> <PARTITION>
+        for partition in partitionToPaths:
+            assert re.match(r'^[A-Za-z_]\w*$', partition), "Patch partition name '%s' is not a valid identifier"%(partition)
+            assert partition != self.DEFAULT_PARTITION, "Patch partition name '%s' is reserved for the signals outside of all partitions"%(partition)
+            for path in partitionToPaths[partition]:
+                keys = ("TOP",) + tuple(path.split("."))
+                assert isinstance(self.getSubMap(observeSignalList, keys), dict) or \
+                       isinstance(self.getSubMap(controlSignalList, keys), dict), \
+                       "Instance path '%s' of patch partition '%s' not found in the interface maps"%(path, partition)
+                assert keys not in self.pathToPartition, "Instance path '%s' is in more than one patch partition"%(path)
+                self.pathToPartition[keys] = partition
+        self.partitions = list(partitionToPaths) + [self.DEFAULT_PARTITION]
+        # <PARTITION> --> Filtered maps (global indices)
+        observeMaps = {partition: self.filterMap(observeSignalList, partition) for partition in self.partitions}
+        controlMaps = {partition: self.filterMap(controlSignalList, partition) for partition in self.partitions}
+        # The default partition is dropped if it has no signals
+        if not self.getLeaves(observeMaps[self.DEFAULT_PARTITION]) and not self.getLeaves(controlMaps[self.DEFAULT_PARTITION]):
+            self.partitions.remove(self.DEFAULT_PARTITION)
+        self.partitionToInterface = {}
+        for partition in self.partitions:
+            observeRanges = self.getRanges(self.getLeaves(observeMaps[partition]))
+            controlRanges = self.getRanges(self.getLeaves(controlMaps[partition]))
+            # A patch block needs at least one observed (SMU) and one controlled (SRU) signal
+            assert observeRanges and controlRanges, "Patch partition '%s' has no observed or no controlled signals"%(partition)
+            self.partitionToInterface[partition] = {
+                'OBSERVE_RANGES'      : observeRanges,
+                'CONTROL_RANGES'      : controlRanges,
+                'OBSERVABILITY_MAP'   : self.localizeMap(observeMaps[partition], observeRanges),
+                'CONTROLLABILITY_MAP' : self.localizeMap(controlMaps[partition], controlRanges),
+                'CONTROL_TYPE_MAP'    : self.filterTypeMap(signalToControlType, controlMaps[partition])
+            }
+
+    # Returns the (sub-)map at a key path (None if it does not exist)
+    @staticmethod
+    def getSubMap(signalMap, keys):
+        for key in keys:
+            if not isinstance(signalMap, dict) or key not in signalMap:
+                return None
+            signalMap = signalMap[key]
+        return signalMap
+
+    # Returns the partition of a signal (key path) - The partition of its longest instance path
+    def getPartition(self, keys):
+        for length in range(len(keys) - 1, 0, -1):
+            if keys[:length] in self.pathToPartition:
+                return self.pathToPartition[keys[:length]]
+        return self.DEFAULT_PARTITION
+
+    # Returns a copy of a (nested) signal map with only the signals of a partition (empty instances are dropped)
+    def filterMap(self, signalMap, partition, keys=()):
+        filteredMap = {}
+        for key, value in signalMap.items():
+            if isinstance(value, dict):
+                child = self.filterMap(value, partition, keys + (key,))
+                if child:
+                    filteredMap[key] = child
+            elif self.getPartition(keys + (key,)) == partition:
+                filteredMap[key] = value
+        return filteredMap
+
+    # Returns a copy of a (nested) control type map with only the signals of a (filtered) control map
+    def filterTypeMap(self, typeMap, controlMap):
+        return {key: self.filterTypeMap(typeMap[key], value) if isinstance(value, dict) else typeMap[key] \
+                for key, value in controlMap.items()}
+
+    # Returns all [<MSB>, <LSB>] entries of a (nested) signal map
+    @staticmethod
+    def getLeaves(signalMap):
+        leaves = []
+        for value in signalMap.values():
+            leaves.extend(PatchPartitionMap.getLeaves(value) if isinstance(value, dict) else [value])
+        return leaves
+
+    # Merges [<MSB>, <LSB>] entries into maximal contiguous ranges ordered by LSB
+    @staticmethod
+    def getRanges(leaves):
+        ranges = []
+        for msb, lsb in sorted(leaves, key=lambda leaf: leaf[1]):
+            if ranges and ranges[-1][0] + 1 == lsb:
+                ranges[-1][0] = msb
+            else:
+                ranges.append([msb, lsb])
+        return ranges
+
+    # Returns a copy of a (filtered) signal map with indices local to the partition (its ranges concatenated LSB first)
+    @staticmethod
+    def localizeMap(signalMap, ranges):
+        offsets = []
+        offset  = 0
+        for msb, lsb in ranges:
+            offsets.append((lsb, msb, offset - lsb))
+            offset += msb - lsb + 1
+        def localize(value):
+            if isinstance(value, dict):
+                return {key: localize(child) for key, child in value.items()}
+            shift = next(shift for lsb, msb, shift in offsets if lsb <= value[1] <= msb)
+            return [value[0] + shift, value[1] + shift]
+        return localize(signalMap)
+
+
+# This class generates the top-level patch block of a partitioned interface (PATCH_PARTITIONS)
+# Every partition gets its own patch block (patchBlock_<PARTITION>, see TopPatchBlockGenerator). The patchBlock wrapper
+# keeps the ports of the single patch block - The observe/control vectors are sliced into the partition patch blocks and
+# every partition is programmed with its own bitstream (smuStreamValid/sruStreamValid bit <INDEX OF PARTITION>)
+class PartitionedPatchBlockGenerator:
+    def __init__(self, topFileName, partitionToGenerator, partitionToInterface) -> None:
+        self.topFileName          = topFileName
+        self.partitionToGenerator = partitionToGenerator
+        self.partitionToInterface = partitionToInterface
+        self.observeSize          = sum(msb - lsb + 1 for partition in partitionToInterface \
+                                        for msb, lsb in partitionToInterface[partition]['OBSERVE_RANGES'])
+        self.controlSize          = sum(msb - lsb + 1 for partition in partitionToInterface \
+                                        for msb, lsb in partitionToInterface[partition]['CONTROL_RANGES'])
+
+    @staticmethod
+    def getVectorWidth(parameter):
+        return Width(Minus(Identifier(parameter), IntConst('1')), IntConst('0'))
+
+    def getWrapperIOAndParams(self):
+        paramList = Paramlist([Parameter('NUM_PARTITIONS', Rvalue(IntConst(len(self.partitionToGenerator)))),
+                               Parameter('K', Rvalue(IntConst(self.observeSize))),
+                               Parameter('CONTROL_WIDTH', Rvalue(IntConst(self.controlSize)))])
+        portList  = Portlist([Ioport(Input('clk')),
+                              Ioport(Input('cfgClk')),
+                              Ioport(Input('rst')),
+                              Ioport(Input('bitstreamSerialIn')),
+                              Ioport(Input('smuStreamValid', width = self.getVectorWidth('NUM_PARTITIONS'))),
+                              Ioport(Input('sruStreamValid', width = self.getVectorWidth('NUM_PARTITIONS'))),
+                              Ioport(Input('p',    width = self.getVectorWidth('K'))),
+                              Ioport(Input('qIn',  width = self.getVectorWidth('CONTROL_WIDTH'))),
+                              Ioport(Output('qOut', width = self.getVectorWidth('CONTROL_WIDTH')))])
+        return portList, paramList
+
+    # Returns the slices of a vector for the given ranges, concatenated MSB first
+    @staticmethod
+    def getSlices(vector, ranges):
+        slices = [Partselect(Identifier(vector), IntConst(str(msb)), IntConst(str(lsb))) for msb, lsb in reversed(ranges)]
+        return slices[0] if len(slices) == 1 else Concat(slices)
+
+    def getPartitionInstances(self):
+        items = []
+        for index, partition in enumerate(self.partitionToGenerator):
+            interface = self.partitionToInterface[partition]
+            portArgMap = {
+                "clk"               : Identifier('clk'),
+                "cfgClk"            : Identifier('cfgClk'),
+                "rst"               : Identifier('rst'),
+                "bitstreamSerialIn" : Identifier('bitstreamSerialIn'),
+                "smuStreamValid"    : Pointer(Identifier('smuStreamValid'), IntConst(str(index))),
+                "sruStreamValid"    : Pointer(Identifier('sruStreamValid'), IntConst(str(index))),
+                "p"                 : self.getSlices('p',    interface['OBSERVE_RANGES']),
+                "qIn"               : self.getSlices('qIn',  interface['CONTROL_RANGES']),
+                "qOut"              : self.getSlices('qOut', interface['CONTROL_RANGES'])
+            }
+            instance = Instance(
+                module         = self.partitionToGenerator[partition].moduleName,
+                name           = partition + "_patch",
+                portlist       = tuple(PortArg(portname = port, argname = portArgMap[port]) for port in portArgMap),
+                parameterlist  = ()
+            )
+            instanceList = InstanceList(
+                module        = instance.module,
+                parameterlist = instance.parameterlist,
+                instances     = [instance]
+            )
+            items.append(instanceList)
+        return items
+
+    def generateTopModule(self):
+        portList, paramList = self.getWrapperIOAndParams()
+        wrapperModule = ModuleDef(
+            name       = "patchBlock",
+            items      = self.getPartitionInstances(),
+            paramlist  = paramList,
+            portlist   = portList
+        )
+        codeGen = ASTCodeGenerator()
+        verilogCode = [str(codeGen.visit(wrapperModule))]
+        for partition in self.partitionToGenerator:
+            verilogCode.append(str(codeGen.visit(self.partitionToGenerator[partition].getTopModuleDef())))
+        with open(self.topFileName, "w") as f:
+            f.write("".join(verilogCode))
+
+
 # This class generates the top-level patch block comprising of SMU and SRU block with appropriate connectivity
 class TopPatchBlockGenerator:
     def __init__(self, 
@@ -1102,10 +3140,18 @@ class TopPatchBlockGenerator:
                  sruNumPla,           \
                  controlSignalList,   \
                  signalToControlType, \
+                 coalesceRanges = False,
+                 moduleName     = "patchBlock",
+                 observePacker  = None
                 ) -> None:
         
         
         self.topFileName         = topFileName
+        self.moduleName          = moduleName
+        # Emit the control reordering as one concatenation per direction instead of two assignments per signal
+        self.coalesceRanges      = coalesceRanges
+        # Packed SMU input vector (OBSERVE_PACKING) - None: The observe port is the SMU input vector
+        self.observePacker       = observePacker
         # SMU Params and required vars
         self.smuModuleName       = smuModuleName
         self.observeSignalList   = observeSignalList
@@ -1135,6 +3181,14 @@ class TopPatchBlockGenerator:
                       "SRU_SEGMENT_SIZE"    :  Parameter("SRU_SEGMENT_SIZE", Rvalue(IntConst(self.sruSegmentSize))),
                       "SMU_SEGMENT_SIZE"    :  Parameter("SMU_SEGMENT_SIZE", Rvalue(IntConst(self.smuSegmentSize))) 
         }
+        # Width of the packed SMU input vector follows the observe port width
+        if self.observePacker is not None:
+            packedParamMap = {}
+            for param in paramMap:
+                packedParamMap[param] = paramMap[param]
+                if param == "K":
+                    packedParamMap["K_PACKED"] = Parameter('K_PACKED', Rvalue(IntConst(self.observePacker.packedWidth)))
+            paramMap = packedParamMap
 
         portMap = { "clkPort"               :  Ioport(Input('clk')),
                     "cfgClkPort"            :  Ioport(Input('cfgClk')),
@@ -1205,6 +3259,9 @@ class TopPatchBlockGenerator:
         self.originalToRearrangedControlMapping(self.reorderMap.controlledSignalMap, \
                                                 self.controlSignalList,           \
                                                 signalMapList)
+        if self.coalesceRanges:
+            items.extend(self.getCoalescedControlAssignments(signalMapList))
+            return items
         for item in signalMapList:
             newInpAssignNode = Assign(
                 Lvalue(Partselect(Identifier('qInInternal'), 
@@ -1227,6 +3284,74 @@ class TopPatchBlockGenerator:
     
 
 
+    # Merges the (rearranged, original) index ranges of the control map into maximal runs in which both
+    # indices advance together. Returns [(<REARRANGED MSB>, <REARRANGED LSB>, <ORIGINAL MSB>, <ORIGINAL LSB>)]
+    # ordered by the rearranged index
+    def getControlRuns(self, signalMapList):
+        runs = []
+        for rearranged, original in sorted(signalMapList, key=lambda item: item[0][1]):
+            if runs and runs[-1][0] + 1 == rearranged[1] and runs[-1][2] + 1 == original[1]:
+                runs[-1] = (rearranged[0], runs[-1][1], original[0], runs[-1][3])
+            else:
+                runs.append((rearranged[0], rearranged[1], original[0], original[1]))
+        return runs
+
+    # Range coalesced version of the rearranging assignments - One part-select per run
+    # -- No rearrangement needed: assign qInInternal = qIn and assign qOut = qOutInternal
+    # -- Otherwise:               assign qInInternal = {qIn[<runN>], ..., qIn[<run1>]} (runs in rearranged order)
+    #                             assign qOut = {qOutInternal[<runN>], ..., qOutInternal[<run1>]} (runs in original order)
+    # Both sides are contiguous from bit 0, so each concatenation covers the whole control width
+    def getCoalescedControlAssignments(self, signalMapList):
+        runs = self.getControlRuns(signalMapList)
+        if not runs:
+            return []
+        if len(runs) == 1 and runs[0][1] == runs[0][3]:
+            logging.info("Control map needs no rearrangement - Passing controls through")
+            return [Assign(Lvalue(Identifier('qInInternal')), Rvalue(Identifier('qIn'))),
+                    Assign(Lvalue(Identifier('qOut')),        Rvalue(Identifier('qOutInternal')))]
+        logging.info("Control map rearranged in %d run(s) for %d controlled signal(s)"%(len(runs), len(signalMapList)))
+        inputSlices  = [Partselect(Identifier('qIn'),                   \
+                                   msb = IntConst(str(run[2])),         \
+                                   lsb = IntConst(str(run[3]))) for run in reversed(runs)]
+        outputSlices = [Partselect(Identifier('qOutInternal'),          \
+                                   msb = IntConst(str(run[0])),         \
+                                   lsb = IntConst(str(run[1]))) for run in sorted(runs, key=lambda run: run[3], reverse=True)]
+        return [Assign(Lvalue(Identifier('qInInternal')), Rvalue(Concat(inputSlices)  if len(inputSlices)  > 1 else inputSlices[0])),
+                Assign(Lvalue(Identifier('qOut')),        Rvalue(Concat(outputSlices) if len(outputSlices) > 1 else outputSlices[0]))]
+
+    # Packed SMU input vector (OBSERVE_PACKING): pInternal[<PACKED RANGE>] = p[<PORT RANGE>] for every observed signal,
+    # the bits between packed signals are tied to 0
+    def getPackedObserveAssignments(self):
+        items = [Wire("pInternal", width = Width(Minus(Identifier('K_PACKED'), IntConst('1')), IntConst('0')))]
+        ranges = self.observePacker.getPackedRanges()
+        gaps   = self.observePacker.getPackedGaps()
+        if self.coalesceRanges:
+            # One concatenation, MSB first
+            parts = [(item[1], Partselect(Identifier('p'),                     \
+                                          msb = IntConst(str(item[2])),        \
+                                          lsb = IntConst(str(item[3])))) for item in ranges]
+            parts.extend([(gap[1], IntConst("%d'b0"%(gap[0] - gap[1] + 1))) for gap in gaps])
+            parts = [part for lsb, part in sorted(parts, key=lambda part: part[0], reverse=True)]
+            items.append(Assign(Lvalue(Identifier('pInternal')), Rvalue(Concat(parts) if len(parts) > 1 else parts[0])))
+            return items
+        for item in ranges:
+            items.append(Assign(
+                Lvalue(Partselect(Identifier('pInternal'),
+                                  msb = IntConst(str(item[0])),
+                                  lsb = IntConst(str(item[1])))),
+                Rvalue(Partselect(Identifier('p'),
+                                  msb = IntConst(str(item[2])),
+                                  lsb = IntConst(str(item[3]))))
+            ))
+        for gap in gaps:
+            items.append(Assign(
+                Lvalue(Partselect(Identifier('pInternal'),
+                                  msb = IntConst(str(gap[0])),
+                                  lsb = IntConst(str(gap[1])))),
+                Rvalue(IntConst("%d'b0"%(gap[0] - gap[1] + 1)))
+            ))
+        return items
+
     # This method generates the SMU instance. It also generates the trigger declaration
     # as trigger is an internal signal that is connected to SRU
     def getSmuAndSruInstances(self):
@@ -1247,6 +3372,9 @@ class TopPatchBlockGenerator:
             "M"                   :  "M",
             "SMU_SEGMENT_SIZE"    : "SMU_SEGMENT_SIZE"
          }
+        if self.observePacker is not None:
+            smuPortArgMap["p"] = "pInternal"
+            smuParamMap["K"]   = "K_PACKED"
         sruPortArgMap = {
             "clk"                 : "clk",
             "rst"                 : "rst",
@@ -1326,27 +3454,129 @@ class TopPatchBlockGenerator:
         return items
     
     # Method to generate TOP-MODULE
-    def generateTopModule(self):
+    def getTopModuleDef(self):
         portList, paramList = self.getTopIOAndParams()
         controlAssignItems  = self.getRearrangedControlAssignments()
         instanceItems       = self.getSmuAndSruInstances()
 
         items = []
+        if self.observePacker is not None:
+            items.extend(self.getPackedObserveAssignments())
         items.extend(controlAssignItems)
         items.extend(instanceItems)
 
-        topModule = ModuleDef(
-            name       = "patchBlock",
+        return ModuleDef(
+            name       = self.moduleName,
             items      = items,
             paramlist  = paramList,
             portlist   = portList
         )
+
+    def generateTopModule(self):
+        topModule = self.getTopModuleDef()
         codeGen = ASTCodeGenerator()
         verilogCode = codeGen.visit(topModule)
         with open(self.topFileName, "w") as f:
             f.write(str(verilogCode))
 
 
+# Class to generate the hierarchical-reference tap module of the simulation insertion mode (INSERTION_MODE = simulation)
+# The tap module is instantiated next to patchBlock in the testbench, in place of the hook ports of the top module -
+# <observePort>/<controlPortIn> feed p/qIn of patchBlock and qOut of patchBlock feeds <controlPortOut>
+# -- Observed signals of unmodified modules are referenced directly:  `ASAP_DUT_PATH.<INSTANCE PATH>.<SIGNAL>[<RANGE>]
+# -- Modules with controlled signals are referenced through their internal (stage one) ports <port>_int. The values
+#    returned by the SRU are forced onto <controlPortOut>_int
+# ASAP_DUT_PATH is the hierarchical path of the top module instance in the testbench (defaults to the top module name)
+class SimulationTapGenerator:
+    TAP_MODULE_NAME = "asapSimTaps"
+    DUT_PATH_MACRO  = "ASAP_DUT_PATH"
+
+    def __init__(self, tapFileName,             \
+                       topModule,               \
+                       instanceTree,            \
+                       moduleToSignalToObserve, \
+                       modifiedModules,         \
+                       observeSignalList,       \
+                       controlSignalList,       \
+                       observePort,             \
+                       controlPortIn,           \
+                       controlPortOut) -> None:
+        self.tapFileName             = tapFileName
+        self.topModule               = topModule
+        self.instanceTree            = instanceTree
+        self.moduleToSignalToObserve = moduleToSignalToObserve
+        # Modules with stage one hooks (see VerilogGenerator.getModifiedModules)
+        self.modifiedModules         = modifiedModules
+        self.observeSignalList       = observeSignalList
+        self.controlSignalList       = controlSignalList
+        self.observePort             = observePort
+        self.controlPortIn           = controlPortIn
+        self.controlPortOut          = controlPortOut
+
+    # Returns the [<MSB>, <LSB>] range spanned by the signals of a module instance (None if it has none)
+    @staticmethod
+    def getOwnRange(signalMap):
+        ranges = [value for value in signalMap.values() if isinstance(value, list)]
+        if not ranges:
+            return None
+        return [max(signalRange[0] for signalRange in ranges), min(signalRange[1] for signalRange in ranges)]
+
+    # Returns the tap statements of every instance of the hierarchy and the observe/control widths
+    def getTaps(self):
+        taps = []
+        observeWidth = 0
+        controlWidth = 0
+        # (<MODULE>, <HIERARCHICAL PATH>, <OBSERVE MAP>, <CONTROL MAP>)
+        stack = [(self.topModule, "`" + self.DUT_PATH_MACRO, self.observeSignalList["TOP"], self.controlSignalList["TOP"])]
+        while stack:
+            moduleName, path, observeMap, controlMap = stack.pop()
+            observeRange = self.getOwnRange(observeMap)
+            controlRange = self.getOwnRange(controlMap)
+            if observeRange is not None:
+                observeWidth = max(observeWidth, observeRange[0] + 1)
+                if moduleName in self.modifiedModules:
+                    taps.append("assign %s[%d:%d] = %s.%s_int[%d:0];"%(self.observePort, observeRange[0], observeRange[1], \
+                                                                       path, self.observePort, observeRange[0] - observeRange[1]))
+                else:
+                    signalToObserve = self.moduleToSignalToObserve[moduleName]
+                    for signal in signalToObserve:
+                        taps.append("assign %s[%d:%d] = %s.%s[%d:%d];"%(self.observePort, observeMap[signal][0], observeMap[signal][1], \
+                                                                        path, signal, signalToObserve[signal][0], signalToObserve[signal][1]))
+            if controlRange is not None:
+                controlWidth = max(controlWidth, controlRange[0] + 1)
+                taps.append("assign %s[%d:%d] = %s.%s_int;"%(self.controlPortIn, controlRange[0], controlRange[1], path, self.controlPortIn))
+                taps.append("initial force %s.%s_int = %s[%d:%d];"%(path, self.controlPortOut, self.controlPortOut, \
+                                                                   controlRange[0], controlRange[1]))
+            children = [(childModule, path + "." + childInstance, observeMap[childInstance], controlMap[childInstance]) \
+                        for childInstance, childModule in self.instanceTree.getInstances(moduleName)]
+            stack.extend(reversed(children))
+        return taps, observeWidth, controlWidth
+
+    def generateTapModule(self):
+        taps, observeWidth, controlWidth = self.getTaps()
+        ports = []
+        if observeWidth > 0:
+            ports.append("  output [%d:0] %s"%(observeWidth - 1, self.observePort))
+        if controlWidth > 0:
+            ports.append("  output [%d:0] %s"%(controlWidth - 1, self.controlPortIn))
+            ports.append("  input [%d:0] %s"%(controlWidth - 1, self.controlPortOut))
+        lines = ["// Hierarchical-reference taps of the ASAP hooks (simulation only)",
+                 "// Set %s to the hierarchical path of the '%s' instance in the testbench"%(self.DUT_PATH_MACRO, self.topModule),
+                 "`ifndef %s"%(self.DUT_PATH_MACRO),
+                 "`define %s %s"%(self.DUT_PATH_MACRO, self.topModule),
+                 "`endif",
+                 "",
+                 "module %s"%(self.TAP_MODULE_NAME),
+                 "(",
+                 ",\n".join(ports),
+                 ");",
+                 ""]
+        lines.extend("  " + tap for tap in taps)
+        lines.extend(["", "endmodule", ""])
+        with open(self.tapFileName, "w") as f:
+            f.write("\n".join(lines))
+
+
 class ASAPInsertion:
     def __init__(self, specFile, outputFolder):
         # Semi-Static Constants - Please don't change these as of now due to code dependency
@@ -1357,14 +3587,20 @@ class ASAPInsertion:
         SRU_MODULE_NAME       = "sru"
         TOP_FILE_NAME         = outputFolder + "/asapTop.v"
         ASAP_INTERFACE_FILE   = outputFolder + "/asap_interface.json"
+        SIM_TAP_FILE_NAME     = outputFolder + "/asapSimTaps.v"
+        # SMU/SRU architecture params that may be set per patch partition (<PARAM>.<PARTITION> = <VALUE>)
+        PARTITION_PARAMS      = ("SMU_SEGMENT_SIZE", "MAX_SEQ_DEPTH", "MAX_TRIGGERS", "SRU_SEGMENT_SIZE", "SRU_NUM_PLA")
 
         paramMap = {}
         # asap_param.txt has all the relevant configurable params for ASAP architecture
         with open(specFile, "r") as paramFile:
             for line in paramFile:
-                assert len(line.split('=')) == 2, "Incorrect param specififed in %s"%(specFile)
-                paramMap.update({line.split('=')[0].strip(): line.split('=')[1].strip()})
-                
+                if not line.strip():
+                    continue
+                # Split only on the first '=' so that values (e.g. defines) may contain '='
+                assert len(line.split('=', 1)) == 2, "Incorrect param specififed in %s"%(specFile)
+                paramMap.update({line.split('=', 1)[0].strip(): line.split('=', 1)[1].strip()})
+
         # SMU Params
         TOP_MODULE        = paramMap['TOP_MODULE']
         FILELIST          = paramMap['FILELIST']
@@ -1376,56 +3612,256 @@ class ASAPInsertion:
         SRU_SEGMENT_SIZE  = int(paramMap['SRU_SEGMENT_SIZE'])
         SRU_NUM_PLA       = int(paramMap['SRU_NUM_PLA'])
 
+        # Optional params
+        # AST_CACHE_DIR         - Directory for the persistent AST cache (caching is disabled if not specified)
+        # PREPROCESS_DEFINES    - Space separated preprocessor defines (e.g. SYNTHESIS WIDTH=8)
+        # PREPROCESS_INCLUDES   - Space separated preprocessor include directories
+        # PREPROCESS_FAST_PATH  - 1 (default): Files without compiler directives skip the external preprocessor
+        # PARSER_TABLE_DIR      - Directory for the cached Verilog parser tables (defaults to ~/.cache/asap/parser_tables)
+        # JOBS                  - Number of worker processes for parsing, stage one insertion and codegen (1: serial)
+        # HIERARCHY_PRUNING     - 1: Only modules on a path from the top module to a pragma are parsed and rewritten
+        # COALESCE_RANGES       - 1: Adjacent observe/control tap slices (and patchBlock control reordering runs) are merged
+        #                            into one concatenation assignment
+        # EMITTER               - codegen (default): Modified files are generated from the AST
+        #                         splice: Edits are spliced into the source text, unmodified files are copied as-is
+        # HARDLINK_UNMODIFIED   - 1: Files without edits are hard-linked (instead of copied) to the output folder
+        # LOW_MEMORY            - 1: ASTs are frozen away from the cyclic GC, every file is written (and its AST released)
+        #                            as soon as stage two is done with it and the peak RSS of every phase is logged
+        # SUMMARY_DIR           - Directory of the per-partition interface summaries (incremental insertion is disabled if not specified)
+        # PARTITIONS            - Space separated partition root modules (defaults to the modules instantiated in the top module)
+        # SYMBOL_DB             - Path of the design symbol database (SQLite) to be written after parsing
+        # PIPELINE_INTERVAL     - N > 0: The observe port of every module N, 2N, ... levels above the leaves is registered
+        #                            (1: at every hierarchy boundary). 0 (default): Combinational observe path
+        # PIPELINE_CLOCK        - Input port of the top module clocking the observe pipeline registers (defaults to clk)
+        # INSERTION_MODE        - hierarchy (default): Hooks are threaded through the hierarchy to the top module ports
+        #                         simulation: Only controlled signals are spliced, hooks are tapped by hierarchical references
+        # PATCH_PARTITIONS      - Space separated patch partitions <NAME>:<INSTANCE PATH>[,<INSTANCE PATH>...] - One patch
+        #                         block (and bitstream) per partition, signals outside of all partitions go to 'default'
+        # OBSERVE_PACKING       - 1: Observed signals are packed into SMU segments (first fit decreasing) - patchBlock permutes
+        #                            the observe port into the packed SMU input vector
+        # INTERFACE_INDEX       - 1: The compiled interface asap_interface.idx (flat, mmapped by the ASAP compiler) is
+        #                            written next to asap_interface.json
+        AST_CACHE_DIR           = paramMap.get('AST_CACHE_DIR')
+        PREPROCESS_DEFINES      = paramMap.get('PREPROCESS_DEFINES', '').split()
+        PREPROCESS_INCLUDES     = paramMap.get('PREPROCESS_INCLUDES', '').split()
+        PREPROCESS_FAST_PATH    = bool(int(paramMap.get('PREPROCESS_FAST_PATH', 1)))
+        PARSER_TABLE_DIR        = paramMap.get('PARSER_TABLE_DIR')
+        JOBS                    = int(paramMap.get('JOBS', 1))
+        HIERARCHY_PRUNING       = bool(int(paramMap.get('HIERARCHY_PRUNING', 0)))
+        COALESCE_RANGES         = bool(int(paramMap.get('COALESCE_RANGES', 0)))
+        EMITTER                 = paramMap.get('EMITTER', 'codegen')
+        HARDLINK_UNMODIFIED     = bool(int(paramMap.get('HARDLINK_UNMODIFIED', 0)))
+        LOW_MEMORY              = bool(int(paramMap.get('LOW_MEMORY', 0)))
+        SUMMARY_DIR             = paramMap.get('SUMMARY_DIR')
+        PARTITIONS              = paramMap.get('PARTITIONS', '').split()
+        SYMBOL_DB               = paramMap.get('SYMBOL_DB')
+        PIPELINE_INTERVAL       = int(paramMap.get('PIPELINE_INTERVAL', 0))
+        PIPELINE_CLOCK          = paramMap.get('PIPELINE_CLOCK', 'clk')
+        INSERTION_MODE          = paramMap.get('INSERTION_MODE', 'hierarchy')
+        PATCH_PARTITIONS        = paramMap.get('PATCH_PARTITIONS', '').split()
+        OBSERVE_PACKING         = bool(int(paramMap.get('OBSERVE_PACKING', 0)))
+        INTERFACE_INDEX         = bool(int(paramMap.get('INTERFACE_INDEX', 0)))
+
         # Make sure all provided paths exists
         assert os.path.exists(specFile), "Specification file %s doesn't exist"%(specFile)
         assert os.path.exists(outputFolder), "Output folder %s doesn't exist"%(outputFolder)
         assert os.path.exists(FILELIST), "Filelist %s doesn't exist"%(FILELIST)
 
-        logging.info("Verilog signal parsing started for filelist %s"%(FILELIST))
-        ## Instantiating parser
-        parser = VerilogParser(FILELIST, TOP_MODULE)
-        fileToModuleToSignalToObserve, fileToModuleToSignalToControl = parser.fileToModuleToSignalToPragma()
-        filewiseAst = parser.fileToAst
-        moduleWiseAst = parser.moduleToAst
-        ## Instantiating the insertion class
-        verilogGenerator = VerilogGenerator(filewiseAst,                      \
-                                            moduleWiseAst,                    \
-                                            outputFolder,                     \
-                                            parser.tree,                      \
-                                            TOP_MODULE,                       \
-                                            fileToModuleToSignalToObserve,    \
-                                            fileToModuleToSignalToControl,    \
-                                            OBSERVE_PORT_NAME,                \
-                                            CONTROL_PORT_IN_NAME,             \
-                                            CONTROL_PORT_OUT_NAME)
-        observeSignalList, controlSignalList, signalToControlType = verilogGenerator.generateVerilog()
-        # Writing observability/controllability in to interface JSON file
-        ioData = {
-            'OBSERVABILITY_MAP'    : observeSignalList,
-            'CONTROLLABILITY_MAP'  : controlSignalList,
-            'CONTROL_TYPE_MAP'     : signalToControlType
-        }
-
-        # Write the SMU/SRU observe/control interface information to asap_interface.json file for ASAP compiler
-        with open(ASAP_INTERFACE_FILE, "w") as ioFile:
-            json.dump(ioData, ioFile, indent = 4)  
-        logging.info("Observed signal map - %s"%(observeSignalList))
-        logging.info("Controlled signal map - %s"%(controlSignalList))
-        logging.info("control type map - %s"%(signalToControlType))
-
-
-        # Instance of top-module generator
-        top = TopPatchBlockGenerator(
-            topFileName          = TOP_FILE_NAME,
-            smuModuleName        = SMU_MODULE_NAME,
-            smuSegmentSize       = SMU_SEGMENT_SIZE,
-            observeSignalList    = observeSignalList,
-            maxTriggers          = MAX_TRIGGERS,
-            maxseqDepth          = MAX_SEQ_DEPTH,
-            sruModuleName        = SRU_MODULE_NAME,
-            sruSegmentSize       = SRU_SEGMENT_SIZE,
-            sruNumPla            = SRU_NUM_PLA,
-            controlSignalList    = controlSignalList,
-            signalToControlType  = signalToControlType
-        )
-        top.generateTopModule()
+        assert JOBS >= 1, "JOBS should be a positive integer"
+        assert INSERTION_MODE in ("hierarchy", "simulation"), "INSERTION_MODE should be 'hierarchy' or 'simulation'"
+        # No ports are threaded through the hierarchy in the simulation insertion mode - Nothing to pipeline or to summarize
+        if INSERTION_MODE == "simulation" and (PIPELINE_INTERVAL > 0 or SUMMARY_DIR):
+            logging.warning("PIPELINE_INTERVAL and SUMMARY_DIR are ignored in the simulation insertion mode")
+            PIPELINE_INTERVAL = 0
+            SUMMARY_DIR       = None
+        # One process pool is shared by all parallel stages of this run
+        executor = createProcessPool(JOBS) if JOBS > 1 else None
+        # The pool is shut down (and the heap unfrozen in LOW_MEMORY mode) on errors too
+        try:
+            memoryMonitor = PeakMemoryMonitor(enabled=LOW_MEMORY)
+
+            memoryMonitor.startPhase("Parsing")
+            logging.info("Verilog signal parsing started for filelist %s"%(FILELIST))
+            ## Instantiating parser
+            parser = VerilogParser(FILELIST,                                     \
+                                   TOP_MODULE,                                   \
+                                   astCacheDir        = AST_CACHE_DIR,           \
+                                   defines            = PREPROCESS_DEFINES,      \
+                                   includes           = PREPROCESS_INCLUDES,     \
+                                   parserTableDir     = PARSER_TABLE_DIR,        \
+                                   preprocessFastPath = PREPROCESS_FAST_PATH,    \
+                                   executor           = executor,                \
+                                   jobs               = JOBS,                    \
+                                   pruneHierarchy     = HIERARCHY_PRUNING,       \
+                                   summaryDir         = SUMMARY_DIR,             \
+                                   partitions         = PARTITIONS,              \
+                                   summarySettings    = (OBSERVE_PORT_NAME, CONTROL_PORT_IN_NAME, CONTROL_PORT_OUT_NAME, \
+                                                         int(COALESCE_RANGES), EMITTER, int(HIERARCHY_PRUNING),           \
+                                                         PIPELINE_INTERVAL, PIPELINE_CLOCK))
+            fileToModuleToSignalToObserve, fileToModuleToSignalToControl = parser.fileToModuleToSignalToPragma()
+            if SYMBOL_DB:
+                parser.writeSymbolDatabase(SYMBOL_DB, fileToModuleToSignalToObserve, fileToModuleToSignalToControl)
+            # The parsed ASTs live (at least) until stage two - Keep millions of AST nodes away from the cyclic GC
+            if LOW_MEMORY:
+                gc.freeze()
+            filewiseAst = parser.fileToAst
+            moduleWiseAst = parser.moduleToAst
+            # The splice emitter splices the edits into the source text read by the parser. Otherwise the sources are released
+            sourceStore = parser.sourceStore
+            if EMITTER != "splice":
+                sourceStore.close()
+            summaryStore = parser.summaryStore
+            ## Instantiating the insertion class
+            verilogGenerator = VerilogGenerator(filewiseAst,                      \
+                                                moduleWiseAst,                    \
+                                                outputFolder,                     \
+                                                parser.tree,                      \
+                                                TOP_MODULE,                       \
+                                                fileToModuleToSignalToObserve,    \
+                                                fileToModuleToSignalToControl,    \
+                                                OBSERVE_PORT_NAME,                \
+                                                CONTROL_PORT_IN_NAME,             \
+                                                CONTROL_PORT_OUT_NAME,            \
+                                                executor                 = executor,                         \
+                                                jobs                     = JOBS,                             \
+                                                sourceStore              = sourceStore,                      \
+                                                prunedModuleToInputPorts = parser.prunedModuleToInputPorts,  \
+                                                passThroughFiles         = parser.passThroughFiles,          \
+                                                coalesceRanges           = COALESCE_RANGES,                  \
+                                                emitter                  = EMITTER,                          \
+                                                hardlinkUnmodified       = HARDLINK_UNMODIFIED,              \
+                                                lowMemory                = LOW_MEMORY,                       \
+                                                memoryMonitor            = memoryMonitor,                    \
+                                                moduleToSummary          = summaryStore.partitionToSummary if summaryStore else None, \
+                                                observePipelineInterval  = PIPELINE_INTERVAL,                \
+                                                pipelineClock            = PIPELINE_CLOCK,                   \
+                                                insertionMode            = INSERTION_MODE)
+            # The parser (pragma map) is not needed anymore. ASTs are owned by the generator
+            del parser, filewiseAst, moduleWiseAst
+            observeSignalList, controlSignalList, signalToControlType = verilogGenerator.generateVerilog()
+            sourceStore.close()
+            # Incremental insertion: Files of up-to-date partitions are restored, all other partitions are (re-)summarized
+            if summaryStore is not None:
+                summaryStore.restoreFiles(outputFolder)
+                for partition in summaryStore.getStalePartitions():
+                    summary = verilogGenerator.getPartitionSummary(partition)
+                    if summary is not None:
+                        summaryStore.storeSummary(partition, summary, outputFolder)
+            memoryMonitor.startPhase("Top module generation")
+            # Writing observability/controllability in to interface JSON file
+            ioData = {
+                'OBSERVABILITY_MAP'    : observeSignalList,
+                'CONTROLLABILITY_MAP'  : controlSignalList,
+                'CONTROL_TYPE_MAP'     : signalToControlType
+            }
+            # Observe pipelining: Register stages between every observed signal and the top observe port. The stages are
+            # balanced, all observed signals have the same latency (OBSERVE_PIPELINE_DEPTH)
+            if PIPELINE_INTERVAL > 0:
+                ioData['OBSERVE_PIPELINE_MAP']   = verilogGenerator.observePipelineMap
+                ioData['OBSERVE_PIPELINE_DEPTH'] = verilogGenerator.getPipelineDepth(verilogGenerator.observePipelineMap)
+                logging.info("Observe pipeline depth = %d stage(s)"%(ioData['OBSERVE_PIPELINE_DEPTH']))
+            # Patch partitions: Interface maps (local to the partition), port ranges and architecture params of every partition
+            partitionMap = None
+            if PATCH_PARTITIONS:
+                partitionToPaths = {}
+                for partitionSpec in PATCH_PARTITIONS:
+                    assert len(partitionSpec.split(':')) == 2, "Incorrect patch partition '%s' in %s"%(partitionSpec, specFile)
+                    partitionToPaths[partitionSpec.split(':')[0]] = partitionSpec.split(':')[1].split(',')
+                partitionMap = PatchPartitionMap(partitionToPaths, observeSignalList, controlSignalList, signalToControlType)
+                ioData['PATCH_PARTITIONS'] = {}
+                for partition in partitionMap.partitions:
+                    params = {param: int(paramMap.get(param + "." + partition, paramMap[param])) for param in PARTITION_PARAMS}
+                    ioData['PATCH_PARTITIONS'][partition] = dict(partitionMap.partitionToInterface[partition], PARAMS = params)
+                    logging.info("Patch partition '%s' - Observe ranges %s, control ranges %s"%(partition,                            \
+                                                                                              ioData['PATCH_PARTITIONS'][partition]['OBSERVE_RANGES'], \
+                                                                                              ioData['PATCH_PARTITIONS'][partition]['CONTROL_RANGES']))
+            # Observe packing: The interface maps hold the packed (SMU input vector) indices used by the compiler. The observe
+            # port indices are kept in OBSERVE_PORT_MAP
+            observePacker      = None
+            partitionToPacker  = {}
+            if OBSERVE_PACKING and partitionMap is not None:
+                for partition in partitionMap.partitions:
+                    interface = ioData['PATCH_PARTITIONS'][partition]
+                    partitionToPacker[partition] = ObservePacker(interface['OBSERVABILITY_MAP'], interface['PARAMS']['SMU_SEGMENT_SIZE'])
+                    interface['OBSERVE_PORT_MAP']  = interface['OBSERVABILITY_MAP']
+                    interface['OBSERVABILITY_MAP'] = partitionToPacker[partition].packedSignalList
+                    interface['OBSERVE_PACKING']   = partitionToPacker[partition].getReport()
+            elif OBSERVE_PACKING:
+                observePacker = ObservePacker(observeSignalList, SMU_SEGMENT_SIZE)
+                ioData['OBSERVABILITY_MAP'] = observePacker.packedSignalList
+                ioData['OBSERVE_PORT_MAP']  = observeSignalList
+                ioData['OBSERVE_PACKING']   = observePacker.getReport()
+
+            # Write the SMU/SRU observe/control interface information to asap_interface.json file for ASAP compiler
+            with open(ASAP_INTERFACE_FILE, "w") as ioFile:
+                json.dump(ioData, ioFile, indent = 4)  
+            if INTERFACE_INDEX:
+                CompiledInterfaceWriter(ASAP_INTERFACE_FILE)
+            logging.info("Observed signal map - %s"%(observeSignalList))
+            logging.info("Controlled signal map - %s"%(controlSignalList))
+            logging.info("control type map - %s"%(signalToControlType))
+
+            # Simulation insertion mode: The hooks are reached through hierarchical references from the tap module
+            if INSERTION_MODE == "simulation":
+                taps = SimulationTapGenerator(
+                    tapFileName             = SIM_TAP_FILE_NAME,
+                    topModule               = TOP_MODULE,
+                    instanceTree            = verilogGenerator.instanceTree,
+                    moduleToSignalToObserve = verilogGenerator.moduleToSignalToObserve,
+                    modifiedModules         = verilogGenerator.getModifiedModules(),
+                    observeSignalList       = observeSignalList,
+                    controlSignalList       = controlSignalList,
+                    observePort             = OBSERVE_PORT_NAME,
+                    controlPortIn           = CONTROL_PORT_IN_NAME,
+                    controlPortOut          = CONTROL_PORT_OUT_NAME
+                )
+                taps.generateTapModule()
+
+
+            # Instance of top-module generator
+            if partitionMap is not None:
+                # One patch block per partition, with the interface maps and architecture params of the partition
+                partitionToGenerator = {}
+                for partition in partitionMap.partitions:
+                    interface = ioData['PATCH_PARTITIONS'][partition]
+                    partitionToGenerator[partition] = TopPatchBlockGenerator(
+                        topFileName          = TOP_FILE_NAME,
+                        smuModuleName        = SMU_MODULE_NAME,
+                        smuSegmentSize       = interface['PARAMS']['SMU_SEGMENT_SIZE'],
+                        observeSignalList    = interface.get('OBSERVE_PORT_MAP', interface['OBSERVABILITY_MAP']),
+                        maxTriggers          = interface['PARAMS']['MAX_TRIGGERS'],
+                        maxseqDepth          = interface['PARAMS']['MAX_SEQ_DEPTH'],
+                        sruModuleName        = SRU_MODULE_NAME,
+                        sruSegmentSize       = interface['PARAMS']['SRU_SEGMENT_SIZE'],
+                        sruNumPla            = interface['PARAMS']['SRU_NUM_PLA'],
+                        controlSignalList    = interface['CONTROLLABILITY_MAP'],
+                        signalToControlType  = interface['CONTROL_TYPE_MAP'],
+                        coalesceRanges       = COALESCE_RANGES,
+                        moduleName           = "patchBlock_" + partition,
+                        observePacker        = partitionToPacker.get(partition)
+                    )
+                top = PartitionedPatchBlockGenerator(TOP_FILE_NAME, partitionToGenerator, partitionMap.partitionToInterface)
+            else:
+                top = TopPatchBlockGenerator(
+                    topFileName          = TOP_FILE_NAME,
+                    smuModuleName        = SMU_MODULE_NAME,
+                    smuSegmentSize       = SMU_SEGMENT_SIZE,
+                    observeSignalList    = observeSignalList,
+                    maxTriggers          = MAX_TRIGGERS,
+                    maxseqDepth          = MAX_SEQ_DEPTH,
+                    sruModuleName        = SRU_MODULE_NAME,
+                    sruSegmentSize       = SRU_SEGMENT_SIZE,
+                    sruNumPla            = SRU_NUM_PLA,
+                    controlSignalList    = controlSignalList,
+                    signalToControlType  = signalToControlType,
+                    coalesceRanges       = COALESCE_RANGES,
+                    observePacker        = observePacker
+                )
+            top.generateTopModule()
+            memoryMonitor.endPhase()
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            # The heap is unfrozen on errors too (no-op if nothing was frozen)
+            if LOW_MEMORY:
+                gc.unfreeze()
@@ -0,0 +1,288 @@
+import os
+import sys
+import json
+import mmap                                                          # Memory mapped compiled interface
+import struct
+import hashlib                                                       # Staleness check against asap_interface.json
+import logging                                                       # logger
+
+# ********************************* <COMPILED INTERFACE (asap_interface.idx)> *********************************
+# asap_interface.json holds the observe/control maps as nested dicts. Loading it, re-deriving the control
+# reordering and resolving hierarchical names by dict descent is done by every compile. The compiled interface
+# holds the same information in flat, fixed size tables that are used in place from a read-only mmap:
+#
+# HEADER     - <MAGIC> <VERSION> <# SECTIONS> <JSON SIZE> <JSON MTIME> <JSON SHA1> <STRING TABLE OFFSET>
+# SECTIONS   - One directory entry per interface: the top level interface (name "") and every patch partition
+#              of PATCH_PARTITIONS (name of the partition)
+# TABLES     - Per section
+#              -- Observe table: One record per observed signal, sorted by hierarchical path
+#              -- Control table: One record per controlled signal/clock, sorted by hierarchical path
+#              -- Connection order: Control table record indices in connection order (index in control signal q)
+# STRINGS    - UTF-8 paths, section names and the JSON encoded PARAMS of the sections (OBSERVE_PIPELINE_DEPTH
+#              of asap_interface.json for the top level section)
+#
+# A record is <PATH OFFSET> <PATH LENGTH> <MSB> <LSB> <CONNECTION INDEX> <TYPE>, where CONNECTION INDEX is the
+# reordered LSB of a controlled signal (0 for an observed signal). Paths are found by a binary search over the
+# records, nothing is decoded up front. The SMU segment of an observed signal is not stored - It depends on the
+# SMU_SEGMENT_SIZE of the compile, and is derived from the LSB by the SMU compiler.
+#
+# The compiled interface is written by ASAP Insertion (INTERFACE_INDEX = 1) or, once, by
+#   python3 ASAPInterface.py <asap_interface.json>
+# and is used by the ASAP compiler when it is up to date with asap_interface.json (same version, size and SHA1 -
+# The SHA1 is only checked if the modification time of asap_interface.json changed)
+
+MAGIC        = b'ASAPIDX\0'
+VERSION      = 3
+HEADER       = struct.Struct('<8sIIQQ20sQ')
+SECTION      = struct.Struct('<12I')
+RECORD       = struct.Struct('<6I')
+INDEX        = struct.Struct('<I')
+TYPE_OBSERVE = 0
+TYPE_SIGNAL  = 1
+TYPE_CLOCK   = 2
+CONTROL_TYPE_TO_RECORD_TYPE = {"signal": TYPE_SIGNAL, "clock": TYPE_CLOCK}
+
+
+# Method returns the compiled interface file of an interface file (asap_interface.json --> asap_interface.idx)
+def getCompiledInterfaceFile(interfaceFile):
+    return os.path.splitext(interfaceFile)[0] + ".idx"
+
+# Method returns the SHA1 digest of an interface file
+def getInterfaceDigest(interfaceFile):
+    with open(interfaceFile, "rb") as f:
+        return hashlib.sha1(f.read()).digest()
+
+# Method returns the leaves [<PATH>, <MSB>, <LSB>, <CONTROL TYPE or None>] of an interface map in tree order
+def getInterfaceLeaves(signalMap, typeMap=None, prefix="", leaves=None):
+    if leaves is None:
+        leaves = []
+    for key in signalMap:
+        if isinstance(signalMap[key], dict):
+            getInterfaceLeaves(signalMap[key], typeMap[key] if typeMap is not None else None, prefix + key + ".", leaves)
+        elif isinstance(signalMap[key], list):
+            leaves.append([prefix + key, signalMap[key][0], signalMap[key][1], typeMap[key] if typeMap is not None else None])
+    return leaves
+
+
+# Class to build the tables of one interface section
+# The control reordering is the one of the SRU (and of patchBlock in asapTop.v) - signal controls in tree order
+# from control index 0, followed by the clock controls in tree order
+class CompiledInterfaceSectionBuilder:
+    def __init__(self, name, interface, params) -> None:
+        self.name           = name
+        self.params         = params
+        observeLeaves       = getInterfaceLeaves(interface['OBSERVABILITY_MAP'])
+        controlLeaves       = getInterfaceLeaves(interface['CONTROLLABILITY_MAP'], interface['CONTROL_TYPE_MAP'])
+        self.maxObserveIndex = max([msb for [path, msb, lsb, controlType] in observeLeaves], default=0)
+        # Observe records [<PATH>, <MSB>, <LSB>, 0, <TYPE>]
+        self.observeRecords = sorted([[path, msb, lsb, 0, TYPE_OBSERVE] for [path, msb, lsb, controlType] in observeLeaves])
+        # Control records [<PATH>, <MSB>, <LSB>, <CONNECTION INDEX>, <TYPE>]
+        self.controlRecords = []
+        connectionIndex     = 0
+        for controlType in ["signal", "clock"]:
+            for [path, msb, lsb, leafType] in controlLeaves:
+                if leafType == controlType:
+                    self.controlRecords.append([path, msb, lsb, connectionIndex, CONTROL_TYPE_TO_RECORD_TYPE[controlType]])
+                    connectionIndex += msb - lsb + 1
+            if controlType == "signal":
+                self.numSignalControls = connectionIndex
+        self.numClkControls = connectionIndex - self.numSignalControls
+        # Connection order: The control records are created in connection order - Keep their position before sorting
+        for position, record in enumerate(self.controlRecords):
+            record.append(position)
+        self.controlRecords.sort()
+        self.connectionOrder = [0] * len(self.controlRecords)
+        for recordIndex, record in enumerate(self.controlRecords):
+            self.connectionOrder[record.pop()] = recordIndex
+
+
+# Class to write the compiled interface of an interface file
+class CompiledInterfaceWriter:
+    def __init__(self, interfaceFile, compiledInterfaceFile=None) -> None:
+        self.interfaceFile         = interfaceFile
+        self.compiledInterfaceFile = compiledInterfaceFile if compiledInterfaceFile else getCompiledInterfaceFile(interfaceFile)
+        jsonStat                   = os.stat(interfaceFile)
+        jsonDigest                 = getInterfaceDigest(interfaceFile)
+        with open(interfaceFile, "r") as ioFile:
+            ioMap = json.load(ioFile)
+        topParams = {'OBSERVE_PIPELINE_DEPTH': ioMap['OBSERVE_PIPELINE_DEPTH']} if 'OBSERVE_PIPELINE_DEPTH' in ioMap else {}
+        sections = [CompiledInterfaceSectionBuilder("", ioMap, topParams)]
+        for partition, interface in ioMap.get('PATCH_PARTITIONS', {}).items():
+            sections.append(CompiledInterfaceSectionBuilder(partition, interface, interface['PARAMS']))
+        self.write(sections, jsonStat, jsonDigest)
+        logging.info("Compiled interface %s written (%d section(s))"%(self.compiledInterfaceFile, len(sections)))
+
+    def write(self, sections, jsonStat, jsonDigest):
+        strings   = bytearray()
+        stringMap = {}
+        # Method appends a string to the string table and returns its [offset, length]
+        def addString(string):
+            if string not in stringMap:
+                encoded = string.encode('utf-8')
+                stringMap[string] = [len(strings), len(encoded)]
+                strings.extend(encoded)
+            return stringMap[string]
+        tables    = bytearray()
+        tableBase = HEADER.size + SECTION.size * len(sections)
+        directory = bytearray()
+        for section in sections:
+            sectionTables = []
+            for records in [section.observeRecords, section.controlRecords]:
+                sectionTables.append(tableBase + len(tables))
+                for [path, msb, lsb, connectionIndex, recordType] in records:
+                    tables.extend(RECORD.pack(*addString(path), msb, lsb, connectionIndex, recordType))
+            sectionTables.append(tableBase + len(tables))
+            for recordIndex in section.connectionOrder:
+                tables.extend(INDEX.pack(recordIndex))
+            directory.extend(SECTION.pack(*addString(section.name),                       \
+                                          *addString(json.dumps(section.params)),         \
+                                          sectionTables[0], len(section.observeRecords),  \
+                                          sectionTables[1], len(section.controlRecords),  \
+                                          sectionTables[2],                               \
+                                          section.numSignalControls,                      \
+                                          section.numClkControls,                         \
+                                          section.maxObserveIndex))
+        # The string table follows the tables
+        # The file is written via a temporary file, so that a compiled interface is either complete or missing
+        tempPath = self.compiledInterfaceFile + ".%d.tmp"%(os.getpid())
+        with open(tempPath, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, len(sections), jsonStat.st_size, jsonStat.st_mtime_ns, jsonDigest, tableBase + len(tables)))
+            f.write(directory)
+            f.write(tables)
+            f.write(strings)
+        os.replace(tempPath, self.compiledInterfaceFile)
+
+
+# Class for one section (interface) of a compiled interface. All lookups are binary searches over the mmapped tables
+class CompiledInterfaceSection:
+    def __init__(self, compiledInterface, entry) -> None:
+        self.compiledInterface = compiledInterface
+        self.buffer            = compiledInterface.buffer
+        [nameOffset, nameLength, paramsOffset, paramsLength,          \
+         self.observeTable, self.numObserve,                          \
+         self.controlTable, self.numControl,                          \
+         self.connectionOrderTable,                                   \
+         self.numSignalControls, self.numClkControls,                 \
+         self.maxObserveIndex] = entry
+        self.name   = compiledInterface.getString(nameOffset, nameLength)
+        self.params = json.loads(compiledInterface.getString(paramsOffset, paramsLength))
+
+    # The section is pickled as its file and name, so that it can be sent to worker processes (JOBS > 1)
+    def __reduce__(self):
+        return (loadCompiledInterfaceSection, (self.compiledInterface.compiledInterfaceFile, self.name))
+
+    def __repr__(self):
+        return "CompiledInterfaceSection(%s, '%s', %d observed, %d controlled)"%(self.compiledInterface.compiledInterfaceFile, \
+                                                                                  self.name,                                   \
+                                                                                  self.numObserve,                             \
+                                                                                  self.numControl)
+
+    def getRecord(self, table, recordIndex):
+        return RECORD.unpack_from(self.buffer, table + recordIndex * RECORD.size)
+
+    # Method returns the record of <path> in a table (None if the path is not in the table)
+    def findRecord(self, table, numRecords, path:str):
+        key = path.encode('utf-8')
+        low, high = 0, numRecords
+        while low < high:
+            middle = (low + high) // 2
+            record = self.getRecord(table, middle)
+            recordPath = self.buffer[self.compiledInterface.stringBase + record[0]:self.compiledInterface.stringBase + record[0] + record[1]]
+            if recordPath < key:
+                low = middle + 1
+            elif recordPath > key:
+                high = middle
+            else:
+                return record
+        return None
+
+    # Method returns [<MSB>, <LSB>] of an observed signal (None if the signal is not observed)
+    def getObserveIndex(self, path:str):
+        record = self.findRecord(self.observeTable, self.numObserve, path)
+        return None if record is None else [record[2], record[3]]
+
+    # Method returns (<CONTROL TYPE>, [<MSB>, <LSB>], [<REORDERED MSB>, <REORDERED LSB>]) of a controlled signal
+    # (None if the signal is not controlled)
+    def getControlIndex(self, path:str):
+        record = self.findRecord(self.controlTable, self.numControl, path)
+        if record is None:
+            return None
+        controlType = "signal" if record[5] == TYPE_SIGNAL else "clock"
+        return controlType, [record[2], record[3]], [record[4] + record[2] - record[3], record[4]]
+
+    # Method returns True if the signal is in the given interface map (OBSERVABILITY_MAP/CONTROLLABILITY_MAP)
+    def hasSignal(self, mapName, path:str):
+        if mapName == 'OBSERVABILITY_MAP':
+            return self.findRecord(self.observeTable, self.numObserve, path) is not None
+        return self.findRecord(self.controlTable, self.numControl, path) is not None
+
+    # Method returns the control leaf table {<CONTROL TYPE>: [[<PATH>, <REORDERED MSB>, <REORDERED LSB>], ...]}
+    # in connection order. Every control record is decoded - The compiler does not need it, as it looks up the
+    # programmed controls only (getControlIndex)
+    def getControlLeafTable(self):
+        leafTable = {TYPE_SIGNAL: [], TYPE_CLOCK: []}
+        records   = list(RECORD.iter_unpack(self.buffer[self.controlTable:self.controlTable + RECORD.size * self.numControl]))
+        strings   = self.buffer[self.compiledInterface.stringBase:]
+        for [recordIndex] in INDEX.iter_unpack(self.buffer[self.connectionOrderTable:self.connectionOrderTable + INDEX.size * self.numControl]):
+            [pathOffset, pathLength, msb, lsb, connectionIndex, recordType] = records[recordIndex]
+            leafTable[recordType].append([strings[pathOffset:pathOffset + pathLength].decode('utf-8'), connectionIndex + msb - lsb, connectionIndex])
+        return {"signal": leafTable[TYPE_SIGNAL], "clock": leafTable[TYPE_CLOCK]}
+
+
+# Class to load a compiled interface (asap_interface.idx) through a read-only mmap
+class CompiledInterface:
+    def __init__(self, compiledInterfaceFile) -> None:
+        self.compiledInterfaceFile = compiledInterfaceFile
+        with open(compiledInterfaceFile, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, numSections, self.jsonSize, self.jsonMtime, self.jsonDigest, self.stringBase = HEADER.unpack_from(self.buffer, 0)
+        assert magic == MAGIC and version == VERSION, "%s is not a compiled interface (version %d)"%(compiledInterfaceFile, VERSION)
+        self.sections = {}
+        for index in range(numSections):
+            section = CompiledInterfaceSection(self, SECTION.unpack_from(self.buffer, HEADER.size + SECTION.size * index))
+            self.sections[section.name] = section
+
+    def getString(self, offset, length):
+        return self.buffer[self.stringBase + offset:self.stringBase + offset + length].decode('utf-8')
+
+    # Top level interface
+    def getInterface(self):
+        return self.sections[""]
+
+    # Patch partitions {<PARTITION>: CompiledInterfaceSection} (None if the interface is not partitioned)
+    def getPartitions(self):
+        partitions = {name: section for name, section in self.sections.items() if name != ""}
+        return partitions if partitions else None
+
+    # Method returns the compiled interface of an interface file if it is up to date (None otherwise)
+    @staticmethod
+    def load(interfaceFile):
+        compiledInterfaceFile = getCompiledInterfaceFile(interfaceFile)
+        if not os.path.exists(compiledInterfaceFile):
+            return None
+        # A compiled interface of another version (or a truncated file) is out of date as well
+        with open(compiledInterfaceFile, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) != HEADER.size or HEADER.unpack(header)[:2] != (MAGIC, VERSION):
+            logging.info("Compiled interface %s is not of version %d - Using %s"%(compiledInterfaceFile, VERSION, interfaceFile))
+            return None
+        compiledInterface = CompiledInterface(compiledInterfaceFile)
+        jsonStat          = os.stat(interfaceFile)
+        if jsonStat.st_size != compiledInterface.jsonSize or                                                  \
+           (jsonStat.st_mtime_ns != compiledInterface.jsonMtime and getInterfaceDigest(interfaceFile) != compiledInterface.jsonDigest):
+            logging.info("Compiled interface %s is out of date with %s - Using %s"%(compiledInterfaceFile, interfaceFile, interfaceFile))
+            return None
+        logging.info("Using compiled interface %s"%(compiledInterfaceFile))
+        return compiledInterface
+
+
+# Loads a section of a compiled interface (unpickling of CompiledInterfaceSection)
+def loadCompiledInterfaceSection(compiledInterfaceFile, name):
+    return CompiledInterface(compiledInterfaceFile).sections[name]
+
+
+# One-time indexing of an existing interface file: python3 ASAPInterface.py <asap_interface.json>
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    assert len(sys.argv) == 2, "Usage: python3 ASAPInterface.py <asap_interface.json>"
+    CompiledInterfaceWriter(sys.argv[1])
@@ -0,0 +1,94 @@
+# Shared setup of the ASAP tests
+# -- src/ is importable. The design under test is the sample design with pragmas (asap_sample/src/sample_with_pragmas)
+# -- The tests run in a temporary working directory, so that logs (ASAPCompiler.log) and the lex/parser table
+#    caches (XDG_CACHE_HOME) are not written to the repository or to the home directory
+import os
+import sys
+import shutil
+import tempfile
+import pytest
+
+REPO_DIR       = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR     = os.path.join(REPO_DIR, "asap_sample", "src", "sample_with_pragmas")
+SAMPLE_FILES   = ["top.v", "software_adaptor.v", "access_controller.v", "target_agent.v"]
+PROGRAM_DIR    = os.path.join(REPO_DIR, "asap_sample", "remediation_programs")
+SAMPLE_PARAMS  = {"TOP_MODULE"       : "top", \
+                  "SMU_SEGMENT_SIZE" : 5,     \
+                  "SRU_SEGMENT_SIZE" : 3,     \
+                  "MAX_SEQ_DEPTH"    : 5,     \
+                  "MAX_TRIGGERS"     : 5,     \
+                  "SRU_NUM_PLA"      : 5}
+
+sys.path.insert(0, os.path.join(REPO_DIR, "src"))
+WORK_DIR = tempfile.mkdtemp(prefix="asap_tests_")
+os.environ["XDG_CACHE_HOME"] = os.path.join(WORK_DIR, "cache")
+os.chdir(WORK_DIR)
+
+
+def pytest_sessionfinish(session, exitstatus):
+    os.chdir(REPO_DIR)
+    shutil.rmtree(WORK_DIR, ignore_errors=True)
+
+
+# Copies the sample design to <folder> and returns its filelist
+def copySampleDesign(folder):
+    os.makedirs(folder, exist_ok=True)
+    for file in SAMPLE_FILES:
+        shutil.copyfile(os.path.join(SAMPLE_DIR, file), os.path.join(folder, file))
+    filelist = os.path.join(folder, "filelist.f")
+    with open(filelist, "w") as f:
+        f.write("\n".join(os.path.join(folder, file) for file in SAMPLE_FILES) + "\n")
+    return filelist
+
+# Writes a specification file of the sample design (SAMPLE_PARAMS updated with <params>) and returns its path
+def writeSpec(specFile, filelist, params=None):
+    specParams = dict(SAMPLE_PARAMS, FILELIST = filelist)
+    specParams.update(params if params else {})
+    with open(specFile, "w") as f:
+        f.write("\n".join("%s = %s"%(param, value) for param, value in specParams.items()) + "\n")
+    return specFile
+
+# Returns {<FILENAME>: <CONTENT>} of all files in a folder
+def readFolder(folder):
+    contents = {}
+    for filename in sorted(os.listdir(folder)):
+        if os.path.isfile(os.path.join(folder, filename)):
+            with open(os.path.join(folder, filename), "rb") as f:
+                contents[filename] = f.read()
+    return contents
+
+
+@pytest.fixture
+def sampleFilelist(tmp_path):
+    return copySampleDesign(str(tmp_path / "design"))
+
+# Runs ASAP insertion of the design of <filelist> (default: the sample design) with the spec params <params>
+# Returns the output folder
+@pytest.fixture
+def runInsertion(tmp_path, sampleFilelist):
+    import ASAPInsertion
+    def run(name, params=None, filelist=None):
+        outputFolder = str(tmp_path / name)
+        os.makedirs(outputFolder, exist_ok=True)
+        specFile = writeSpec(str(tmp_path / (name + ".spec")), filelist if filelist else sampleFilelist, params)
+        ASAPInsertion.ASAPInsertion(specFile, outputFolder)
+        return outputFolder
+    return run
+
+# Compiles the sample remediation program <approach> for the interface of <interfaceFile> with the spec params <params>
+# Returns the output folder
+@pytest.fixture
+def runCompiler(tmp_path, sampleFilelist):
+    import ASAPCompiler
+    def run(name, interfaceFile, approach=1, params=None):
+        outputFolder = str(tmp_path / name)
+        os.makedirs(outputFolder, exist_ok=True)
+        specFile   = writeSpec(str(tmp_path / (name + ".spec")), sampleFilelist, params)
+        programDir = os.path.join(PROGRAM_DIR, "approach_%d"%(approach))
+        ASAPCompiler.ASAPCompiler(specFile,                                        \
+                                  interfaceFile,                                   \
+                                  outputFolder,                                    \
+                                  os.path.join(programDir, "patch.asap.smu"),      \
+                                  os.path.join(programDir, "patch.asap.sru"))
+        return outputFolder
+    return run
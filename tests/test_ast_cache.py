@@ -0,0 +1,75 @@
+# Tests of the persistent AST cache (AST_CACHE_DIR) - Hits and misses across runs, and the invalidation of entries
+# by an edit of a file, a change of the defines and a change of an included file
+import os
+import logging
+from ASAPInsertion import AstCache
+from conftest import readFolder
+
+
+def getCacheLog(caplog):
+    return [record.getMessage() for record in caplog.records if record.getMessage().startswith("AST cache:")][-1]
+
+
+def test_unchanged_files_hit(tmp_path, runInsertion, caplog):
+    caplog.set_level(logging.INFO)
+    params = {"AST_CACHE_DIR": str(tmp_path / "ast_cache")}
+    first  = runInsertion("first", params)
+    assert getCacheLog(caplog) == "AST cache: 0 hit(s), 4 miss(es) for 4 file(s)"
+    second = runInsertion("second", params)
+    assert getCacheLog(caplog) == "AST cache: 4 hit(s), 0 miss(es) for 4 file(s)"
+    assert readFolder(first) == readFolder(second) == readFolder(runInsertion("uncached"))
+
+
+def test_edited_file_misses(tmp_path, runInsertion, sampleFilelist, caplog):
+    caplog.set_level(logging.INFO)
+    params = {"AST_CACHE_DIR": str(tmp_path / "ast_cache")}
+    runInsertion("first", params)
+    # A new signal changes the AST (and the output) of the edited file only
+    agentFile = os.path.join(os.path.dirname(sampleFilelist), "target_agent.v")
+    with open(agentFile, "r") as f:
+        source = f.read()
+    with open(agentFile, "w") as f:
+        f.write(source.replace("endmodule", "wire asap_cache_test;\nendmodule", 1))
+    edited = runInsertion("edited", params)
+    assert getCacheLog(caplog) == "AST cache: 3 hit(s), 1 miss(es) for 4 file(s)"
+    assert b"asap_cache_test" in readFolder(edited)["target_agent.v"]
+    assert readFolder(edited) == readFolder(runInsertion("uncached"))
+
+
+def test_changed_defines_miss(tmp_path, runInsertion, caplog):
+    caplog.set_level(logging.INFO)
+    params = {"AST_CACHE_DIR": str(tmp_path / "ast_cache")}
+    runInsertion("first", params)
+    runInsertion("defined", dict(params, PREPROCESS_DEFINES="SYNTHESIS"))
+    assert getCacheLog(caplog) == "AST cache: 0 hit(s), 4 miss(es) for 4 file(s)"
+    runInsertion("second", params)
+    assert getCacheLog(caplog) == "AST cache: 4 hit(s), 0 miss(es) for 4 file(s)"
+
+
+def test_changed_include_changes_key(tmp_path):
+    includeDir = tmp_path / "include"
+    includeDir.mkdir()
+    (includeDir / "widths.vh").write_text("`define WIDTH 4\n")
+    (tmp_path / "top.v").write_text("`include \"widths.vh\"\nmodule top;\nendmodule\n")
+    file  = str(tmp_path / "top.v")
+    cache = AstCache(str(tmp_path / "ast_cache"), includes=(str(includeDir),))
+    key   = cache.getKey(file)
+    assert key is not None and AstCache(cache.cacheDir, includes=(str(includeDir),)).getKey(file) == key
+    # Key of the defines and include directories
+    assert AstCache(cache.cacheDir, defines=("WIDTH=8",), includes=(str(includeDir),)).getKey(file) != key
+    # Contents of the included file
+    (includeDir / "widths.vh").write_text("`define WIDTH 8\n")
+    assert AstCache(cache.cacheDir, includes=(str(includeDir),)).getKey(file) != key
+    # A file with an unresolved include is not cached
+    assert AstCache(cache.cacheDir).getKey(file) is None
+
+
+def test_store_and_load(tmp_path):
+    cache = AstCache(str(tmp_path / "ast_cache"))
+    assert cache.load("0" * 64) is None and cache.misses == 1
+    cache.store("0" * 64, {"ast": [1, 2]})
+    assert cache.load("0" * 64) == {"ast": [1, 2]} and cache.hits == 1
+    # A corrupt entry is a miss
+    with open(cache.getEntryPath("0" * 64), "wb") as f:
+        f.write(b"corrupt")
+    assert cache.load("0" * 64) is None and cache.misses == 2
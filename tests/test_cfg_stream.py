@@ -0,0 +1,130 @@
+# Tests of the SMU/SRU cfg streams - The packed cfg buffer (BitBuffer), and the stream layout against the cfg
+# register layout of reusable_ip/smu.v and reusable_ip/sru.v (bit 0 of the stream is the last bit streamed in)
+import math
+import pytest
+from ASAPCompiler import BitBuffer, ASAPSmuGrammar, ASAPSruGrammar, ASAPSmuCompiler, ASAPSruCompiler
+
+
+# Returns bits [lsb +: width] of a cfg stream (MSB first string) as a MSB first string
+def getStreamBits(cfgStream, lsb, width):
+    return cfgStream[len(cfgStream) - lsb - width:len(cfgStream) - lsb]
+
+def compileSmu(tmp_path, program, maxSeqDepth, maxTriggers, segmentSize, observabilityMap):
+    sequenceList, diagnostics = ASAPSmuGrammar.getGrammar().parseText(program)
+    assert diagnostics == []
+    compiler = ASAPSmuCompiler(None, str(tmp_path), maxSeqDepth, maxTriggers, segmentSize, observabilityMap, \
+                               sequenceList=sequenceList)
+    compiler.generateProgram()
+    return compiler, compiler.getCfgStreamFromOrderedCfg()
+
+# CFG_SIZE of smu.v
+def getSmuCfgSize(N, K, M, segmentSize):
+    numSegments = (K + segmentSize - 1) // segmentSize
+    bitsNumSegments = 1 if numSegments == 1 else math.ceil(math.log2(numSegments))
+    return N * M * (2 + math.ceil(math.log2(N)) + 2 * segmentSize + bitsNumSegments + 1)
+
+
+def test_bit_buffer_fields():
+    buffer = BitBuffer(20)
+    # Fields within a byte, across a byte boundary and across two byte boundaries
+    buffer.setField(0, 3, 0b101)
+    buffer.setField(6, 4, 0b1001)
+    buffer.setField(10, 10, 0b1100000011)
+    assert (buffer.getField(0, 3), buffer.getField(6, 4), buffer.getField(10, 10)) == (0b101, 0b1001, 0b1100000011)
+    assert buffer.toBinaryString() == "1100000011" + "1001" + "000" + "101"
+    # Setting a field leaves its neighbours untouched
+    buffer.setField(6, 4, 0)
+    assert buffer.toBinaryString() == "1100000011" + "0000" + "000" + "101"
+    assert buffer.getBinaryString(10, 4) == "0011"
+
+
+def test_bit_buffer_limits():
+    buffer = BitBuffer(9)
+    buffer.setField(9, 0, 0)
+    assert (buffer.getField(4, 0), buffer.getBinaryString(4, 0)) == (0, "")
+    assert len(buffer.toBinaryString()) == 9
+    assert BitBuffer(0).toBinaryString() == ""
+    with pytest.raises(AssertionError, match="outside of the cfg buffer"):
+        buffer.setField(8, 2, 0)
+    with pytest.raises(AssertionError, match="does not fit"):
+        buffer.setField(0, 2, 4)
+
+
+@pytest.mark.parametrize("maxSeqDepth, observeMsb", [(2, 3), (4, 12), (1, 3), (1, 12)])
+def test_smu_stream_matches_smu_v(tmp_path, maxSeqDepth, observeMsb):
+    # A single segment (observeMsb 3) has a 1 bit INP_SEL, a maximum sequence depth of 1 has no FSM_CMP bits
+    program = "t0 {\n(TOP.a[1:0] == 2'b10)\n}\nt1 {\n(TOP.b[0:0] == 1'b1)\n}\n"
+    compiler, cfgStream = compileSmu(tmp_path, program, maxSeqDepth, 3, 5, {"TOP": {"a": [1, 0], "b": [observeMsb, observeMsb]}})
+    assert len(cfgStream) == getSmuCfgSize(maxSeqDepth, observeMsb + 1, 3, 5)
+    with open(str(tmp_path / "smu.stream"), "r") as f:
+        assert f.read().split() == list(cfgStream)
+    # Unit of t1 in cycle 0 - {SMU_ENB, INP_SEL, CMP_VAL, MASK, FSM_CMP, CMP_SEL} from the MSB
+    unitSize  = len(cfgStream) // (maxSeqDepth * 3)
+    segment   = observeMsb // 5
+    inpSel    = format(segment, "0{}b".format(compiler.inpSelWidth))
+    bit       = format(1 << (observeMsb % 5), "05b")
+    assert getStreamBits(cfgStream, unitSize, unitSize) == "1" + inpSel + bit + bit + "0" * compiler.fsmCmpWidth + "11"
+
+
+def test_sru_part_select_matches_sru_v(tmp_path):
+    # TOP.x is control bits 0-3, TOP.y control bits 4-5 and TOP.c the only clock control
+    program = "signal {\n  name = TOP.x[2:1]\n  trigger = (t0)\n  constant = 2'b10\n}\n"
+    controlNodeList, diagnostics = ASAPSruGrammar.getGrammar().parseText(program)
+    assert diagnostics == []
+    S, C, M, numPla, segmentSize = 6, 1, 4, 2, 2
+    compiler = ASAPSruCompiler(None, str(tmp_path), segmentSize, M, C, S, {"t0": 3}, numPla,  \
+                               {"TOP": {"x": [3, 0], "y": [5, 4]}}, {"TOP": {"c": [6, 6]}},   \
+                               controlNodeList=controlNodeList)
+    compiler.generateProgram()
+    cfgStream = compiler.getCfgStreamFromOrderedCfg()
+    # CFG_SIZE and the cfg register offsets of sru.v
+    plaSelWidth = math.ceil(math.log2(numPla))
+    regClkCtlEnbLsb = S
+    regSigCtlEnbLsb = regClkCtlEnbLsb + C
+    regPlaSelSigLsb = regSigCtlEnbLsb + S + C * plaSelWidth
+    regMintermLsb   = regPlaSelSigLsb + S * plaSelWidth
+    regSigSelLsb    = regMintermLsb + numPla * 2 ** segmentSize
+    assert len(cfgStream) == regSigSelLsb + numPla * segmentSize * math.ceil(math.log2(M))
+    # Only the selected bits 1-2 of TOP.x are controlled, the other control bits stay disabled
+    assert getStreamBits(cfgStream, 0, S) == "000100"
+    assert getStreamBits(cfgStream, regClkCtlEnbLsb, C) == "0"
+    assert getStreamBits(cfgStream, regSigCtlEnbLsb, S) == "000110"
+    assert getStreamBits(cfgStream, regPlaSelSigLsb, S * plaSelWidth) == "000000"
+    # PLA 0 - t0 is trigger 3 on PLA input 0. Minterms 1 and 3 (t0 = 1, unused PLA input 1 is don't care) are selected
+    assert getStreamBits(cfgStream, regMintermLsb, 2 ** segmentSize) == "1010"
+    assert getStreamBits(cfgStream, regSigSelLsb, segmentSize * 2) == "0011"
+
+
+def test_sru_stream_matches_hand_computed_layout(tmp_path):
+    # Signal controls TOP.x (bits 0-3) and TOP.u.y (bits 4-5), clock controls TOP.c (bit 6) and TOP.u.g (bit 7)
+    # (t0 . t1) and (t1 . t0) are equivalent - TOP.x and TOP.u.y share PLA 1
+    program = "clock {\n  name = TOP.u.g[0:0]\n  trigger = (t1)\n}\n"                             \
+              "signal {\n  name = TOP.x[3:2]\n  trigger = (t0 . t1)\n  constant = 2'b01\n}\n"     \
+              "signal {\n  name = TOP.u.y[1:0]\n  trigger = (t1 . t0)\n  constant = 2'b11\n}\n"   \
+              "clock {\n  name = TOP.c[0:0]\n  trigger = (t0 + t1)\n}\n"
+    controlNodeList, diagnostics = ASAPSruGrammar.getGrammar().parseText(program)
+    assert diagnostics == []
+    S, C, M, numPla, segmentSize = 6, 2, 4, 3, 2
+    compiler = ASAPSruCompiler(None, str(tmp_path), segmentSize, M, C, S, {"t0": 1, "t1": 2}, numPla,      \
+                               {"TOP": {"x": [3, 0], "u": {"y": [5, 4]}}},                                \
+                               {"TOP": {"c": [6, 6], "u": {"g": [7, 7]}}},                                \
+                               controlNodeList=controlNodeList)
+    compiler.generateProgram()
+    cfgStream = compiler.getCfgStreamFromOrderedCfg()
+    # Sections of sru.v from the MSB, the last unit (PLA 2, control bit 5/1) first
+    # -- TRIG_SEL:    PLA 2 (t0 + t1) and PLA 1 (t0 . t1) select t0 (1), t1 (2). PLA 0 (t1) an unused input and t1 (2)
+    # -- MINTERM_SEL: t0 + t1, t0 . t1, t1 (PLA input 1 is don't care)
+    # -- PLA_SEL:     Signal - TOP.u.y and TOP.x on PLA 1, bits 0-1 unused. Clock - TOP.u.g on PLA 0, TOP.c on PLA 2
+    # -- CNTL_ENB:    Signal - Bits 2-5. Clock - Both
+    # -- CONSTANT:    TOP.u.y = 2'b11, TOP.x = 2'b01
+    expected = "01" "10" + "01" "10" + "00" "10" + \
+               "1110" + "1000" + "1010"        + \
+               "01" * 4 + "00" * 2             + \
+               "00" + "10"                     + \
+               "1111" + "00"                   + \
+               "11"                            + \
+               "11" + "01" + "00"
+    assert len(cfgStream) == 54
+    assert cfgStream == expected
+    with open(str(tmp_path / "sru.stream"), "r") as f:
+        assert f.read().split() == list(cfgStream)
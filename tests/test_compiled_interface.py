@@ -0,0 +1,96 @@
+# Tests of the compiled interface (asap_interface.idx) - Lookups against the JSON interface, the staleness check
+# against asap_interface.json and the compile with the compiled interface
+import os
+import json
+import shutil
+import logging
+import pytest
+import ASAPInterface
+from ASAPInterface import CompiledInterface, getCompiledInterfaceFile
+from ASAPCompiler import ControlSignalMappingModel, ControlType
+from conftest import readFolder
+
+
+@pytest.fixture
+def interfaceFile(runInsertion):
+    interfaceFile = os.path.join(runInsertion("indexed", {"INTERFACE_INDEX": 1}), "asap_interface.json")
+    assert os.path.exists(getCompiledInterfaceFile(interfaceFile))
+    return interfaceFile
+
+def readInterface(interfaceFile):
+    with open(interfaceFile, "r") as f:
+        return json.load(f)
+
+
+def test_lookups_match_json_interface(interfaceFile):
+    ioMap      = readInterface(interfaceFile)
+    interface  = CompiledInterface.load(interfaceFile).getInterface()
+    reorderMap = ControlSignalMappingModel(ioMap['CONTROLLABILITY_MAP'], ioMap['CONTROL_TYPE_MAP'])
+    assert interface.getObserveIndex("TOP.rd_ready") == ioMap['OBSERVABILITY_MAP']['TOP']['rd_ready']
+    assert interface.getObserveIndex("TOP.no_such_signal") is None
+    assert (interface.numSignalControls, interface.numClkControls) == (reorderMap.numSignalControls, reorderMap.numClkControls)
+    for controlType in ControlType:
+        leafTable = interface.getControlLeafTable()[controlType.name.lower()]
+        assert leafTable == reorderMap.controlLeafTable[controlType]
+        for [name, msb, lsb] in leafTable:
+            assert interface.getControlIndex(name)[0] == controlType.name.lower()
+            assert interface.getControlIndex(name)[2] == [msb, lsb]
+
+
+def test_unchanged_interface_is_used(interfaceFile):
+    # A new modification time alone only triggers the SHA1 check
+    os.utime(interfaceFile, ns=(0, 0))
+    assert CompiledInterface.load(interfaceFile) is not None
+
+
+@pytest.mark.parametrize("change", ["size", "content"])
+def test_changed_interface_is_stale(interfaceFile, change, caplog):
+    caplog.set_level(logging.INFO)
+    with open(interfaceFile, "r") as f:
+        text = f.read()
+    # A change of the same size is only found by the SHA1 check
+    changedText = text + "\n" if change == "size" else text.replace('"rd_ready"', '"rd_readx"')
+    assert changedText != text and (len(changedText) == len(text)) == (change == "content")
+    with open(interfaceFile, "w") as f:
+        f.write(changedText)
+    assert CompiledInterface.load(interfaceFile) is None
+    assert "is out of date with" in caplog.records[-1].getMessage()
+
+
+def test_other_version_is_stale(interfaceFile, monkeypatch):
+    monkeypatch.setattr(ASAPInterface, "VERSION", ASAPInterface.VERSION + 1)
+    assert CompiledInterface.load(interfaceFile) is None
+    # A truncated compiled interface is not used either
+    monkeypatch.undo()
+    with open(getCompiledInterfaceFile(interfaceFile), "r+b") as f:
+        f.truncate(ASAPInterface.HEADER.size - 1)
+    assert CompiledInterface.load(interfaceFile) is None
+
+
+def test_missing_interface_is_not_loaded(tmp_path):
+    assert CompiledInterface.load(str(tmp_path / "asap_interface.json")) is None
+
+
+def test_compile_with_compiled_interface(interfaceFile, runCompiler, tmp_path, caplog):
+    caplog.set_level(logging.INFO)
+    # The same interface without its compiled interface
+    jsonFolder = tmp_path / "json"
+    jsonFolder.mkdir()
+    jsonInterfaceFile = str(jsonFolder / "asap_interface.json")
+    shutil.copyfile(interfaceFile, jsonInterfaceFile)
+    for approach in [1, 2, 3]:
+        compiled = readFolder(runCompiler("compiled_%d"%(approach), interfaceFile, approach))
+        assert any(record.getMessage().startswith("Using compiled interface") for record in caplog.records)
+        caplog.clear()
+        assert readFolder(runCompiler("json_%d"%(approach), jsonInterfaceFile, approach)) == compiled
+
+
+def test_partition_sections(runInsertion):
+    interfaceFile = os.path.join(runInsertion("partitioned", {"INTERFACE_INDEX": 1, "PATCH_PARTITIONS": "ip:adaptor,controller"}), \
+                                 "asap_interface.json")
+    partitions = readInterface(interfaceFile)['PATCH_PARTITIONS']
+    sections   = CompiledInterface.load(interfaceFile).getPartitions()
+    assert list(sections) == list(partitions)
+    for name, section in sections.items():
+        assert section.params == partitions[name]['PARAMS']
+        assert section.getObserveIndex("TOP.rd_ready") == partitions[name]['OBSERVABILITY_MAP']['TOP'].get('rd_ready')
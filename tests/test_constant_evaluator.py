@@ -0,0 +1,34 @@
+# Tests of the constant expression evaluation (parameters, declaration ranges) of the symbol database
+import pytest
+from ASAPInsertion import ConstantEvaluator, VerilogParserPool, ModuleIndex
+
+
+def getParameterValues(parameters):
+    text = "module m #(%s) (input wire a);\nendmodule\n"%(", ".join("parameter %s = %s"%(name, value) for name, value in parameters))
+    moduleDef, = ModuleIndex.getModuleDefs(VerilogParserPool().parse(text, "m.v"))
+    return ConstantEvaluator(moduleDef).parameterToValue
+
+
+@pytest.mark.parametrize("expression, value", [("7 / 2",   3),  ("-7 / 2",  -3), ("7 / -2", -3), ("-7 / -2", 3),
+                                               ("7 % 2",   1),  ("-7 % 2",  -1), ("7 % -2",  1), ("-7 % -2", -1),
+                                               ("(2 ** 70 + 1) / 3", (2 ** 70 + 1) // 3),
+                                               ("((2 ** 64) - 1) / 1", 2 ** 64 - 1)])
+def test_division_truncates_toward_zero(expression, value):
+    assert getParameterValues([("P", expression)])["P"] == value
+
+
+# A negative exponent gives an integer: 0, except for the bases 1 and -1
+@pytest.mark.parametrize("expression, value", [("2 ** 10",   1024), ("-2 ** 3",   -8),
+                                               ("2 ** -1",   0),    ("-3 ** -2",  0),
+                                               ("1 ** -5",   1),    ("-1 ** -3",  -1), ("-1 ** -4", 1),
+                                               ("0 ** -1",   None), ("0 ** 0",    1)])
+def test_power(expression, value):
+    assert getParameterValues([("P", expression)])["P"] == value
+
+
+def test_division_by_zero_is_not_constant():
+    assert getParameterValues([("P", "1 / 0"), ("Q", "1 % 0")]) == {"P": None, "Q": None}
+
+
+def test_parameters_are_evaluated_in_order():
+    assert getParameterValues([("W", "8"), ("D", "W * 4 / 3"), ("L", "$clog2(D)")]) == {"W": 8, "D": 10, "L": 4}
@@ -0,0 +1,86 @@
+# Tests of the control reordering of the top-level patch block (asapTop.v) - The coalesced qIn/qOut concatenations
+# (COALESCE_RANGES) connect the same bits as the per-signal assignments and as the per-bit mapping of
+# ControlSignalMappingModel ({clock controls, signal controls} from the MSB)
+import pytest
+from pyverilog.vparser.ast import Assign, Concat, Identifier, Partselect
+from ASAPInsertion import ControlSignalMappingModel, TopPatchBlockGenerator
+
+CONTROL_WIDTH = 9
+
+# TOP.a, TOP.b and TOP.u.e are signal controls, TOP.c and TOP.u.d clock controls
+MIXED_CONTROL_MAP  = ({"TOP": {"a": [1, 0], "c": [2, 2], "b": [5, 3], "u": {"d": [6, 6], "e": [8, 7]}}},                     \
+                      {"TOP": {"a": "signal", "c": "clock", "b": "signal", "u": {"d": "clock", "e": "signal"}}})
+# Signal controls ahead of the clock controls - No reordering needed
+ORDERED_CONTROL_MAP = ({"TOP": {"a": [1, 0], "b": [5, 2], "u": {"e": [6, 6], "d": [7, 7], "f": [8, 8]}}},                    \
+                       {"TOP": {"a": "signal", "b": "signal", "u": {"e": "signal", "d": "clock", "f": "clock"}}})
+
+
+def getGenerator(controlMap, coalesceRanges):
+    return TopPatchBlockGenerator("asapTop.v", "smu", 5, {"TOP": {"o": [0, 0]}}, 5, 5, "sru", 3, 5, \
+                                  controlMap[0], controlMap[1], coalesceRanges = coalesceRanges)
+
+# Bits of an expression (LSB first) as [(<SIGNAL>, <BIT>)] - Whole identifiers are CONTROL_WIDTH wide
+def getBits(node):
+    if isinstance(node, Partselect):
+        return [(node.var.name, bit) for bit in range(int(node.lsb.value), int(node.msb.value) + 1)]
+    if isinstance(node, Concat):
+        return [bit for item in reversed(node.list) for bit in getBits(item)]
+    assert isinstance(node, Identifier)
+    return [(node.name, bit) for bit in range(CONTROL_WIDTH)]
+
+# {<LHS BIT>: <RHS BIT>} of the reordering assignments
+def getBitMap(items):
+    bitMap = {}
+    for assignment in [item for item in items if isinstance(item, Assign)]:
+        lhsBits, rhsBits = getBits(assignment.left.var), getBits(assignment.right.var)
+        assert len(lhsBits) == len(rhsBits)
+        for lhsBit, rhsBit in zip(lhsBits, rhsBits):
+            assert lhsBit not in bitMap, "Bit %s driven twice"%(str(lhsBit))
+            bitMap[lhsBit] = rhsBit
+    return bitMap
+
+# Per-bit mapping of the reordered control maps - qInInternal[<REORDERED BIT>] = qIn[<ORIGINAL BIT>] and
+# qOut[<ORIGINAL BIT>] = qOutInternal[<REORDERED BIT>]
+def getModelBitMap(controlMap):
+    model  = ControlSignalMappingModel(controlMap[0], controlMap[1])
+    bitMap = {}
+    def visit(reorderedMap, originalMap):
+        for key in reorderedMap:
+            if isinstance(reorderedMap[key], dict):
+                visit(reorderedMap[key], originalMap[key])
+                continue
+            for offset in range(reorderedMap[key][0] - reorderedMap[key][1] + 1):
+                reorderedBit, originalBit = reorderedMap[key][1] + offset, originalMap[key][1] + offset
+                bitMap[("qInInternal", reorderedBit)] = ("qIn", originalBit)
+                bitMap[("qOut", originalBit)]         = ("qOutInternal", reorderedBit)
+    visit(model.controlledSignalMap, controlMap[0])
+    visit(model.controlledClkMap, controlMap[0])
+    return bitMap
+
+
+@pytest.mark.parametrize("controlMap", [MIXED_CONTROL_MAP, ORDERED_CONTROL_MAP])
+def test_coalesced_reordering_matches_model(controlMap):
+    perSignal = getGenerator(controlMap, False).getRearrangedControlAssignments()
+    coalesced = getGenerator(controlMap, True).getRearrangedControlAssignments()
+    assert len([item for item in coalesced if isinstance(item, Assign)]) == 2
+    assert getBitMap(coalesced) == getBitMap(perSignal) == getModelBitMap(controlMap)
+    assert len(getModelBitMap(controlMap)) == 2 * CONTROL_WIDTH
+
+
+def test_mixed_controls_are_reordered_in_runs():
+    generator = getGenerator(MIXED_CONTROL_MAP, True)
+    coalesced = [item for item in generator.getRearrangedControlAssignments() if isinstance(item, Assign)]
+    # qInInternal = {qIn[6:6], qIn[2:2], qIn[8:7], qIn[5:3], qIn[1:0]} - Signal controls a, b, e and clock controls c, d
+    assert [(int(item.msb.value), int(item.lsb.value)) for item in coalesced[0].right.var.list] == [(6, 6), (2, 2), (8, 7), (5, 3), (1, 0)]
+    assert [(int(item.msb.value), int(item.lsb.value)) for item in coalesced[1].right.var.list] == [(6, 5), (8, 8), (4, 2), (7, 7), (1, 0)]
+
+
+def test_ordered_controls_pass_through():
+    generator = getGenerator(ORDERED_CONTROL_MAP, True)
+    signalMapList = generator.originalToRearrangedControlMapping(generator.reorderMap.controlledSignalMap, ORDERED_CONTROL_MAP[0], [])
+    signalMapList = generator.originalToRearrangedControlMapping(generator.reorderMap.controlledClkMap, ORDERED_CONTROL_MAP[0], signalMapList)
+    # One run with the same LSB on both sides
+    assert generator.getControlRuns(signalMapList) == [(8, 0, 8, 0)]
+    coalesced = generator.getCoalescedControlAssignments(signalMapList)
+    assert [(item.left.var.name, item.right.var.name) for item in coalesced] == [("qInInternal", "qIn"), ("qOut", "qOutInternal")]
+    assert generator.getCoalescedControlAssignments([]) == []
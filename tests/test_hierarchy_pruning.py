@@ -0,0 +1,36 @@
+# Tests of hierarchy pruning (HIERARCHY_PRUNING) - Files with only pruned modules are passed through unparsed and
+# byte for byte, and the interface maps are those of an unpruned run
+import os
+import logging
+from conftest import copySampleDesign, readFolder
+
+# A module outside of the hierarchy of the top module (CRLF line breaks and comments are kept by the pass-through)
+SPARE_SOURCE = b"// Spare cell\r\nmodule spare(input a, output b);\r\n  assign b = ~a;  // inverted\r\nendmodule\r\n"
+
+
+def test_pruned_files_pass_through(tmp_path, runInsertion, caplog):
+    caplog.set_level(logging.INFO)
+    filelist = copySampleDesign(str(tmp_path / "pruned_design"))
+    designDir = os.path.dirname(filelist)
+    # target_agent has no pragmas left, so no path from the top module to a pragma passes through it
+    agentFile = os.path.join(designDir, "target_agent.v")
+    with open(agentFile, "rb") as f:
+        source = f.read()
+    with open(agentFile, "wb") as f:
+        f.write(source.replace(b"// #pragma observe 0:0 control signal 0:0", b"// access enable"))
+    with open(os.path.join(designDir, "spare.v"), "wb") as f:
+        f.write(SPARE_SOURCE)
+    with open(filelist, "a") as f:
+        f.write(os.path.join(designDir, "spare.v") + "\n")
+    pruned = readFolder(runInsertion("pruned", {"HIERARCHY_PRUNING": 1}, filelist))
+    assert any(record.getMessage().startswith("Hierarchy pruning: 3 of 5 module(s) to be rewritten, 3 of 5 file(s) to be parsed") \
+               for record in caplog.records)
+    full = readFolder(runInsertion("full", {"HIERARCHY_PRUNING": 0}, filelist))
+    # Pruned files are copied unchanged, the unpruned run regenerates them from the AST
+    with open(agentFile, "rb") as f:
+        assert pruned["target_agent.v"] == f.read()
+    assert pruned["spare.v"] == SPARE_SOURCE
+    assert pruned["asap_interface.json"] == full["asap_interface.json"]
+    for filename in full:
+        if filename not in ("target_agent.v", "spare.v"):
+            assert pruned[filename] == full[filename], filename
@@ -0,0 +1,58 @@
+# Tests of the partitioned, incremental insertion (SUMMARY_DIR) - Interface summaries of partitions whose sources
+# are unchanged are reused, and the output matches a full insertion
+import os
+import logging
+from conftest import readFolder
+
+PARTITION_FILES = {"software_adaptor"  : "software_adaptor.v", \
+                   "access_controller" : "access_controller.v", \
+                   "target_agent"      : "target_agent.v"}
+
+
+def getSummaryLog(caplog):
+    return [record.getMessage() for record in caplog.records if record.getMessage().startswith("Interface summaries:")]
+
+
+def test_summaries_are_stored_and_reused(tmp_path, runInsertion, caplog):
+    caplog.set_level(logging.INFO)
+    summaryDir = str(tmp_path / "summaries")
+    full  = runInsertion("full")
+    first = runInsertion("first", {"SUMMARY_DIR": summaryDir})
+    for partition in PARTITION_FILES:
+        assert os.path.exists(os.path.join(summaryDir, partition + ".json"))
+    caplog.clear()
+    second = runInsertion("second", {"SUMMARY_DIR": summaryDir})
+    assert getSummaryLog(caplog)[-1].startswith("Interface summaries: 3 of 3 partition(s) up-to-date")
+    assert readFolder(first) == readFolder(full)
+    assert readFolder(second) == readFolder(full)
+
+
+def test_changed_partition_is_resummarized(tmp_path, runInsertion, sampleFilelist, caplog):
+    caplog.set_level(logging.INFO)
+    summaryDir = str(tmp_path / "summaries")
+    runInsertion("first", {"SUMMARY_DIR": summaryDir})
+    # Dropping a control pragma of one partition changes its summary, the other partitions stay up-to-date
+    agentFile = os.path.join(os.path.dirname(sampleFilelist), PARTITION_FILES["target_agent"])
+    with open(agentFile, "r") as f:
+        source = f.read()
+    changedSource = source.replace("// #pragma observe 0:0 control signal 0:0", "// #pragma observe 0:0")
+    assert changedSource != source
+    with open(agentFile, "w") as f:
+        f.write(changedSource)
+    caplog.clear()
+    incremental = runInsertion("second", {"SUMMARY_DIR": summaryDir})
+    assert getSummaryLog(caplog)[-1].startswith("Interface summaries: 2 of 3 partition(s) up-to-date")
+    assert readFolder(incremental) == readFolder(runInsertion("full"))
+    caplog.clear()
+    runInsertion("third", {"SUMMARY_DIR": summaryDir})
+    assert getSummaryLog(caplog)[-1].startswith("Interface summaries: 3 of 3 partition(s) up-to-date")
+
+
+def test_changed_settings_invalidate_summaries(tmp_path, runInsertion, caplog):
+    caplog.set_level(logging.INFO)
+    summaryDir = str(tmp_path / "summaries")
+    runInsertion("first", {"SUMMARY_DIR": summaryDir})
+    caplog.clear()
+    coalesced = runInsertion("second", {"SUMMARY_DIR": summaryDir, "COALESCE_RANGES": 1})
+    assert getSummaryLog(caplog)[-1].startswith("Interface summaries: 0 of 3 partition(s) up-to-date")
+    assert readFolder(coalesced) == readFolder(runInsertion("full", {"COALESCE_RANGES": 1}))
@@ -0,0 +1,61 @@
+# Tests of the memory-bounded mode (LOW_MEMORY) - The files written as soon as stage two is done with them are the
+# files of a normal run, and the peak RSS reporting degrades safely where /proc/self/clear_refs cannot be written
+import gc
+import builtins
+import logging
+import pytest
+import ASAPInsertion
+from ASAPInsertion import PeakMemoryMonitor
+from conftest import readFolder
+
+
+# Files are streamed serially and on the process pool (JOBS), by both emitters
+@pytest.mark.parametrize("params", [{}, {"EMITTER": "splice"}, {"COALESCE_RANGES": 1, "HIERARCHY_PRUNING": 1}, \
+                                    {"JOBS": 2}, {"JOBS": 2, "EMITTER": "splice"}])
+def test_low_memory_matches_normal_run(runInsertion, params, caplog):
+    caplog.set_level(logging.INFO)
+    normal    = runInsertion("normal", dict(params, LOW_MEMORY=0))
+    lowMemory = runInsertion("low_memory", dict(params, LOW_MEMORY=1))
+    assert readFolder(lowMemory) == readFolder(normal)
+    assert any(record.getMessage().startswith("Peak RSS in phase 'Parsing'") for record in caplog.records)
+    # The heap is unfrozen at the end of the run
+    assert gc.get_freeze_count() == 0
+
+
+@pytest.mark.parametrize("error", [FileNotFoundError, PermissionError])
+def test_monitor_without_clear_refs(monkeypatch, caplog, error):
+    caplog.set_level(logging.INFO)
+    # /proc/self/clear_refs is missing (e.g. not Linux) or not writable (e.g. in a container)
+    def open(file, *args, **kwargs):
+        if file == '/proc/self/clear_refs':
+            raise error(file)
+        return builtins.open(file, *args, **kwargs)
+    monkeypatch.setattr(ASAPInsertion, "open", open, raising=False)
+    monitor = PeakMemoryMonitor()
+    assert not monitor.resettable
+    monitor.startPhase("Parsing")
+    monitor.startPhase("Stage two")
+    monitor.endPhase()
+    assert list(monitor.phaseToPeakRss) == ["Parsing", "Stage two"]
+    assert all(peakRss > 0 for peakRss in monitor.phaseToPeakRss.values())
+    assert caplog.records[-1].getMessage().endswith("MiB (since process start)")
+
+
+def test_monitor_without_peak_rss(monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    # Neither clear_refs nor the resource module (e.g. Windows) - Phases are not reported
+    monkeypatch.setattr(PeakMemoryMonitor, "resetPeak", staticmethod(lambda: False))
+    monkeypatch.setattr(ASAPInsertion, "resource", None)
+    monitor = PeakMemoryMonitor()
+    monitor.startPhase("Parsing")
+    monitor.endPhase()
+    assert monitor.getPeakRss() is None and monitor.phaseToPeakRss == {}
+    assert not any(record.getMessage().startswith("Peak RSS") for record in caplog.records)
+
+
+def test_disabled_monitor(monkeypatch):
+    monkeypatch.setattr(PeakMemoryMonitor, "resetPeak", staticmethod(lambda: pytest.fail("clear_refs written")))
+    monitor = PeakMemoryMonitor(enabled=False)
+    monitor.startPhase("Parsing")
+    monitor.endPhase()
+    assert monitor.phaseToPeakRss == {}
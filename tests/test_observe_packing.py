@@ -0,0 +1,66 @@
+# Tests of the observe packing (OBSERVE_PACKING) - First fit decreasing packing of the observed signals into SMU segments
+import os
+import json
+from ASAPInsertion import ObservePacker
+
+
+def getPackedSpans(packer):
+    return {keys: (position, position + msb - lsb) for keys, (msb, lsb) in packer.getLeaves(packer.observeSignalList) \
+            for position in [packer.keysToPosition[keys]]}
+
+
+def test_first_fit_decreasing():
+    # Port order: a (3), b (6), c (2), d (5) - Unpacked, b straddles the 8 bit segments
+    observeSignalList = {"TOP": {"a": [2, 0], "b": [8, 3], "u": {"c": [10, 9], "d": [15, 11]}}}
+    packer = ObservePacker(observeSignalList, 8)
+    # Decreasing width: b -> segment 0, d -> segment 1, a -> first fit in segment 1, c -> first fit in segment 0
+    assert packer.keysToPosition == {("TOP", "b"): 0, ("TOP", "u", "d"): 8, ("TOP", "a"): 13, ("TOP", "u", "c"): 6}
+    assert packer.packedSignalList == {"TOP": {"a": [15, 13], "b": [5, 0], "u": {"c": [7, 6], "d": [12, 8]}}}
+    assert packer.straddling == [("TOP", "b")]
+    assert packer.getReport() == {"SEGMENT_SIZE": 8, "SEGMENTS": 2, "UNPACKED_SEGMENTS": 2, "PACKED_WIDTH": 16, "UTILIZATION": 1.0}
+    assert packer.getPackedGaps() == []
+
+
+def test_equal_widths_keep_port_order():
+    observeSignalList = {"TOP": {"a": [1, 0], "b": [3, 2], "c": [5, 4]}}
+    packer = ObservePacker(observeSignalList, 3)
+    assert [packer.keysToPosition[("TOP", signal)] for signal in "abc"] == [0, 3, 6]
+    assert packer.getPackedGaps() == [[2, 2], [5, 5]]
+    assert packer.getPackedRanges() == [(1, 0, 1, 0), (4, 3, 3, 2), (7, 6, 5, 4)]
+
+
+def test_wide_signal_is_segment_aligned():
+    # w (10 bits) takes segments 0 and 1 and 2 bits of segment 2. x (2 bits) fills segment 2
+    observeSignalList = {"TOP": {"x": [1, 0], "w": [11, 2], "y": [14, 12]}}
+    packer = ObservePacker(observeSignalList, 4)
+    assert packer.keysToPosition == {("TOP", "w"): 0, ("TOP", "x"): 10, ("TOP", "y"): 12}
+    assert packer.numSegments == 4
+    assert packer.packedWidth == 15
+
+
+def test_no_packed_signal_straddles_a_segment():
+    widths = [3, 1, 4, 1, 5, 2, 2, 4, 3, 5, 1, 2]
+    observeSignalList, index = {"TOP": {}}, 0
+    for signal, width in enumerate(widths):
+        observeSignalList["TOP"]["s%d"%(signal)] = [index + width - 1, index]
+        index += width
+    packer = ObservePacker(observeSignalList, 5)
+    for lsb, msb in getPackedSpans(packer).values():
+        assert lsb // 5 == msb // 5
+    # No two signals overlap and the packed segments are the minimal number of 5 bit bins
+    positions = sorted(getPackedSpans(packer).values())
+    assert all(previous[1] < current[0] for previous, current in zip(positions, positions[1:]))
+    assert packer.numSegments == 7
+
+
+def test_sample_interface_is_packed(runInsertion):
+    outputFolder = runInsertion("packed", {"OBSERVE_PACKING": 1})
+    with open(os.path.join(outputFolder, "asap_interface.json"), "r") as f:
+        interface = json.load(f)
+    assert interface["OBSERVE_PACKING"]["SEGMENT_SIZE"] == 5
+    assert interface["OBSERVE_PACKING"]["SEGMENTS"] <= interface["OBSERVE_PACKING"]["UNPACKED_SEGMENTS"]
+    packed = ObservePacker.getLeaves(interface["OBSERVABILITY_MAP"])
+    ported = ObservePacker.getLeaves(interface["OBSERVE_PORT_MAP"])
+    assert [keys for keys, _ in packed] == [keys for keys, _ in ported]
+    for keys, (msb, lsb) in packed:
+        assert msb - lsb > 4 or msb // 5 == lsb // 5
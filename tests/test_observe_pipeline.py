@@ -0,0 +1,106 @@
+# Tests of the observe pipeline (PIPELINE_INTERVAL) - The register stages are balanced, every observed signal reaches
+# the top observe port with the same latency, and the registers are clocked on an input port of the top module
+import os
+import json
+import logging
+import pytest
+from conftest import readFolder
+
+# Hierarchy of unequal depth - top --> (leaf_a, mid --> leaf_b)
+NESTED_DESIGN = {"top.v"    : "module top(input clk,\n"                                              \
+                              "           input [1:0] t  // #pragma observe 1:0\n"                   \
+                              "          );\n"                                                       \
+                              "  leaf_a la(.clk(clk), .a(t[0]));\n"                                  \
+                              "  mid m(.clk(clk), .b(t[1]));\n"                                      \
+                              "endmodule\n",
+                 "mid.v"    : "module mid(input clk, input b);\n"                                    \
+                              "  leaf_b lb(.clk(clk), .b(b));\n"                                     \
+                              "endmodule\n",
+                 "leaf_a.v" : "module leaf_a(input clk,\n"                                           \
+                              "              input a  // #pragma observe 0:0\n"                      \
+                              "             );\n"                                                    \
+                              "endmodule\n",
+                 "leaf_b.v" : "module leaf_b(input clk,\n"                                           \
+                              "              input b  // #pragma observe 0:0\n"                      \
+                              "             );\n"                                                    \
+                              "endmodule\n"}
+
+
+def getStageCounts(stageMap):
+    counts = []
+    for value in stageMap.values():
+        counts.extend(getStageCounts(value) if isinstance(value, dict) else [value])
+    return counts
+
+def readInterface(outputFolder):
+    with open(os.path.join(outputFolder, "asap_interface.json"), "r") as f:
+        return json.load(f)
+
+@pytest.fixture
+def nestedFilelist(tmp_path):
+    folder = tmp_path / "nested"
+    folder.mkdir()
+    for filename, source in NESTED_DESIGN.items():
+        (folder / filename).write_text(source)
+    filelist = folder / "filelist.f"
+    filelist.write_text("\n".join(str(folder / filename) for filename in NESTED_DESIGN) + "\n")
+    return str(filelist)
+
+
+@pytest.mark.parametrize("interval", [1, 2, 3])
+def test_sample_latency_is_balanced(runInsertion, interval):
+    interface = readInterface(runInsertion("pipelined", {"PIPELINE_INTERVAL": interval}))
+    stageCounts = getStageCounts(interface['OBSERVE_PIPELINE_MAP'])
+    assert len(stageCounts) == 7
+    assert set(stageCounts) == {interface['OBSERVE_PIPELINE_DEPTH']}
+
+
+def test_nested_latency_is_balanced(runInsertion, nestedFilelist):
+    outputFolder = runInsertion("nested", {"PIPELINE_INTERVAL": 1}, filelist=nestedFilelist)
+    interface = readInterface(outputFolder)
+    # leaf_b: leaf_b, mid and top stages. leaf_a and the top signals are delayed to the same latency
+    assert interface['OBSERVE_PIPELINE_DEPTH'] == 3
+    assert getStageCounts(interface['OBSERVE_PIPELINE_MAP']) == [3, 3, 3]
+    top = readFolder(outputFolder)["top.v"].decode()
+    assert "observe_port_la_dly0 <= observe_port_inst[0:0]" in top
+    assert "observe_port_la_dly1" not in top
+    assert "observe_port_int_dly1 <= observe_port_int_dly0" in top
+    assert "observe_port_pipe <= { observe_port_int_dly1, { observe_port_inst[1:1], observe_port_la_dly0 } }" in top
+
+
+def test_pipeline_clock_is_top_input(runInsertion):
+    outputFolder = runInsertion("pipelined", {"PIPELINE_INTERVAL": 1})
+    files = readFolder(outputFolder)
+    top = files["top.v"].decode()
+    # No new clock port on the top module - The instances are clocked on the pipeline clock
+    assert "input observe_port_clk" not in top
+    assert ".observe_port_clk(clk)" in top
+    assert "always @(posedge clk) observe_port_pipe" in top
+    assert "input observe_port_clk" in files["software_adaptor.v"].decode()
+
+
+def test_pipeline_clock_must_exist(runInsertion):
+    with pytest.raises(AssertionError, match="not an input port of the top module"):
+        runInsertion("pipelined", {"PIPELINE_INTERVAL": 1, "PIPELINE_CLOCK": "asap_clk"})
+
+
+# The compiler reads the stage count from asap_interface.json and from the compiled interface - The latency is logged,
+# not compensated, so the bitstreams are the bitstreams of an interface without pipeline
+@pytest.mark.parametrize("interfaceIndex", [0, 1])
+def test_compiler_reads_pipeline_depth(runInsertion, runCompiler, caplog, interfaceIndex):
+    caplog.set_level(logging.INFO)
+    pipelined = runInsertion("pipelined", {"PIPELINE_INTERVAL": 1, "INTERFACE_INDEX": interfaceIndex})
+    plain     = runInsertion("plain", {"INTERFACE_INDEX": interfaceIndex})
+    depth     = readInterface(pipelined)['OBSERVE_PIPELINE_DEPTH']
+    assert depth > 0
+    caplog.clear()
+    pipelinedStreams = readFolder(runCompiler("pipelined_streams", os.path.join(pipelined, "asap_interface.json")))
+    messages = [record.getMessage() for record in caplog.records]
+    assert ("Using compiled interface %s"%(os.path.join(pipelined, "asap_interface.idx")) in messages) == bool(interfaceIndex)
+    assert "Observe pipeline depth = %d stage(s) - Triggers fire %d cycle(s) after the observed sequences"%(depth, depth) in messages
+    caplog.clear()
+    plainStreams = readFolder(runCompiler("plain_streams", os.path.join(plain, "asap_interface.json")))
+    assert not any(record.getMessage().startswith("Observe pipeline depth") for record in caplog.records)
+    assert "smu.stream" in pipelinedStreams and "sru.stream" in pipelinedStreams
+    assert {name: data for name, data in pipelinedStreams.items() if name.endswith(".stream")} == \
+           {name: data for name, data in plainStreams.items() if name.endswith(".stream")}
@@ -0,0 +1,75 @@
+# Tests of the patch partitions (PATCH_PARTITIONS) - Partition interfaces of the insertion, and the routing of the
+# sequences (SMU) and controls (SRU) of a patch program to the partitions by the compiler
+import os
+import json
+import logging
+import pytest
+from ASAPCompiler import ASAPSmuGrammar, ASAPSruGrammar, PatchPartitionRouter
+
+PARTITION_TO_INTERFACE = {"cpu" : {"OBSERVABILITY_MAP"   : {"TOP": {"core": {"state": [1, 0]}}},
+                                   "CONTROLLABILITY_MAP" : {"TOP": {"core": {"stall": [0, 0]}}}},
+                          "io"  : {"OBSERVABILITY_MAP"   : {"TOP": {"valid": [0, 0]}},
+                                   "CONTROLLABILITY_MAP" : {"TOP": {"ready": [0, 0]}}}}
+
+SMU_PROGRAM = "t0 {\n(TOP.core.state[1:0] == 2'b11)\n}\n" \
+              "t1 {\n(TOP.valid[0:0] == 1'b1)\n}\n"
+
+
+def getControl(signal, trigger):
+    return "signal {\n  name = %s\n  trigger = %s\n  constant = 1'b0\n}\n"%(signal, trigger)
+
+def route(smuProgram, sruProgram):
+    sequenceList, diagnostics = ASAPSmuGrammar.getGrammar().parseText(smuProgram)
+    assert diagnostics == []
+    controlNodeList, diagnostics = ASAPSruGrammar.getGrammar().parseText(sruProgram)
+    assert diagnostics == []
+    router = PatchPartitionRouter(PARTITION_TO_INTERFACE)
+    partitionToSequences, sequenceToPartition = router.routeSequences(sequenceList)
+    return partitionToSequences, sequenceToPartition, router.routeControls(controlNodeList, sequenceToPartition)
+
+def getRoutingErrors(caplog):
+    return [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+
+
+def test_sequences_and_controls_are_routed():
+    partitionToSequences, sequenceToPartition, partitionToControls = \
+        route(SMU_PROGRAM, getControl("TOP.core.stall[0:0]", "(t0)") + getControl("TOP.ready[0:0]", "(t1')"))
+    assert sequenceToPartition == {"t0": "cpu", "t1": "io"}
+    assert [sequence.name for sequence in partitionToSequences["cpu"].sequences] == ["t0"]
+    assert [controlNode.signal.name for controlNode in partitionToControls["cpu"].controlNodes] == ["TOP.core.stall"]
+    assert [controlNode.signal.name for controlNode in partitionToControls["io"].controlNodes] == ["TOP.ready"]
+
+
+def test_sequence_across_partitions_is_rejected(caplog):
+    smuProgram = "t0 {\n(TOP.core.state[1:0] == 2'b11)\n(TOP.valid[0:0] == 1'b1)\n}\n"
+    with pytest.raises(SystemExit):
+        route(smuProgram, "")
+    assert "A sequence has to be within one partition" in getRoutingErrors(caplog)[-1]
+
+
+def test_control_triggered_from_other_partition_is_rejected(caplog):
+    with pytest.raises(SystemExit):
+        route(SMU_PROGRAM, getControl("TOP.ready[0:0]", "(t0 + t1)"))
+    assert getRoutingErrors(caplog)[-1] == \
+           "Control of TOP.ready (patch partition io) is triggered by sequence t0 of patch partition cpu"
+
+
+def test_undefined_trigger_is_rejected(caplog):
+    with pytest.raises(SystemExit):
+        route(SMU_PROGRAM, getControl("TOP.ready[0:0]", "(t1 . t7)"))
+    assert getRoutingErrors(caplog)[-1] == "Trigger t7 of the control of TOP.ready not programmed in SMU patch"
+
+
+def test_partition_interfaces(runInsertion):
+    outputFolder = runInsertion("partitioned", {"PATCH_PARTITIONS": "ip:adaptor,controller"})
+    with open(os.path.join(outputFolder, "asap_interface.json"), "r") as f:
+        partitions = json.load(f)["PATCH_PARTITIONS"]
+    # The agent instance and rd_ready of the top module are outside of all instance paths. Indices are local to the partition
+    assert list(partitions) == ["ip", "default"]
+    assert list(partitions["ip"]["OBSERVABILITY_MAP"]["TOP"]) == ["adaptor", "controller"]
+    assert partitions["default"]["OBSERVABILITY_MAP"]["TOP"] == {"agent": {"access_en": [0, 0]}, "rd_ready": [1, 1]}
+
+
+def test_default_partition_name_is_reserved(runInsertion):
+    with pytest.raises(AssertionError, match="reserved"):
+        runInsertion("partitioned", {"PATCH_PARTITIONS": "default:adaptor"})
@@ -0,0 +1,163 @@
+# Tests of the SMU/SRU patch program grammars - ASTs of well-formed programs, and the diagnostics (line, column) of
+# syntax errors and illegal characters, with the recovery at the end of the enclosing sequence/control block
+import sys
+import pytest
+import ply.lex as lex
+from ASAPCompiler import ASAPCompiler, ASAPSmuGrammar, ASAPSruGrammar, ASAPSmuParser, ASAPPatchSyntaxError, Signal, Clock, TriggerOp, \
+                         BaseLexer, ASAPSmuLexer, ASAPSruLexer, ASAPTriggerLexer
+
+SMU_PROGRAM = "t0 {\n"                                     \
+              "  (TOP.adaptor.req_state[1:0] == 2'b11)\n"  \
+              "  ()\n"                                     \
+              "  (TOP.rd_ready[0:0] > 1'b0)\n"             \
+              "}\n"                                        \
+              "t1{(TOP.rd_ready[0:0]<1'b1)}\n"
+
+SRU_PROGRAM = "signal {\n"                                 \
+              "  name = TOP.rd_ready[0:0]\n"               \
+              "  trigger = (t0 . t1' + ~t2)\n"             \
+              "  constant = 1'b0\n"                        \
+              "}\n"                                        \
+              "clock {\n"                                  \
+              "  trigger = (t1)\n"                         \
+              "  name = TOP.adaptor.clk_en[0:0]\n"         \
+              "}\n"
+
+
+def test_smu_program():
+    sequenceList, diagnostics = ASAPSmuGrammar.getGrammar().parseText(SMU_PROGRAM)
+    assert diagnostics == []
+    assert [sequence.name for sequence in sequenceList.sequences] == ["t0", "t1"]
+    patterns = sequenceList.sequences[0].patterns
+    assert (patterns[0].lhs.name, patterns[0].lhs.msb, patterns[0].lhs.lsb) == ("TOP.adaptor.req_state", 1, 0)
+    assert (patterns[0].opType.operator, patterns[0].rhs.width, patterns[0].rhs.binaryValue) == ("==", 2, "11")
+    # Empty pattern
+    assert (patterns[1].lhs, patterns[1].opType, patterns[1].rhs) == (None, None, None)
+    assert patterns[2].opType.operator == ">"
+    assert sequenceList.sequences[1].patterns[0].opType.operator == "<"
+
+
+def test_sru_program():
+    controlNodeList, diagnostics = ASAPSruGrammar.getGrammar().parseText(SRU_PROGRAM)
+    assert diagnostics == []
+    signal, clock = controlNodeList.controlNodes
+    assert isinstance(signal, Signal) and isinstance(clock, Clock)
+    assert (signal.signal.name, signal.constant.width, signal.constant.binaryValue) == ("TOP.rd_ready", 1, "0")
+    # The expression keeps its outer parentheses, its AST is built by the SRU grammar
+    assert signal.trigger.expr == "(t0 . t1' + ~t2)"
+    assert isinstance(signal.trigger.exprTree, TriggerOp) and signal.trigger.exprTree.operator == "+"
+    assert signal.trigger.getVarList() == ["t0", "t1", "t2"]
+    assert (clock.signal.name, clock.trigger.expr) == ("TOP.adaptor.clk_en", "(t1)")
+
+
+def test_smu_errors_are_recovered():
+    program = "t0 {\n"                            \
+              "  (TOP.a[1:0] 2'b11)\n"            \
+              "  (TOP.a[1:0] == 2'b10)\n"         \
+              "}\n"                               \
+              "t1 { (TOP.b[0:0] == 1'b1) }\n"
+    sequenceList, diagnostics = ASAPSmuGrammar.getGrammar().parseText(program)
+    assert diagnostics == ["Line 2, Column 15: Syntax Error: Unexpected token CONST", \
+                           "Line 2, Column 3: Syntax Error: Pattern should be (<VARIABLE> <COMPARISON> <CONST>)"]
+    # The malformed pattern is dropped, the rest of the program is parsed
+    assert [len(sequence.patterns) for sequence in sequenceList.sequences] == [1, 1]
+
+
+def test_sru_errors_are_recovered():
+    program = "signal {\n"                        \
+              "  name = TOP.x[0:0]\n"             \
+              "  trigger = (t0 +)\n"              \
+              "  constant = 1'b0\n"               \
+              "}\n"                               \
+              "clock { name = TOP.c[0:0] }\n"     \
+              "clock { name = TOP.c[0:0] trigger = (t0) }\n"
+    controlNodeList, diagnostics = ASAPSruGrammar.getGrammar().parseText(program)
+    assert diagnostics == ["Line 3, Column 18: Syntax Error: Unexpected token RPAREN",                        \
+                           "Line 5, Column 1: Control block skipped",                                        \
+                           "Line 6, Column 1: Syntax Error: Illegal arguments for CLOCK block definition - Expected one NAME/TRIGGER each"]
+    assert len(controlNodeList.controlNodes) == 1
+
+
+@pytest.mark.parametrize("grammar, program, diagnostic", [
+    (ASAPSmuGrammar, "t0 {\n  (TOP.a[1:0] == 2'b11);\n}\n",  "Line 2, Column 24: Lexer Error: Illegal character ';'"),
+    (ASAPSmuGrammar, "t0 {\n  @(TOP.a[1:0] == 2'b11)\n}\n",  "Line 2, Column 3: Lexer Error: Illegal character '@'"),
+    (ASAPSruGrammar, "clock {\n  name = TOP.c[0:0]\n  trigger = (t0 $ t1)\n}\n", "Line 3, Column 17: Lexer Error: Illegal character '$'")])
+def test_illegal_characters_are_diagnostics(grammar, program, diagnostic):
+    result, diagnostics = grammar.getGrammar().parseText(program)
+    assert diagnostics[0] == diagnostic
+
+
+def test_parser_raises_with_all_diagnostics(tmp_path):
+    smuFile = tmp_path / "patch.asap.smu"
+    smuFile.write_text("t0 {\n  (TOP.a[1:0] 2'b11)\n}\nt1 {\n  (TOP.a[1:0] == 2'b11);\n}\n")
+    with pytest.raises(ASAPPatchSyntaxError) as error:
+        ASAPSmuParser(str(smuFile), exitOnError=False)
+    assert len(error.value.diagnostics) == 3
+    assert error.value.diagnostics[-1] == "Line 5, Column 24: Lexer Error: Illegal character ';'"
+
+
+
+# The compiler parses both programs before compiling - The diagnostics of both are reported before it exits
+def test_compiler_reports_both_programs(tmp_path, caplog):
+    smuFile, sruFile = tmp_path / "patch.asap.smu", tmp_path / "patch.asap.sru"
+    smuFile.write_text("t0 {\n  (TOP.a[1:0] 2'b11)\n}\n")
+    sruFile.write_text("clock {\n  name = TOP.c[0:0]\n  trigger = (t0 $ t1)\n}\n")
+    with pytest.raises(SystemExit):
+        ASAPCompiler.parsePrograms(str(smuFile), str(sruFile))
+    messages = [record.getMessage() for record in caplog.records if record.levelname == "ERROR"]
+    assert "%s: Line 2, Column 15: Syntax Error: Unexpected token CONST"%(smuFile) in messages
+    assert "%s: Line 3, Column 17: Lexer Error: Illegal character '$'"%(sruFile) in messages
+    assert messages[-1] == "Patch program parsing failed - 2 syntax error(s) in %s, 3 syntax error(s) in %s"%(smuFile, sruFile)
+    # Well-formed programs are parsed once, for the SMU and the SRU compilers
+    smuFile.write_text(SMU_PROGRAM)
+    sruFile.write_text(SRU_PROGRAM)
+    sequenceList, controlNodeList = ASAPCompiler.parsePrograms(str(smuFile), str(sruFile))
+    assert (len(sequenceList.sequences), len(controlNodeList.controlNodes)) == (2, 2)
+
+# Lexers built from the lex tables skip PLY's validation of the rules (e.g. a rule defined twice in the file)
+@pytest.mark.parametrize("lexerClass, program, numTokens", [(ASAPSmuLexer, SMU_PROGRAM, 23),
+                                                            (ASAPSruLexer, SRU_PROGRAM, 31),
+                                                            (ASAPTriggerLexer, "(t0 . t1' + ~t2)", 9)])
+def test_lexers_build_without_tables(lexerClass, program, numTokens):
+    lexer = lex.lex(module=lexerClass())
+    lexer.input(program)
+    assert sum(1 for token in iter(lexer.token, None)) == numTokens
+
+
+# Lexers of the master lexer cache are clones - Inputs lexed back to back do not share the position, line or errors
+@pytest.mark.parametrize("lexerClass, program, badProgram", [(ASAPSmuLexer, SMU_PROGRAM, "t0 {\n  (TOP.a[1:0] == 2'b11);\n}\n"),
+                                                            (ASAPSruLexer, SRU_PROGRAM, "clock {\n  trigger = (t0 $ t1)\n}\n")])
+def test_cached_lexers_are_reset(lexerClass, program, badProgram):
+    def lexProgram(text):
+        lexer  = lexerClass().lexer
+        errors = []
+        lexer.errorHandler = lambda lexpos, message: errors.append((lexpos, message))
+        lexer.input(text)
+        tokens = [(token.type, token.lexpos) for token in iter(lexer.token, None)]
+        return lexer, tokens, errors
+    _, expected, _ = lexProgram(program)
+    badLexer, badTokens, badErrors = lexProgram(badProgram)
+    assert len(badErrors) == 1 and badErrors[0][1].startswith("Lexer Error: Illegal character")
+    lexer, tokens, errors = lexProgram(program)
+    assert lexer is not badLexer and lexer is not BaseLexer.masterLexers[lexerClass.__name__]
+    assert (tokens, errors, lexer.lineno) == (expected, [], 1)
+    # The master lexer is never fed an input
+    assert BaseLexer.masterLexers[lexerClass.__name__].lexdata is None
+
+
+# The lex table directory is on sys.path while the table is loaded only - also when the build fails
+@pytest.mark.parametrize("fail", [False, True])
+def test_master_lexer_restores_sys_path(monkeypatch, fail):
+    monkeypatch.setattr(BaseLexer, "masterLexers", {})
+    sysPath = list(sys.path)
+    if fail:
+        def failingLex(**kwargs):
+            assert sys.path[0] == BaseLexer.getDefaultTableDir()
+            raise SyntaxError("Can't build lexer")
+        monkeypatch.setattr(lex, "lex", failingLex)
+        with pytest.raises(SyntaxError):
+            ASAPSmuLexer()
+    else:
+        ASAPSmuLexer()
+        assert "ASAPSmuLexer" in BaseLexer.masterLexers
+    assert sys.path == sysPath
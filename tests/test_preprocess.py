@@ -0,0 +1,124 @@
+# Tests of the batched preprocessing (VerilogPreprocessStage) - Every file of the batch is its own compilation unit
+# iverilog is not required: A minimal 'iverilog -E' (PREPROCESSOR) runs all sources as one compilation unit, as
+# iverilog does, so macros leak across files unless the boundary marker files reset them
+import os
+import sys
+import stat
+import pytest
+from ASAPInsertion import VerilogPreprocessStage, PreprocessingError
+
+PREPROCESSOR = r'''
+import os
+import re
+import sys
+args, macros, includes, sources, output = sys.argv[1:], {}, [], [], None
+index = 0
+while index < len(args):
+    if args[index] in ('-D', '-I', '-o'):
+        option, value = args[index], args[index + 1]
+        if option == '-D':
+            name, _, text = value.partition('=')
+            macros[name] = text if text else '1'
+        elif option == '-I':
+            includes.append(value)
+        else:
+            output = value
+        index += 2
+    else:
+        if args[index] != '-E':
+            sources.append(args[index])
+        index += 1
+
+def expand(line):
+    return re.sub(r'`(\w+)', lambda m: macros.get(m.group(1), m.group(0)), line)
+
+def preprocess(source, lines):
+    active = []
+    for line in open(source).read().splitlines():
+        directive = re.match(r'\s*`(\w+)\s*(.*)', line)
+        name = directive.group(1) if directive else None
+        args = directive.group(2).split(None, 1) if directive else []
+        if name in ('ifdef', 'ifndef'):
+            active.append((args[0] in macros) == (name == 'ifdef'))
+        elif name == 'else':
+            active[-1] = not active[-1]
+        elif name == 'endif':
+            active.pop()
+        elif not all(active):
+            pass
+        elif name == 'define':
+            macros[args[0]] = args[1] if len(args) > 1 else ''
+        elif name == 'undef':
+            macros.pop(args[0], None)
+        elif name == 'undefineall':
+            macros.clear()
+        elif name == 'include':
+            includeName = args[0].strip('"')
+            for directory in [os.path.dirname(source)] + includes:
+                if os.path.isfile(os.path.join(directory, includeName)):
+                    preprocess(os.path.join(directory, includeName), lines)
+                    break
+            else:
+                sys.exit("Include %s not found" % includeName)
+            continue
+        else:
+            lines.append(expand(line))
+            continue
+        lines.append('')
+
+lines = []
+for source in sources:
+    preprocess(source, lines)
+with open(output, 'w') as f:
+    f.write('\n'.join(lines) + '\n')
+'''
+
+
+@pytest.fixture
+def preprocessor(tmp_path, monkeypatch):
+    script = tmp_path / "iverilog"
+    script.write_text("#!%s\n%s"%(sys.executable, PREPROCESSOR))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PYVERILOG_IVERILOG", str(script))
+
+def writeSources(folder, fileToText):
+    files = []
+    for filename, text in fileToText.items():
+        files.append(str(folder / filename))
+        with open(files[-1], "w") as f:
+            f.write(text)
+    return files
+
+
+SOURCES = {"a.v": "`define WIDE\nmodule a(input [`W-1:0] x);\nendmodule\n",                                     \
+           "b.v": "module b(\n`ifdef WIDE\ninput [7:0] y\n`else\ninput y\n`endif\n);\nendmodule\n",            \
+           "c.v": "`define WIDE\n`ifdef WIDE\nmodule c(input [`W-1:0] z);\n`endif\nendmodule\n"}
+
+
+def test_macros_do_not_leak_across_files(tmp_path, preprocessor):
+    files = writeSources(tmp_path, SOURCES)
+    stage = VerilogPreprocessStage(defines=("W=4",))
+    batch = stage.preprocess(files)
+    # WIDE of a.v is not defined in b.v, the command line define W is defined in every file
+    assert batch[files[1]].splitlines()[4] == "input y"
+    assert batch[files[0]].splitlines()[1] == "module a(input [4-1:0] x);"
+    assert batch[files[2]].splitlines()[2] == "module c(input [4-1:0] z);"
+    # The output of a file does not depend on the other files of the batch (e.g. the cache misses of the AST cache)
+    for file in files:
+        assert stage.preprocess([file])[file] == batch[file]
+    assert stage.preprocess(files[::-1]) == batch
+
+
+def test_line_numbers_are_preserved(tmp_path, preprocessor):
+    files = writeSources(tmp_path, SOURCES)
+    for file, text in VerilogPreprocessStage(defines=("W=4",)).preprocess(files).items():
+        with open(file, "r") as f:
+            assert len(text.splitlines()) == len(f.read().splitlines())
+
+
+def test_fast_path_and_failures(tmp_path, preprocessor):
+    files = writeSources(tmp_path, {"plain.v": "module plain;\nendmodule\n", "broken.v": "`include \"missing.vh\"\n"})
+    stage = VerilogPreprocessStage()
+    assert stage.preprocess(files[:1]) == {files[0]: "module plain;\nendmodule\n"}
+    with pytest.raises(PreprocessingError):
+        stage.preprocess(files)
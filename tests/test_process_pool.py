@@ -0,0 +1,23 @@
+# Tests of the process pool (JOBS) - Parsing, stage one hook insertion and code generation in worker processes give
+# the same output files as a serial run
+import logging
+import pytest
+from ASAPInsertion import getChunkSize
+from conftest import readFolder
+
+
+@pytest.mark.parametrize("params", [{}, {"EMITTER": "splice"}, {"COALESCE_RANGES": 1, "HIERARCHY_PRUNING": 1}])
+def test_pool_matches_serial_run(runInsertion, params, caplog):
+    caplog.set_level(logging.INFO)
+    serial = runInsertion("serial", dict(params, JOBS=1))
+    assert not any(record.getMessage().startswith("Parsing") and "process pool" in record.getMessage() for record in caplog.records)
+    pooled = runInsertion("pooled", dict(params, JOBS=2))
+    assert any(record.getMessage().startswith("Parsing") and "process pool" in record.getMessage() for record in caplog.records)
+    assert readFolder(pooled) == readFolder(serial)
+
+
+def test_chunk_size():
+    # ~4 chunks per worker, at least one task per chunk
+    assert getChunkSize(100, 4) == 6
+    assert getChunkSize(3, 4) == 1
+    assert getChunkSize(0, 1) == 1
@@ -0,0 +1,69 @@
+# Tests of the simulation insertion mode (INSERTION_MODE = simulation) - Files without controlled signals are copied
+# byte-identical, and the interface (asap_interface.json, asapTop.v) is the interface of the hierarchy mode
+import pytest
+from conftest import readFolder
+
+# top.v observes a port, ctrl_leaf.v has the controlled signals and obs_leaf.v observes an input only
+SIMULATION_DESIGN = {
+    "top.v"       : "module top (\n"
+                    "  input  wire       clk,\n"
+                    "  input  wire [3:0] data,   // #pragma observe 3:0\n"
+                    "  output wire [3:0] result\n"
+                    ");\n"
+                    "  wire [3:0] ctrl;\n"
+                    "  ctrl_leaf u_ctrl (.clk(clk), .data(data), .ctrl(ctrl));\n"
+                    "  obs_leaf  u_obs  (.clk(clk), .ctrl(ctrl), .result(result));\n"
+                    "endmodule\n",
+    "ctrl_leaf.v" : "module ctrl_leaf (\n"
+                    "  input  wire       clk,    // #pragma control clock 0:0\n"
+                    "  input  wire [3:0] data,\n"
+                    "  output reg  [3:0] ctrl    // #pragma control signal 3:0\n"
+                    ");\n"
+                    "  always @(posedge clk) ctrl <= data;\n"
+                    "endmodule\n",
+    "obs_leaf.v"  : "module obs_leaf (\n"
+                    "  input  wire       clk,\n"
+                    "  input  wire [3:0] ctrl,   // #pragma observe 1:0\n"
+                    "  output wire [3:0] result\n"
+                    ");\n"
+                    "  assign result = ~ctrl;  // kept as is\n"
+                    "endmodule\n"}
+
+
+@pytest.fixture
+def simulationFilelist(tmp_path):
+    designDir = tmp_path / "simulation_design"
+    designDir.mkdir()
+    for filename, text in SIMULATION_DESIGN.items():
+        (designDir / filename).write_text(text)
+    filelist = designDir / "filelist.f"
+    filelist.write_text("".join(str(designDir / filename) + "\n" for filename in SIMULATION_DESIGN))
+    return str(filelist)
+
+
+@pytest.mark.parametrize("emitter", ["codegen", "splice"])
+def test_uncontrolled_files_are_unchanged(runInsertion, simulationFilelist, emitter):
+    simulation = readFolder(runInsertion("simulation", {"INSERTION_MODE": "simulation", "EMITTER": emitter}, simulationFilelist))
+    hierarchy  = readFolder(runInsertion("hierarchy", {"INSERTION_MODE": "hierarchy", "EMITTER": emitter}, simulationFilelist))
+    assert simulation["top.v"] == SIMULATION_DESIGN["top.v"].encode()
+    assert simulation["obs_leaf.v"] == SIMULATION_DESIGN["obs_leaf.v"].encode()
+    # Only the controlled module is spliced - Its hooks are internal, no port is threaded to the top module
+    assert simulation["ctrl_leaf.v"] != SIMULATION_DESIGN["ctrl_leaf.v"].encode()
+    assert b"ctrl_controlled" in simulation["ctrl_leaf.v"]
+    assert b"control_port_in_int" in simulation["ctrl_leaf.v"]
+    assert all(hierarchy[filename] != SIMULATION_DESIGN[filename].encode() for filename in SIMULATION_DESIGN)
+    assert simulation["asap_interface.json"] == hierarchy["asap_interface.json"]
+    assert simulation["asapTop.v"] == hierarchy["asapTop.v"]
+    assert "asapSimTaps.v" not in hierarchy
+    taps = simulation["asapSimTaps.v"].decode()
+    assert "  assign observe_port[5:2] = `ASAP_DUT_PATH.data[3:0];\n" in taps
+    assert "  assign observe_port[1:0] = `ASAP_DUT_PATH.u_obs.ctrl[1:0];\n" in taps
+    assert "  assign control_port_in[4:0] = `ASAP_DUT_PATH.u_ctrl.control_port_in_int;\n" in taps
+    assert "  initial force `ASAP_DUT_PATH.u_ctrl.control_port_out_int = control_port_out[4:0];\n" in taps
+
+
+def test_sample_interface_matches_hierarchy_mode(runInsertion):
+    simulation = readFolder(runInsertion("simulation", {"INSERTION_MODE": "simulation"}))
+    hierarchy  = readFolder(runInsertion("hierarchy", {"INSERTION_MODE": "hierarchy"}))
+    assert simulation["asap_interface.json"] == hierarchy["asap_interface.json"]
+    assert simulation["asapTop.v"] == hierarchy["asapTop.v"]
@@ -0,0 +1,96 @@
+# Tests of the splice emitter (EMITTER = splice) - The spliced files are the files generated from the modified ASTs
+# (ASTCodeGenerator) up to formatting and comments, and files whose edits cannot be spliced are generated instead
+import logging
+import pytest
+from pyverilog.ast_code_generator.codegen import ASTCodeGenerator
+import ASAPInsertion
+from ASAPInsertion import VerilogParserPool, SpliceError
+from conftest import readFolder
+
+# Multi-line port lists and instance port args, identifiers of controlled signals in comments and strings, an output
+# reg port (converted to wire) and a controlled reg declaration (replaced in place)
+SPLICE_DESIGN = {
+    "top.v"  : "// Top of the splice test - ctrl and data are renamed in the code only\n"
+               "module top (\n"
+               "  input  wire       clk,     // #pragma control clock 0:0\n"
+               "  input  wire [3:0] data,    // #pragma observe 3:0 control signal 1:0\n"
+               "  output wire [3:0] result\n"
+               ");\n"
+               "  /* ctrl = data ^ 4'b0101 */\n"
+               "  wire [3:0] ctrl;           // #pragma control signal 3:0\n"
+               "  assign ctrl = data ^ 4'b0101;\n"
+               "  leaf u_leaf (\n"
+               "    .clk    (clk),\n"
+               "    .ctrl   (ctrl),\n"
+               "    .result (result)\n"
+               "  );\n"
+               "  initial $display(\"data ctrl\");\n"
+               "endmodule\n",
+    "leaf.v" : "module leaf (\n"
+               "  input  wire       clk,\n"
+               "  input  wire [3:0] ctrl,\n"
+               "  output reg  [3:0] result   // #pragma observe 3:0 control signal 3:0\n"
+               ");\n"
+               "  reg [3:0] state;           // #pragma control signal 1:0\n"
+               "  always @(posedge clk) begin\n"
+               "    state  <= ctrl;\n"
+               "    result <= state;  // result follows state\n"
+               "  end\n"
+               "  initial $display(\"state result\");\n"
+               "endmodule\n"}
+
+
+@pytest.fixture
+def spliceFilelist(tmp_path):
+    designDir = tmp_path / "splice_design"
+    designDir.mkdir()
+    for filename, text in SPLICE_DESIGN.items():
+        (designDir / filename).write_text(text)
+    filelist = designDir / "filelist.f"
+    filelist.write_text("".join(str(designDir / filename) + "\n" for filename in SPLICE_DESIGN))
+    return str(filelist)
+
+# Code generated from the AST of a (modified) file - Formatting and comments are dropped
+def regenerate(text, filename):
+    return ASTCodeGenerator().visit(VerilogParserPool().parse(text.decode(), filename))
+
+def assertSplicedMatchesGenerated(spliced, generated):
+    assert spliced.keys() == generated.keys()
+    for filename in generated:
+        if filename.endswith(".v"):
+            assert regenerate(spliced[filename], filename) == regenerate(generated[filename], filename), filename
+        else:
+            assert spliced[filename] == generated[filename], filename
+
+
+@pytest.mark.parametrize("params", [{}, {"COALESCE_RANGES": 1}])
+def test_splice_matches_codegen(runInsertion, spliceFilelist, params):
+    spliced   = readFolder(runInsertion("spliced", dict(params, EMITTER="splice"), spliceFilelist))
+    generated = readFolder(runInsertion("generated", dict(params, EMITTER="codegen"), spliceFilelist))
+    assertSplicedMatchesGenerated(spliced, generated)
+    # Formatting, comments and strings are kept
+    assert spliced["top.v"].startswith(SPLICE_DESIGN["top.v"].encode()[:SPLICE_DESIGN["top.v"].index("module")])
+    assert b"/* ctrl = data ^ 4'b0101 */\n" in spliced["top.v"] and b"$display(\"data ctrl\")" in spliced["top.v"]
+    assert b"    result_controlled <= state;  // result follows state\n" in spliced["leaf.v"]
+    assert b"  output wire  [3:0] result,   // #pragma observe 3:0 control signal 3:0\n" in spliced["leaf.v"]
+    assert b"  reg [3:0] state_controlled;           // #pragma control signal 1:0\n" in spliced["leaf.v"]
+
+
+def test_sample_splice_matches_codegen(runInsertion):
+    assertSplicedMatchesGenerated(readFolder(runInsertion("spliced", {"EMITTER": "splice"})), \
+                                  readFolder(runInsertion("generated", {"EMITTER": "codegen"})))
+
+
+def test_splice_error_falls_back_to_codegen(runInsertion, spliceFilelist, monkeypatch, caplog):
+    caplog.set_level(logging.INFO)
+    generated = readFolder(runInsertion("generated", {"EMITTER": "codegen"}, spliceFilelist))
+    # The instance port args of top.v cannot be spliced - top.v is generated from its AST, leaf.v is still spliced
+    def addPortArgEdits(self, instanceList, instance, numPortArgs):
+        raise SpliceError("port args cannot be appended to instance '%s'"%(instance.name))
+    monkeypatch.setattr(ASAPInsertion.VerilogSpliceEmitter, "addPortArgEdits", addPortArgEdits)
+    spliced = readFolder(runInsertion("spliced", {"EMITTER": "splice"}, spliceFilelist))
+    assert any(record.getMessage().startswith("Splice emitter: port args cannot be appended to instance 'u_leaf' in file") and \
+               record.getMessage().endswith("top.v - Generated the file from the AST instead") for record in caplog.records)
+    assert spliced["top.v"] == generated["top.v"]
+    assert spliced["leaf.v"] != generated["leaf.v"]
+    assertSplicedMatchesGenerated(spliced, generated)
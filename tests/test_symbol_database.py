@@ -0,0 +1,59 @@
+# Tests of the design symbol database (SYMBOL_DB) of the sample design - The tables written by insertion, the
+# hierarchical_signals view and the prefix/REGEXP/width queries of findSignals
+import os
+import pytest
+from ASAPInsertion import SymbolDatabase
+
+
+@pytest.fixture
+def database(tmp_path, runInsertion):
+    path = str(tmp_path / "symbols.db")
+    runInsertion("symbols", {"SYMBOL_DB": path})
+    database = SymbolDatabase(path)
+    yield database
+    database.close()
+
+def getPaths(rows):
+    return sorted(row[0] for row in rows)
+
+
+def test_tables(database, sampleFilelist):
+    designDir = os.path.dirname(sampleFilelist)
+    assert database.execute("SELECT * FROM modules ORDER BY name") == \
+           [(module, os.path.join(designDir, module + ".v"), 3) for module in ["access_controller", "software_adaptor", "target_agent", "top"]]
+    assert database.execute("SELECT * FROM instances ORDER BY path") == [("top",            "top",        "top",               None,  0), \
+                                                                         ("top.adaptor",    "adaptor",    "software_adaptor",  "top", 1), \
+                                                                         ("top.agent",      "agent",      "target_agent",      "top", 1), \
+                                                                         ("top.controller", "controller", "access_controller", "top", 1)]
+    columns = "direction, type, msb, lsb, width, observe_msb, observe_lsb, control_type, control_msb, control_lsb"
+    query   = "SELECT %s FROM signals WHERE module = ? AND name = ?"%(columns)
+    # A port with a parameterized width, an output reg port and module level declarations with pragmas
+    assert database.execute(query, ("access_controller", "key_hash")) == [("input", "wire", 63, 0, 64, None, None, None, None, None)]
+    assert database.execute(query, ("software_adaptor", "data_out")) == [("output", "reg", 31, 0, 32, None, None, "signal", 31, 0)]
+    assert database.execute(query, ("software_adaptor", "req_state")) == [(None, "reg", 1, 0, 2, 1, 0, None, None, None)]
+    assert database.execute(query, ("top", "rd_ready")) == [("input", "wire", 0, 0, 1, 0, 0, "signal", 0, 0)]
+
+
+def test_hierarchical_signals(database):
+    assert database.execute("SELECT count(*) FROM hierarchical_signals") == database.execute("SELECT count(*) FROM signals")
+    assert database.execute("SELECT path, instance_path, module, name, width FROM hierarchical_signals WHERE path = ?", \
+                            ("top.controller.key_en",)) == [("top.controller.key_en", "top.controller", "access_controller", "key_en", 1)]
+
+
+def test_find_signals(database):
+    assert len(database.findSignals()) == len(database.findSignals(pathPrefix="top"))
+    assert {row[1] for row in database.findSignals(pathPrefix="top.controller")} == {"top.controller"}
+    # Prefixes match whole instance names only
+    assert database.findSignals(pathPrefix="top.control") == []
+    assert getPaths(database.findSignals(pathRegex=r"\.key_hash(_next)?$")) == ["top.adaptor.key_hash", "top.adaptor.key_hash_next", \
+                                                                                 "top.controller.key_hash", "top.key_hash"]
+    assert getPaths(database.execute("SELECT * FROM hierarchical_signals WHERE path REGEXP ?", (r"^top\.agent\.",))) == \
+           ["top.agent.access_en", "top.agent.priv_data"]
+
+
+def test_wide_signals_under_a_hierarchy(database):
+    # The signals under top.adaptor wider than 8 bits
+    expected = ["top.adaptor.data_in", "top.adaptor.data_out", "top.adaptor.key_hash", "top.adaptor.key_hash_next", "top.adaptor.priv_data"]
+    assert getPaths(database.findSignals(pathPrefix="top.adaptor", minWidth=9)) == expected
+    assert getPaths(database.execute("SELECT * FROM hierarchical_signals WHERE instance_path LIKE 'top.adaptor%' AND width > 8")) == expected
+    assert getPaths(database.findSignals(pathPrefix="top.adaptor", minWidth=9, maxWidth=32)) == expected[:2]
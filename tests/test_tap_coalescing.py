@@ -0,0 +1,67 @@
+# Tests of the tap coalescing pass (COALESCE_RANGES) - The concatenation assignment of an internal port connects
+# every port bit to the same signal bit as the per-slice assignments
+import pytest
+from pyverilog.vparser.ast import Assign, Concat, Identifier, Partselect
+from ASAPInsertion import VerilogGenerator
+
+# Adjacent slices (w[7:6], w[5:4]), non-adjacent slices of one signal (w[1:0]), part selects (x[5:2]) and single bits
+SRU_DRIVERS = [("w", 7, 6), ("w", 5, 4), ("x", 5, 2), ("w", 1, 0), ("y", 0, 0)]
+SRU_LOADS   = [(signal + "_controlled", msb, lsb) for signal, msb, lsb in SRU_DRIVERS]
+OBSERVED    = {"w": (7, 4), "x": (3, 3), "z": (9, 2), "y": (0, 0)}
+
+
+def getGenerator(coalesceRanges):
+    return VerilogGenerator({}, {}, None, None, None, {}, {}, "observe", "control_in", "control_out", \
+                            moduleToInputPorts = {}, coalesceRanges = coalesceRanges)
+
+# Bits of an expression (LSB first) as [(<SIGNAL>, <BIT>)] - Whole identifiers are internal ports of <portWidths>
+def getBits(node, portWidths):
+    if isinstance(node, Partselect):
+        return [(node.var.name, bit) for bit in range(int(node.lsb.value), int(node.msb.value) + 1)]
+    if isinstance(node, Concat):
+        return [bit for item in reversed(node.list) for bit in getBits(item, portWidths)]
+    assert isinstance(node, Identifier)
+    return [(node.name, bit) for bit in range(portWidths[node.name])]
+
+# {<LHS BIT>: <RHS BIT>} of a list of assignments
+def getBitMap(assignmentList, portWidths):
+    bitMap = {}
+    for assignment in assignmentList:
+        assert isinstance(assignment, Assign)
+        lhsBits, rhsBits = getBits(assignment.left, portWidths), getBits(assignment.right, portWidths)
+        assert len(lhsBits) == len(rhsBits)
+        for lhsBit, rhsBit in zip(lhsBits, rhsBits):
+            assert lhsBit not in bitMap, "Bit %s driven twice"%(str(lhsBit))
+            bitMap[lhsBit] = rhsBit
+    return bitMap
+
+
+def test_control_taps_are_bit_equivalent():
+    perSlice,  inMsb,  outMsb  = getGenerator(False).createInternalControlTaps(SRU_DRIVERS, SRU_LOADS)
+    coalesced, cInMsb, cOutMsb = getGenerator(True).createInternalControlTaps(SRU_DRIVERS, SRU_LOADS)
+    assert (inMsb, outMsb) == (cInMsb, cOutMsb) == (10, 10)
+    assert (len(perSlice), len(coalesced)) == (2 * len(SRU_DRIVERS), 2)
+    portWidths = {"control_in_int": inMsb + 1, "control_out_int": outMsb + 1}
+    assert getBitMap(coalesced, portWidths) == getBitMap(perSlice, portWidths)
+    # control_in_int = {y[0:0], w[1:0], x[5:2], w[5:4], w[7:6]}
+    assert getBitMap(coalesced[:1], portWidths)[("control_in_int", 4)] == ("x", 2)
+    assert getBitMap(coalesced[1:], portWidths)[("w_controlled", 0)] == ("control_out_int", 8)
+
+
+def test_observe_taps_are_bit_equivalent():
+    # Observed w and y are controlled inputs (tapped as is), x is tapped as x_controlled
+    sruDrivers = SRU_DRIVERS[:2] + [("x_controlled", 5, 2), SRU_DRIVERS[4]]
+    perSlice,  msb          = getGenerator(False).createInternalObserveTaps(OBSERVED, sruDrivers)
+    coalesced, coalescedMsb = getGenerator(True).createInternalObserveTaps(OBSERVED, sruDrivers)
+    assert msb == coalescedMsb == 13 and len(coalesced) == 1
+    portWidths = {"observe_int": msb + 1}
+    assert getBitMap(coalesced, portWidths) == getBitMap(perSlice, portWidths)
+    assert getBitMap(coalesced, portWidths)[("observe_int", 4)] == ("x_controlled", 3)
+
+
+@pytest.mark.parametrize("portIsDriven", [True, False])
+def test_single_tap_is_kept(portIsDriven):
+    generator = getGenerator(True)
+    assignmentList, _, _ = getGenerator(False).createInternalControlTaps(SRU_DRIVERS[:1], SRU_LOADS[:1])
+    tap = assignmentList[:1] if portIsDriven else assignmentList[1:]
+    assert generator.coalesceTapAssignments(tap, portIsDriven) == tap
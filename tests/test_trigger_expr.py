@@ -0,0 +1,99 @@
+# Tests of the trigger expressions of SRU control blocks - The grammar and its precedence rules, the diagnostics of
+# malformed expressions, and the truth tables (PLA minterm cfg) over the PLA inputs
+import os
+import pytest
+from ASAPCompiler import ASAPTriggerGrammar, PosExpr
+from conftest import REPO_DIR, readFolder
+
+
+def parse(expr):
+    exprTree, diagnostics = ASAPTriggerGrammar.getGrammar().parseText(expr)
+    assert diagnostics == []
+    return str(exprTree)
+
+
+@pytest.mark.parametrize("expr, tree", [
+    ("t0",                   "t0"),
+    # Precedence OR < XOR < AND
+    ("t0 + t1 . t2",         "(t0 + (t1 . t2))"),
+    ("t0 ^ t1 . t2 + t3",    "((t0 ^ (t1 . t2)) + t3)"),
+    ("(t0 + t1) . t2",       "((t0 + t1) . t2)"),
+    # Chains of one operation are a single node
+    ("t0 . t1 . t2 . t3",    "(t0 . t1 . t2 . t3)"),
+    ("t0 + t1 + t2 . t3",    "(t0 + t1 + (t2 . t3))"),
+    # Complements bind tighter than the binary operators, the postfix complement before the prefix one
+    ("~t0 . t1",             "(~(t0) . t1)"),
+    ("t0' + t1",             "(~(t0) + t1)"),
+    ("(t0 + t1)'",           "~((t0 + t1))"),
+    ("~t0'",                 "~(~(t0))"),
+    ("~(t0 ^ t1)",           "~((t0 ^ t1))")])
+def test_grammar(expr, tree):
+    assert parse(expr) == tree
+
+
+@pytest.mark.parametrize("expr, diagnostic", [
+    ("(t0 $)",   "Column 5: Lexer Error: Illegal character '$'"),
+    ("(t0 +)",   "Column 6: Unexpected token RPAREN"),
+    ("t0 t1",    "Column 4: Unexpected token VAR"),
+    ("(t0 + t1", "Column 9: Unexpected end of expression")])
+def test_diagnostics(expr, diagnostic):
+    exprTree, diagnostics = ASAPTriggerGrammar.getGrammar().parseText(expr)
+    assert diagnostics[0] == diagnostic
+    with pytest.raises(AssertionError, match="Illegal trigger expression"):
+        PosExpr(expr)
+
+
+def test_pla_inputs_are_in_reverse_name_order():
+    posExpr = PosExpr("t2 . t0 + t1")
+    assert posExpr.getVarList() == ["t0", "t1", "t2"]
+    assert posExpr.InputList == ["t2", "t1", "t0"]
+    # t0 is the MSB of the minterm index: t0.t1' is minterm 0b10
+    assert PosExpr("t0 . t1'").getTruthTable(2) == 1 << 0b10
+
+
+@pytest.mark.parametrize("expr, truthTable", [
+    ("t0",          0b10),
+    ("t0'",         0b01),
+    ("t0 . t1",     0b1000),
+    ("t0 + t1",     0b1110),
+    ("t0 ^ t1",     0b0110),
+    ("~(t0 . t1)",  0b0111),
+    ("t0 . t1'",    0b0100),
+    ("t1 . t0'",    0b0010)])
+def test_truth_table(expr, truthTable):
+    numTriggers = len(PosExpr(expr).getVarList())
+    assert PosExpr(expr).getTruthTable(numTriggers) == truthTable
+
+
+def test_truth_table_dont_care_inputs():
+    # The unused PLA inputs (the MSBs of the minterm index) are don't cares - The table repeats over them
+    assert PosExpr("t0 . t1'").getTruthTable(3) == 0b01000100
+    assert PosExpr("t0").getTruthTable(4) == 0b1010101010101010
+    with pytest.raises(AssertionError, match="More triggers"):
+        PosExpr("t0 . t1 . t2").getTruthTable(2)
+
+
+def test_var_masks():
+    assert [PosExpr.getVarMask(index, 3) for index in range(3)] == [0b10101010, 0b11001100, 0b11110000]
+
+
+@pytest.mark.parametrize("lhs, rhs, equivalent", [
+    ("t0 . t1",           "t1 . t0",                  True),
+    ("~(t0 + t1)",        "t0' . t1'",                True),
+    ("t0 ^ t1",           "t0 . t1' + t0' . t1",      True),
+    ("(t0 + t1) . t2",    "t0 . t2 + t1 . t2",        True),
+    ("t0 . t1",           "t0 + t1",                  False),
+    # Same truth table over different triggers
+    ("t0",                "t1",                       False)])
+def test_equivalent_expressions_share_a_key(lhs, rhs, equivalent):
+    assert (PosExpr(lhs).getExprKey() == PosExpr(rhs).getExprKey()) == equivalent
+
+
+# The sample remediation programs compile to the streams of the sample simulations
+@pytest.mark.parametrize("approach", [1, 2, 3])
+def test_sample_streams(runCompiler, approach):
+    interfaceFile = os.path.join(REPO_DIR, "asap_sample", "src", "asap_modified", "asap_interface.json")
+    outputFolder  = runCompiler("approach_%d"%(approach), interfaceFile, approach)
+    simulationDir = os.path.join(REPO_DIR, "asap_sample", "tests", "remediation_approach_%d"%(approach))
+    for stream in ["smu.stream", "sru.stream"]:
+        assert readFolder(outputFolder)[stream] == readFolder(simulationDir)[stream]